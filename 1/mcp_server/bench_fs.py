@@ -0,0 +1,135 @@
+"""
+Benchmark przepustowości zapisu dużych plików w katalogu data.
+
+Porównuje zapis w miejscu (dotychczasowe zachowanie fs_write_file), zapis atomowy
+dla każdej polityki fsync oraz przesyłanie we fragmentach przez sesję upload.
+Z opcją --search-files porównuje też wyszukiwanie przez indeks z pełnym przeglądaniem plików.
+
+Użycie:
+    python bench_fs.py --size-mb 256 --chunk-kb 1024 --runs 3
+    python bench_fs.py --search-files 20000
+"""
+
+import os
+import time
+import random
+import shutil
+import asyncio
+import argparse
+import aiofiles
+import fs_tool
+from fs_config import FS_CONFIG
+from fs_index import SearchIndex
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+BENCH_DIR = os.path.join(DATA_DIR, ".bench")
+
+
+async def write_in_place(path: str, data: bytes, chunk_size: int) -> None:
+    async with aiofiles.open(path, "wb") as file:
+        await file.write(data)
+
+
+async def write_atomic(path: str, data: bytes, chunk_size: int) -> None:
+    await fs_tool.write_file_atomic(path, data)
+
+
+async def write_upload(path: str, data: bytes, chunk_size: int) -> None:
+    upload_dir = os.path.join(BENCH_DIR, FS_CONFIG["upload_dir"])
+    session = await fs_tool.start_upload(upload_dir, os.path.basename(path), path)
+    offset = 0
+    view = memoryview(data)
+    while offset < len(data):
+        result = await fs_tool.upload_chunk(upload_dir, session["upload_id"], offset, view[offset:offset + chunk_size])
+        offset = result["offset"]
+    await fs_tool.commit_upload(upload_dir, session["upload_id"])
+
+
+async def measure(name: str, writer, data: bytes, chunk_size: int, runs: int) -> None:
+    path = os.path.join(BENCH_DIR, "bench.bin")
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await writer(path, data, chunk_size)
+        timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    size_mb = len(data) / (1024 * 1024)
+    print(f"{name:<32} {best:8.3f} s {size_mb / best:10.1f} MB/s")
+
+
+def full_scan(root: str, word: str) -> int:
+    found = 0
+    for directory, _, files in os.walk(root):
+        for name in files:
+            with open(os.path.join(directory, name), "r", errors="replace") as file:
+                if word in file.read():
+                    found += 1
+    return found
+
+
+async def bench_search(file_count: int, runs: int) -> None:
+    corpus_dir = os.path.join(BENCH_DIR, "corpus")
+    words = [f"slowo{i}" for i in range(5000)]
+    for i in range(file_count):
+        subdir = os.path.join(corpus_dir, f"d{i // 1000}")
+        os.makedirs(subdir, exist_ok=True)
+        with open(os.path.join(subdir, f"plik{i}.txt"), "w") as file:
+            file.write(" ".join(random.choices(words, k=200)))
+
+    index = SearchIndex(corpus_dir, os.path.join(BENCH_DIR, "index", "search.db"))
+    print(f"\nWyszukiwanie w {file_count} plikach")
+
+    start = time.perf_counter()
+    await index.refresh()
+    print(f"{'budowa indeksu':<32} {time.perf_counter() - start:8.3f} s")
+
+    start = time.perf_counter()
+    await index.refresh()
+    print(f"{'aktualizacja (bez zmian)':<32} {time.perf_counter() - start:8.3f} s")
+
+    for name, search in (
+        ("pełne przeglądanie plików", lambda: asyncio.get_running_loop().run_in_executor(None, full_scan, corpus_dir, "slowo42 ")),
+        ("indeks FTS5", lambda: index.search("slowo42", limit=20)),
+    ):
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            await search()
+            timings.append(time.perf_counter() - start)
+        print(f"{name:<32} {min(timings) * 1000:8.1f} ms")
+
+
+async def main(size_mb: int, chunk_kb: int, runs: int, search_files: int) -> None:
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    data = os.urandom(size_mb * 1024 * 1024)
+    chunk_size = chunk_kb * 1024
+    original_policy = FS_CONFIG["fsync"]
+
+    print(f"Plik: {size_mb} MB, fragment: {chunk_kb} KB, powtórzeń: {runs}\n")
+    print(f"{'Metoda':<32} {'Czas':>10} {'Przepustowość':>15}")
+
+    try:
+        await measure("zapis w miejscu", write_in_place, data, chunk_size, runs)
+        for policy in fs_tool.FSYNC_POLICIES:
+            FS_CONFIG["fsync"] = policy
+            await measure(f"zapis atomowy (fsync={policy})", write_atomic, data, chunk_size, runs)
+            await measure(f"upload fragmentami (fsync={policy})", write_upload, data, chunk_size, runs)
+        FS_CONFIG["fsync"] = original_policy
+
+        if search_files:
+            await bench_search(search_files, runs)
+    finally:
+        FS_CONFIG["fsync"] = original_policy
+        shutil.rmtree(BENCH_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark zapisu plików w katalogu data")
+    parser.add_argument("--size-mb", type=int, default=64, help="Rozmiar zapisywanego pliku w MB")
+    parser.add_argument("--chunk-kb", type=int, default=1024, help="Rozmiar fragmentu przy przesyłaniu w KB")
+    parser.add_argument("--runs", type=int, default=3, help="Liczba powtórzeń (wynik: najlepszy czas)")
+    parser.add_argument("--search-files", type=int, default=0, help="Liczba plików w benchmarku wyszukiwania (0 - pomiń)")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.size_mb, args.chunk_kb, args.runs, args.search_files))
@@ -0,0 +1,18 @@
+# Konfiguracja narzędzi systemu plików
+
+FS_CONFIG = {
+    "max_response_bytes": 1024 * 1024,  # Maksymalny rozmiar odpowiedzi narzędzia (1 MB)
+    "chunk_size": 64 * 1024,  # Rozmiar fragmentu przy odczycie strumieniowym (64 KB)
+    "mmap_threshold": 16 * 1024 * 1024,  # Od tego rozmiaru pliki są mapowane do pamięci (16 MB)
+    "default_lines": 10,  # Domyślna liczba linii dla trybów head/tail
+    "fsync": "data",  # Polityka fsync: never, data (przed podmianą pliku), full (każdy fragment i katalog)
+    "upload_dir": ".uploads",  # Katalog sesji przesyłania (względnie do katalogu data)
+    "list_page_size": 1000,  # Domyślna liczba pozycji na stronie listowania
+    "list_cache": False,  # Cache listowania katalogów unieważniany przez inotify (wymaga pakietu watchdog)
+    "list_cache_dirs": 64,  # Maksymalna liczba katalogów w cache listowania
+    "index_dir": ".index",  # Katalog indeksu wyszukiwania (względnie do katalogu data)
+    "index_max_file_bytes": 4 * 1024 * 1024,  # Większe pliki nie są indeksowane (4 MB)
+    "index_refresh_interval": 30,  # Minimalny odstęp (s) między aktualizacjami indeksu przy wyszukiwaniu
+    "index_regex_max_bytes": 64 * 1024 * 1024,  # Maksymalna ilość danych przeszukiwanych wyrażeniem (64 MB)
+    "index_regex_timeout": 10  # Maksymalny czas (s) wyszukiwania wyrażeniem (sprawdzany między plikami i dopasowaniami)
+}
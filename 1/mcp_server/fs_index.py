@@ -0,0 +1,391 @@
+import os
+import re
+import time
+import fnmatch
+import sqlite3
+import asyncio
+import threading
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+from fs_config import FS_CONFIG
+
+# Schemat indeksu: metadane plików oraz indeks pełnotekstowy FTS5 (rowid = files.id)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    indexed INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS content USING fts5(
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Dostępne tryby wyszukiwania
+SEARCH_MODES = ("text", "regex")
+
+# Grupa z kwantyfikatorem wewnątrz, sama powtarzana (np. (a+)+) - katastrofalne nawracanie
+NESTED_QUANTIFIER = re.compile(r"\((?:[^()\\]|\\.)*[*+}](?:[^()\\]|\\.)*\)[*+{]")
+
+# Sekwencje specjalne, po których dopasowanie na pewno nie jest wewnątrz słowa
+BOUNDARY_ESCAPES = "bsWAZ"
+
+# Liczba znaków argumentu sekwencji \x, \u i \U
+HEX_ESCAPE_LENGTH = {"x": 2, "u": 4, "U": 8}
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _pattern_elements(pattern: str) -> Optional[List[Tuple[str, str]]]:
+    """
+    Dzieli wyrażenie regularne na elementy: ("word", znak) - wymagany znak słowa,
+    ("sep", "") - granica słowa, ("other", "") - pozostałe (klasy, grupy, elementy
+    z kwantyfikatorem).
+
+    Returns:
+        Lista elementów lub None, jeśli wyrażenie zawiera alternatywę "|" poza grupami
+    """
+    elements = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+        if char == "\\" and i < len(pattern):
+            escaped = pattern[i]
+            i += 1
+            if escaped in HEX_ESCAPE_LENGTH:
+                i += HEX_ESCAPE_LENGTH[escaped]
+                element = ("other", "")
+            elif escaped == "N":
+                i = pattern.find("}", i) + 1 or len(pattern)
+                element = ("other", "")
+            elif escaped.isdigit():
+                while i < len(pattern) and pattern[i].isdigit():
+                    i += 1
+                element = ("other", "")
+            elif escaped in BOUNDARY_ESCAPES or escaped in "ntrfv":
+                element = ("sep", "")
+            elif escaped.isalnum():
+                element = ("other", "")
+            else:
+                element = ("word", escaped) if _is_word_char(escaped) else ("sep", "")
+        elif char == "[":
+            # Klasa znaków - do zamykającego "]" (pierwszy "]" po "[" lub "[^" jest znakiem klasy)
+            if i < len(pattern) and pattern[i] == "^":
+                i += 1
+            if i < len(pattern) and pattern[i] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+            element = ("other", "")
+        elif char == "(":
+            depth += 1
+            continue
+        elif char == ")":
+            depth = max(0, depth - 1)
+            element = ("other", "")
+        elif char == "|":
+            if depth == 0:
+                return None
+            continue
+        elif char in "^$":
+            element = ("sep", "")
+        elif char in "?*+{" and elements:
+            # Kwantyfikator - poprzedni element jest opcjonalny lub powtarzany
+            if char == "{":
+                i = pattern.find("}", i) + 1 or len(pattern)
+            if i < len(pattern) and pattern[i] in "?+":
+                i += 1
+            elements[-1] = ("other", "")
+            continue
+        elif char == "." or not _is_word_char(char):
+            element = ("other", "") if char == "." else ("sep", "")
+        else:
+            element = ("word", char)
+        elements.append(element if depth == 0 else ("other", ""))
+    return elements
+
+
+def required_literals(pattern: str) -> List[Tuple[str, bool, bool]]:
+    """
+    Wyodrębnia fragmenty tekstu, które musi zawierać każde dopasowanie wyrażenia.
+
+    Uwzględniane są tylko znaki słów poza grupami i klasami znaków, bez kwantyfikatorów,
+    w wyrażeniach bez alternatywy "|" na najwyższym poziomie.
+
+    Args:
+        pattern: Wyrażenie regularne
+
+    Returns:
+        Lista krotek (tekst, czy zaczyna słowo, czy kończy słowo)
+    """
+    elements = _pattern_elements(pattern)
+    if not elements:
+        return []
+
+    literals = []
+    run = []
+    start = 0
+    for index, (kind, char) in enumerate(elements + [("other", "")]):
+        if kind == "word":
+            if not run:
+                start = index
+            run.append(char)
+            continue
+        if run:
+            word_start = start > 0 and elements[start - 1][0] == "sep"
+            literals.append(("".join(run), word_start, kind == "sep"))
+            run = []
+    return literals
+
+
+class SearchIndex:
+    """
+    Trwały indeks pełnotekstowy plików tekstowych w katalogu data.
+
+    Indeks jest aktualizowany przyrostowo: ponownie odczytywane są tylko pliki,
+    których rozmiar lub czas modyfikacji zmienił się od ostatniej aktualizacji.
+    """
+
+    def __init__(self, root: str, db_path: str, exclude: Iterable[str] = ()):
+        """
+        Args:
+            root: Katalog, którego pliki są indeksowane
+            db_path: Ścieżka do pliku bazy indeksu
+            exclude: Bezwzględne ścieżki pomijane podczas indeksowania
+        """
+        self.root = root
+        self.db_path = db_path
+        # Katalogi robocze (indeks, sesje przesyłania) nigdy nie są indeksowane
+        reserved = [
+            os.path.dirname(db_path),
+            os.path.join(root, FS_CONFIG["index_dir"]),
+            os.path.join(root, FS_CONFIG["upload_dir"]),
+        ]
+        self.exclude = {os.path.normpath(path) for path in list(exclude) + reserved}
+        self._conn = None
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _walk(self):
+        """Zwraca (ścieżka względna, ścieżka, rozmiar, mtime_ns) dla każdego pliku."""
+        stack = [self.root]
+        while stack:
+            current = stack.pop()
+            try:
+                iterator = os.scandir(current)
+            except OSError:
+                continue
+            with iterator:
+                for entry in iterator:
+                    if entry.path in self.exclude:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        info = entry.stat(follow_symlinks=False)
+                        relative = os.path.relpath(entry.path, self.root).replace(os.sep, "/")
+                        yield relative, entry.path, info.st_size, info.st_mtime_ns
+
+    @staticmethod
+    def _read_text(path: str, size: int) -> Optional[str]:
+        """Odczytuje plik tekstowy; zwraca None dla plików binarnych lub zbyt dużych."""
+        if size > FS_CONFIG["index_max_file_bytes"]:
+            return None
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        if b"\x00" in data[:8192]:
+            return None
+        return data.decode("utf-8", errors="replace")
+
+    def _refresh(self, force: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < FS_CONFIG["index_refresh_interval"]:
+                return {"skipped": True}
+
+            start = time.perf_counter()
+            conn = self._connect()
+            known = {
+                path: (file_id, size, mtime_ns)
+                for file_id, path, size, mtime_ns in conn.execute("SELECT id, path, size, mtime_ns FROM files")
+            }
+            stats = {"scanned": 0, "added": 0, "updated": 0, "removed": 0}
+
+            with conn:
+                for relative, path, size, mtime_ns in self._walk():
+                    stats["scanned"] += 1
+                    previous = known.pop(relative, None)
+                    if previous and previous[1] == size and previous[2] == mtime_ns:
+                        continue
+
+                    text = self._read_text(path, size)
+                    if previous:
+                        file_id = previous[0]
+                        conn.execute(
+                            "UPDATE files SET size = ?, mtime_ns = ?, indexed = ? WHERE id = ?",
+                            (size, mtime_ns, text is not None, file_id)
+                        )
+                        conn.execute("DELETE FROM content WHERE rowid = ?", (file_id,))
+                        stats["updated"] += 1
+                    else:
+                        file_id = conn.execute(
+                            "INSERT INTO files (path, size, mtime_ns, indexed) VALUES (?, ?, ?, ?)",
+                            (relative, size, mtime_ns, text is not None)
+                        ).lastrowid
+                        stats["added"] += 1
+
+                    if text is not None:
+                        conn.execute("INSERT INTO content (rowid, body) VALUES (?, ?)", (file_id, text))
+
+                # Pliki, których już nie ma na dysku
+                removed = [(file_id,) for file_id, _, _ in known.values()]
+                conn.executemany("DELETE FROM content WHERE rowid = ?", removed)
+                conn.executemany("DELETE FROM files WHERE id = ?", removed)
+                stats["removed"] = len(removed)
+
+            self._last_refresh = time.monotonic()
+            stats["seconds"] = round(time.perf_counter() - start, 3)
+            return stats
+
+    def _search_text(self, query: str, pattern: str, limit: int) -> List[Dict[str, Any]]:
+        sql = (
+            "SELECT f.path, snippet(content, 0, '[', ']', '…', 16), bm25(content) "
+            "FROM content JOIN files f ON f.id = content.rowid "
+            "WHERE content MATCH ? ORDER BY bm25(content) LIMIT ?"
+        )
+        conn = self._connect()
+        # Przy filtrze ścieżki pobieramy więcej wyników, aby po filtrowaniu wypełnić limit
+        fetch = limit * 10 if pattern else limit
+        try:
+            rows = conn.execute(sql, (query, fetch)).fetchall()
+        except sqlite3.OperationalError:
+            # Zapytanie niezgodne ze składnią FTS5 - szukamy słów jako fraz
+            terms = " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+            rows = conn.execute(sql, (terms, fetch)).fetchall()
+
+        results = [
+            {"path": path, "score": round(-rank, 3), "snippet": " ".join(snippet.split())}
+            for path, snippet, rank in rows
+            if not pattern or fnmatch.fnmatch(path, pattern)
+        ]
+        return results[:limit]
+
+    def _search_regex(self, query: str, pattern: str, limit: int) -> List[Dict[str, Any]]:
+        if NESTED_QUANTIFIER.search(query):
+            raise ValueError("Wyrażenie z zagnieżdżonymi kwantyfikatorami (np. (a+)+) jest niedozwolone.")
+        regex = re.compile(query, re.MULTILINE)
+
+        # Wstępny wybór plików przez indeks: słowa z wyrażenia (FTS5) i pozostałe stałe fragmenty (instr)
+        conditions, params = [], []
+        terms = []
+        for text, word_start, word_end in required_literals(query):
+            # Tokenizer unicode61 traktuje "_" jak separator - takie fragmenty sprawdza instr
+            if word_start and text.isalnum():
+                terms.append(f'"{text}"' if word_end else f'"{text}"*')
+            elif not regex.flags & re.IGNORECASE:
+                conditions.append("instr(content.body, ?) > 0")
+                params.append(text)
+        if terms:
+            conditions.insert(0, "content MATCH ?")
+            params.insert(0, " AND ".join(terms))
+        sql = "SELECT f.path, content.body FROM content JOIN files f ON f.id = content.rowid"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+
+        conn = self._connect()
+        deadline = time.monotonic() + FS_CONFIG["index_regex_timeout"]
+        budget = FS_CONFIG["index_regex_max_bytes"]
+        truncated = False
+
+        results = []
+        for path, body in conn.execute(sql, params):
+            if pattern and not fnmatch.fnmatch(path, pattern):
+                continue
+            # Limit przeszukanych danych i czasu - wynik częściowy zamiast blokowania serwera.
+            # Czas jest sprawdzany między plikami i między kolejnymi dopasowaniami; pojedynczego
+            # przeszukiwania bez dopasowań nie da się przerwać, ogranicza je index_max_file_bytes.
+            budget -= len(body)
+            if budget < 0 or time.monotonic() > deadline:
+                truncated = True
+                break
+            first, count = None, 0
+            for match in regex.finditer(body):
+                first = first or match
+                count += 1
+                if time.monotonic() > deadline:
+                    truncated = True
+                    break
+            if first:
+                results.append({"path": path, "score": count, "snippet": _regex_snippet(body, first)})
+            if truncated:
+                break
+
+        if truncated and not results:
+            raise ValueError("Przekroczono limit czasu lub danych wyszukiwania - zawęź wyszukiwanie wzorcem ścieżki.")
+        results.sort(key=lambda result: (-result["score"], result["path"]))
+        for result in results if truncated else ():
+            result["partial"] = True
+        return results[:limit]
+
+    def _search(self, query: str, mode: str, pattern: str, limit: int) -> List[Dict[str, Any]]:
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Nieznany tryb wyszukiwania '{mode}'. Dostępne: {', '.join(SEARCH_MODES)}.")
+        self._refresh()
+        with self._lock:
+            if mode == "regex":
+                return self._search_regex(query, pattern, limit)
+            return self._search_text(query, pattern, limit)
+
+    def mark_stale(self) -> None:
+        """Wymusza aktualizację indeksu przy najbliższym wyszukiwaniu."""
+        self._last_refresh = 0.0
+
+    async def refresh(self, force: bool = True) -> Dict[str, Any]:
+        """Aktualizuje indeks (tylko zmienione pliki); zwraca statystyki aktualizacji."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._refresh, force)
+
+    async def search(self, query: str, mode: str = "text", pattern: str = "", limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Wyszukuje pliki pasujące do zapytania.
+
+        Args:
+            query: Zapytanie FTS5 (mode="text") lub wyrażenie regularne (mode="regex")
+            mode: text lub regex
+            pattern: Opcjonalny filtr glob ścieżki względnej
+            limit: Maksymalna liczba wyników
+
+        Returns:
+            Lista wyników z kluczami path, score i snippet (od najlepszego); wyniki wyszukiwania
+            wyrażeniem przerwanego po przekroczeniu limitów mają klucz partial
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._search, query, mode, pattern, limit)
+
+
+def _regex_snippet(body: str, match, context: int = 60) -> str:
+    """Fragment tekstu wokół dopasowania z zaznaczeniem w nawiasach kwadratowych."""
+    start = max(0, match.start() - context)
+    end = min(len(body), match.end() + context)
+    snippet = f"{body[start:match.start()]}[{match.group(0)}]{body[match.end():end]}"
+    snippet = " ".join(snippet.split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(body) else "")
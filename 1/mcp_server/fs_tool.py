@@ -0,0 +1,934 @@
+import os
+import re
+import json
+import mmap
+import time
+import uuid
+import base64
+import codecs
+import asyncio
+import fnmatch
+import itertools
+import threading
+import aiofiles
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict, Any, List, Iterable
+from mcp.server.fastmcp import Context
+from fs_config import FS_CONFIG
+from fs_index import SearchIndex
+
+# Dostępne tryby odczytu pliku
+READ_MODES = ("text", "base64", "head", "tail", "chunked")
+
+# Dostępne klucze sortowania przy listowaniu katalogów
+SORT_KEYS = ("name", "size", "mtime", "type")
+
+# Dostępne polityki fsync przy zapisie
+FSYNC_POLICIES = ("never", "data", "full")
+
+# Identyfikator sesji przesyłania (uuid4 w postaci hex)
+UPLOAD_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def _run_in_thread(func, *args):
+    """Uruchamia blokującą funkcję w puli wątków pętli zdarzeń."""
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(None, func, *args)
+
+
+def _read_mmap(path: str, offset: int, length: int) -> bytes:
+    """Odczytuje fragment dużego pliku przez mapowanie do pamięci."""
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[offset:offset + length]
+
+
+def _read_head(path: str, lines: int, max_bytes: int) -> bytes:
+    """Odczytuje pierwsze `lines` linii pliku (nie więcej niż max_bytes)."""
+    buffer = bytearray()
+    found = 0
+
+    with open(path, "rb") as file:
+        while len(buffer) < max_bytes and found < lines:
+            chunk = file.read(FS_CONFIG["chunk_size"])
+            if not chunk:
+                break
+            buffer += chunk
+            found += chunk.count(b"\n")
+
+    # Obcięcie bufora za n-tym znakiem nowej linii
+    end = -1
+    for _ in range(lines):
+        end = buffer.find(b"\n", end + 1)
+        if end < 0:
+            break
+
+    if end >= 0:
+        del buffer[end + 1:]
+    return bytes(buffer[:max_bytes])
+
+
+def _read_tail(path: str, lines: int, max_bytes: int) -> bytes:
+    """Odczytuje ostatnie `lines` linii pliku bez wczytywania całego pliku."""
+    if os.path.getsize(path) == 0:
+        return b""
+
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = len(mapped)
+            limit = max(0, end - max_bytes)
+
+            # Końcowy znak nowej linii nie rozpoczyna kolejnej linii
+            pos = end - 1 if mapped[end - 1:end] == b"\n" else end
+            for _ in range(lines):
+                pos = mapped.rfind(b"\n", limit, pos)
+                if pos < 0:
+                    break
+
+            start = limit if pos < 0 else pos + 1
+            return mapped[start:end]
+
+
+def decode_text(data: bytes, final: bool = True) -> Tuple[str, int]:
+    """
+    Dekoduje bajty jako UTF-8 bez rozcinania znaków wielobajtowych.
+
+    Args:
+        data: Bajty do zdekodowania
+        final: Czy dane kończą się razem z plikiem
+
+    Returns:
+        Krotka (tekst, liczba zużytych bajtów)
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    text = decoder.decode(data, final=final)
+    pending = decoder.getstate()[0]
+    return text, len(data) - len(pending)
+
+
+def is_binary(data: bytes) -> bool:
+    """Heurystyka: bajt zerowy oznacza dane binarne."""
+    return b"\x00" in data[:8192]
+
+
+async def read_range(path: str, offset: int = 0, length: Optional[int] = None, on_progress=None) -> bytes:
+    """
+    Odczytuje zakres bajtów pliku, nie więcej niż FS_CONFIG["max_response_bytes"].
+
+    Args:
+        path: Bezwzględna ścieżka do pliku
+        offset: Początek zakresu (wartość ujemna liczona od końca pliku)
+        length: Długość zakresu (None - do końca pliku)
+        on_progress: Opcjonalna korutyna wywoływana z (odczytane, razem)
+
+    Returns:
+        Odczytane bajty
+    """
+    size = os.path.getsize(path)
+    if offset < 0:
+        offset = max(0, size + offset)
+    offset = min(offset, size)
+
+    if length is None or length < 0:
+        length = size - offset
+    length = min(length, size - offset, FS_CONFIG["max_response_bytes"])
+    if length == 0:
+        return b""
+
+    # Duże pliki - mapowanie do pamięci zamiast buforowanego odczytu
+    if size >= FS_CONFIG["mmap_threshold"]:
+        data = await _run_in_thread(_read_mmap, path, offset, length)
+        if on_progress:
+            await on_progress(length, length)
+        return data
+
+    async with aiofiles.open(path, "rb") as file:
+        await file.seek(offset)
+        if not on_progress:
+            return await file.read(length)
+
+        buffer = bytearray()
+        while len(buffer) < length:
+            chunk = await file.read(min(FS_CONFIG["chunk_size"], length - len(buffer)))
+            if not chunk:
+                break
+            buffer += chunk
+            await on_progress(len(buffer), length)
+        return bytes(buffer)
+
+
+async def read_file_content(
+    path: str,
+    offset: int = 0,
+    length: Optional[int] = None,
+    mode: str = "text",
+    lines: Optional[int] = None,
+    ctx: Context = None
+) -> str:
+    """
+    Odczytuje plik w wybranym trybie i formatuje wynik dla narzędzia MCP.
+
+    Args:
+        path: Bezwzględna ścieżka do pliku
+        offset: Początek zakresu w bajtach
+        length: Długość zakresu w bajtach
+        mode: text, base64, head, tail lub chunked
+        lines: Liczba linii dla trybów head/tail
+        ctx: Kontekst MCP (opcjonalny, do raportowania postępu)
+
+    Returns:
+        Zawartość pliku lub komunikat o błędzie
+    """
+    if mode not in READ_MODES:
+        return f"Błąd: Nieznany tryb odczytu '{mode}'. Dostępne tryby: {', '.join(READ_MODES)}."
+
+    size = os.path.getsize(path)
+    max_bytes = FS_CONFIG["max_response_bytes"]
+
+    if mode in ("head", "tail"):
+        count = lines if lines and lines > 0 else FS_CONFIG["default_lines"]
+        reader = _read_head if mode == "head" else _read_tail
+        data = await _run_in_thread(reader, path, count, max_bytes)
+        return decode_text(data)[0]
+
+    if mode == "chunked" and length is None:
+        length = FS_CONFIG["chunk_size"]
+
+    on_progress = None
+    if ctx:
+        async def on_progress(done, total):
+            await ctx.report_progress(done, total)
+
+    start = min(max(0, size + offset) if offset < 0 else offset, size)
+    data = await read_range(path, start, length, on_progress)
+
+    if mode == "base64":
+        next_offset = start + len(data)
+        return json.dumps({
+            "offset": start,
+            "next_offset": next_offset,
+            "size": size,
+            "eof": next_offset >= size,
+            "encoding": "base64",
+            "data": base64.b64encode(data).decode("ascii")
+        })
+
+    if is_binary(data):
+        return "Błąd: Plik zawiera dane binarne. Użyj trybu 'base64'."
+
+    text, consumed = decode_text(data, final=start + len(data) >= size)
+    next_offset = start + consumed
+
+    if mode == "chunked":
+        return json.dumps({
+            "offset": start,
+            "next_offset": next_offset,
+            "size": size,
+            "eof": next_offset >= size,
+            "data": text
+        }, ensure_ascii=False)
+
+    requested_end = size if length is None or length < 0 else min(size, start + length)
+    if next_offset < requested_end:
+        text += (
+            f"\n\n[Odpowiedź obcięta (limit {max_bytes} bajtów): zwrócono bajty {start}-{next_offset} "
+            f"z {size}. Kontynuuj z offset={next_offset}.]"
+        )
+    return text
+
+
+def decode_content(content: str, encoding: str = "text") -> bytes:
+    """Zamienia zawartość przekazaną do narzędzia (tekst lub base64) na bajty."""
+    if encoding == "base64":
+        return base64.b64decode(content, validate=True)
+    if encoding != "text":
+        raise ValueError(f"Nieznane kodowanie '{encoding}'. Dostępne: text, base64.")
+    return content.encode("utf-8")
+
+
+def _fsync_policy() -> str:
+    policy = FS_CONFIG["fsync"]
+    if policy not in FSYNC_POLICIES:
+        raise ValueError(f"Nieznana polityka fsync '{policy}'. Dostępne: {', '.join(FSYNC_POLICIES)}.")
+    return policy
+
+
+def _fsync_dir(directory: str) -> None:
+    """Utrwala wpis katalogu po podmianie pliku (niedostępne w Windows)."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _create_temp(directory: str, prefix: str) -> Tuple[int, str]:
+    """
+    Tworzy plik tymczasowy z uprawnieniami jak zwykły plik (0o666 bez bitów umask
+    nakładanych przez system), w przeciwieństwie do tempfile.mkstemp (0o600).
+
+    Returns:
+        Krotka (deskryptor, ścieżka)
+    """
+    while True:
+        path = os.path.join(directory, f"{prefix}{uuid.uuid4().hex[:12]}.tmp")
+        try:
+            return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), path
+        except FileExistsError:
+            continue
+
+
+def _replace_file(source: str, target: str, policy: str) -> None:
+    """Atomowo podmienia plik docelowy, zachowując jego uprawnienia."""
+    try:
+        os.chmod(source, os.stat(target).st_mode & 0o777)
+    except FileNotFoundError:
+        # Nowy plik zachowuje uprawnienia nadane przy utworzeniu (z umask procesu)
+        pass
+    os.replace(source, target)
+    if policy == "full":
+        _fsync_dir(os.path.dirname(target))
+
+
+def _write_atomic(path: str, data: bytes, policy: str) -> None:
+    """Zapisuje dane do pliku tymczasowego w tym samym katalogu i podmienia plik docelowy."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = _create_temp(directory, f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+            if policy != "never":
+                file.flush()
+                os.fsync(file.fileno())
+        _replace_file(tmp_path, path, policy)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _append(path: str, data: bytes, policy: str) -> int:
+    """Dopisuje dane na końcu pliku i zwraca jego nowy rozmiar."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as file:
+        file.write(data)
+        if policy != "never":
+            file.flush()
+            os.fsync(file.fileno())
+        return file.tell()
+
+
+async def write_file_atomic(path: str, data: bytes) -> None:
+    """Zapisuje plik atomowo (zapis do pliku tymczasowego, następnie rename)."""
+    await _run_in_thread(_write_atomic, path, data, _fsync_policy())
+
+
+async def append_file(path: str, data: bytes) -> int:
+    """Dopisuje dane do pliku; zwraca rozmiar pliku po zapisie."""
+    return await _run_in_thread(_append, path, data, _fsync_policy())
+
+
+class UploadError(Exception):
+    """Błąd sesji przesyłania pliku."""
+    pass
+
+
+def _upload_paths(upload_dir: str, upload_id: str) -> Tuple[str, str]:
+    if not UPLOAD_ID_PATTERN.fullmatch(upload_id or ""):
+        raise UploadError(f"Nieprawidłowy identyfikator sesji: {upload_id}")
+    part_path = os.path.join(upload_dir, f"{upload_id}.part")
+    meta_path = os.path.join(upload_dir, f"{upload_id}.json")
+    if not os.path.exists(meta_path):
+        raise UploadError(f"Sesja przesyłania {upload_id} nie istnieje")
+    return part_path, meta_path
+
+
+def _load_upload(upload_dir: str, upload_id: str) -> Dict[str, Any]:
+    part_path, meta_path = _upload_paths(upload_dir, upload_id)
+    with open(meta_path, "r") as file:
+        meta = json.load(file)
+    # Rozmiar pliku częściowego na dysku jest jedynym źródłem prawdy o postępie
+    meta["offset"] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    meta["upload_id"] = upload_id
+    return meta
+
+
+def _start_upload(upload_dir: str, filepath: str, target_path: str) -> Dict[str, Any]:
+    os.makedirs(upload_dir, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    meta = {"filepath": filepath, "target": target_path, "created": time.time()}
+    open(os.path.join(upload_dir, f"{upload_id}.part"), "wb").close()
+    _write_atomic(os.path.join(upload_dir, f"{upload_id}.json"), json.dumps(meta).encode("utf-8"), "never")
+    return {"upload_id": upload_id, "filepath": filepath, "offset": 0}
+
+
+def _write_chunk(upload_dir: str, upload_id: str, offset: int, data: bytes, policy: str) -> Dict[str, Any]:
+    part_path, _ = _upload_paths(upload_dir, upload_id)
+    size = os.path.getsize(part_path)
+
+    # Ponowienie fragmentu (offset < size) nadpisuje końcówkę, luka (offset > size) jest błędem
+    if offset < 0 or offset > size:
+        raise UploadError(f"Nieprawidłowy offset {offset}, oczekiwano wartości z zakresu 0-{size}")
+
+    with open(part_path, "r+b") as file:
+        file.seek(offset)
+        file.write(data)
+        file.truncate()
+        if policy == "full":
+            file.flush()
+            os.fsync(file.fileno())
+        new_size = file.tell()
+
+    return {"upload_id": upload_id, "offset": new_size}
+
+
+def _commit_upload(upload_dir: str, upload_id: str, policy: str) -> Dict[str, Any]:
+    meta = _load_upload(upload_dir, upload_id)
+    part_path, meta_path = _upload_paths(upload_dir, upload_id)
+
+    if policy != "never":
+        with open(part_path, "rb+") as file:
+            os.fsync(file.fileno())
+
+    os.makedirs(os.path.dirname(meta["target"]), exist_ok=True)
+    _replace_file(part_path, meta["target"], policy)
+    os.unlink(meta_path)
+    return meta
+
+
+def _abort_upload(upload_dir: str, upload_id: str) -> None:
+    part_path, meta_path = _upload_paths(upload_dir, upload_id)
+    for path in (part_path, meta_path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+async def start_upload(upload_dir: str, filepath: str, target_path: str) -> Dict[str, Any]:
+    """Rozpoczyna sesję przesyłania pliku we fragmentach."""
+    return await _run_in_thread(_start_upload, upload_dir, filepath, target_path)
+
+
+async def upload_chunk(upload_dir: str, upload_id: str, offset: int, data: bytes) -> Dict[str, Any]:
+    """Zapisuje fragment przesyłanego pliku od podanego offsetu."""
+    return await _run_in_thread(_write_chunk, upload_dir, upload_id, offset, data, _fsync_policy())
+
+
+async def upload_status(upload_dir: str, upload_id: str) -> Dict[str, Any]:
+    """Zwraca stan sesji - offset, od którego należy wznowić przesyłanie."""
+    return await _run_in_thread(_load_upload, upload_dir, upload_id)
+
+
+async def commit_upload(upload_dir: str, upload_id: str) -> Dict[str, Any]:
+    """Kończy sesję i atomowo umieszcza plik w miejscu docelowym."""
+    return await _run_in_thread(_commit_upload, upload_dir, upload_id, _fsync_policy())
+
+
+async def abort_upload(upload_dir: str, upload_id: str) -> None:
+    """Przerywa sesję i usuwa przesłane dane."""
+    await _run_in_thread(_abort_upload, upload_dir, upload_id)
+
+
+class ListingCache:
+    """
+    Cache wyników listowania często odczytywanych katalogów.
+
+    Wpisy są unieważniane przez zdarzenia inotify (pakiet watchdog), dlatego
+    cache działa tylko wtedy, gdy watchdog jest zainstalowany. Katalog jest
+    obserwowany od chwili przed jego odczytem, więc zmiana w trakcie odczytu
+    nie zostawia w cache starego wyniku. Obserwacje katalogów bez wpisów są
+    usuwane przy kolejnym watch()/put() - w wątku zapytania, bo invalidate()
+    jest wywoływane przez obserwatora pod jego własną blokadą.
+    """
+
+    def __init__(self, max_dirs: int):
+        self.max_dirs = max_dirs
+        self._entries = OrderedDict()
+        # Klucze obserwowane od watch() do unieważnienia lub usunięcia wpisu
+        self._tokens = {}
+        # Obserwacje watchdog wspólne dla kluczy z tym samym (katalog, recursive)
+        self._watches = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        # Zakładanie i usuwanie obserwacji (tylko w wątkach zapytań)
+        self._observe_lock = threading.Lock()
+        self._observer = None
+
+    def start(self) -> bool:
+        """Uruchamia obserwatora systemu plików; zwraca False, jeśli watchdog jest niedostępny."""
+        if self._observer is not None:
+            return True
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return False
+
+        cache = self
+
+        class _InvalidateHandler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                cache.invalidate(event.src_path)
+                dest_path = getattr(event, "dest_path", "")
+                if dest_path:
+                    cache.invalidate(dest_path)
+
+        self._handler = _InvalidateHandler()
+        self._observer = Observer()
+        self._observer.daemon = True
+        self._observer.start()
+        return True
+
+    def _release_watches(self) -> None:
+        """Usuwa obserwacje, z których nie korzysta żaden klucz (pod _observe_lock)."""
+        with self._lock:
+            used = {key[:2] for key in self._tokens}
+            unused = [self._watches.pop(path) for path in list(self._watches) if path not in used]
+        for watch in unused:
+            try:
+                self._observer.unschedule(watch)
+            except KeyError:
+                pass
+
+    def get(self, key: Tuple[str, bool, Tuple[str, ...]]) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entries = self._entries.get(key)
+            if entries is not None:
+                self._entries.move_to_end(key)
+            return entries
+
+    def watch(self, key: Tuple[str, bool, Tuple[str, ...]]) -> int:
+        """
+        Rozpoczyna obserwację katalogu przed jego odczytem.
+
+        Returns:
+            Znacznik dla put(); traci ważność, gdy katalog zmieni się przed zapisem wyniku
+        """
+        directory, recursive, _ = key
+        with self._observe_lock:
+            with self._lock:
+                token = self._tokens.get(key)
+                if token is None:
+                    token = self._tokens[key] = next(self._counter)
+            # Po przydzieleniu znacznika - obserwacja tego katalogu nie jest zwalniana
+            self._release_watches()
+            with self._lock:
+                scheduled = (directory, recursive) in self._watches
+            if not scheduled:
+                watch = self._observer.schedule(self._handler, directory, recursive=recursive)
+                with self._lock:
+                    self._watches[(directory, recursive)] = watch
+        return token
+
+    def put(self, key: Tuple[str, bool, Tuple[str, ...]], entries: List[Dict[str, Any]], token: int) -> None:
+        """Zapisuje wynik odczytu, jeśli katalog nie zmienił się od wywołania watch()."""
+        with self._lock:
+            if self._tokens.get(key) != token:
+                return
+            self._entries[key] = entries
+            self._entries.move_to_end(key)
+            evicted = len(self._entries) > self.max_dirs
+            while len(self._entries) > self.max_dirs:
+                oldest, _ = self._entries.popitem(last=False)
+                self._tokens.pop(oldest, None)
+        if evicted:
+            with self._observe_lock:
+                self._release_watches()
+
+    def invalidate(self, path: str) -> None:
+        """Usuwa wpisy katalogów, których dotyczy zmiana ścieżki `path`."""
+        parent = os.path.dirname(path)
+        with self._lock:
+            for key in list(self._tokens):
+                directory, recursive, exclude = key
+                # Zmiany w wykluczonych katalogach (np. zapisy indeksu) nie zmieniają listingu
+                if any(path == excluded or path.startswith(excluded + os.sep) for excluded in exclude):
+                    continue
+                if parent == directory or path == directory or (recursive and path.startswith(directory + os.sep)):
+                    self._entries.pop(key, None)
+                    del self._tokens[key]
+
+
+_listing_cache = None
+# Ustawiane, gdy cache jest włączony w FS_CONFIG, ale watchdog nie jest zainstalowany
+_listing_cache_unavailable = False
+
+
+def _get_listing_cache() -> Optional[ListingCache]:
+    global _listing_cache, _listing_cache_unavailable
+    if not FS_CONFIG["list_cache"] or _listing_cache_unavailable:
+        return None
+    if _listing_cache is None:
+        cache = ListingCache(FS_CONFIG["list_cache_dirs"])
+        if not cache.start():
+            _listing_cache_unavailable = True
+            return None
+        _listing_cache = cache
+    return _listing_cache
+
+
+def _scan_directory(directory: str, recursive: bool, exclude: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """Listuje katalog przez os.scandir - jedno wywołanie stat na pozycję."""
+    excluded = {os.path.normpath(path) for path in exclude}
+    entries = []
+    stack = [directory]
+
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as iterator:
+            for entry in iterator:
+                if entry.path in excluded:
+                    continue
+
+                is_dir = entry.is_dir(follow_symlinks=False)
+                info = entry.stat(follow_symlinks=False)
+                if is_dir and recursive:
+                    stack.append(entry.path)
+
+                entries.append({
+                    "name": os.path.relpath(entry.path, directory).replace(os.sep, "/"),
+                    "type": "dir" if is_dir else "file",
+                    "size": None if is_dir else info.st_size,
+                    "mtime": info.st_mtime
+                })
+
+    return entries
+
+
+def _list_entries(directory: str, recursive: bool, exclude: Iterable[str]) -> List[Dict[str, Any]]:
+    cache = _get_listing_cache()
+    if cache is None:
+        return _scan_directory(directory, recursive, exclude)
+
+    key = (directory, recursive, tuple(sorted(exclude)))
+    entries = cache.get(key)
+    if entries is None:
+        # Obserwacja przed odczytem - zmiana w trakcie odczytu unieważnia znacznik
+        token = cache.watch(key)
+        entries = _scan_directory(directory, recursive, exclude)
+        cache.put(key, entries, token)
+    return entries
+
+
+def _matches(entry: Dict[str, Any], pattern: str) -> bool:
+    # Wzorzec ze znakiem "/" dopasowujemy do ścieżki względnej, pozostałe do nazwy pliku
+    name = entry["name"] if "/" in pattern else entry["name"].rsplit("/", 1)[-1]
+    return fnmatch.fnmatch(name, pattern)
+
+
+def _sort_key(sort: str):
+    if sort == "size":
+        return lambda entry: (entry["size"] is None, entry["size"] or 0, entry["name"])
+    if sort == "mtime":
+        return lambda entry: (entry["mtime"], entry["name"])
+    if sort == "type":
+        return lambda entry: (entry["type"] != "dir", entry["name"])
+    return lambda entry: entry["name"]
+
+
+def _list_page(
+    directory: str,
+    recursive: bool,
+    pattern: str,
+    sort: str,
+    reverse: bool,
+    limit: int,
+    cursor: str,
+    exclude: Iterable[str]
+) -> Dict[str, Any]:
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Nieznany klucz sortowania '{sort}'. Dostępne: {', '.join(SORT_KEYS)}.")
+
+    try:
+        start = int(cursor) if cursor else 0
+    except ValueError:
+        raise ValueError(f"Nieprawidłowy kursor: {cursor}")
+
+    entries = _list_entries(directory, recursive, exclude)
+    if pattern:
+        entries = [entry for entry in entries if _matches(entry, pattern)]
+    entries = sorted(entries, key=_sort_key(sort), reverse=reverse)
+
+    limit = limit if limit and limit > 0 else FS_CONFIG["list_page_size"]
+    page = entries[start:start + limit]
+    end = start + len(page)
+
+    return {
+        "entries": page,
+        "total": len(entries),
+        "next_cursor": str(end) if end < len(entries) else None
+    }
+
+
+async def list_directory(
+    directory: str,
+    recursive: bool = False,
+    pattern: str = "",
+    sort: str = "name",
+    reverse: bool = False,
+    limit: int = 0,
+    cursor: str = "",
+    exclude: Iterable[str] = ()
+) -> Dict[str, Any]:
+    """
+    Listuje katalog z filtrowaniem, sortowaniem i stronicowaniem.
+
+    Args:
+        directory: Bezwzględna ścieżka do katalogu
+        recursive: Czy listować podkatalogi
+        pattern: Wzorzec glob (np. "*.log")
+        sort: name, size, mtime lub type
+        reverse: Odwrócenie kolejności sortowania
+        limit: Liczba pozycji na stronie (0 - FS_CONFIG["list_page_size"])
+        cursor: Kursor kolejnej strony zwrócony przez poprzednie wywołanie
+        exclude: Bezwzględne ścieżki pomijane podczas listowania
+
+    Returns:
+        Słownik z kluczami entries, total i next_cursor
+    """
+    return await _run_in_thread(
+        _list_page, directory, recursive, pattern, sort, reverse, limit, cursor, tuple(exclude)
+    )
+
+
+def resolve_data_path(data_dir: str, path: str) -> Optional[str]:
+    """
+    Zamienia ścieżkę podaną przez klienta na ścieżkę bezwzględną w katalogu data.
+
+    Dowiązania symboliczne są rozwijane, więc nie pozwalają wyjść poza katalog.
+
+    Args:
+        data_dir: Katalog data
+        path: Ścieżka względna (od katalogu data)
+
+    Returns:
+        Ścieżka bezwzględna lub None, jeśli wskazuje poza katalog data
+    """
+    root = os.path.realpath(data_dir)
+    target = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, target]) != root:
+        return None
+    return target
+
+
+def register_fs_tools(mcp, data_dir: str) -> SearchIndex:
+    """
+    Rejestruje narzędzia systemu plików (fs_*) w serwerze FastMCP.
+
+    Args:
+        mcp: Serwer FastMCP
+        data_dir: Katalog data, do którego ograniczony jest dostęp
+
+    Returns:
+        Indeks wyszukiwania plików katalogu data
+    """
+    data_dir = os.path.realpath(data_dir)
+    upload_dir = os.path.join(data_dir, FS_CONFIG["upload_dir"])
+    index_dir = os.path.join(data_dir, FS_CONFIG["index_dir"])
+    # Katalogi robocze serwera - niewidoczne przy listowaniu i niedostępne do zapisu
+    reserved = [upload_dir, index_dir]
+    forbidden = f"Błąd: Niedozwolona ścieżka. Dostęp możliwy tylko do katalogu {data_dir}."
+
+    # Indeks wyszukiwania plików (plik bazy danych jest binarny, więc nie trafia do indeksu)
+    search_index = SearchIndex(data_dir, os.path.join(index_dir, "search.db"), exclude=reserved)
+
+    def write_target_error(target_path: Optional[str]) -> Optional[str]:
+        if target_path is None:
+            return forbidden
+        if any(os.path.commonpath([directory, target_path]) == directory for directory in reserved):
+            return "Błąd: Niedozwolona ścieżka. Katalogi robocze serwera są tylko do odczytu."
+        if os.path.isdir(target_path):
+            return "Błąd: Ścieżka wskazuje katalog."
+        return None
+
+    @mcp.tool()
+    async def fs_list_files(
+        directory: str = "",
+        recursive: bool = False,
+        pattern: str = "",
+        sort: str = "name",
+        reverse: bool = False,
+        limit: int = 0,
+        cursor: str = "",
+        output: str = "text"
+    ) -> str:
+        """Wylistuj pliki w katalogu (względnie do katalogu data).
+
+        Obsługuje listowanie rekurencyjne, filtr glob (pattern), sortowanie (name, size, mtime, type),
+        stronicowanie (limit, cursor) oraz wynik w formacie JSON (output="json").
+        """
+        target_dir = resolve_data_path(data_dir, directory)
+        if target_dir is None:
+            return forbidden
+
+        try:
+            page = await list_directory(
+                target_dir, recursive, pattern, sort, reverse, limit, cursor, exclude=reserved
+            )
+
+            if output == "json":
+                return json.dumps(page, ensure_ascii=False)
+
+            result = []
+            for entry in page["entries"]:
+                entry_type = "katalog" if entry["type"] == "dir" else "plik"
+                size = "-" if entry["size"] is None else entry["size"]
+                result.append(f"{entry['name']} ({entry_type}, {size} bajtów)")
+
+            if page["next_cursor"]:
+                result.append(
+                    f"[Wyświetlono {len(page['entries'])} z {page['total']} pozycji. "
+                    f"Kolejna strona: cursor={page['next_cursor']}]"
+                )
+
+            return "\n".join(result) if result else "Katalog jest pusty."
+        except Exception as e:
+            return f"Błąd podczas listowania plików: {str(e)}"
+
+    @mcp.tool()
+    async def fs_read_file(
+        filepath: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        mode: str = "text",
+        lines: Optional[int] = None,
+        ctx: Context = None
+    ) -> str:
+        """Odczytaj zawartość pliku (względnie do katalogu data).
+
+        Tryby: text (zakres offset/length), base64 (dane binarne), head/tail (pierwsze/ostatnie
+        `lines` linii) oraz chunked (kolejne fragmenty z next_offset). Odpowiedź jest ograniczona
+        do FS_CONFIG["max_response_bytes"].
+        """
+        target_path = resolve_data_path(data_dir, filepath)
+        if target_path is None:
+            return forbidden
+
+        try:
+            if not os.path.isfile(target_path):
+                return f"Błąd: Plik nie istnieje lub nie jest zwykłym plikiem."
+
+            return await read_file_content(target_path, offset, length, mode, lines, ctx)
+        except Exception as e:
+            return f"Błąd podczas odczytu pliku: {str(e)}"
+
+    @mcp.tool()
+    async def fs_write_file(filepath: str, content: str, ctx: Context, append: bool = False, encoding: str = "text") -> str:
+        """Zapisz zawartość do pliku (względnie do katalogu data).
+
+        Zapis jest atomowy (plik tymczasowy + rename), append=True dopisuje dane na końcu pliku,
+        a encoding="base64" pozwala zapisać dane binarne.
+        """
+        target_path = resolve_data_path(data_dir, filepath)
+        error = write_target_error(target_path)
+        if error:
+            return error
+
+        try:
+            data = decode_content(content, encoding)
+
+            if append:
+                await ctx.info(f"Dopisywanie do pliku: {filepath}")
+                size = await append_file(target_path, data)
+                search_index.mark_stale()
+                return f"Dopisano {len(data)} bajtów do pliku: {filepath} (rozmiar: {size} bajtów)"
+
+            await ctx.info(f"Zapisywanie do pliku: {filepath}")
+            await write_file_atomic(target_path, data)
+            search_index.mark_stale()
+            return f"Plik został pomyślnie zapisany: {filepath}"
+        except Exception as e:
+            return f"Błąd podczas zapisu pliku: {str(e)}"
+
+    @mcp.tool()
+    async def fs_upload_start(filepath: str, ctx: Context) -> str:
+        """Rozpocznij przesyłanie dużego pliku we fragmentach (zwraca upload_id)."""
+        target_path = resolve_data_path(data_dir, filepath)
+        error = write_target_error(target_path)
+        if error:
+            return error
+
+        try:
+            await ctx.info(f"Rozpoczynanie przesyłania pliku: {filepath}")
+            return json.dumps(await start_upload(upload_dir, filepath, target_path))
+        except Exception as e:
+            return f"Błąd podczas rozpoczynania przesyłania: {str(e)}"
+
+    @mcp.tool()
+    async def fs_upload_chunk(upload_id: str, offset: int, content: str, encoding: str = "text") -> str:
+        """Prześlij fragment pliku od podanego offsetu (zwraca offset kolejnego fragmentu)."""
+        try:
+            data = decode_content(content, encoding)
+            return json.dumps(await upload_chunk(upload_dir, upload_id, offset, data))
+        except Exception as e:
+            return f"Błąd podczas przesyłania fragmentu: {str(e)}"
+
+    @mcp.tool()
+    async def fs_upload_status(upload_id: str) -> str:
+        """Sprawdź stan przesyłania - offset, od którego należy wznowić po błędzie."""
+        try:
+            meta = await upload_status(upload_dir, upload_id)
+            return json.dumps({"upload_id": upload_id, "filepath": meta["filepath"], "offset": meta["offset"]})
+        except Exception as e:
+            return f"Błąd podczas sprawdzania przesyłania: {str(e)}"
+
+    @mcp.tool()
+    async def fs_upload_commit(upload_id: str, ctx: Context) -> str:
+        """Zakończ przesyłanie i atomowo zapisz plik w miejscu docelowym."""
+        try:
+            meta = await commit_upload(upload_dir, upload_id)
+            search_index.mark_stale()
+            await ctx.info(f"Zakończono przesyłanie pliku: {meta['filepath']}")
+            return f"Plik został pomyślnie zapisany: {meta['filepath']} ({meta['offset']} bajtów)"
+        except Exception as e:
+            return f"Błąd podczas kończenia przesyłania: {str(e)}"
+
+    @mcp.tool()
+    async def fs_upload_abort(upload_id: str) -> str:
+        """Przerwij przesyłanie i usuń przesłane fragmenty."""
+        try:
+            await abort_upload(upload_dir, upload_id)
+            return f"Przesyłanie {upload_id} zostało przerwane"
+        except Exception as e:
+            return f"Błąd podczas przerywania przesyłania: {str(e)}"
+
+    @mcp.tool()
+    async def fs_search(query: str, ctx: Context, mode: str = "text", pattern: str = "", limit: int = 20) -> str:
+        """Wyszukaj pliki w katalogu data po zawartości (indeks pełnotekstowy).
+
+        mode="text" przyjmuje zapytanie FTS5 (słowa, "frazy", AND/OR/NOT, prefiksy*), mode="regex"
+        wyrażenie regularne. pattern zawęża wyniki do ścieżek pasujących do wzorca glob.
+        """
+        try:
+            await ctx.info(f"Wyszukiwanie: {query}")
+            results = await search_index.search(query, mode, pattern, limit)
+            if not results:
+                return "Brak wyników."
+
+            lines = [f"{result['path']} [{result['score']}]: {result['snippet']}" for result in results]
+            if results[0].get("partial"):
+                lines.append("(wyniki częściowe - przekroczono limit wyszukiwania, zawęź je wzorcem ścieżki)")
+            return "\n".join(lines)
+        except Exception as e:
+            return f"Błąd podczas wyszukiwania: {str(e)}"
+
+    @mcp.tool()
+    async def fs_reindex(ctx: Context) -> str:
+        """Zaktualizuj indeks wyszukiwania (ponownie odczytywane są tylko zmienione pliki)."""
+        try:
+            await ctx.info("Aktualizacja indeksu wyszukiwania...")
+            stats = await search_index.refresh()
+            return (
+                f"Indeks zaktualizowany w {stats['seconds']} s: przejrzano {stats['scanned']} plików, "
+                f"dodano {stats['added']}, zaktualizowano {stats['updated']}, usunięto {stats['removed']}"
+            )
+        except Exception as e:
+            return f"Błąd podczas aktualizacji indeksu: {str(e)}"
+
+    return search_index
@@ -3,7 +3,11 @@
 OLLAMA_CONFIG = {
     "base_url": "http://localhost:11434",
     "model": "tinyllama",  # Można zmienić na inny model
-    "timeout": 30
+    "timeout": 30,  # Maksymalny czas oczekiwania na kolejny fragment odpowiedzi (s)
+    "connect_timeout": 5,  # Czas na nawiązanie połączenia (s)
+    "max_connections": 10,  # Rozmiar puli połączeń do Ollama
+    "max_keepalive_connections": 5,  # Liczba utrzymywanych połączeń keep-alive
+    "progress_interval": 0.2  # Minimalny odstęp (s) między powiadomieniami z fragmentami odpowiedzi
 }
 
 # Parametry generacji
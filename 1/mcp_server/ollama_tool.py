@@ -1,12 +1,81 @@
 import json
+import time
 import httpx
+from typing import Optional
+from contextlib import asynccontextmanager
 from mcp.server.fastmcp import Context
 from ollama_config import OLLAMA_CONFIG, GENERATION_PARAMS
 
+# Współdzielony klient HTTP (pula połączeń keep-alive do Ollama)
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Zwraca współdzielonego klienta HTTP, tworząc go przy pierwszym użyciu."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=OLLAMA_CONFIG["base_url"],
+            timeout=httpx.Timeout(OLLAMA_CONFIG["timeout"], connect=OLLAMA_CONFIG["connect_timeout"]),
+            limits=httpx.Limits(
+                max_connections=OLLAMA_CONFIG["max_connections"],
+                max_keepalive_connections=OLLAMA_CONFIG["max_keepalive_connections"]
+            ),
+            headers={"Content-Type": "application/json"}
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Zamyka współdzielonego klienta HTTP."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+@asynccontextmanager
+async def ollama_lifespan(server):
+    """Lifespan serwera FastMCP: otwiera pulę połączeń przy starcie i zamyka ją przy zamknięciu."""
+    get_client()
+    try:
+        yield {}
+    finally:
+        await close_client()
+
+
+def ollama_options() -> dict:
+    """Zwraca GENERATION_PARAMS w schemacie "options" Ollama (max_tokens -> num_predict)."""
+    names = {"max_tokens": "num_predict"}
+    return {names.get(key, key): value for key, value in GENERATION_PARAMS.items()}
+
+
+def format_timing(chunk: dict) -> str:
+    """Opisuje statystyki czasu generowania z ostatniego fragmentu odpowiedzi (czasy w ns)."""
+    eval_count = chunk.get("eval_count") or 0
+    eval_seconds = (chunk.get("eval_duration") or 0) / 1e9
+    speed = f"{eval_count / eval_seconds:.1f} tok/s" if eval_seconds else "?"
+    return (
+        f"Wygenerowano {eval_count} tokenów ({speed}); "
+        f"ładowanie {(chunk.get('load_duration') or 0) / 1e9:.2f} s, "
+        f"prompt {(chunk.get('prompt_eval_duration') or 0) / 1e9:.2f} s, "
+        f"generowanie {eval_seconds:.2f} s"
+    )
+
+
+async def _report_partial(ctx: Context, text: str, tokens: int) -> None:
+    """Przekazuje klientowi fragment wygenerowanego tekstu."""
+    await ctx.report_progress(tokens, GENERATION_PARAMS.get("max_tokens"), text)
+    await ctx.info(text)
+
+
 async def generate_ollama_response(prompt: str, ctx: Context = None) -> str:
     """
     Funkcja do generowania odpowiedzi z modelu Ollama Tiny.
 
+    Odpowiedź jest pobierana strumieniowo (NDJSON), a fragmenty tekstu są
+    przekazywane klientowi jako powiadomienia o postępie w miarę ich generowania.
+
     Args:
         prompt: Tekst zapytania do modelu
         ctx: Kontekst MCP (opcjonalny)
@@ -17,24 +86,23 @@ async def generate_ollama_response(prompt: str, ctx: Context = None) -> str:
     if ctx:
         await ctx.info(f"Wysyłanie zapytania do modelu Ollama {OLLAMA_CONFIG['model']}...")
 
-    url = f"{OLLAMA_CONFIG['base_url']}/api/generate"
-
     # Przygotowanie danych zapytania
     data = {
         "model": OLLAMA_CONFIG["model"],
         "prompt": prompt,
-        **GENERATION_PARAMS
+        "stream": True,
+        # Parametry generowania Ollama przyjmuje tylko w "options"
+        "options": ollama_options()
     }
 
-    try:
-        # Wykonanie zapytania do API Ollama
-        async with httpx.AsyncClient(timeout=OLLAMA_CONFIG["timeout"]) as client:
-            response = await client.post(
-                url,
-                json=data,
-                headers={"Content-Type": "application/json"}
-            )
+    parts = []
+    pending = []
+    tokens = 0
+    last_report = time.monotonic()
 
+    try:
+        # Wykonanie zapytania do API Ollama przez współdzieloną pulę połączeń
+        async with get_client().stream("POST", "/api/generate", json=data) as response:
             # Sprawdzenie odpowiedzi
             if response.status_code != 200:
                 error_message = f"Błąd komunikacji z Ollama: {response.status_code}"
@@ -42,15 +110,44 @@ async def generate_ollama_response(prompt: str, ctx: Context = None) -> str:
                     await ctx.error(error_message)
                 return error_message
 
-            # Przetwarzanie odpowiedzi
-            try:
-                result = response.json()
-                return result.get("response", "Brak odpowiedzi od modelu.")
-            except json.JSONDecodeError:
-                error_message = "Błąd przetwarzania odpowiedzi z Ollama (nieprawidłowy JSON)"
-                if ctx:
-                    await ctx.error(error_message)
-                return error_message
+            # Przetwarzanie kolejnych linii NDJSON
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError:
+                    error_message = "Błąd przetwarzania odpowiedzi z Ollama (nieprawidłowy JSON)"
+                    if ctx:
+                        await ctx.error(error_message)
+                    return error_message
+
+                if "error" in chunk:
+                    error_message = f"Błąd Ollama: {chunk['error']}"
+                    if ctx:
+                        await ctx.error(error_message)
+                    return error_message
+
+                text = chunk.get("response", "")
+                if text:
+                    parts.append(text)
+                    pending.append(text)
+                    tokens += 1
+
+                # Fragmenty są grupowane, aby nie wysyłać powiadomienia dla każdego tokenu
+                if ctx and pending and (
+                    chunk.get("done") or time.monotonic() - last_report >= OLLAMA_CONFIG["progress_interval"]
+                ):
+                    await _report_partial(ctx, "".join(pending), tokens)
+                    pending = []
+                    last_report = time.monotonic()
+
+                if chunk.get("done"):
+                    if ctx:
+                        await ctx.info(format_timing(chunk))
+                    break
+
+        return "".join(parts) or "Brak odpowiedzi od modelu."
 
     except httpx.HTTPError as e:
         error_message = f"Błąd HTTP podczas komunikacji z Ollama: {str(e)}"
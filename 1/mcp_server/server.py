@@ -1,10 +1,10 @@
 import os
 import aiosqlite
-import aiofiles
 import aiosmtplib
 from email.message import EmailMessage
 from mcp.server.fastmcp import FastMCP, Context
 from email_config import SMTP_CONFIG, DEFAULT_EMAIL
+from fs_tool import register_fs_tools
 
 # Tworzenie serwera MCP
 mcp = FastMCP("MCP Server z SQLite, systemem plików i emailami")
@@ -59,67 +59,8 @@ async def get_schema() -> str:
 
             return "\n".join(result) if result else "Brak tabel w bazie danych."
 
-# Narzędzia systemu plików
-@mcp.tool()
-async def fs_list_files(directory: str = "") -> str:
-    """Wylistuj pliki w katalogu (względnie do katalogu data)."""
-    target_dir = os.path.normpath(os.path.join(DATA_DIR, directory))
-
-    # Sprawdzenie czy ścieżka jest w obrębie DATA_DIR (zabezpieczenie)
-    if not target_dir.startswith(DATA_DIR):
-        return f"Błąd: Niedozwolona ścieżka. Dostęp możliwy tylko do katalogu {DATA_DIR}."
-
-    try:
-        entries = os.listdir(target_dir)
-        result = []
-        for entry in entries:
-            full_path = os.path.join(target_dir, entry)
-            entry_type = "katalog" if os.path.isdir(full_path) else "plik"
-            size = os.path.getsize(full_path) if os.path.isfile(full_path) else "-"
-            result.append(f"{entry} ({entry_type}, {size} bajtów)")
-
-        return "\n".join(result) if result else "Katalog jest pusty."
-    except Exception as e:
-        return f"Błąd podczas listowania plików: {str(e)}"
-
-@mcp.tool()
-async def fs_read_file(filepath: str) -> str:
-    """Odczytaj zawartość pliku (względnie do katalogu data)."""
-    target_path = os.path.normpath(os.path.join(DATA_DIR, filepath))
-
-    # Sprawdzenie czy ścieżka jest w obrębie DATA_DIR (zabezpieczenie)
-    if not target_path.startswith(DATA_DIR):
-        return f"Błąd: Niedozwolona ścieżka. Dostęp możliwy tylko do katalogu {DATA_DIR}."
-
-    try:
-        if not os.path.isfile(target_path):
-            return f"Błąd: Plik nie istnieje lub nie jest zwykłym plikiem."
-
-        async with aiofiles.open(target_path, 'r') as file:
-            content = await file.read()
-            return content
-    except Exception as e:
-        return f"Błąd podczas odczytu pliku: {str(e)}"
-
-@mcp.tool()
-async def fs_write_file(filepath: str, content: str, ctx: Context) -> str:
-    """Zapisz zawartość do pliku (względnie do katalogu data)."""
-    target_path = os.path.normpath(os.path.join(DATA_DIR, filepath))
-
-    # Sprawdzenie czy ścieżka jest w obrębie DATA_DIR (zabezpieczenie)
-    if not target_path.startswith(DATA_DIR):
-        return f"Błąd: Niedozwolona ścieżka. Dostęp możliwy tylko do katalogu {DATA_DIR}."
-
-    try:
-        # Utworzenie katalogu nadrzędnego, jeśli nie istnieje
-        os.makedirs(os.path.dirname(target_path), exist_ok=True)
-
-        await ctx.info(f"Zapisywanie do pliku: {filepath}")
-        async with aiofiles.open(target_path, 'w') as file:
-            await file.write(content)
-            return f"Plik został pomyślnie zapisany: {filepath}"
-    except Exception as e:
-        return f"Błąd podczas zapisu pliku: {str(e)}"
+# Narzędzia systemu plików (fs_*)
+search_index = register_fs_tools(mcp, DATA_DIR)
 
 # Narzędzia email
 @mcp.tool()
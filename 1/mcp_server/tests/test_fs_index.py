@@ -0,0 +1,88 @@
+"""
+Testy dla modułu fs_index.
+"""
+
+import asyncio
+
+import pytest
+
+from fs_config import FS_CONFIG
+from fs_index import SearchIndex, required_literals
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Indeks katalogu tymczasowego z bazą w katalogu indeksu."""
+    root = tmp_path / "data"
+    root.mkdir()
+    search_index = SearchIndex(str(root), str(root / FS_CONFIG["index_dir"] / "index.db"))
+    return root, search_index
+
+
+def search(search_index, query, mode="text", pattern=""):
+    return asyncio.run(search_index.search(query, mode, pattern))
+
+
+def test_required_literals():
+    """Test wyodrębniania stałych fragmentów wyrażenia."""
+    assert required_literals(r"\bdef\s+load_\w+") == [("def", True, False), ("load_", False, False)]
+    assert required_literals(r"foo|bar") == []
+    assert required_literals(r"(abc)+x") == [("x", False, False)]
+
+
+def test_search_after_refresh(index):
+    """Test, że nowy plik jest widoczny dopiero po aktualizacji indeksu."""
+    root, search_index = index
+    (root / "a.txt").write_text("alpha beta")
+    assert [result["path"] for result in search(search_index, "alpha")] == ["a.txt"]
+
+    (root / "b.txt").write_text("alpha gamma")
+    assert [result["path"] for result in search(search_index, "gamma")] == []
+
+    asyncio.run(search_index.refresh())
+    assert [result["path"] for result in search(search_index, "gamma")] == ["b.txt"]
+
+
+def test_regex_underscore(index):
+    """Test wyrażeń z "_", które tokenizer FTS5 traktuje jako separator."""
+    root, search_index = index
+    (root / "a.py").write_text("x = _ + 1\n")
+    (root / "b.py").write_text("def load_config():\n    pass\n")
+    (root / "c.py").write_text("load config\n")
+
+    assert [result["path"] for result in search(search_index, r"\b_\b", "regex")] == ["a.py"]
+    assert [result["path"] for result in search(search_index, r"\bload_config\b", "regex")] == ["b.py"]
+    assert [result["path"] for result in search(search_index, r"\bconfig\b", "regex")] == ["c.py"]
+
+
+def test_regex_timeout(index, monkeypatch):
+    """Test przerwania wyszukiwania wyrażeniem po przekroczeniu limitu czasu."""
+    root, search_index = index
+    (root / "a.txt").write_text("abc\n" * 1000)
+    asyncio.run(search_index.refresh())
+    monkeypatch.setitem(FS_CONFIG, "index_regex_timeout", -1)
+
+    with pytest.raises(ValueError):
+        search(search_index, "abc", "regex")
+
+
+def test_regex_timeout_within_file(index, monkeypatch):
+    """Test sprawdzania limitu czasu między dopasowaniami w jednym pliku."""
+    root, search_index = index
+    (root / "a.txt").write_text("abc\n" * 1000)
+    asyncio.run(search_index.refresh())
+    clock = iter(range(10 ** 6))
+    monkeypatch.setitem(FS_CONFIG, "index_regex_timeout", 5)
+    # Zegar przesuwa się o sekundę przy każdym odczycie; bez pętli asyncio, która też go używa
+    monkeypatch.setattr("fs_index.time.monotonic", lambda: next(clock))
+    results = search_index._search("abc", "regex", "", 20)
+
+    assert results[0]["partial"] is True
+    assert results[0]["score"] < 1000
+
+
+def test_regex_rejects_nested_quantifiers(index):
+    """Test odrzucenia wyrażeń z katastrofalnym nawracaniem."""
+    _, search_index = index
+    with pytest.raises(ValueError):
+        search(search_index, r"(a+)+b", "regex")
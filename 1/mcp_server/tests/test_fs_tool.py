@@ -0,0 +1,234 @@
+"""
+Testy dla narzędzi systemu plików (fs_tool) wywoływanych przez klienta MCP w pamięci.
+"""
+
+import os
+import json
+import stat
+import time
+import asyncio
+
+import pytest
+from mcp.server.fastmcp import FastMCP
+from mcp.shared.memory import create_connected_server_and_client_session
+
+from fs_config import FS_CONFIG
+import fs_tool
+from fs_tool import ListingCache, register_fs_tools, resolve_data_path
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Serwer z narzędziami fs_* ograniczonymi do katalogu tmp_path/data."""
+    root = tmp_path / "data"
+    root.mkdir()
+    mcp = FastMCP("test")
+    register_fs_tools(mcp, str(root))
+    return mcp, root
+
+
+def call(server, name, **arguments):
+    """Wywołuje narzędzie przez sesję klienta MCP i zwraca tekst odpowiedzi."""
+    mcp, _ = server
+
+    async def run():
+        async with create_connected_server_and_client_session(mcp._mcp_server) as client:
+            result = await client.call_tool(name, arguments)
+            return result.content[0].text
+
+    return asyncio.run(run())
+
+
+def test_resolve_data_path(tmp_path):
+    """Test ograniczenia ścieżek do katalogu data."""
+    root = tmp_path / "data"
+    (root / "sub").mkdir(parents=True)
+    os.symlink(tmp_path, root / "up")
+    os.symlink(root / "sub", root / "inside")
+
+    assert resolve_data_path(str(root), "sub/a.txt") == str(root / "sub" / "a.txt")
+    assert resolve_data_path(str(root), "inside/a.txt") == str(root / "sub" / "a.txt")
+    assert resolve_data_path(str(root), "") == str(root)
+    for path in ("..", "../secret.txt", "sub/../../secret.txt", "/etc/passwd", "up/secret.txt"):
+        assert resolve_data_path(str(root), path) is None
+
+
+def test_sandbox_escape(server, tmp_path):
+    """Test, że narzędzia odmawiają dostępu poza katalog data."""
+    _, root = server
+    (tmp_path / "secret.txt").write_text("secret")
+    os.symlink(tmp_path, root / "up")
+
+    for path in ("../secret.txt", "up/secret.txt"):
+        assert call(server, "fs_read_file", filepath=path).startswith("Błąd: Niedozwolona ścieżka")
+        assert call(server, "fs_write_file", filepath=path, content="x").startswith("Błąd: Niedozwolona ścieżka")
+    assert call(server, "fs_list_files", directory="..").startswith("Błąd: Niedozwolona ścieżka")
+    assert (tmp_path / "secret.txt").read_text() == "secret"
+
+
+def test_write_reserved_and_directory(server):
+    """Test odmowy zapisu do katalogów roboczych serwera i do katalogu."""
+    _, root = server
+    (root / "dir").mkdir()
+
+    assert "tylko do odczytu" in call(server, "fs_write_file", filepath=".uploads/x.part", content="x")
+    assert call(server, "fs_write_file", filepath="dir", content="x") == "Błąd: Ścieżka wskazuje katalog."
+
+
+def test_write_keeps_file_mode(server):
+    """Test uprawnień po zapisie atomowym: istniejący plik je zachowuje, nowy dostaje 0o666 bez umask."""
+    _, root = server
+    (root / "old.txt").write_text("old")
+    os.chmod(root / "old.txt", 0o640)
+    umask = os.umask(0o022)
+    try:
+        call(server, "fs_write_file", filepath="old.txt", content="new")
+        call(server, "fs_write_file", filepath="sub/new.txt", content="new")
+    finally:
+        os.umask(umask)
+
+    assert (root / "old.txt").read_text() == "new"
+    assert stat.S_IMODE(os.stat(root / "old.txt").st_mode) == 0o640
+    assert stat.S_IMODE(os.stat(root / "sub" / "new.txt").st_mode) == 0o644
+    assert [name for name in os.listdir(root / "sub") if name.endswith(".tmp")] == []
+
+
+def test_head_and_tail(server):
+    """Test trybów head i tail na granicach pliku."""
+    _, root = server
+    (root / "lines.txt").write_text("1\n2\n3\n4\n5\n")
+    (root / "open.txt").write_text("a\nb\nc")
+    (root / "empty.txt").write_text("")
+
+    assert call(server, "fs_read_file", filepath="lines.txt", mode="head", lines=2) == "1\n2\n"
+    assert call(server, "fs_read_file", filepath="lines.txt", mode="head", lines=10) == "1\n2\n3\n4\n5\n"
+    assert call(server, "fs_read_file", filepath="lines.txt", mode="tail", lines=2) == "4\n5\n"
+    assert call(server, "fs_read_file", filepath="lines.txt", mode="tail", lines=10) == "1\n2\n3\n4\n5\n"
+    assert call(server, "fs_read_file", filepath="open.txt", mode="tail", lines=1) == "c"
+    assert call(server, "fs_read_file", filepath="open.txt", mode="head", lines=1) == "a\n"
+    assert call(server, "fs_read_file", filepath="empty.txt", mode="tail", lines=3) == ""
+
+
+def test_read_range(server, monkeypatch):
+    """Test odczytu zakresu: offset ujemny, poza końcem pliku, obcięcie i znaki wielobajtowe."""
+    _, root = server
+    (root / "digits.txt").write_text("0123456789")
+    (root / "utf.txt").write_text("aąb", encoding="utf-8")
+
+    assert call(server, "fs_read_file", filepath="digits.txt", offset=2, length=3) == "234"
+    assert call(server, "fs_read_file", filepath="digits.txt", offset=-3) == "789"
+    assert call(server, "fs_read_file", filepath="digits.txt", offset=-30, length=2) == "01"
+    assert call(server, "fs_read_file", filepath="digits.txt", offset=10) == ""
+
+    # Fragment kończący się w połowie znaku "ą" zwraca tylko pełne znaki
+    chunk = json.loads(call(server, "fs_read_file", filepath="utf.txt", mode="chunked", length=2))
+    assert chunk == {"offset": 0, "next_offset": 1, "size": 4, "eof": False, "data": "a"}
+    chunk = json.loads(call(server, "fs_read_file", filepath="utf.txt", mode="chunked", offset=1))
+    assert chunk == {"offset": 1, "next_offset": 4, "size": 4, "eof": True, "data": "ąb"}
+
+    monkeypatch.setitem(FS_CONFIG, "max_response_bytes", 4)
+    text = call(server, "fs_read_file", filepath="digits.txt")
+    assert text.startswith("0123\n\n[Odpowiedź obcięta")
+    assert "Kontynuuj z offset=4" in text
+
+
+def test_upload_resume_and_commit(server):
+    """Test przesyłania: start, przerwanie, wznowienie od offsetu ze statusu i zatwierdzenie."""
+    _, root = server
+    started = json.loads(call(server, "fs_upload_start", filepath="big/file.txt"))
+    upload_id = started["upload_id"]
+    assert started["offset"] == 0
+
+    assert json.loads(call(server, "fs_upload_chunk", upload_id=upload_id, offset=0, content="hello "))["offset"] == 6
+    assert json.loads(call(server, "fs_upload_status", upload_id=upload_id))["offset"] == 6
+    # Ponowienie od wcześniejszego offsetu nadpisuje końcówkę, luka jest błędem
+    assert json.loads(call(server, "fs_upload_chunk", upload_id=upload_id, offset=3, content="lo wor"))["offset"] == 9
+    assert "Nieprawidłowy offset" in call(server, "fs_upload_chunk", upload_id=upload_id, offset=20, content="x")
+    assert json.loads(call(server, "fs_upload_chunk", upload_id=upload_id, offset=9, content="ld"))["offset"] == 11
+    assert not (root / "big" / "file.txt").exists()
+
+    assert "(11 bajtów)" in call(server, "fs_upload_commit", upload_id=upload_id)
+    assert (root / "big" / "file.txt").read_text() == "hello world"
+    assert os.listdir(root / FS_CONFIG["upload_dir"]) == []
+    assert "nie istnieje" in call(server, "fs_upload_status", upload_id=upload_id)
+
+
+def test_upload_abort(server):
+    """Test przerwania przesyłania - fragmenty są usuwane, plik docelowy nie powstaje."""
+    _, root = server
+    upload_id = json.loads(call(server, "fs_upload_start", filepath="file.bin"))["upload_id"]
+    call(server, "fs_upload_chunk", upload_id=upload_id, offset=0, content="AAEC", encoding="base64")
+
+    assert call(server, "fs_upload_abort", upload_id=upload_id) == f"Przesyłanie {upload_id} zostało przerwane"
+    assert os.listdir(root / FS_CONFIG["upload_dir"]) == []
+    assert not (root / "file.bin").exists()
+    assert "nie istnieje" in call(server, "fs_upload_commit", upload_id=upload_id)
+    assert "Nieprawidłowy identyfikator" in call(server, "fs_upload_abort", upload_id="../../etc")
+
+
+def test_listing_cache_invalidate(tmp_path):
+    """Test unieważniania wpisów cache listowania."""
+    pytest.importorskip("watchdog")
+    cache = ListingCache(max_dirs=2)
+    assert cache.start()
+    directory = str(tmp_path)
+    excluded = os.path.join(directory, ".index")
+    key = (directory, True, (excluded,))
+
+    token = cache.watch(key)
+    cache.put(key, [{"name": "a.txt"}], token)
+    assert cache.get(key) == [{"name": "a.txt"}]
+
+    # Zmiany w wykluczonym katalogu nie unieważniają wpisu, zmiany w podkatalogu tak
+    cache.invalidate(os.path.join(excluded, "search.db"))
+    assert cache.get(key) is not None
+    cache.invalidate(os.path.join(directory, "sub", "b.txt"))
+    assert cache.get(key) is None
+
+    # Wynik odczytu sprzed zmiany nie trafia do cache
+    token = cache.watch(key)
+    cache.invalidate(os.path.join(directory, "c.txt"))
+    cache.put(key, [{"name": "stale"}], token)
+    assert cache.get(key) is None
+
+
+def test_listing_cache_after_write(server, monkeypatch):
+    """Test, że listowanie z włączonym cache widzi plik zapisany po poprzednim listowaniu."""
+    pytest.importorskip("watchdog")
+    monkeypatch.setitem(FS_CONFIG, "list_cache", True)
+    monkeypatch.setattr(fs_tool, "_listing_cache", None)
+
+    def names():
+        page = json.loads(call(server, "fs_list_files", output="json"))
+        return [entry["name"] for entry in page["entries"]]
+
+    call(server, "fs_write_file", filepath="a.txt", content="a")
+    assert names() == ["a.txt"]
+    assert fs_tool._listing_cache is not None
+
+    call(server, "fs_write_file", filepath="b.txt", content="b")
+    # Zdarzenia inotify docierają asynchronicznie
+    deadline = time.monotonic() + 5
+    while names() != ["a.txt", "b.txt"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert names() == ["a.txt", "b.txt"]
+
+
+def test_search_and_reindex(server):
+    """Test wyszukiwania przed i po fs_reindex, także wyrażeniem z "_"."""
+    _, root = server
+    (root / "a.py").write_text("value = _ + 1\n")
+
+    assert call(server, "fs_search", query=r"\b_\b", mode="regex").startswith("a.py [1]: value = [_] + 1")
+    assert call(server, "fs_search", query="load_config", mode="regex") == "Brak wyników."
+
+    # Plik zapisany poza narzędziami jest widoczny dopiero po aktualizacji indeksu
+    (root / "b.py").write_text("def load_config():\n    pass\n")
+    assert call(server, "fs_search", query="load_config", mode="regex") == "Brak wyników."
+    assert "dodano 1" in call(server, "fs_reindex")
+    assert call(server, "fs_search", query=r"\bload_config\b", mode="regex").startswith("b.py [1]:")
+
+    # Zapis przez fs_write_file oznacza indeks jako nieaktualny
+    call(server, "fs_write_file", filepath="c.txt", content="gamma delta")
+    assert call(server, "fs_search", query="gamma").startswith("c.txt [")
+    assert call(server, "fs_search", query="x", mode="fuzzy").startswith("Błąd podczas wyszukiwania")
@@ -47,6 +47,19 @@ def check_ollama_available():
 mcp = FastMCP("MCP-Ollama-TinyLLM")
 
 
+def format_timing(result: dict) -> str:
+    """Opisuje statystyki czasu generowania z odpowiedzi Ollama (czasy w nanosekundach)."""
+    eval_count = result.get("eval_count") or 0
+    eval_seconds = (result.get("eval_duration") or 0) / 1e9
+    speed = f"{eval_count / eval_seconds:.1f} tok/s" if eval_seconds else "?"
+    return (
+        f"Wygenerowano {eval_count} tokenów ({speed}); "
+        f"ładowanie {(result.get('load_duration') or 0) / 1e9:.2f} s, "
+        f"prompt {(result.get('prompt_eval_duration') or 0) / 1e9:.2f} s, "
+        f"generowanie {eval_seconds:.2f} s"
+    )
+
+
 @mcp.tool()
 async def ask_tinyllm(prompt: str, ctx: Context = None) -> str:
     """Zadaj pytanie do modelu TinyLLM poprzez Ollama."""
@@ -60,14 +73,17 @@ async def ask_tinyllm(prompt: str, ctx: Context = None) -> str:
             json={
                 "model": MODEL_NAME,
                 "prompt": prompt,
-                "temperature": 0.7,
-                "max_tokens": 1000
+                "stream": False,
+                # Ollama przyjmuje parametry generowania tylko w "options" (limit długości to num_predict)
+                "options": {"temperature": 0.7, "num_predict": 1000}
             },
             timeout=60
         )
 
         if response.status_code == 200:
             result = response.json()
+            if ctx:
+                await ctx.info(format_timing(result))
             return result.get("response", "Brak odpowiedzi od modelu.")
         else:
             error_msg = f"Błąd Ollama: {response.status_code}"
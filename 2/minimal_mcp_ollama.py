@@ -57,8 +57,9 @@ async def ask_tinyllm(prompt: str, ctx: Context = None) -> str:
             json={
                 "model": MODEL_NAME,
                 "prompt": prompt,
-                "temperature": 0.7,
-                "max_tokens": 1000
+                "stream": False,
+                # Ollama przyjmuje parametry generowania tylko w "options" (limit długości to num_predict)
+                "options": {"temperature": 0.7, "num_predict": 1000}
             },
             timeout=60
         )
@@ -10,12 +10,19 @@ import json
 import requests
 from flask import Flask, request, jsonify
 
+# Wspólne moduły serwerów Flask (katalog 3/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3"))
+from request_log import setup_logging, log_request, truncate
+from cached_page import CachedPage
+from ollama_ndjson import read_generate, generation_stats
+
 # Konfiguracja
 OLLAMA_URL = "http://localhost:11434"
 MODEL_NAME = "tinyllama"  # Nazwę modelu można zmienić
 PORT = 5000
 
 app = Flask(__name__)
+logger = setup_logging("server2")
 
 def check_ollama_available():
     """Sprawdza, czy Ollama jest dostępna i model załadowany."""
@@ -45,10 +52,8 @@ def check_ollama_available():
         print(f"⚠️ Błąd: {str(e)}")
         return False
 
-@app.route('/', methods=['GET'])
-def home():
-    """Strona główna z instrukcjami."""
-    return """
+# Strona główna - treść stała, serwowana z pamięci z nagłówkami pamięci podręcznej
+HOME_PAGE = """
     <html>
     <head>
         <title>Super prosty serwer TinyLLM</title>
@@ -84,10 +89,18 @@ curl -X POST -H "Content-Type: application/json" \\
     </body>
     </html>
     """
+home_page = CachedPage(lambda: HOME_PAGE, max_age=300)
+
+
+@app.route('/', methods=['GET'])
+def home():
+    """Strona główna z instrukcjami."""
+    return home_page.response(request)
 
 @app.route('/ask', methods=['POST'])
 def ask_tinyllm():
     """Zadaj pytanie do modelu TinyLLM poprzez Ollama."""
+    log_request(logger, request, "ask")
     if not request.is_json:
         return jsonify({"error": "Oczekiwano danych JSON"}), 400
 
@@ -97,7 +110,7 @@ def ask_tinyllm():
 
     prompt = data['prompt']
 
-    print(f"📤 Zapytanie: {prompt[:50]}...")
+    logger.info("Zapytanie", extra={"fields": {"prompt": truncate(prompt, 50)}})
 
     try:
         # Wywołanie API Ollama z minimalną konfiguracją
@@ -106,28 +119,36 @@ def ask_tinyllm():
             json={
                 "model": MODEL_NAME,
                 "prompt": prompt,
-                "temperature": data.get('temperature', 0.7),
-                "max_tokens": data.get('max_tokens', 1000)
+                "stream": False,
+                # Ollama przyjmuje parametry generowania tylko w "options" (limit długości to num_predict)
+                "options": {
+                    "temperature": data.get('temperature', 0.7),
+                    "num_predict": data.get('max_tokens', 1000)
+                }
             },
-            timeout=60
+            timeout=60,
+            stream=True
         )
 
-        if response.status_code == 200:
-            result = response.json()
-            print(f"📥 Odpowiedź otrzymana")
-            return jsonify({"response": result.get("response", "Brak odpowiedzi od modelu.")})
-        else:
-            error_msg = f"Błąd Ollama: {response.status_code}"
-            print(f"⚠️ {error_msg}")
-            return jsonify({"error": error_msg}), 500
+        with response:
+            if response.status_code == 200:
+                text, summary = read_generate(response)
+                timing = generation_stats(summary) if summary else None
+                logger.info("Odpowiedź otrzymana", extra={"fields": {"chars": len(text), **(timing or {})}})
+                return jsonify({"response": text or "Brak odpowiedzi od modelu.", "timing": timing})
+            else:
+                error_msg = f"Błąd Ollama: {response.status_code}"
+                logger.warning(error_msg)
+                return jsonify({"error": error_msg}), 500
     except Exception as e:
         error_msg = f"Błąd: {str(e)}"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 500
 
 @app.route('/echo', methods=['POST'])
 def echo():
     """Proste narzędzie do testowania działania serwera."""
+    log_request(logger, request, "echo")
     if not request.is_json:
         return jsonify({"error": "Oczekiwano danych JSON"}), 400
 
@@ -6,17 +6,22 @@ Obsługuje problemy z parsowaniem JSON z Ollama.
 
 import os
 import sys
-import json
-import traceback
 import requests
 from flask import Flask, request, jsonify
 
+# Wspólne moduły serwerów Flask (katalog 3/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3"))
+from request_log import setup_logging, log_request, truncate
+from cached_page import CachedPage
+from ollama_ndjson import read_generate, generation_stats, NDJSONError
+
 # Konfiguracja
 OLLAMA_URL = "http://localhost:11434"
 MODEL_NAME = "tinyllama:latest"  # Użycie pełnej nazwy z tagiem
 PORT = 5001
 
 app = Flask(__name__)
+logger = setup_logging("server3")
 
 
 def check_ollama_available():
@@ -54,10 +59,8 @@ def check_ollama_available():
         return False
 
 
-@app.route('/', methods=['GET'])
-def home():
-    """Strona główna z instrukcjami."""
-    return """
+# Strona główna - treść stała, serwowana z pamięci z nagłówkami pamięci podręcznej
+HOME_PAGE = """
     <html>
     <head>
         <title>Super prosty serwer TinyLLM</title>
@@ -102,6 +105,13 @@ curl -X POST -H "Content-Type: application/json" \\
     </body>
     </html>
     """
+home_page = CachedPage(lambda: HOME_PAGE, max_age=300)
+
+
+@app.route('/', methods=['GET'])
+def home():
+    """Strona główna z instrukcjami."""
+    return home_page.response(request)
 
 
 def call_ollama_api(prompt, temperature=0.7, max_tokens=1000):
@@ -114,89 +124,64 @@ def call_ollama_api(prompt, temperature=0.7, max_tokens=1000):
         max_tokens: Maksymalna liczba tokenów w odpowiedzi
 
     Returns:
-        str: Odpowiedź od modelu lub komunikat o błędzie
+        tuple: (odpowiedź, komunikat błędu, statystyki czasu generowania)
     """
     try:
-        # Użycie stream=False, aby uniknąć problemów z parsowaniem JSON
+        # stream=False - Ollama zwraca całą odpowiedź w jednym obiekcie JSON
         payload = {
             "model": MODEL_NAME,
             "prompt": prompt,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-            "stream": False
+            "stream": False,
+            # Ollama przyjmuje parametry generowania tylko w "options" (limit długości to num_predict)
+            "options": {"temperature": temperature, "num_predict": max_tokens}
         }
 
-        print(f"📤 Wysyłanie zapytania do Ollama: {json.dumps(payload)[:200]}...")
+        logger.debug("Wysyłanie zapytania do Ollama", extra={"fields": {
+            "model": MODEL_NAME, "prompt_chars": len(prompt), "options": payload["options"]}})
 
-        response = requests.post(
+        # Odpowiedź jest czytana strumieniowo i dekodowana jeden raz
+        with requests.post(
             f"{OLLAMA_URL}/api/generate",
             json=payload,
-            timeout=60
-        )
+            timeout=60,
+            stream=True
+        ) as response:
+            # Sprawdzenie statusu odpowiedzi
+            if response.status_code != 200:
+                error_msg = f"Błąd Ollama: Kod {response.status_code}"
+                logger.warning(error_msg)
+                return None, error_msg, None
 
-        # Sprawdzenie statusu odpowiedzi
-        if response.status_code != 200:
-            error_msg = f"Błąd Ollama: Kod {response.status_code}"
-            print(f"⚠️ {error_msg}")
-            return None, error_msg
-
-        # Próba parsowania odpowiedzi jako JSON
-        try:
-            # Tylko pierwszy wiersz treści odpowiedzi
-            first_line = response.text.strip().split('\n')[0]
-            result = json.loads(first_line)
-            ollama_response = result.get("response", "")
-            print(f"📥 Odpowiedź Ollama (długość: {len(ollama_response)} znaków)")
-            return ollama_response, None
-        except json.JSONDecodeError as e:
-            # Jeśli parsowanie nie powiodło się, wyświetl surowe dane
-            print(f"⚠️ Błąd parsowania JSON: {str(e)}")
-            print(f"Surowa odpowiedź: {response.text[:200]}...")
-
-            # Spróbuj wyciągnąć tekst odpowiedzi bez polegania na JSON
             try:
-                # Ręczne parsowanie dla strumieniowej odpowiedzi
-                text_content = ""
-                for line in response.text.strip().split('\n'):
-                    try:
-                        chunk = json.loads(line)
-                        if "response" in chunk:
-                            text_content += chunk["response"]
-                    except:
-                        pass
-
-                if text_content:
-                    print(f"📥 Odpowiedź wyodrębniona ręcznie (długość: {len(text_content)} znaków)")
-                    return text_content, None
-            except Exception as parsing_ex:
-                print(f"⚠️ Nie można wyodrębnić odpowiedzi: {str(parsing_ex)}")
-
-            # Jeśli wszystko zawiedzie, zwróć błąd
-            return None, f"Błąd parsowania odpowiedzi Ollama: {str(e)}"
+                ollama_response, summary = read_generate(response)
+            except NDJSONError as e:
+                error_msg = f"Błąd parsowania odpowiedzi Ollama: {str(e)}"
+                logger.warning(error_msg)
+                return None, error_msg, None
+
+        timing = generation_stats(summary) if summary else None
+        logger.info("Odpowiedź Ollama", extra={"fields": {"chars": len(ollama_response), **(timing or {})}})
+        return ollama_response, None, timing
     except requests.exceptions.Timeout:
         error_msg = "Timeout podczas oczekiwania na odpowiedź z Ollama"
-        print(f"⚠️ {error_msg}")
-        return None, error_msg
+        logger.warning(error_msg)
+        return None, error_msg, None
     except Exception as e:
         error_msg = f"Nieoczekiwany błąd: {str(e)}"
-        print(f"⚠️ {error_msg}")
-        traceback.print_exc()
-        return None, error_msg
+        logger.exception(error_msg)
+        return None, error_msg, None
 
 
 @app.route('/ask', methods=['POST'])
 def ask_tinyllm():
     """Zadaj pytanie do modelu TinyLLM poprzez Ollama."""
-    # Debugowanie żądania
-    print(f"\n===== NOWE ZAPYTANIE =====")
-    print(f"Content-Type: {request.headers.get('Content-Type', 'brak')}")
-    print(f"Długość danych: {request.content_length} bajtów")
-    print(f"Surowe dane: {request.data.decode('utf-8', errors='replace')}")
+    # Metadane żądania (treść tylko dla próbki zapytań, skrócona)
+    log_request(logger, request, "ask")
 
     # Sprawdzenie Content-Type
     if not request.is_json:
         error_msg = "Oczekiwano danych JSON. Użyj nagłówka 'Content-Type: application/json'"
-        print(f"⚠️ Błąd: {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     # Obsługa błędów parsowania JSON
@@ -204,68 +189,65 @@ def ask_tinyllm():
         data = request.get_json(force=False)
     except Exception as e:
         error_msg = f"Błąd parsowania JSON: {str(e)}"
-        print(f"⚠️ {error_msg}")
-        print(f"Stacktrace: {traceback.format_exc()}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     # Sprawdzenie struktury JSON
     if not isinstance(data, dict):
         error_msg = f"Oczekiwano obiektu JSON, otrzymano: {type(data).__name__}"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     if 'prompt' not in data:
         error_msg = "Brak parametru 'prompt' w danych JSON"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     prompt = data['prompt']
     temperature = data.get('temperature', 0.7)
     max_tokens = data.get('max_tokens', 1000)
 
-    print(f"📤 Zapytanie: {prompt[:50]}...")
+    logger.info("Zapytanie", extra={"fields": {"prompt": truncate(prompt, 50)}})
 
     # Wywołanie API Ollama
-    response, error = call_ollama_api(prompt, temperature, max_tokens)
+    response, error, timing = call_ollama_api(prompt, temperature, max_tokens)
 
     if error:
         return jsonify({"error": error}), 500
     else:
-        return jsonify({"response": response})
+        return jsonify({"response": response, "timing": timing})
 
 
 @app.route('/echo', methods=['POST'])
 def echo():
     """Proste narzędzie do testowania działania serwera."""
-    # Debugowanie żądania
-    print(f"\n===== NOWE ZAPYTANIE ECHO =====")
-    print(f"Content-Type: {request.headers.get('Content-Type', 'brak')}")
-    print(f"Surowe dane: {request.data.decode('utf-8', errors='replace')}")
+    # Metadane żądania (treść tylko dla próbki zapytań, skrócona)
+    log_request(logger, request, "echo")
 
     if not request.is_json:
         error_msg = "Oczekiwano danych JSON. Użyj nagłówka 'Content-Type: application/json'"
-        print(f"⚠️ Błąd: {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     try:
         data = request.get_json(force=False)
     except Exception as e:
         error_msg = f"Błąd parsowania JSON: {str(e)}"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     if not isinstance(data, dict):
         error_msg = f"Oczekiwano obiektu JSON, otrzymano: {type(data).__name__}"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     if 'message' not in data:
         error_msg = "Brak parametru 'message' w danych JSON"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     message = data['message']
-    print(f"📤 Echo: {message}")
+    logger.info("Echo", extra={"fields": {"message": truncate(message)}})
 
     return jsonify({"response": f"Otrzymano: {message}"})
 
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Porównanie dekodera ollama_ndjson.py z dotychczasowym parsowaniem odpowiedzi Ollama.
+
+Dotychczasowe podejście (call_ollama_api) dekodowało całą treść do tekstu,
+próbowało json.loads na całości i na pierwszej linii, a po niepowodzeniu
+dzieliło tekst ponownie i parsowało każdą linię, doklejając fragmenty.
+Dekoder czyta porcje bajtów jeden raz i łączy fragmenty na końcu.
+
+Użycie:
+    python bench_ndjson.py
+    python bench_ndjson.py --tokens 200000 --chunk-size 1400 --repeat 5
+"""
+
+import json
+import time
+import argparse
+import tracemalloc
+
+from ollama_ndjson import NDJSONDecoder, collect_generate
+
+
+def make_stream(tokens):
+    """Zwraca odpowiedź strumieniową Ollama (NDJSON) z podaną liczbą fragmentów."""
+    lines = [json.dumps({"model": "fake", "response": f"słowo{i % 100} ", "done": False}) for i in range(tokens)]
+    lines.append(json.dumps({"model": "fake", "response": "", "done": True, "eval_count": tokens,
+                             "eval_duration": tokens * 20_000_000, "context": list(range(2048))}))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def make_single(tokens):
+    """Zwraca odpowiedź niestrumieniową (jeden obiekt JSON)."""
+    return json.dumps({"model": "fake", "response": "".join(f"słowo{i % 100} " for i in range(tokens)),
+                       "done": True, "eval_count": tokens, "context": list(range(2048))}).encode("utf-8")
+
+
+def legacy_parse(body):
+    """Dotychczasowe parsowanie: całość, pierwsza linia, a potem linia po linii."""
+    response_text = body.decode("utf-8").strip()
+    try:
+        return json.loads(response_text).get("response", "")
+    except json.JSONDecodeError:
+        lines = response_text.split("\n")
+        try:
+            json.loads(lines[0])
+        except json.JSONDecodeError:
+            pass
+        text_content = ""
+        for line in response_text.strip().split("\n"):
+            try:
+                chunk = json.loads(line)
+                if "response" in chunk:
+                    text_content += chunk["response"]
+            except Exception:
+                pass
+        return text_content
+
+
+def decoder_parse(body, chunk_size):
+    """Parsowanie dekoderem NDJSON z porcji o podanym rozmiarze."""
+    chunks = (body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    text, _ = collect_generate(NDJSONDecoder().decode(chunks))
+    return text
+
+
+def measure(func, repeat):
+    """Zwraca najkrótszy czas wykonania (s) z kilku powtórzeń."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_memory(func):
+    """Zwraca szczytowe zużycie pamięci (MB) podczas wykonania."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dekodera NDJSON")
+    parser.add_argument("--tokens", type=int, default=50000, help="Liczba fragmentów odpowiedzi")
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="Rozmiar porcji danych (bajty)")
+    parser.add_argument("--repeat", type=int, default=5, help="Liczba powtórzeń")
+    args = parser.parse_args()
+
+    print(f"{'odpowiedź':<14} {'rozmiar':>9} {'dotychczas':>22} {'dekoder':>22}")
+    for name, body in (("strumieniowa", make_stream(args.tokens)), ("pojedyncza", make_single(args.tokens))):
+        assert legacy_parse(body) == decoder_parse(body, args.chunk_size)
+        legacy = measure(lambda: legacy_parse(body), args.repeat)
+        decoder = measure(lambda: decoder_parse(body, args.chunk_size), args.repeat)
+        legacy_memory = peak_memory(lambda: legacy_parse(body))
+        decoder_memory = peak_memory(lambda: decoder_parse(body, args.chunk_size))
+        print(f"{name:<14} {len(body) / 1e6:>7.1f}MB "
+              f"{legacy * 1000:>9.1f} ms {legacy_memory:>7.1f} MB "
+              f"{decoder * 1000:>9.1f} ms {decoder_memory:>7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Strony HTML renderowane raz i serwowane z pamięci (serwery Flask w 3/ i 2/).
+
+Strona jest renderowana ponownie tylko wtedy, gdy zmieni się klucz
+konfiguracji (np. model lub port). Wynik jest od razu kompresowany (gzip
+oraz brotli, jeśli pakiet jest zainstalowany), a odpowiedź zawiera
+nagłówki ETag, Last-Modified i Cache-Control, dzięki którym przeglądarki
+i serwery proxy odpytują aplikację rzadziej i dostają 304 Not Modified.
+
+Użycie:
+    home_page = CachedPage(lambda: render_template("home.html", ...), max_age=60)
+
+    @app.route('/')
+    def home():
+        return home_page.response(request, key=(MODEL_NAME, SERVER_PORT))
+"""
+
+import gzip
+import hashlib
+import threading
+import time
+
+from flask import Response
+
+# Kompresja brotli jest opcjonalna (pip install brotli)
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Mniejsze odpowiedzi nie są kompresowane
+MIN_COMPRESS_SIZE = 512
+
+
+class CachedPage:
+    """Wyrenderowana strona z wariantami skompresowanymi i nagłówkami pamięci podręcznej."""
+
+    def __init__(self, render, max_age=60, mimetype="text/html"):
+        """
+        Args:
+            render: Funkcja bez argumentów zwracająca treść strony (str).
+            max_age: Czas (s), przez który przeglądarki i proxy mogą używać kopii.
+            mimetype: Typ treści.
+        """
+        self.render = render
+        self.max_age = max_age
+        self.mimetype = mimetype
+        self._key = None
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        body = self.render().encode("utf-8")
+        variants = {"identity": body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            # mtime=0 - ta sama treść daje zawsze te same bajty
+            variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                variants["br"] = brotli.compress(body)
+        return {
+            "variants": variants,
+            "etag": hashlib.sha256(body).hexdigest()[:32],
+            "last_modified": int(time.time()),
+        }
+
+    def get(self, key=None):
+        """
+        Zwraca wyrenderowaną stronę, renderując ją, jeśli zmienił się klucz.
+
+        Args:
+            key: Wartość opisująca konfigurację użytą do renderowania.
+
+        Returns:
+            dict: Warianty treści ("identity", "gzip", "br"), ETag i czas modyfikacji.
+        """
+        with self._lock:
+            if self._entry is None or key != self._key:
+                self._entry = self._build()
+                self._key = key
+            return self._entry
+
+    def response(self, request, key=None):
+        """
+        Zwraca odpowiedź Flask (200 lub 304) z najlepszym wariantem kompresji.
+
+        Args:
+            request: Obiekt flask.request.
+            key: Wartość opisująca konfigurację użytą do renderowania.
+
+        Returns:
+            flask.Response: Odpowiedź z nagłówkami ETag, Last-Modified i Cache-Control.
+        """
+        entry = self.get(key)
+        variants = entry["variants"]
+        accepted = request.accept_encodings
+        encoding = "identity"
+        for candidate in ("br", "gzip"):
+            if candidate in variants and accepted[candidate]:
+                encoding = candidate
+                break
+
+        response = Response(variants[encoding], mimetype=self.mimetype)
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        response.headers["Vary"] = "Accept-Encoding"
+        # Każdy wariant kompresji ma własny (silny) ETag
+        response.set_etag(entry["etag"] if encoding == "identity" else f"{entry['etag']}-{encoding}")
+        response.last_modified = entry["last_modified"]
+        response.cache_control.public = True
+        response.cache_control.max_age = self.max_age
+        return response.make_conditional(request)
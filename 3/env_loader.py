@@ -6,6 +6,7 @@ Moduł do ładowania konfiguracji z pliku .env dla serwera Ollama
 import os
 import sys
 import re
+import uuid
 from dotenv import load_dotenv
 
 
@@ -25,7 +26,16 @@ def load_env_config(env_file=".env"):
         "OLLAMA_URL": "http://localhost:11434",
         "SERVER_PORT": 5001,
         "TEMPERATURE": 0.7,
-        "MAX_TOKENS": 1000
+        "MAX_TOKENS": 1000,
+        "WORKERS": 2,
+        "THREADS": 8,
+        "REQUEST_TIMEOUT": 120,
+        "OLLAMA_TIMEOUT": 60,
+        "GRACEFUL_TIMEOUT": 30,
+        "LOG_LEVEL": "INFO",
+        "LOG_FORMAT": "text",
+        "LOG_BODY_SAMPLE_RATE": 0.01,
+        "LOG_BODY_MAX_CHARS": 200
     }
 
     # Sprawdzenie czy plik .env istnieje
@@ -41,13 +51,14 @@ def load_env_config(env_file=".env"):
         env_value = os.getenv(key)
         if env_value is not None:
             # Konwersja na odpowiedni typ
-            if key in ["SERVER_PORT", "MAX_TOKENS"]:
+            if key in ["SERVER_PORT", "MAX_TOKENS", "WORKERS", "THREADS", "REQUEST_TIMEOUT",
+                       "OLLAMA_TIMEOUT", "GRACEFUL_TIMEOUT", "LOG_BODY_MAX_CHARS"]:
                 try:
                     config[key] = int(env_value)
                 except ValueError:
                     print(
                         f"Ostrzeżenie: {key}={env_value} nie jest liczbą całkowitą. Używanie wartości domyślnej: {config[key]}")
-            elif key in ["TEMPERATURE"]:
+            elif key in ["TEMPERATURE", "LOG_BODY_SAMPLE_RATE"]:
                 try:
                     config[key] = float(env_value)
                 except ValueError:
@@ -78,7 +89,20 @@ def create_env_file(env_file, config):
 
         f.write("# Parametry generowania\n")
         f.write(f'TEMPERATURE={config["TEMPERATURE"]}\n')
-        f.write(f'MAX_TOKENS={config["MAX_TOKENS"]}\n')
+        f.write(f'MAX_TOKENS={config["MAX_TOKENS"]}\n\n')
+
+        f.write("# Serwer produkcyjny (wsgi.py)\n")
+        f.write(f'WORKERS={config["WORKERS"]}\n')
+        f.write(f'THREADS={config["THREADS"]}\n')
+        f.write(f'REQUEST_TIMEOUT={config["REQUEST_TIMEOUT"]}\n')
+        f.write(f'OLLAMA_TIMEOUT={config["OLLAMA_TIMEOUT"]}\n')
+        f.write(f'GRACEFUL_TIMEOUT={config["GRACEFUL_TIMEOUT"]}\n\n')
+
+        f.write("# Logowanie (LOG_FORMAT: text lub json)\n")
+        f.write(f'LOG_LEVEL="{config["LOG_LEVEL"]}"\n')
+        f.write(f'LOG_FORMAT="{config["LOG_FORMAT"]}"\n')
+        f.write(f'LOG_BODY_SAMPLE_RATE={config["LOG_BODY_SAMPLE_RATE"]}\n')
+        f.write(f'LOG_BODY_MAX_CHARS={config["LOG_BODY_MAX_CHARS"]}\n')
 
 
 def update_env_value(env_file, key, value):
@@ -119,9 +143,14 @@ def update_env_value(env_file, key, value):
     if not found:
         lines.append(f'{key}={value}\n')
 
-    # Zapisanie zaktualizowanej zawartości
-    with open(env_file, 'w') as f:
+    # Zapisanie zaktualizowanej zawartości przez plik tymczasowy - serwer
+    # obserwujący .env nigdy nie odczyta pliku zapisanego do połowy; plik
+    # zachowuje swoje uprawnienia (tempfile.mkstemp tworzy pliki 0600)
+    tmp_path = os.path.join(os.path.dirname(os.path.abspath(env_file)), f".env.{uuid.uuid4().hex[:12]}.tmp")
+    with open(tmp_path, 'x') as f:
         f.writelines(lines)
+    os.chmod(tmp_path, os.stat(env_file).st_mode & 0o777)
+    os.replace(tmp_path, env_file)
 
     return True
 
@@ -130,6 +159,9 @@ def update_server_config(server_file, model_name):
     """
     Aktualizuje konfigurację modelu w pliku serwera.
 
+    Przestarzałe: serwery czytają MODEL_NAME z pliku .env, więc wystarczy
+    update_env_value() - zmiana kodu źródłowego nie jest potrzebna.
+
     Args:
         server_file: ścieżka do pliku serwera
         model_name: nazwa modelu
@@ -177,11 +209,5 @@ if __name__ == "__main__":
         model_name = sys.argv[1]
         print(f"\nAktualizacja modelu na: {model_name}")
 
-        # Aktualizacja w pliku .env
-        update_env_value("../2/.env", "MODEL_NAME", model_name)
-
-        # Aktualizacja w pliku serwera
-        server_files = ["server4.py", "super_simple_server.py"]
-        for file in server_files:
-            if os.path.exists(file):
-                update_server_config(file, model_name)
\ No newline at end of file
+        # Aktualizacja tylko w pliku .env (bez zmiany plików źródłowych serwerów)
+        update_env_value("../2/.env", "MODEL_NAME", model_name)
\ No newline at end of file
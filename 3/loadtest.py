@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test obciążeniowy serwera produkcyjnego (wsgi.py) z atrapą Ollama.
+
+Skrypt uruchamia atrapę Ollama odpowiadającą na /api/generate po zadanym
+opóźnieniu (symulacja czasu generowania), a następnie dla każdej liczby
+procesów roboczych uruchamia wsgi.py, wysyła równoległe zapytania /ask
+i wypisuje liczbę zapytań na sekundę oraz czasy odpowiedzi.
+
+Użycie:
+    python loadtest.py                          # procesy 1,2,4; 8 wątków
+    python loadtest.py --workers 1,2,4,8 --threads 4 --delay 0.2 --concurrency 32
+    python loadtest.py --builtin --threads 1,4,16   # serwer wbudowany: porównanie liczby wątków
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Atrapa Ollama z pakietu ollama_server
+sys.path.insert(0, os.path.join(BASE_DIR, "server"))
+from ollama_server.fake_ollama import FakeOllama
+
+
+def free_port():
+    """Zwraca wolny port TCP."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_ollama(delay):
+    """
+    Uruchamia atrapę Ollama (ollama_server.fake_ollama) w wątku.
+
+    Args:
+        delay: Czas (s) "generowania" odpowiedzi.
+
+    Returns:
+        tuple: (atrapa, URL)
+    """
+    fake = FakeOllama(models={"fake:latest": 1_000_000_000}, token_rate=0, latency=delay, response_tokens=8)
+    fake.start()
+    return fake, fake.url
+
+
+def wait_for_server(url, process, timeout=30):
+    """Czeka, aż serwer zacznie odpowiadać."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Serwer zakończył działanie przy starcie")
+        try:
+            requests.post(f"{url}/echo", json={"message": "ping"}, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("Serwer nie uruchomił się w wyznaczonym czasie")
+
+
+def run_load(url, concurrency, duration):
+    """
+    Wysyła równoległe zapytania /ask przez zadany czas.
+
+    Returns:
+        dict: Liczba zapytań, błędów, zapytania/s i percentyle czasu odpowiedzi.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            start = time.monotonic()
+            try:
+                response = session.post(f"{url}/ask", json={"prompt": "Test"}, timeout=60)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            elapsed = time.monotonic() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.monotonic() - start
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else 0.0
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed,
+        "p50": percentile(50),
+        "p95": percentile(95),
+    }
+
+
+def benchmark(workers, threads, builtin, ollama_url, concurrency, duration):
+    """Uruchamia wsgi.py z podaną konfiguracją i mierzy przepustowość."""
+    port = free_port()
+    settings = {"OLLAMA_URL": ollama_url, "MODEL_NAME": "fake:latest", "OLLAMA_TIMEOUT": "60"}
+    env = dict(os.environ, **settings)
+    command = [sys.executable, os.path.join(BASE_DIR, "wsgi.py"), "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--threads", str(threads)]
+    if builtin:
+        command.append("--builtin")
+
+    # Osobny katalog roboczy, aby nie tworzyć ani nie zmieniać pliku .env projektu
+    with tempfile.TemporaryDirectory() as workdir:
+        # server.py czyta .env z bieżącego katalogu
+        with open(os.path.join(workdir, ".env"), "w", encoding="utf-8") as f:
+            for key, value in settings.items():
+                f.write(f'{key}="{value}"\n')
+        process = subprocess.Popen(command, cwd=workdir, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            url = f"http://127.0.0.1:{port}"
+            wait_for_server(url, process)
+            return run_load(url, concurrency, duration)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test obciążeniowy wsgi.py z atrapą Ollama")
+    parser.add_argument("--workers", default="1,2,4", help="Liczby procesów do porównania (oddzielone przecinkami)")
+    parser.add_argument("--threads", default="8", help="Liczby wątków na proces (oddzielone przecinkami)")
+    parser.add_argument("--builtin", action="store_true", help="Użyj serwera wbudowanego zamiast gunicorn")
+    parser.add_argument("--delay", type=float, default=0.1, help="Czas generowania w atrapie Ollama (s)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Liczba równoległych klientów")
+    parser.add_argument("--duration", type=float, default=5.0, help="Czas pomiaru dla każdej konfiguracji (s)")
+    args = parser.parse_args()
+
+    worker_counts = [int(value) for value in args.workers.split(",")]
+    thread_counts = [int(value) for value in args.threads.split(",")]
+    if not args.builtin:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            print("ℹ️ gunicorn nie jest zainstalowany - test serwera wbudowanego (jeden proces)")
+            args.builtin = True
+    if args.builtin:
+        worker_counts = [1]
+
+    fake, ollama_url = start_fake_ollama(args.delay)
+    print(f"Atrapa Ollama: {ollama_url} (opóźnienie {args.delay} s), klientów: {args.concurrency}")
+    print(f"{'procesy':>8} {'wątki':>6} {'zapytania':>10} {'błędy':>6} {'zap./s':>8} {'p50 [s]':>8} {'p95 [s]':>8}")
+
+    try:
+        for workers in worker_counts:
+            for threads in thread_counts:
+                result = benchmark(workers, threads, args.builtin, ollama_url, args.concurrency, args.duration)
+                print(f"{workers:>8} {threads:>6} {result['requests']:>10} {result['errors']:>6} "
+                      f"{result['rps']:>8.1f} {result['p50']:>8.3f} {result['p95']:>8.3f}")
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Przyrostowy dekoder odpowiedzi NDJSON z Ollama (serwery Flask w 3/ i 2/).
+
+Ollama zwraca z /api/generate jeden obiekt JSON (stream=False) albo
+strumień obiektów w kolejnych liniach (stream=True). Dekoder czyta bajty
+odpowiedzi jeden raz, w miarę ich nadchodzenia, składa fragmenty
+"response" w jeden tekst i zwraca statystyki z ostatniego obiektu
+("done": true). Błędne linie i komunikaty "error" są zgłaszane jako
+wyjątki zamiast być pomijane. Nazwa modułu nie koliduje z pakietem
+ndjson z PyPI.
+
+Użycie:
+    with requests.post(url, json=payload, stream=True, timeout=60) as response:
+        text, summary = read_generate(response)
+    timing = generation_stats(summary) if summary else None
+"""
+
+import json
+
+# Rozmiar porcji odczytywanej z gniazda
+CHUNK_SIZE = 64 * 1024
+
+
+class NDJSONError(ValueError):
+    """Nieprawidłowa linia NDJSON lub błąd zgłoszony przez Ollama."""
+
+    def __init__(self, message, line_number=None):
+        super().__init__(message if line_number is None else f"Linia {line_number}: {message}")
+        self.line_number = line_number
+
+
+class NDJSONDecoder:
+    """
+    Dekoder NDJSON zasilany porcjami bajtów.
+
+    Niepełna ostatnia linia porcji jest przechowywana do nadejścia
+    kolejnej, więc każdy bajt jest przetwarzany (i dekodowany) raz.
+    """
+
+    def __init__(self):
+        # Porcje bez znaku nowej linii (niepełna linia) - łączone raz, gdy linia się zakończy
+        self._pending = []
+        self.line_number = 0
+
+    def _decode_lines(self, text):
+        """Dekoduje linie tekstu; przy błędzie wskazuje numer linii."""
+        lines = text.split("\n")
+        try:
+            # Szybka ścieżka: json.loads toleruje "\r" i spacje na brzegach
+            objects = [json.loads(line) for line in lines if line]
+        except ValueError:
+            objects = []
+            for offset, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    objects.append(json.loads(line))
+                except ValueError as e:
+                    raise NDJSONError(f"nieprawidłowy JSON ({e})", self.line_number + offset) from e
+        self.line_number += len(lines)
+        return objects
+
+    def feed(self, chunk):
+        """
+        Przetwarza porcję danych.
+
+        Args:
+            chunk: Kolejne bajty odpowiedzi.
+
+        Returns:
+            list: Obiekty z linii zakończonych w tej porcji.
+        """
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            self._pending.append(chunk)
+            return []
+        data = chunk
+        if self._pending:
+            self._pending.append(chunk)
+            end += sum(len(piece) for piece in self._pending) - len(chunk)
+            data = b"".join(self._pending)
+        self._pending = [data[end + 1:]] if end + 1 < len(data) else []
+        try:
+            text = data[:end].decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise NDJSONError(f"nieprawidłowe kodowanie UTF-8 ({e})") from e
+        return self._decode_lines(text)
+
+    def close(self):
+        """
+        Kończy dekodowanie.
+
+        Returns:
+            list: Obiekt z ostatniej linii bez znaku nowej linii (lub pusta lista).
+        """
+        tail = b"".join(self._pending)
+        self._pending = []
+        if not tail.strip():
+            return []
+        try:
+            text = tail.decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise NDJSONError(f"nieprawidłowe kodowanie UTF-8 ({e})") from e
+        return self._decode_lines(text)
+
+    def decode(self, chunks):
+        """
+        Dekoduje całą sekwencję porcji.
+
+        Args:
+            chunks: Iterowalna sekwencja bajtów (np. response.iter_content()).
+
+        Yields:
+            dict: Kolejne obiekty JSON.
+        """
+        for chunk in chunks:
+            if chunk:
+                yield from self.feed(chunk)
+        yield from self.close()
+
+
+def collect_generate(objects):
+    """
+    Składa odpowiedź /api/generate z kolejnych obiektów.
+
+    Args:
+        objects: Obiekty JSON z Ollama (jeden lub strumień fragmentów).
+
+    Returns:
+        tuple: (pełny tekst odpowiedzi, statystyki z obiektu "done" lub None)
+    """
+    parts = []
+    summary = None
+    for obj in objects:
+        if not isinstance(obj, dict):
+            raise NDJSONError(f"oczekiwano obiektu JSON, otrzymano: {type(obj).__name__}")
+        if "error" in obj:
+            raise NDJSONError(f"błąd Ollama: {obj['error']}")
+        fragment = obj.get("response")
+        if fragment:
+            parts.append(fragment)
+        if obj.get("done"):
+            summary = {key: value for key, value in obj.items() if key not in ("response", "context")}
+    # Jedno połączenie fragmentów zamiast doklejania (koszt liniowy)
+    return "".join(parts), summary
+
+
+def read_generate(response, chunk_size=CHUNK_SIZE):
+    """
+    Czyta odpowiedź /api/generate (requests, najlepiej z stream=True) jeden raz.
+
+    Zgłasza NDJSONError dla nieprawidłowych danych lub błędu Ollama.
+
+    Args:
+        response: Odpowiedź requests.
+        chunk_size: Rozmiar porcji odczytu.
+
+    Returns:
+        tuple: (pełny tekst odpowiedzi, statystyki z obiektu "done" lub None)
+    """
+    return collect_generate(NDJSONDecoder().decode(response.iter_content(chunk_size=chunk_size)))
+
+
+def generation_stats(summary):
+    """
+    Wyciąga statystyki czasu generowania z obiektu "done" (czasy w nanosekundach).
+
+    Args:
+        summary: Statystyki zwrócone przez read_generate/collect_generate
+
+    Returns:
+        dict: Liczby tokenów, czasy w sekundach i prędkość generowania
+    """
+    def seconds(key):
+        value = summary.get(key)
+        return round(value / 1e9, 4) if value is not None else None
+
+    eval_count = summary.get("eval_count")
+    eval_duration = summary.get("eval_duration")
+    return {
+        "prompt_eval_count": summary.get("prompt_eval_count"),
+        "eval_count": eval_count,
+        "load_seconds": seconds("load_duration"),
+        "prompt_eval_seconds": seconds("prompt_eval_duration"),
+        "eval_seconds": seconds("eval_duration"),
+        "total_seconds": seconds("total_duration"),
+        "tokens_per_second": round(eval_count / eval_duration * 1e9, 2) if eval_count and eval_duration else None
+    }
@@ -0,0 +1,252 @@
+"""
+Wspólne logowanie dla serwerów Flask (3/server.py, 2/server2.py, 2/server3.py).
+
+Zamiast print() na ścieżce obsługi zapytania:
+- poziomy logowania (LOG_LEVEL),
+- zapis przez kolejkę - wątek obsługujący zapytanie tylko dodaje rekord do
+  kolejki, a na standardowe wyjście zapisuje go wątek w tle; gdy kolejka
+  jest pełna, rekord jest pomijany zamiast blokować zapytanie; wątek zapisu
+  jest uruchamiany przy pierwszym rekordzie w każdym procesie, więc działa
+  też w procesach roboczych gunicorn utworzonych przez fork,
+- format tekstowy lub JSON (jeden obiekt w linii) do zbierania logów
+  (LOG_FORMAT=json),
+- treść zapytań logowana tylko dla części zapytań (LOG_BODY_SAMPLE_RATE)
+  i skracana do LOG_BODY_MAX_CHARS znaków.
+
+Użycie:
+    from request_log import setup_logging, log_request, truncate
+
+    logger = setup_logging("server")
+    logger.info("Zapytanie", extra={"fields": {"prompt": truncate(prompt)}})
+"""
+
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+# Domyślne ustawienia (nadpisywane zmiennymi środowiskowymi)
+DEFAULT_LEVEL = "INFO"
+DEFAULT_FORMAT = "text"
+DEFAULT_BODY_SAMPLE_RATE = 0.01
+DEFAULT_BODY_MAX_CHARS = 200
+DEFAULT_QUEUE_SIZE = 10000
+
+_handler = None
+_settings = {
+    "body_sample_rate": DEFAULT_BODY_SAMPLE_RATE,
+    "body_max_chars": DEFAULT_BODY_MAX_CHARS,
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formatuje rekord jako jeden obiekt JSON w linii."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_info:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Format czytelny dla człowieka: komunikat i pola klucz=wartość."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def formatMessage(self, record):
+        text = super().formatMessage(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={json.dumps(value, ensure_ascii=False, default=str)}"
+                                   for key, value in fields.items())
+        return text
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler, który przy pełnej kolejce pomija rekord zamiast blokować.
+
+    Wątek zapisu (QueueListener) jest uruchamiany przy pierwszym rekordzie
+    w danym procesie. Proces potomny utworzony przez fork (np. proces roboczy
+    gunicorn) nie ma wątków rodzica, więc dostaje własną kolejkę i wątek.
+    """
+
+    def __init__(self, output, queue_size=DEFAULT_QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize=queue_size))
+        self.output = output
+        self.queue_size = queue_size
+        self.listener = None
+        self.pid = None
+        self.dropped = 0
+
+    def _ensure_listener(self):
+        # Wywoływane pod blokadą handlera (Handler.handle), odnawianą przez logging po fork
+        pid = os.getpid()
+        if self.pid == pid:
+            return
+        if self.pid is not None:
+            # Rekordy w kopii kolejki rodzica zapisze sam rodzic
+            self.queue = queue.Queue(maxsize=self.queue_size)
+        self.listener = logging.handlers.QueueListener(self.queue, self.output, respect_handler_level=False)
+        self.listener.start()
+        self.pid = pid
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        """Zapisuje rekordy pozostałe w kolejce i zatrzymuje wątek zapisu tego procesu."""
+        self.acquire()
+        try:
+            if self.listener is not None and self.pid == os.getpid():
+                self.listener.stop()
+            self.listener = None
+            self.pid = None
+        finally:
+            self.release()
+
+    def prepare(self, record):
+        # Komunikat jest formatowany w wątku zapytania, a ślad wyjątku
+        # zapisywany osobno (pole exc_info w formacie JSON)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _env(name, default, cast=str):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    try:
+        return cast(value.strip('"\''))
+    except ValueError:
+        return default
+
+
+def setup_logging(name, level=None, log_format=None, body_sample_rate=None, body_max_chars=None,
+                  queue_size=DEFAULT_QUEUE_SIZE, stream=None):
+    """
+    Konfiguruje logowanie przez kolejkę i zwraca logger.
+
+    Parametry pominięte w wywołaniu są odczytywane ze zmiennych środowiskowych
+    LOG_LEVEL, LOG_FORMAT, LOG_BODY_SAMPLE_RATE i LOG_BODY_MAX_CHARS.
+    Kolejne wywołania zastępują poprzednią konfigurację.
+
+    Args:
+        name: Nazwa loggera.
+        level: Poziom logowania (np. "INFO", "DEBUG").
+        log_format: "text" lub "json".
+        body_sample_rate: Część zapytań (0-1), dla których logowana jest treść.
+        body_max_chars: Maksymalna długość logowanej treści.
+        queue_size: Pojemność kolejki rekordów.
+        stream: Strumień wyjściowy (domyślnie sys.stdout).
+
+    Returns:
+        logging.Logger: Skonfigurowany logger.
+    """
+    global _handler
+
+    level = (level or _env("LOG_LEVEL", DEFAULT_LEVEL)).upper()
+    log_format = (log_format or _env("LOG_FORMAT", DEFAULT_FORMAT)).lower()
+    if body_sample_rate is None:
+        body_sample_rate = _env("LOG_BODY_SAMPLE_RATE", DEFAULT_BODY_SAMPLE_RATE, float)
+    if body_max_chars is None:
+        body_max_chars = _env("LOG_BODY_MAX_CHARS", DEFAULT_BODY_MAX_CHARS, int)
+    _settings["body_sample_rate"] = min(1.0, max(0.0, float(body_sample_rate)))
+    _settings["body_max_chars"] = max(0, int(body_max_chars))
+
+    if _handler is not None:
+        _handler.stop()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == "json" else TextFormatter())
+    # Zapis na wyjście odbywa się w wątku w tle, uruchamianym przy pierwszym rekordzie
+    _handler = DroppingQueueHandler(output, queue_size)
+
+    logger = logging.getLogger(name)
+    logger.handlers = [_handler]
+    logger.setLevel(getattr(logging, level, logging.INFO))
+    logger.propagate = False
+    return logger
+
+
+def shutdown_logging():
+    """Zapisuje rekordy pozostałe w kolejce i zatrzymuje wątek w tle."""
+    if _handler is not None:
+        _handler.stop()
+
+
+atexit.register(shutdown_logging)
+
+
+def truncate(text, limit=None):
+    """
+    Skraca tekst do logowania.
+
+    Args:
+        text: Tekst (lub dowolna wartość, zamieniana na tekst).
+        limit: Maksymalna długość (domyślnie LOG_BODY_MAX_CHARS).
+
+    Returns:
+        str: Tekst skrócony do limitu z informacją o pominiętej długości.
+    """
+    if limit is None:
+        limit = _settings["body_max_chars"]
+    text = text if isinstance(text, str) else str(text)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}...(+{len(text) - limit} znaków)"
+
+
+def log_request(logger, request, endpoint):
+    """
+    Loguje metadane zapytania Flask, a treść tylko dla próbki zapytań.
+
+    Treść jest dekodowana wyłącznie wtedy, gdy zostanie zapisana, i tylko
+    w zakresie limitu długości.
+
+    Args:
+        logger: Logger z setup_logging().
+        request: Obiekt flask.request.
+        endpoint: Nazwa endpointu.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    fields = {
+        "endpoint": endpoint,
+        "content_type": request.headers.get("Content-Type"),
+        "content_length": request.content_length,
+    }
+    rate = _settings["body_sample_rate"]
+    if rate > 0 and random.random() < rate:
+        limit = _settings["body_max_chars"]
+        data = request.get_data(cache=True)
+        # Dekodowanie tylko początku treści (z zapasem na znaki wielobajtowe UTF-8)
+        text = data[:limit * 4].decode("utf-8", errors="ignore")
+        fields["body"] = text[:limit]
+        fields["body_truncated"] = len(text) > limit or len(data) > limit * 4
+    logger.debug("Nowe zapytanie", extra={"fields": fields})
@@ -5,10 +5,13 @@ Zaawansowany serwer Flask dla Ollama z obsługą różnych modeli i konfiguracj
 
 import os
 import sys
-import json
 import traceback
 import requests
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, request, jsonify, render_template
+
+from request_log import setup_logging, log_request, truncate
+from cached_page import CachedPage
+from ollama_ndjson import read_generate, generation_stats, NDJSONError
 
 # Sprawdzenie czy potrzebne moduły są zainstalowane
 try:
@@ -37,7 +40,16 @@ else:
             "OLLAMA_URL": "http://localhost:11434",
             "SERVER_PORT": 5001,
             "TEMPERATURE": 0.7,
-            "MAX_TOKENS": 1000
+            "MAX_TOKENS": 1000,
+            "WORKERS": 2,
+            "THREADS": 8,
+            "REQUEST_TIMEOUT": 120,
+            "OLLAMA_TIMEOUT": 60,
+            "GRACEFUL_TIMEOUT": 30,
+            "LOG_LEVEL": "INFO",
+            "LOG_FORMAT": "text",
+            "LOG_BODY_SAMPLE_RATE": 0.01,
+            "LOG_BODY_MAX_CHARS": 200
         }
 
         # Sprawdzenie czy plik .env istnieje
@@ -49,13 +61,14 @@ else:
             for key in config:
                 env_value = os.getenv(key)
                 if env_value is not None:
-                    if key in ["SERVER_PORT", "MAX_TOKENS"]:
+                    if key in ["SERVER_PORT", "MAX_TOKENS", "WORKERS", "THREADS", "REQUEST_TIMEOUT",
+                               "OLLAMA_TIMEOUT", "GRACEFUL_TIMEOUT", "LOG_BODY_MAX_CHARS"]:
                         try:
                             config[key] = int(env_value)
                         except ValueError:
                             print(
                                 f"Ostrzeżenie: {key}={env_value} nie jest liczbą całkowitą. Używanie wartości domyślnej: {config[key]}")
-                    elif key in ["TEMPERATURE"]:
+                    elif key in ["TEMPERATURE", "LOG_BODY_SAMPLE_RATE"]:
                         try:
                             config[key] = float(env_value)
                         except ValueError:
@@ -97,12 +110,31 @@ except Exception as e:
         "MAX_TOKENS": 1000
     }
 
+# Ustawienia serwera produkcyjnego (wsgi.py) i logowania - starsze pliki env_loader.py ich nie zwracają
+for key, value in {"WORKERS": 2, "THREADS": 8, "REQUEST_TIMEOUT": 120, "OLLAMA_TIMEOUT": 60,
+                   "GRACEFUL_TIMEOUT": 30, "LOG_LEVEL": "INFO", "LOG_FORMAT": "text",
+                   "LOG_BODY_SAMPLE_RATE": 0.01, "LOG_BODY_MAX_CHARS": 200}.items():
+    config.setdefault(key, value)
+
 # Konfiguracja z pliku .env
 OLLAMA_URL = config["OLLAMA_URL"]
 MODEL_NAME = config["MODEL_NAME"]
 SERVER_PORT = config["SERVER_PORT"]
 DEFAULT_TEMPERATURE = float(config["TEMPERATURE"])
 DEFAULT_MAX_TOKENS = int(config["MAX_TOKENS"])
+OLLAMA_TIMEOUT = int(config["OLLAMA_TIMEOUT"])
+
+# Czas (s), przez który przeglądarki i proxy mogą używać kopii strony głównej
+HOME_PAGE_MAX_AGE = 60
+
+# Logowanie przez kolejkę (zapis na wyjście w wątku w tle)
+logger = setup_logging(
+    "server",
+    level=config["LOG_LEVEL"],
+    log_format=config["LOG_FORMAT"],
+    body_sample_rate=config["LOG_BODY_SAMPLE_RATE"],
+    body_max_chars=config["LOG_BODY_MAX_CHARS"],
+)
 
 app = Flask(__name__)
 
@@ -153,203 +185,42 @@ def check_ollama_available():
         return False
 
 
-@app.route('/', methods=['GET'])
-def home():
-    """Strona główna z interfejsem użytkownika."""
-    html_template = """
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <title>Serwer Ollama</title>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1">
-        <style>
-            body { 
-                font-family: Arial, sans-serif; 
-                max-width: 800px; 
-                margin: 0 auto; 
-                padding: 20px;
-                line-height: 1.6;
-            }
-            h1, h2 { color: #333; }
-            h1 { border-bottom: 2px solid #eee; padding-bottom: 10px; }
-            .card {
-                background: #f9f9f9;
-                border-radius: 8px;
-                padding: 15px;
-                margin-bottom: 20px;
-                box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            }
-            pre { 
-                background: #f4f4f4; 
-                padding: 10px; 
-                border-radius: 5px; 
-                overflow-x: auto;
-            }
-            .response-area {
-                border: 1px solid #ddd;
-                border-radius: 5px;
-                padding: 15px;
-                min-height: 100px;
-                margin-top: 10px;
-                background: #fff;
-            }
-            .btn {
-                background: #4CAF50;
-                color: white;
-                border: none;
-                padding: 10px 15px;
-                border-radius: 4px;
-                cursor: pointer;
-                font-size: 16px;
-            }
-            .btn:hover { background: #45a049; }
-            textarea, input, select {
-                width: 100%;
-                padding: 8px;
-                margin: 5px 0 15px 0;
-                border: 1px solid #ddd;
-                border-radius: 4px;
-                box-sizing: border-box;
-            }
-            .parameter-row {
-                display: flex;
-                justify-content: space-between;
-                gap: 10px;
-            }
-            .parameter-row > div {
-                flex: 1;
-            }
-            .footer {
-                text-align: center;
-                margin-top: 30px;
-                padding-top: 10px;
-                border-top: 1px solid #eee;
-                font-size: 14px;
-                color: #666;
-            }
-            @media (max-width: 600px) {
-                .parameter-row {
-                    flex-direction: column;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <h1>Serwer Ollama - Interfejs API</h1>
-
-        <div class="card">
-            <h2>Status</h2>
-            <p><strong>Model:</strong> {{ model_name }}</p>
-            <p><strong>URL Ollama:</strong> {{ ollama_url }}</p>
-            <p><strong>Port serwera:</strong> {{ server_port }}</p>
-        </div>
-
-        <div class="card">
-            <h2>Testuj API</h2>
-            <form id="testForm">
-                <div>
-                    <label for="prompt"><strong>Zapytanie:</strong></label>
-                    <textarea id="prompt" name="prompt" rows="4" placeholder="Wpisz swoje zapytanie tutaj..."></textarea>
-                </div>
-
-                <div class="parameter-row">
-                    <div>
-                        <label for="temperature"><strong>Temperatura:</strong></label>
-                        <input type="number" id="temperature" name="temperature" min="0" max="2" step="0.1" value="{{ default_temperature }}">
-                    </div>
-                    <div>
-                        <label for="max_tokens"><strong>Maksymalna długość:</strong></label>
-                        <input type="number" id="max_tokens" name="max_tokens" min="10" max="4096" step="10" value="{{ default_max_tokens }}">
-                    </div>
-                </div>
-
-                <button type="submit" class="btn">Wyślij zapytanie</button>
-            </form>
-
-            <h3>Odpowiedź:</h3>
-            <div id="response" class="response-area">
-                <p><em>Tutaj pojawi się odpowiedź...</em></p>
-            </div>
-        </div>
-
-        <div class="card">
-            <h2>API Endpoints</h2>
-
-            <h3>POST /ask</h3>
-            <p>Zadaj pytanie do modelu Ollama.</p>
-            <pre>curl -X POST -H "Content-Type: application/json" \\
-     -d '{"prompt":"Co to jest Python?"}' \\
-     http://localhost:{{ server_port }}/ask</pre>
-
-            <h3>GET /models</h3>
-            <p>Pobierz listę dostępnych modeli.</p>
-            <pre>curl http://localhost:{{ server_port }}/models</pre>
-
-            <h3>POST /echo</h3>
-            <p>Proste narzędzie do testów - odbija wiadomość.</p>
-            <pre>curl -X POST -H "Content-Type: application/json" \\
-     -d '{"message":"Test"}' \\
-     http://localhost:{{ server_port }}/echo</pre>
-        </div>
-
-        <div class="footer">
-            Serwer Ollama z obsługą modeli LLM | Port: {{ server_port }}
-        </div>
-
-        <script>
-            document.getElementById('testForm').addEventListener('submit', function(e) {
-                e.preventDefault();
-
-                const prompt = document.getElementById('prompt').value;
-                const temperature = document.getElementById('temperature').value;
-                const max_tokens = document.getElementById('max_tokens').value;
-
-                if (!prompt) {
-                    alert('Proszę wpisać zapytanie');
-                    return;
-                }
-
-                const responseArea = document.getElementById('response');
-                responseArea.innerHTML = '<p><em>Ładowanie odpowiedzi...</em></p>';
-
-                fetch('/ask', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify({
-                        prompt: prompt,
-                        temperature: parseFloat(temperature),
-                        max_tokens: parseInt(max_tokens)
-                    })
-                })
-                .then(response => response.json())
-                .then(data => {
-                    if (data.error) {
-                        responseArea.innerHTML = `<p style="color: red"><strong>Błąd:</strong> ${data.error}</p>`;
-                    } else {
-                        responseArea.innerHTML = `<p>${data.response.replace(/\\n/g, '<br>')}</p>`;
-                    }
-                })
-                .catch(error => {
-                    responseArea.innerHTML = `<p style="color: red"><strong>Błąd:</strong> ${error}</p>`;
-                });
-            });
-        </script>
-    </body>
-    </html>
-    """
-    return render_template_string(
-        html_template,
+home_page = CachedPage(
+    lambda: render_template(
+        "home.html",
         model_name=MODEL_NAME,
         ollama_url=OLLAMA_URL,
         server_port=SERVER_PORT,
         default_temperature=DEFAULT_TEMPERATURE,
         default_max_tokens=DEFAULT_MAX_TOKENS
+    ),
+    max_age=HOME_PAGE_MAX_AGE
+)
+
+
+@app.route('/', methods=['GET'])
+def home():
+    """Strona główna z interfejsem użytkownika (renderowana raz dla danej konfiguracji)."""
+    return home_page.response(
+        request,
+        key=(MODEL_NAME, OLLAMA_URL, SERVER_PORT, DEFAULT_TEMPERATURE, DEFAULT_MAX_TOKENS)
     )
 
 
+def build_options(temperature, max_tokens):
+    """
+    Zwraca parametry generowania w schemacie "options" Ollama.
+
+    Args:
+        temperature: Temperatura generowania
+        max_tokens: Maksymalna liczba tokenów w odpowiedzi
+
+    Returns:
+        dict: Parametry dla pola "options" zapytania /api/generate
+    """
+    return {"temperature": temperature, "num_predict": max_tokens}
+
+
 def call_ollama_api(prompt, temperature=None, max_tokens=None):
     """
     Bezpieczne wywołanie API Ollama z obsługą błędów.
@@ -360,7 +231,7 @@ def call_ollama_api(prompt, temperature=None, max_tokens=None):
         max_tokens: Maksymalna liczba tokenów w odpowiedzi (opcjonalnie)
 
     Returns:
-        str: Odpowiedź od modelu lub komunikat o błędzie
+        tuple: (odpowiedź od modelu, komunikat o błędzie, statystyki czasu generowania)
     """
     try:
         # Użycie domyślnych wartości, jeśli nie podano
@@ -373,124 +244,77 @@ def call_ollama_api(prompt, temperature=None, max_tokens=None):
         try:
             temperature = float(temperature)
         except (ValueError, TypeError):
-            print(f"⚠️ Nieprawidłowa wartość temperature: {temperature}, używam domyślnej: {DEFAULT_TEMPERATURE}")
+            logger.warning(f"Nieprawidłowa wartość temperature: {truncate(temperature, 50)}, używam domyślnej: {DEFAULT_TEMPERATURE}")
             temperature = DEFAULT_TEMPERATURE
 
         try:
             max_tokens = int(max_tokens)
         except (ValueError, TypeError):
-            print(f"⚠️ Nieprawidłowa wartość max_tokens: {max_tokens}, używam domyślnej: {DEFAULT_MAX_TOKENS}")
+            logger.warning(f"Nieprawidłowa wartość max_tokens: {truncate(max_tokens, 50)}, używam domyślnej: {DEFAULT_MAX_TOKENS}")
             max_tokens = DEFAULT_MAX_TOKENS
 
-        # Użycie stream=False, aby uniknąć problemów z parsowaniem JSON
+        # Użycie stream=False, aby uniknąć problemów z parsowaniem JSON;
+        # parametry generowania Ollama przyjmuje tylko w "options" (limit długości to num_predict)
         payload = {
             "model": MODEL_NAME,
             "prompt": prompt,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
+            "options": build_options(temperature, max_tokens),
             "stream": False
         }
 
-        print(f"📤 Wysyłanie zapytania do Ollama: {json.dumps(payload)[:200]}...")
+        logger.debug("Wysyłanie zapytania do Ollama", extra={"fields": {
+            "model": MODEL_NAME, "prompt_chars": len(prompt), "options": payload["options"]}})
 
-        response = requests.post(
+        # Odpowiedź jest czytana strumieniowo i dekodowana jeden raz (pojedynczy
+        # obiekt JSON lub NDJSON - oba formaty obsługuje ten sam dekoder)
+        with requests.post(
             f"{OLLAMA_URL}/api/generate",
             json=payload,
-            timeout=60
-        )
-
-        # Sprawdzenie statusu odpowiedzi
-        if response.status_code != 200:
-            error_msg = f"Błąd Ollama: Kod {response.status_code}"
-            print(f"⚠️ {error_msg}")
-            return None, error_msg
-
-        # Próba parsowania odpowiedzi jako JSON
-        try:
-            # Wydobycie tekstu odpowiedzi
-            response_text = response.text.strip()
+            timeout=OLLAMA_TIMEOUT,
+            stream=True
+        ) as response:
+            # Sprawdzenie statusu odpowiedzi
+            if response.status_code != 200:
+                error_msg = f"Błąd Ollama: Kod {response.status_code}"
+                logger.warning(error_msg)
+                return None, error_msg, None
 
-            # Próba parsowania jako pojedynczy JSON
             try:
-                result = json.loads(response_text)
-                ollama_response = result.get("response", "")
-                print(f"📥 Odpowiedź Ollama (długość: {len(ollama_response)} znaków)")
-                return ollama_response, None
-            except json.JSONDecodeError:
-                # Jeśli to nie jest pojedynczy JSON, próbujemy parsować linia po linii
-                print(f"⚠️ Odpowiedź nie jest pojedynczym obiektem JSON. Próbuję parsować linia po linii...")
-
-                lines = response_text.split("\n")
-                if len(lines) > 0:
-                    try:
-                        # Próba parsowania pierwszej linii
-                        first_line_result = json.loads(lines[0])
-                        ollama_response = first_line_result.get("response", "")
-                        print(f"📥 Odpowiedź z pierwszej linii (długość: {len(ollama_response)} znaków)")
-                        return ollama_response, None
-                    except json.JSONDecodeError:
-                        # Jeśli nadal się nie udaje, próbujemy alternatywnego podejścia
-                        pass
-
-                # Ręczne parsowanie dla strumieniowej odpowiedzi
-                text_content = ""
-                for line in lines:
-                    if not line.strip():
-                        continue
-                    try:
-                        chunk = json.loads(line)
-                        if "response" in chunk:
-                            text_content += chunk["response"]
-                    except json.JSONDecodeError:
-                        continue
-
-                if text_content:
-                    print(f"📥 Odpowiedź wyodrębniona ręcznie (długość: {len(text_content)} znaków)")
-                    return text_content, None
-
-                # Jeśli wszystko zawiedzie, zwracamy surowy tekst odpowiedzi
-                print(f"⚠️ Nie udało się sparsować odpowiedzi jako JSON. Zwracam surowy tekst.")
-                return response_text, None
-        except Exception as e:
-            error_msg = f"Błąd przetwarzania odpowiedzi: {str(e)}"
-            print(f"⚠️ {error_msg}")
-            return None, error_msg
+                ollama_response, summary = read_generate(response)
+            except NDJSONError as e:
+                error_msg = f"Błąd parsowania odpowiedzi Ollama: {str(e)}"
+                logger.warning(error_msg)
+                return None, error_msg, None
+
+        timing = generation_stats(summary) if summary else None
+        logger.info("Odpowiedź Ollama", extra={"fields": {"chars": len(ollama_response), **(timing or {})}})
+        return ollama_response, None, timing
     except requests.exceptions.Timeout:
         error_msg = "Timeout podczas oczekiwania na odpowiedź z Ollama"
-        print(f"⚠️ {error_msg}")
-        return None, error_msg
+        logger.warning(error_msg)
+        return None, error_msg, None
     except Exception as e:
         error_msg = f"Nieoczekiwany błąd: {str(e)}"
-        print(f"⚠️ {error_msg}")
-        traceback.print_exc()
-        return None, error_msg
+        logger.exception(error_msg)
+        return None, error_msg, None
 
 
 @app.route('/ask', methods=['POST'])
 def ask():
     """Zadaj pytanie do modelu Ollama."""
-    # Debugowanie żądania
-    print(f"\n===== NOWE ZAPYTANIE =====")
-    print(f"Content-Type: {request.headers.get('Content-Type', 'brak')}")
-    print(f"Długość danych: {request.content_length} bajtów")
+    # Metadane żądania (treść tylko dla próbki zapytań, skrócona)
+    log_request(logger, request, "ask")
 
     # Zabezpieczenie przed brakiem danych
     if not request.data:
         error_msg = "Brak danych w żądaniu"
-        print(f"⚠️ Błąd: {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
-    try:
-        # Próba zdekodowania danych jako tekst
-        raw_data = request.data.decode('utf-8', errors='replace')
-        print(f"Surowe dane: {raw_data}")
-    except Exception as e:
-        print(f"⚠️ Błąd podczas dekodowania danych: {str(e)}")
-
     # Sprawdzenie Content-Type
     if not request.is_json:
         error_msg = "Oczekiwano danych JSON. Użyj nagłówka 'Content-Type: application/json'"
-        print(f"⚠️ Błąd: {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     # Obsługa błędów parsowania JSON
@@ -498,40 +322,39 @@ def ask():
         data = request.get_json(force=False)
     except Exception as e:
         error_msg = f"Błąd parsowania JSON: {str(e)}"
-        print(f"⚠️ {error_msg}")
-        print(f"Stacktrace: {traceback.format_exc()}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     # Sprawdzenie czy dane są słownikiem
     if data is None:
         error_msg = "Brak danych JSON w żądaniu"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     # Sprawdzenie struktury JSON
     if not isinstance(data, dict):
         error_msg = f"Oczekiwano obiektu JSON, otrzymano: {type(data).__name__}"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     if 'prompt' not in data:
         error_msg = "Brak parametru 'prompt' w danych JSON"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     prompt = data['prompt']
     temperature = data.get('temperature', DEFAULT_TEMPERATURE)
     max_tokens = data.get('max_tokens', DEFAULT_MAX_TOKENS)
 
-    print(f"📤 Zapytanie: {prompt[:50]}...")
+    logger.info("Zapytanie", extra={"fields": {"prompt": truncate(prompt, 50)}})
 
     # Wywołanie API Ollama
-    response, error = call_ollama_api(prompt, temperature, max_tokens)
+    response, error, timing = call_ollama_api(prompt, temperature, max_tokens)
 
     if error:
         return jsonify({"error": error}), 500
     elif response:
-        return jsonify({"response": response})
+        return jsonify({"response": response, "timing": timing})
     else:
         return jsonify({"error": "Pusta odpowiedź od serwera Ollama"}), 500
 
@@ -562,53 +385,45 @@ def get_models():
 @app.route('/echo', methods=['POST'])
 def echo():
     """Proste narzędzie do testowania działania serwera."""
-    # Debugowanie żądania
-    print(f"\n===== NOWE ZAPYTANIE ECHO =====")
-    print(f"Content-Type: {request.headers.get('Content-Type', 'brak')}")
+    # Metadane żądania (treść tylko dla próbki zapytań, skrócona)
+    log_request(logger, request, "echo")
 
     # Zabezpieczenie przed brakiem danych
     if not request.data:
         error_msg = "Brak danych w żądaniu"
-        print(f"⚠️ Błąd: {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
-    try:
-        # Próba zdekodowania danych jako tekst
-        raw_data = request.data.decode('utf-8', errors='replace')
-        print(f"Surowe dane: {raw_data}")
-    except Exception as e:
-        print(f"⚠️ Błąd podczas dekodowania danych: {str(e)}")
-
     if not request.is_json:
         error_msg = "Oczekiwano danych JSON. Użyj nagłówka 'Content-Type: application/json'"
-        print(f"⚠️ Błąd: {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     try:
         data = request.get_json(force=False)
     except Exception as e:
         error_msg = f"Błąd parsowania JSON: {str(e)}"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     # Sprawdzenie czy dane są słownikiem
     if data is None:
         error_msg = "Brak danych JSON w żądaniu"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     if not isinstance(data, dict):
         error_msg = f"Oczekiwano obiektu JSON, otrzymano: {type(data).__name__}"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     if 'message' not in data:
         error_msg = "Brak parametru 'message' w danych JSON"
-        print(f"⚠️ {error_msg}")
+        logger.warning(error_msg)
         return jsonify({"error": error_msg}), 400
 
     message = data['message']
-    print(f"📤 Echo: {message}")
+    logger.info("Echo", extra={"fields": {"message": truncate(message)}})
 
     return jsonify({"response": f"Otrzymano: {message}"})
 
@@ -4,9 +4,18 @@ Moduł API dla serwera Ollama.
 Definiuje endpoints REST API do interakcji z modelami Ollama.
 """
 
+import os
+import re
+import json
 import logging
-from flask import Blueprint, request, jsonify, current_app
-from .models import OllamaClient, get_model_info
+import requests
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from .models import get_model_info
+from .batch import BatchCheckpoint, parse_prompts, parse_jsonl, run_batch
+from .balancer import OllamaPool
+from .scheduler import PRIORITIES, SchedulerRejected
+from .budget import STRATEGIES, PromptTooLong
+from .options import GenerationOptions, generation_stats
 
 # Konfiguracja logowania
 logger = logging.getLogger("ollama_server.api")
@@ -14,6 +23,84 @@ logger = logging.getLogger("ollama_server.api")
 # Blueprint dla API
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 
+# Dozwolone identyfikatory zadań wsadowych (nazwa pliku punktu kontrolnego)
+BATCH_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Górny limit równoległości zadania wsadowego
+MAX_BATCH_PARALLELISM = 64
+
+# Maksymalna liczba tekstów w jednym zapytaniu /api/embed
+MAX_EMBED_INPUTS = 2048
+
+
+def get_client():
+    """Zwraca współdzielonego klienta Ollama aplikacji (OllamaClient lub OllamaPool)."""
+    return current_app.extensions["ollama_client"]
+
+
+def get_models():
+    """Zwraca menedżera stanu modeli aplikacji."""
+    return current_app.extensions["ollama_models"]
+
+
+def get_pulls():
+    """Zwraca menedżera zadań pobierania modeli aplikacji."""
+    return current_app.extensions["ollama_pulls"]
+
+
+def get_sessions():
+    """Zwraca magazyn sesji rozmów aplikacji."""
+    return current_app.extensions["ollama_sessions"]
+
+
+def get_budget():
+    """Zwraca budżet tokenów promptów aplikacji."""
+    return current_app.extensions["ollama_budget"]
+
+
+def get_embedder():
+    """Zwraca obiekt liczący embeddingi aplikacji."""
+    return current_app.extensions["ollama_embedder"]
+
+
+def get_scheduler():
+    """Zwraca współdzieloną kolejkę generacji aplikacji."""
+    return current_app.extensions["ollama_scheduler"]
+
+
+def get_supervisor():
+    """Zwraca nadzorcę Ollama aplikacji."""
+    return current_app.extensions["ollama_supervisor"]
+
+
+def get_config_store():
+    """Zwraca magazyn konfiguracji aplikacji."""
+    return current_app.extensions["ollama_config"]
+
+
+def generation_options(data) -> GenerationOptions:
+    """
+    Zwraca parametry generowania zapytania uzupełnione ustawieniami serwera.
+
+    Raises:
+        ValueError: Nieprawidłowa wartość parametru.
+    """
+    defaults = GenerationOptions(
+        temperature=current_app.config["TEMPERATURE"],
+        max_tokens=current_app.config["MAX_TOKENS"],
+        num_ctx=current_app.config["CONTEXT_WINDOW"] or None,
+        num_thread=current_app.config.get("NUM_THREAD") or None
+    )
+    return GenerationOptions.from_dict(data, defaults)
+
+
+def rejected_response(error: SchedulerRejected):
+    """Odpowiedź dla zapytania odrzuconego przez kolejkę (429/503 z nagłówkiem Retry-After)."""
+    response = jsonify({"error": str(error), "retry_after": error.retry_after})
+    response.status_code = error.status
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
 
 @api_bp.route("/models", methods=["GET"])
 def list_models():
@@ -21,15 +108,21 @@ def list_models():
     Endpoint do listowania dostępnych modeli.
 
     Returns:
-        JSON z listą dostępnych modeli.
+        JSON z listą dostępnych modeli, ich stanem załadowania (load_state:
+        unloaded, loading, loaded, error) i ostatnim czasem ładowania (load_seconds).
     """
-    client = OllamaClient(current_app.config["OLLAMA_URL"])
+    client = get_client()
     models = client.list_models()
+    manager = get_models()
+    manager.refresh()
 
     # Dodaj informację o aktualnie używanym modelu
     current_model = current_app.config["MODEL_NAME"]
     for model in models:
         model["current"] = model["name"] == current_model
+        status = manager.status(model["name"])
+        model["load_state"] = status["state"]
+        model["load_seconds"] = status["load_seconds"]
 
     return jsonify({"models": models})
 
@@ -44,37 +137,303 @@ def ask():
         - prompt: Zapytanie do modelu
         - temperature (opcjonalnie): Temperatura generowania (0.0-1.0)
         - max_tokens (opcjonalnie): Maksymalna liczba tokenów w odpowiedzi
+        - options (opcjonalnie): Pozostałe parametry (top_p, top_k, repeat_penalty, seed, num_ctx, num_thread, stop)
+        - priority (opcjonalnie): interactive (domyślnie) lub batch; także nagłówek X-Priority
+        - strategy (opcjonalnie): Postępowanie z promptem przekraczającym okno kontekstu
+          (reject, truncate_head, truncate_middle, summarize; domyślnie PROMPT_STRATEGY)
 
     Returns:
-        JSON z odpowiedzią modelu.
+        JSON z odpowiedzią modelu, liczbą tokenów promptu i statystykami generowania
+        (timing), 413 dla zbyt długiego promptu (strategia reject), 502 przy błędzie
+        Ollama lub 429/503 z nagłówkiem Retry-After przy przeciążeniu.
     """
     data = request.json
     if not data or "prompt" not in data:
         return jsonify({"error": "Brak wymaganego pola 'prompt'"}), 400
 
     prompt = data["prompt"]
-    temperature = data.get("temperature", current_app.config["TEMPERATURE"])
-    max_tokens = data.get("max_tokens", current_app.config["MAX_TOKENS"])
-
-    client = OllamaClient(current_app.config["OLLAMA_URL"])
+    try:
+        options = generation_options(data)
+    except ValueError as e:
+        return jsonify({"error": f"Nieprawidłowe parametry generowania: {str(e)}"}), 400
+    priority = data.get("priority") or request.headers.get("X-Priority", "interactive")
+    if priority not in PRIORITIES:
+        return jsonify({"error": f"Nieznany priorytet '{priority}'. Dostępne: {', '.join(PRIORITIES)}"}), 400
+    strategy = data.get("strategy")
+    if strategy is not None and strategy not in STRATEGIES:
+        return jsonify({"error": f"Nieznana strategia '{strategy}'. Dostępne: {', '.join(STRATEGIES)}"}), 400
+
+    client = get_client()
     model_name = current_app.config["MODEL_NAME"]
 
     logger.info(f"Zapytanie do modelu {model_name}: {prompt[:50]}...")
 
-    if not client.check_availability():
+    if not get_supervisor().available():
         return jsonify({"error": "Serwer Ollama jest niedostępny"}), 503
 
-    if not client.check_model_availability(model_name.split(":")[0]):
+    if not get_models().is_available(model_name):
         return jsonify({"error": f"Model {model_name} nie jest dostępny"}), 404
 
-    response = client.generate(
+    try:
+        with get_scheduler().slot(model_name, priority):
+            # Prompt jest dopasowywany przed wysłaniem, aby Ollama nie przetwarzała nadmiarowych tokenów
+            prompt, tokens = get_budget().apply(model_name, prompt, options.max_tokens, strategy, options.num_ctx)
+            result = client.generate_result(model_name=model_name, prompt=prompt, options=options)
+    except SchedulerRejected as e:
+        return rejected_response(e)
+    except PromptTooLong as e:
+        return jsonify({"error": str(e), "tokens": e.tokens}), 413
+    except (requests.RequestException, ValueError) as e:
+        logger.error(f"Błąd generowania odpowiedzi: {str(e)}")
+        if isinstance(e, requests.HTTPError) and e.response is not None and e.response.status_code == 404:
+            # Model usunięty z Ollama - następne zapytanie sprawdzi dostępność od nowa
+            get_models().invalidate_availability(model_name)
+        return jsonify({"error": f"Błąd: {str(e)}"}), 502
+
+    return jsonify({"response": result.get("response", ""), "tokens": tokens, "timing": generation_stats(result)})
+
+
+@api_bp.route("/chat", methods=["POST"])
+def chat():
+    """
+    Endpoint rozmowy ze stanem przechowywanym po stronie serwera.
+
+    Kolejne wiadomości sesji przekazują do Ollama tokeny kontekstu z poprzedniej
+    odpowiedzi, więc klient wysyła tylko nową wiadomość.
+
+    Expects:
+        JSON z kluczami:
+        - message: Nowa wiadomość
+        - session_id (opcjonalnie): Identyfikator sesji; brak - nowa sesja
+        - temperature, max_tokens, options, priority (opcjonalnie): Jak w /api/ask
+
+    Returns:
+        JSON z odpowiedzią, identyfikatorem sesji i statystykami ponownego użycia
+        kontekstu (saved_prompt_eval_seconds), 404 dla nieznanej lub wygasłej sesji.
+    """
+    data = request.json
+    if not data or "message" not in data:
+        return jsonify({"error": "Brak wymaganego pola 'message'"}), 400
+
+    message = data["message"]
+    try:
+        options = generation_options(data)
+    except ValueError as e:
+        return jsonify({"error": f"Nieprawidłowe parametry generowania: {str(e)}"}), 400
+    priority = data.get("priority") or request.headers.get("X-Priority", "interactive")
+    if priority not in PRIORITIES:
+        return jsonify({"error": f"Nieznany priorytet '{priority}'. Dostępne: {', '.join(PRIORITIES)}"}), 400
+
+    model_name = current_app.config["MODEL_NAME"]
+    sessions = get_sessions()
+    session_id = data.get("session_id")
+    if session_id:
+        session = sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": f"Sesja {session_id} nie istnieje lub wygasła"}), 404
+    else:
+        session = sessions.create(model_name)
+
+    with session.lock:
+        context_reset = session.model != model_name
+        if context_reset:
+            logger.info(f"Sesja {session.id}: zmiana modelu na {model_name}, kontekst wyczyszczony")
+            session.reset_context(model_name)
+
+        try:
+            with get_scheduler().slot(model_name, priority):
+                result = get_client().generate_result(
+                    model_name=model_name,
+                    prompt=message,
+                    options=options,
+                    context=session.context
+                )
+        except SchedulerRejected as e:
+            return rejected_response(e)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Sesja {session.id}: błąd generowania: {str(e)}")
+            return jsonify({"error": f"Błąd podczas generowania odpowiedzi: {str(e)}", "session_id": session.id}), 502
+
+        stats = session.record(message, result)
+
+    return jsonify({
+        "session_id": session.id,
+        "response": result.get("response", ""),
+        "model": model_name,
+        "context_reset": context_reset,
+        "stats": stats,
+        "timing": generation_stats(result),
+    })
+
+
+@api_bp.route("/chat/<session_id>", methods=["GET", "DELETE"])
+def chat_session(session_id):
+    """
+    Endpoint stanu sesji rozmowy; DELETE usuwa sesję.
+
+    Args:
+        session_id: Identyfikator sesji.
+
+    Returns:
+        JSON z historią i statystykami sesji (GET) lub potwierdzeniem usunięcia (DELETE).
+    """
+    sessions = get_sessions()
+    if request.method == "DELETE":
+        if not sessions.delete(session_id):
+            return jsonify({"error": f"Sesja {session_id} nie istnieje lub wygasła"}), 404
+        return jsonify({"success": True})
+
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": f"Sesja {session_id} nie istnieje lub wygasła"}), 404
+    with session.lock:
+        return jsonify(session.to_dict())
+
+
+@api_bp.route("/embed", methods=["POST"])
+def embed():
+    """
+    Endpoint embeddingów.
+
+    Expects:
+        JSON z kluczami:
+        - input: Tekst lub lista tekstów
+        - model (opcjonalnie): Model embeddingów (domyślnie EMBED_MODEL)
+        - priority (opcjonalnie): interactive (domyślnie) lub batch; także nagłówek X-Priority
+
+    Returns:
+        JSON z wektorami w kolejności tekstów, liczbą wymiarów i licznikami
+        (unique, cached, computed, batches).
+    """
+    data = request.json
+    if not data or "input" not in data:
+        return jsonify({"error": "Brak wymaganego pola 'input'"}), 400
+
+    texts = [data["input"]] if isinstance(data["input"], str) else data["input"]
+    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+        return jsonify({"error": "Pole 'input' musi być tekstem lub listą tekstów"}), 400
+    if len(texts) > MAX_EMBED_INPUTS:
+        return jsonify({"error": f"Maksymalna liczba tekstów w zapytaniu to {MAX_EMBED_INPUTS}"}), 413
+    priority = data.get("priority") or request.headers.get("X-Priority", "interactive")
+    if priority not in PRIORITIES:
+        return jsonify({"error": f"Nieznany priorytet '{priority}'. Dostępne: {', '.join(PRIORITIES)}"}), 400
+
+    model_name = data.get("model") or current_app.config["EMBED_MODEL"]
+    try:
+        with get_scheduler().slot(model_name, priority):
+            vectors, stats = get_embedder().embed(model_name, texts)
+    except SchedulerRejected as e:
+        return rejected_response(e)
+    except (requests.RequestException, ValueError, KeyError) as e:
+        logger.error(f"Błąd podczas liczenia embeddingów: {str(e)}")
+        return jsonify({"error": f"Błąd podczas liczenia embeddingów: {str(e)}"}), 502
+
+    return jsonify({
+        "model": model_name,
+        "embeddings": vectors,
+        "dimensions": len(vectors[0]) if vectors else 0,
+        **stats,
+    })
+
+
+@api_bp.route("/backends", methods=["GET"])
+def backends():
+    """
+    Endpoint ze statystykami serwerów Ollama.
+
+    Returns:
+        JSON z listą serwerów, ich stanem, liczbą trwających zapytań i czasami odpowiedzi.
+    """
+    client = get_client()
+    if isinstance(client, OllamaPool):
+        return jsonify({"backends": client.stats()})
+    return jsonify({"backends": [{"url": client.base_url}]})
+
+
+@api_bp.route("/batch", methods=["POST"])
+def batch():
+    """
+    Endpoint do wsadowego przetwarzania promptów.
+
+    Expects:
+        JSON z kluczem "prompts" (lista tekstów lub obiektów z polem "prompt")
+        albo treść JSONL (jedna pozycja na linię). Opcje w JSON lub parametrach URL:
+        - model, temperature, max_tokens, options (opcjonalnie): Domyślne parametry generowania
+        - parallelism (opcjonalnie): Liczba równoczesnych zapytań (domyślnie MAX_CONCURRENCY)
+        - batch_id (opcjonalnie): Identyfikator zadania; wyniki są zapisywane w BATCH_DIR,
+          a ponowne wysłanie tego samego zadania pomija już ukończone pozycje
+
+    Returns:
+        Strumień JSONL z wynikami w kolejności ukończenia (klucz "index" wskazuje
+        pozycję wejściową, "timing" statystyki generowania), zakończony linią
+        {"summary": ...} z przepustowością.
+    """
+    if request.is_json:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("prompts"), list):
+            return jsonify({"error": "Brak wymaganego pola 'prompts' (lista)"}), 400
+        options = data
+    else:
+        data = None
+        options = request.args
+
+    try:
+        if data is not None:
+            items = parse_prompts(data["prompts"])
+        else:
+            items = parse_jsonl(request.get_data(as_text=True).splitlines())
+        defaults = generation_options(options)
+        parallelism = int(options.get("parallelism", current_app.config["MAX_CONCURRENCY"]))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not items:
+        return jsonify({"error": "Brak promptów do przetworzenia"}), 400
+
+    checkpoint = None
+    batch_id = options.get("batch_id")
+    if batch_id:
+        if not BATCH_ID_PATTERN.match(str(batch_id)):
+            return jsonify({"error": "Nieprawidłowy batch_id (dozwolone: litery, cyfry, '_' i '-')"}), 400
+        os.makedirs(current_app.config["BATCH_DIR"], exist_ok=True)
+        checkpoint = BatchCheckpoint(os.path.join(current_app.config["BATCH_DIR"], f"{batch_id}.jsonl"))
+
+    model_name = options.get("model", current_app.config["MODEL_NAME"])
+    scheduler = get_scheduler()
+    logger.info(f"Zadanie wsadowe {batch_id or '-'}: {len(items)} promptów, model {model_name}")
+
+    results = run_batch(
+        get_client(),
+        items,
         model_name=model_name,
-        prompt=prompt,
-        temperature=temperature,
-        max_tokens=max_tokens
+        options=defaults,
+        parallelism=min(parallelism, MAX_BATCH_PARALLELISM),
+        checkpoint=checkpoint,
+        # Pozycje czekają na miejsce w kolejce batch zamiast kończyć się błędem pełnej kolejki
+        slot=lambda model: scheduler.slot(model, "batch", wait_for_room=True)
     )
+    lines = (json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+    return Response(stream_with_context(lines), mimetype="application/x-ndjson")
 
-    return jsonify({"response": response})
+
+@api_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Endpoint z metrykami serwera.
+
+    Returns:
+        JSON z metrykami kolejki generacji (zapytania aktywne i oczekujące,
+        czasy oczekiwania, odrzucenia) dla każdego modelu, sesji rozmów,
+        pamięci podręcznej embeddingów, konfiguracji i nadzoru Ollama.
+    """
+    cache = get_embedder().cache
+    return jsonify({
+        "scheduler": get_scheduler().metrics(),
+        "sessions": get_sessions().metrics(),
+        "embeddings": cache.stats() if cache else None,
+        "config": get_config_store().stats(),
+        "ollama": get_supervisor().stats(),
+    })
 
 
 @api_bp.route("/echo", methods=["POST"])
@@ -117,35 +476,98 @@ def switch_model():
     Endpoint do przełączania używanego modelu.
 
     Expects:
-        JSON z kluczem 'model_name'
+        JSON z kluczem 'model_name' i opcjonalnie 'pull_if_missing'
 
     Returns:
-        JSON z informacją o sukcesie lub błędzie.
+        JSON z informacją o sukcesie lub błędzie. Jeśli model trzeba pobrać,
+        zwraca 202 z zadaniem pobierania; przełączenie nastąpi po jego zakończeniu.
     """
     data = request.json
     if not data or "model_name" not in data:
         return jsonify({"error": "Brak wymaganego pola 'model_name'"}), 400
 
     model_name = data["model_name"]
-    client = OllamaClient(current_app.config["OLLAMA_URL"])
 
     # Sprawdź dostępność modelu
-    if not client.check_model_availability(model_name.split(":")[0]):
+    if not get_models().is_available(model_name):
         pull_model = data.get("pull_if_missing", False)
 
         if pull_model:
-            logger.info(f"Model {model_name} nie jest dostępny, próba pobrania...")
-            if not client.pull_model(model_name):
-                return jsonify({"error": f"Nie można pobrać modelu {model_name}"}), 500
+            logger.info(f"Model {model_name} nie jest dostępny, pobieranie w tle...")
+            app = current_app._get_current_object()
+            job, _ = get_pulls().start(model_name, on_complete=lambda name: activate_model(app, name))
+            return jsonify({"success": True, "model": model_name, "pending": True, "pull": get_pulls().get(job.id)}), 202
         else:
             return jsonify({"error": f"Model {model_name} nie jest dostępny"}), 404
 
-    # Aktualizuj konfigurację
+    activate_model(current_app, model_name)
+
+    # Załaduj nowy model w tle, aby pierwsze zapytanie nie czekało na załadowanie
+    warming_up = get_models().warm_up(model_name)
+
+    return jsonify({"success": True, "model": model_name, "warming_up": warming_up})
+
+
+def activate_model(app, model_name: str) -> None:
+    """
+    Ustawia model jako używany w konfiguracji aplikacji.
+
+    Zmiana działa od razu (w pamięci), a zapis w pliku .env odbywa się
+    w tle, po krótkiej zwłoce.
+
+    Args:
+        app: Aplikacja Flask.
+        model_name: Nazwa modelu.
+    """
     logger.info(f"Przełączanie na model: {model_name}")
-    current_app.config["MODEL_NAME"] = model_name
+    app.config["MODEL_NAME"] = model_name
+    app.extensions["ollama_config"].update(MODEL_NAME=model_name)
 
-    # Aktualizuj zmienną w pamięci
-    from . import config
-    config.update_env_var("MODEL_NAME", model_name)
 
-    return jsonify({"success": True, "model": model_name})
\ No newline at end of file
+@api_bp.route("/pull", methods=["POST"])
+def pull():
+    """
+    Endpoint do pobierania modelu w tle.
+
+    Expects:
+        JSON z kluczem 'model_name'
+
+    Returns:
+        202 z zadaniem pobierania (jeśli model jest już pobierany - z istniejącym zadaniem).
+    """
+    data = request.json
+    if not data or "model_name" not in data:
+        return jsonify({"error": "Brak wymaganego pola 'model_name'"}), 400
+
+    job, created = get_pulls().start(data["model_name"])
+    return jsonify({"created": created, "pull": get_pulls().get(job.id)}), 202
+
+
+@api_bp.route("/pulls", methods=["GET"])
+def list_pulls():
+    """
+    Endpoint z listą zadań pobierania.
+
+    Returns:
+        JSON z zadaniami (od najnowszego).
+    """
+    return jsonify({"pulls": get_pulls().list()})
+
+
+@api_bp.route("/pull/<job_id>", methods=["GET", "DELETE"])
+def pull_status(job_id):
+    """
+    Endpoint stanu zadania pobierania; DELETE anuluje zadanie.
+
+    Args:
+        job_id: Identyfikator zadania.
+
+    Returns:
+        JSON ze stanem zadania: status, bajty pobrane/całkowite (także dla każdej
+        warstwy), prędkość i szacowany czas do końca (eta_seconds).
+    """
+    pulls = get_pulls()
+    job = pulls.cancel(job_id) if request.method == "DELETE" else pulls.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Nie znaleziono zadania {job_id}"}), 404
+    return jsonify({"pull": job})
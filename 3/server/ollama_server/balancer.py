@@ -0,0 +1,400 @@
+"""
+Moduł równoważenia obciążenia między wieloma serwerami Ollama.
+
+Udostępnia pulę klientów, która kieruje zapytania do serwera z najmniejszą
+liczbą trwających zapytań, preferuje serwery z już załadowanym modelem
+(na podstawie /api/ps) i czasowo wyłącza niedziałające serwery.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Any, Union
+
+import requests
+
+from .models import OllamaClient, add_model_info
+
+# Konfiguracja logowania
+logger = logging.getLogger("ollama_server.balancer")
+
+# Liczba ostatnich pomiarów czasu odpowiedzi używanych do percentyli
+LATENCY_WINDOW = 200
+
+
+def normalize_model_name(model_name: str) -> str:
+    """Dodaje domyślny tag ':latest' do nazwy modelu bez tagu."""
+    return model_name if ":" in model_name else f"{model_name}:latest"
+
+
+def parse_backends(value: Union[str, List[str]]) -> List[str]:
+    """
+    Zamienia wartość OLLAMA_URL na listę adresów serwerów.
+
+    Args:
+        value: Adres lub adresy oddzielone przecinkami (albo lista adresów).
+
+    Returns:
+        Lista adresów bez powtórzeń i końcowych ukośników.
+    """
+    urls = value.split(",") if isinstance(value, str) else value
+    backends = []
+    for url in urls:
+        url = url.strip().rstrip("/")
+        if url and url not in backends:
+            backends.append(url)
+    return backends
+
+
+class Backend:
+    """Stan pojedynczego serwera Ollama w puli."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.client = OllamaClient(url)
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.latency_ewma = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.loaded_models = set()
+
+    def is_available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def has_model(self, model_name: str) -> bool:
+        return normalize_model_name(model_name) in self.loaded_models
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "url": self.url,
+            "healthy": self.is_available(now),
+            "ejected_for": round(max(0.0, self.ejected_until - now), 1),
+            "consecutive_failures": self.failures,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "latency_ms": {
+                "avg": round(self.latency_ewma * 1000, 1) if self.requests else None,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+            },
+            "loaded_models": sorted(self.loaded_models),
+        }
+
+
+class OllamaPool(OllamaClient):
+    """
+    Klient Ollama rozkładający zapytania na wiele serwerów.
+
+    Ma ten sam interfejs co OllamaClient. Zapytania trafiają do dostępnego serwera
+    z najmniejszą liczbą trwających zapytań, przy czym serwery z załadowanym modelem
+    mają pierwszeństwo. Serwer, który zwrócił błąd połączenia lub 5xx, jest wyłączany
+    na czas rosnący wykładniczo z każdym kolejnym błędem, a zapytanie jest ponawiane
+    na innym serwerze.
+    """
+
+    def __init__(
+            self,
+            base_urls: List[str],
+            ps_interval: float = 5.0,
+            eject_base: float = 1.0,
+            eject_max: float = 60.0,
+            keep_alive: Optional[str] = None
+    ):
+        """
+        Inicjalizacja puli klientów Ollama.
+
+        Args:
+            base_urls: Lista bazowych URL serwerów Ollama.
+            ps_interval: Odstęp (s) między odświeżeniami /api/ps i sprawdzeniami zdrowia.
+            eject_base: Czas (s) wyłączenia serwera po pierwszym błędzie.
+            eject_max: Maksymalny czas (s) wyłączenia serwera.
+            keep_alive: Czas utrzymania modelu w pamięci po zapytaniu.
+        """
+        if not base_urls:
+            raise ValueError("Pula Ollama wymaga co najmniej jednego serwera")
+
+        self.backends = [Backend(url) for url in base_urls]
+        self.base_url = self.backends[0].url
+        self.keep_alive = keep_alive
+        self.ps_interval = ps_interval
+        self.eject_base = eject_base
+        self.eject_max = eject_max
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._monitor = None
+        logger.info(f"Inicjalizacja puli Ollama dla: {', '.join(b.url for b in self.backends)}")
+
+    def _select(self, model_name: Optional[str], exclude=()) -> Optional[Backend]:
+        """Wybiera serwer dla zapytania (wywoływane z założoną blokadą)."""
+        now = time.monotonic()
+        candidates = [backend for backend in self.backends if backend not in exclude]
+        if not candidates:
+            return None
+
+        available = [backend for backend in candidates if backend.is_available(now)]
+        if not available:
+            # Wszystkie serwery są wyłączone - próbujemy ten, który najwcześniej wraca
+            available = [min(candidates, key=lambda backend: backend.ejected_until)]
+
+        if model_name:
+            warm = [backend for backend in available if backend.has_model(model_name)]
+            available = warm or available
+
+        return min(available, key=lambda backend: (backend.outstanding, backend.latency_ewma))
+
+    def _record(self, backend: Backend, elapsed: float, failed: bool) -> None:
+        """Aktualizuje statystyki serwera po zakończeniu zapytania (z założoną blokadą)."""
+        backend.outstanding -= 1
+        backend.requests += 1
+        backend.latencies.append(elapsed)
+        backend.latency_ewma = elapsed if backend.requests == 1 else 0.8 * backend.latency_ewma + 0.2 * elapsed
+        if failed:
+            self._mark_failure(backend)
+        else:
+            backend.failures = 0
+            backend.ejected_until = 0.0
+
+    def _mark_failure(self, backend: Backend) -> None:
+        """Wyłącza serwer z wykładniczo rosnącym czasem (z założoną blokadą)."""
+        backend.errors += 1
+        backend.failures += 1
+        delay = min(self.eject_max, self.eject_base * 2 ** (backend.failures - 1))
+        backend.ejected_until = time.monotonic() + delay
+        logger.warning(f"Serwer Ollama {backend.url} wyłączony na {delay:.1f} s (błędów z rzędu: {backend.failures})")
+
+    def _send(self, backend: Backend, method: str, path: str, **kwargs) -> requests.Response:
+        """Wysyła zapytanie do konkretnego serwera, zliczając je w statystykach."""
+        with self._lock:
+            backend.outstanding += 1
+        start = time.monotonic()
+        try:
+            response = getattr(requests, method)(f"{backend.url}{path}", **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._record(backend, time.monotonic() - start, failed=True)
+            raise
+
+        with self._lock:
+            self._record(backend, time.monotonic() - start, failed=response.status_code >= 500)
+        return response
+
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Wysyła zapytanie do wybranego serwera, ponawiając je na kolejnych w razie błędu.
+
+        Args:
+            method: Metoda HTTP (head, get, post).
+            path: Ścieżka względem bazowego URL.
+            **kwargs: Dodatkowe argumenty przekazywane do requests.
+
+        Returns:
+            Odpowiedź pierwszego serwera, który nie zwrócił błędu.
+        """
+        self._start_monitor()
+        payload = kwargs.get("json") or {}
+        model_name = payload.get("model") or payload.get("name")
+
+        tried = []
+        last_error = None
+        last_response = None
+        while True:
+            with self._lock:
+                backend = self._select(model_name, exclude=tried)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            try:
+                response = self._send(backend, method, path, **kwargs)
+            except requests.RequestException as e:
+                logger.warning(f"Błąd połączenia z {backend.url}: {str(e)}")
+                last_error = e
+                continue
+
+            if response.status_code >= 500:
+                last_response = response
+                continue
+
+            if path == "/api/generate" and model_name and response.status_code == 200:
+                with self._lock:
+                    backend.loaded_models.add(normalize_model_name(model_name))
+            return response
+
+        if last_response is not None:
+            return last_response
+        raise last_error
+
+    def list_models(self) -> List[Dict[str, Any]]:
+        """
+        Pobiera listę modeli ze wszystkich dostępnych serwerów.
+
+        Returns:
+            Lista modeli bez powtórzeń; klucz "backends" zawiera serwery z danym modelem.
+        """
+        self._start_monitor()
+        now = time.monotonic()
+        merged = {}
+        for backend in self.backends:
+            if not backend.is_available(now):
+                continue
+            try:
+                response = self._send(backend, "get", "/api/tags", timeout=5)
+            except requests.RequestException as e:
+                logger.error(f"Wyjątek podczas pobierania listy modeli z {backend.url}: {str(e)}")
+                continue
+            if response.status_code != 200:
+                logger.error(f"Błąd podczas pobierania listy modeli z {backend.url}: {response.status_code}")
+                continue
+            for model in response.json().get("models", []):
+                entry = merged.setdefault(model.get("name", ""), {**model, "backends": []})
+                entry["backends"].append(backend.url)
+
+        return add_model_info(list(merged.values()))
+
+    def pull_model(self, model_name: str) -> bool:
+        """
+        Pobiera model na wszystkich dostępnych serwerach.
+
+        Args:
+            model_name: Nazwa modelu do pobrania.
+
+        Returns:
+            bool: True jeśli model został pobrany na każdym dostępnym serwerze.
+        """
+        results = [client.pull_model(model_name) for client in self.pull_targets()]
+        return bool(results) and all(results)
+
+    def pull_targets(self) -> List[OllamaClient]:
+        """
+        Zwraca klientów wszystkich dostępnych serwerów.
+
+        Returns:
+            Lista klientów serwerów, które nie są wyłączone.
+        """
+        now = time.monotonic()
+        return [backend.client for backend in self.backends if backend.is_available(now)]
+
+    def load_model(self, model_name: str, keep_alive: Optional[str] = None) -> float:
+        """
+        Ładuje model na wszystkich dostępnych serwerach.
+
+        Zgłasza requests.RequestException, jeśli żaden serwer nie załadował modelu.
+
+        Args:
+            model_name: Nazwa modelu do załadowania.
+            keep_alive: Czas utrzymania modelu w pamięci (domyślnie: ustawienie puli).
+
+        Returns:
+            Najdłuższy czas ładowania modelu (s).
+        """
+        keep_alive = keep_alive if keep_alive is not None else self.keep_alive
+        now = time.monotonic()
+        durations = []
+        last_error = None
+        for backend in self.backends:
+            if not backend.is_available(now):
+                continue
+            try:
+                durations.append(backend.client.load_model(model_name, keep_alive))
+            except requests.RequestException as e:
+                logger.warning(f"Nie udało się załadować modelu {model_name} na {backend.url}: {str(e)}")
+                last_error = e
+                continue
+            with self._lock:
+                backend.loaded_models.add(normalize_model_name(model_name))
+
+        if not durations:
+            raise last_error or requests.ConnectionError("Brak dostępnych serwerów Ollama")
+        return max(durations)
+
+    def loaded_models(self) -> List[str]:
+        """
+        Pobiera listę modeli załadowanych na którymkolwiek serwerze.
+
+        Returns:
+            Lista nazw załadowanych modeli.
+        """
+        self.refresh_backends()
+        with self._lock:
+            return sorted(set().union(*(backend.loaded_models for backend in self.backends)))
+
+    def refresh_backends(self) -> None:
+        """Odświeża listę załadowanych modeli i sprawdza zdrowie każdego serwera."""
+        for backend in self.backends:
+            try:
+                loaded = backend.client.loaded_models()
+            except (requests.RequestException, ValueError) as e:
+                logger.debug(f"Serwer Ollama {backend.url} nie odpowiada: {str(e)}")
+                with self._lock:
+                    # Nie przedłużamy wyłączenia serwera, który i tak czeka na ponowną próbę
+                    if backend.is_available(time.monotonic()):
+                        self._mark_failure(backend)
+                continue
+
+            with self._lock:
+                backend.loaded_models = {normalize_model_name(name) for name in loaded}
+                if backend.failures:
+                    logger.info(f"Serwer Ollama {backend.url} ponownie dostępny")
+                backend.failures = 0
+                backend.ejected_until = 0.0
+
+    def _monitor_loop(self) -> None:
+        while not self._stop.wait(self.ps_interval):
+            self.refresh_backends()
+
+    def _start_monitor(self) -> None:
+        """Uruchamia wątek monitorujący serwery przy pierwszym zapytaniu."""
+        if self._monitor is not None or not self.ps_interval:
+            return
+        with self._lock:
+            if self._monitor is None:
+                self._monitor = threading.Thread(target=self._monitor_loop, name="ollama-pool-monitor", daemon=True)
+                self._monitor.start()
+
+    def close(self) -> None:
+        """Zatrzymuje wątek monitorujący."""
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join(timeout=self.ps_interval + 1)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Zwraca statystyki wszystkich serwerów.
+
+        Returns:
+            Lista słowników ze stanem, liczbą trwających zapytań, błędami,
+            czasami odpowiedzi (średnia, p50, p95) i załadowanymi modelami.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [backend.stats(now) for backend in self.backends]
+
+
+def create_client(ollama_url: Union[str, List[str]], keep_alive: Optional[str] = None, **pool_options) -> OllamaClient:
+    """
+    Tworzy klienta Ollama dla jednego lub wielu serwerów.
+
+    Args:
+        ollama_url: Adres serwera lub adresy oddzielone przecinkami.
+        keep_alive: Czas utrzymania modelu w pamięci po zapytaniu.
+        **pool_options: Opcje przekazywane do OllamaPool.
+
+    Returns:
+        OllamaClient dla jednego serwera lub OllamaPool dla wielu.
+    """
+    backends = parse_backends(ollama_url)
+    if len(backends) == 1:
+        return OllamaClient(backends[0], keep_alive=keep_alive)
+    return OllamaPool(backends, keep_alive=keep_alive, **pool_options)
@@ -0,0 +1,224 @@
+"""
+Moduł przetwarzania wsadowego zapytań do modeli Ollama.
+
+Obsługuje wczytywanie promptów z plików JSONL, równoległe generowanie
+odpowiedzi, zapis postępu (punkty kontrolne) oraz wznawianie przerwanych zadań.
+"""
+
+import json
+import time
+import logging
+import threading
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Iterable, Iterator, Optional, Callable
+
+import requests
+
+from .options import GenerationOptions, generation_stats
+from .scheduler import SchedulerRejected
+
+# Konfiguracja logowania
+logger = logging.getLogger("ollama_server.batch")
+
+
+def parse_prompts(prompts: Iterable[Any]) -> List[Dict[str, Any]]:
+    """
+    Zamienia listę promptów na listę zadań.
+
+    Args:
+        prompts: Teksty promptów lub słowniki z kluczem "prompt" (opcjonalnie
+            "id", "model" i parametry generowania, np. "temperature", "max_tokens", "options").
+
+    Returns:
+        Lista słowników zadań.
+    """
+    items = []
+    for number, prompt in enumerate(prompts, 1):
+        if isinstance(prompt, str):
+            items.append({"prompt": prompt})
+        elif isinstance(prompt, dict) and isinstance(prompt.get("prompt"), str):
+            items.append(prompt)
+        else:
+            raise ValueError(f"Pozycja {number}: oczekiwano tekstu lub obiektu z polem 'prompt'")
+    return items
+
+
+def parse_jsonl(lines: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Wczytuje zadania z linii JSONL (puste linie są pomijane).
+
+    Args:
+        lines: Linie pliku; każda zawiera tekst JSON lub obiekt z polem "prompt".
+
+    Returns:
+        Lista słowników zadań.
+    """
+    prompts = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            prompts.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Linia {number}: nieprawidłowy JSON ({e.msg})")
+    return parse_prompts(prompts)
+
+
+class BatchCheckpoint:
+    """
+    Plik wyników JSONL pełniący rolę punktu kontrolnego.
+
+    Każdy ukończony wynik jest dopisywany od razu po otrzymaniu. Przy wznowieniu
+    pomijane są indeksy, które mają już wynik bez błędu.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Ścieżka do pliku wyników.
+        """
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def completed(self) -> set:
+        """Zwraca indeksy zadań zakończonych sukcesem."""
+        done = set()
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        result = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Ostatnia linia mogła zostać przerwana w połowie zapisu
+                        continue
+                    if isinstance(result, dict) and "index" in result and "error" not in result:
+                        done.add(result["index"])
+        except FileNotFoundError:
+            pass
+        return done
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as file:
+            if file.seek(0, 2) == 0:
+                return True
+            file.seek(-1, 2)
+            return file.read(1) == b"\n"
+
+    def append(self, result: Dict[str, Any]) -> None:
+        """Dopisuje wynik do pliku."""
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+                # Zakończenie linii przerwanej w połowie zapisu, aby nie skleiła się z nowym wynikiem
+                if not self._ends_with_newline():
+                    self._file.write("\n")
+            self._file.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def run_batch(
+        client,
+        items: List[Dict[str, Any]],
+        model_name: str,
+        options: GenerationOptions,
+        parallelism: int = 4,
+        checkpoint: Optional[BatchCheckpoint] = None,
+        slot: Optional[Callable[[str], Any]] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Przetwarza zadania równolegle i zwraca wyniki w kolejności ukończenia.
+
+    Args:
+        client: Klient Ollama (OllamaClient lub OllamaPool).
+        items: Lista zadań (wynik parse_prompts/parse_jsonl).
+        model_name: Domyślny model.
+        options: Domyślne parametry generowania (pozycja może je nadpisać).
+        parallelism: Liczba równoczesnych zapytań.
+        checkpoint: Opcjonalny punkt kontrolny; zadania już w nim zapisane są pomijane.
+        slot: Opcjonalna funkcja zwracająca menedżer kontekstu kolejki dla modelu.
+
+    Yields:
+        Słowniki wyników z kluczami index, response i timing (lub error) oraz seconds,
+        a na końcu słownik {"summary": ...} ze statystykami przepustowości.
+    """
+    parallelism = max(1, parallelism)
+    done = checkpoint.completed() if checkpoint else set()
+    pending = ((index, item) for index, item in enumerate(items) if index not in done)
+    stats = {"processed": 0, "errors": 0, "chars": 0, "tokens": 0}
+    start = time.monotonic()
+
+    def process(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        model = item.get("model", model_name)
+        result = {"index": index}
+        if "id" in item:
+            result["id"] = item["id"]
+
+        item_start = time.monotonic()
+        try:
+            item_options = GenerationOptions.from_dict(item, options)
+            with slot(model) if slot else nullcontext():
+                response = client.generate_result(model, item["prompt"], item_options)
+            result["response"] = response.get("response", "")
+            result["timing"] = generation_stats(response)
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else "?"
+            result["error"] = f"Błąd: Błąd podczas generowania odpowiedzi: {status}"
+        except (requests.RequestException, ValueError) as e:
+            result["error"] = f"Błąd: Wyjątek podczas generowania odpowiedzi: {str(e)}"
+        except SchedulerRejected as e:
+            result["error"] = f"Błąd: {str(e)}"
+        result["seconds"] = round(time.monotonic() - item_start, 3)
+        return result
+
+    def collect(finished) -> Iterator[Dict[str, Any]]:
+        for future in finished:
+            result = future.result()
+            stats["processed"] += 1
+            if "error" in result:
+                stats["errors"] += 1
+            else:
+                stats["chars"] += len(result["response"])
+                stats["tokens"] += result["timing"]["eval_count"] or 0
+            if checkpoint:
+                checkpoint.append(result)
+            yield result
+
+    try:
+        with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix="ollama-batch") as executor:
+            futures = set()
+            for index, item in pending:
+                futures.add(executor.submit(process, index, item))
+                # Ograniczone okno zadań - nie tworzymy od razu przyszłych wyników dla całego pliku
+                if len(futures) >= parallelism * 2:
+                    finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    yield from collect(finished)
+            while futures:
+                finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+                yield from collect(finished)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    seconds = time.monotonic() - start
+    summary = {
+        "total": len(items),
+        "skipped": len(done),
+        "processed": stats["processed"],
+        "errors": stats["errors"],
+        "seconds": round(seconds, 3),
+        "prompts_per_second": round(stats["processed"] / seconds, 2) if seconds else None,
+        "chars_per_second": round(stats["chars"] / seconds, 1) if seconds else None,
+        "tokens": stats["tokens"],
+        "tokens_per_second": round(stats["tokens"] / seconds, 1) if seconds else None,
+    }
+    logger.info(f"Zakończono przetwarzanie wsadowe: {summary}")
+    yield {"summary": summary}
@@ -0,0 +1,326 @@
+"""
+Moduł pomiaru wydajności (ollama-server bench).
+
+Odtwarza zestaw promptów ze stałą współbieżnością (pętla zamknięta) lub ze
+stałą częstotliwością zapytań (pętla otwarta) wobec Ollama lub tego serwera
+i zwraca percentyle czasu odpowiedzi, czas do pierwszego tokenu, przepustowość
+tokenów, odsetek błędów oraz narzut ponad czas generowania zgłoszony przez Ollama.
+"""
+
+import json
+import math
+import time
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Callable
+
+from .options import GenerationOptions
+
+# Cele pomiaru
+TARGET_OLLAMA = "ollama"
+TARGET_SERVER = "server"
+TARGETS = (TARGET_OLLAMA, TARGET_SERVER)
+
+# Największa liczba wątków wysyłających zapytania w trybie stałej częstotliwości
+MAX_RATE_WORKERS = 256
+
+# Mierniki porównywane z wynikiem bazowym: (klucz, percentyl lub None, czy większa wartość jest lepsza)
+BASELINE_METRICS = (
+    ("latency_seconds", "p95", False),
+    ("ttft_seconds", "p95", False),
+    ("tokens_per_second", None, True),
+    ("error_rate", None, False),
+)
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """
+    Zwraca percentyl (metoda najbliższego rangą).
+
+    Args:
+        values: Wartości (kolejność dowolna).
+        p: Percentyl 0-100.
+
+    Returns:
+        Wartość percentyla lub None dla pustej listy.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def distribution(values: List[float]) -> Optional[Dict[str, float]]:
+    """Zwraca p50, p95, p99, średnią i maksimum (w sekundach, zaokrąglone) lub None."""
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "mean": round(sum(values) / len(values), 4),
+        "max": round(max(values), 4),
+    }
+
+
+class OllamaTarget:
+    """Zapytania bezpośrednio do /api/generate Ollama (strumieniowo - z czasem do pierwszego tokenu)."""
+
+    name = TARGET_OLLAMA
+
+    def __init__(self, url: str, model_name: str, options: GenerationOptions, timeout: float = 300):
+        """
+        Args:
+            url: Adres Ollama (np. http://localhost:11434).
+            model_name: Nazwa modelu.
+            options: Parametry generowania.
+            timeout: Limit czasu zapytania (s).
+        """
+        self.url = url.rstrip("/")
+        self.model_name = model_name
+        self.options = options
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, prompt: str) -> Dict[str, Any]:
+        """
+        Wysyła jedno zapytanie.
+
+        Returns:
+            dict: ttft (s do pierwszego fragmentu odpowiedzi), tokens (eval_count),
+            backend_seconds (total_duration Ollama); zgłasza wyjątek przy błędzie.
+        """
+        payload = {"model": self.model_name, "prompt": prompt, "options": self.options.to_ollama(), "stream": True}
+        started = time.perf_counter()
+        ttft = None
+        summary = {}
+        with self.session.post(f"{self.url}/api/generate", json=payload, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            # chunk_size=None - fragmenty są czytane w miarę nadchodzenia (bez buforowania 512 B)
+            for line in response.iter_lines(chunk_size=None):
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise ValueError(f"błąd Ollama: {chunk['error']}")
+                if ttft is None and chunk.get("response"):
+                    ttft = time.perf_counter() - started
+                if chunk.get("done"):
+                    summary = chunk
+        total = summary.get("total_duration")
+        return {
+            "ttft": ttft,
+            "tokens": summary.get("eval_count") or 0,
+            "backend_seconds": total / 1e9 if total else None,
+        }
+
+
+class ServerTarget:
+    """Zapytania do /api/ask tego serwera (bez strumieniowania - czas do pierwszego tokenu niedostępny)."""
+
+    name = TARGET_SERVER
+
+    def __init__(self, url: str, options: GenerationOptions, priority: str = "interactive", timeout: float = 300):
+        """
+        Args:
+            url: Adres serwera (np. http://localhost:5001).
+            options: Parametry generowania (model ustala konfiguracja serwera).
+            priority: Priorytet zapytań (interactive lub batch).
+            timeout: Limit czasu zapytania (s).
+        """
+        self.url = url.rstrip("/")
+        self.model_name = None
+        self.options = options
+        self.priority = priority
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def request(self, prompt: str) -> Dict[str, Any]:
+        """
+        Wysyła jedno zapytanie.
+
+        Returns:
+            dict: tokens i backend_seconds ze statystyk timing odpowiedzi;
+            zgłasza wyjątek przy błędzie.
+        """
+        payload = dict(self.options.to_dict(), prompt=prompt, priority=self.priority)
+        response = self.session.post(f"{self.url}/api/ask", json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        timing = response.json().get("timing") or {}
+        return {
+            "ttft": None,
+            "tokens": timing.get("eval_count") or 0,
+            "backend_seconds": timing.get("total_seconds"),
+        }
+
+
+def error_type(error: Exception) -> str:
+    """Zwraca krótką nazwę rodzaju błędu (np. http_429, timeout, connection)."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return f"http_{error.response.status_code}"
+    if isinstance(error, requests.Timeout):
+        return "timeout"
+    if isinstance(error, requests.ConnectionError):
+        return "connection"
+    return type(error).__name__
+
+
+def _measure(target, prompt: str, scheduled: float) -> Dict[str, Any]:
+    """Wykonuje zapytanie i zwraca jego wynik; czas liczony od zaplanowanego startu."""
+    try:
+        result = target.request(prompt)
+    except (requests.RequestException, ValueError) as e:
+        return {"error": error_type(e), "latency": time.perf_counter() - scheduled}
+    latency = time.perf_counter() - scheduled
+    result["latency"] = latency
+    if result.get("backend_seconds") is not None:
+        result["overhead"] = max(0.0, latency - result["backend_seconds"])
+    return result
+
+
+def run_bench(
+        target,
+        prompts: List[str],
+        requests_count: int,
+        concurrency: int = 1,
+        rate: Optional[float] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Odtwarza prompty (po kolei, cyklicznie) i zwraca podsumowanie pomiaru.
+
+    Przy stałej współbieżności `concurrency` wątków wysyła kolejne zapytanie
+    zaraz po otrzymaniu odpowiedzi. Przy stałej częstotliwości (`rate`)
+    zapytania startują według harmonogramu niezależnie od odpowiedzi, a czas
+    liczony jest od zaplanowanego startu - opóźnienie po stronie klienta nie
+    zaniża wyników.
+
+    Args:
+        target: OllamaTarget lub ServerTarget.
+        prompts: Teksty promptów.
+        requests_count: Liczba zapytań.
+        concurrency: Liczba równoczesnych zapytań (pętla zamknięta).
+        rate: Zapytania na sekundę (pętla otwarta; zastępuje concurrency).
+        progress: Funkcja wywoływana z wynikiem każdego zapytania.
+
+    Returns:
+        Podsumowanie (summarize()).
+    """
+    if not prompts:
+        raise ValueError("Brak promptów do odtworzenia")
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def record(result):
+        with lock:
+            results.append(result)
+        if progress:
+            progress(result)
+
+    started = time.perf_counter()
+    if rate:
+        workers = min(MAX_RATE_WORKERS, max(1, requests_count))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for i in range(requests_count):
+                scheduled = started + i / rate
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(_measure, target, prompts[i % len(prompts)], scheduled))
+                futures[-1].add_done_callback(lambda future: record(future.result()))
+    else:
+        counter = iter(range(requests_count))
+
+        def worker():
+            while True:
+                with lock:
+                    i = next(counter, None)
+                if i is None:
+                    return
+                record(_measure(target, prompts[i % len(prompts)], time.perf_counter()))
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            for _ in range(max(1, concurrency)):
+                executor.submit(worker)
+    duration = time.perf_counter() - started
+
+    summary = summarize(results, duration)
+    summary.update({
+        "target": target.name,
+        "url": target.url,
+        "model": target.model_name,
+        "mode": "rate" if rate else "concurrency",
+        "concurrency": None if rate else concurrency,
+        "rate": rate,
+    })
+    return summary
+
+
+def summarize(results: List[Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    """
+    Podsumowuje wyniki zapytań.
+
+    Args:
+        results: Wyniki _measure() (latency, ttft, tokens, overhead lub error).
+        duration: Czas całego pomiaru (s).
+
+    Returns:
+        Słownik z liczbą zapytań i błędów (łącznie i według rodzaju), rozkładami
+        latency_seconds, ttft_seconds i overhead_seconds (p50/p95/p99/mean/max)
+        oraz przepustowością (requests_per_second, tokens_per_second).
+    """
+    ok = [result for result in results if "error" not in result]
+    errors: Dict[str, int] = {}
+    for result in results:
+        if "error" in result:
+            errors[result["error"]] = errors.get(result["error"], 0) + 1
+    tokens = sum(result["tokens"] for result in ok)
+    return {
+        "requests": len(results),
+        "completed": len(ok),
+        "errors": len(results) - len(ok),
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else 0.0,
+        "errors_by_type": errors,
+        "duration_seconds": round(duration, 3),
+        "requests_per_second": round(len(ok) / duration, 3) if duration > 0 else 0.0,
+        "tokens": tokens,
+        "tokens_per_second": round(tokens / duration, 2) if duration > 0 else 0.0,
+        "latency_seconds": distribution([result["latency"] for result in ok]),
+        "ttft_seconds": distribution([result["ttft"] for result in ok if result.get("ttft") is not None]),
+        "overhead_seconds": distribution([result["overhead"] for result in ok if "overhead" in result]),
+    }
+
+
+def compare_to_baseline(summary: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """
+    Porównuje wynik z wynikiem bazowym (np. z poprzedniego przebiegu CI).
+
+    Args:
+        summary: Bieżący wynik run_bench().
+        baseline: Wynik bazowy w tym samym formacie.
+        tolerance: Dopuszczalne względne pogorszenie (0.1 - 10%).
+
+    Returns:
+        Lista opisów pogorszeń (pusta, jeśli brak regresji).
+    """
+    regressions = []
+    for key, stat, higher_is_better in BASELINE_METRICS:
+        current, previous = summary.get(key), baseline.get(key)
+        if stat is not None:
+            current = current.get(stat) if current else None
+            previous = previous.get(stat) if previous else None
+        if current is None or previous is None:
+            continue
+        name = f"{key}.{stat}" if stat else key
+        if higher_is_better:
+            worse = current < previous * (1 - tolerance)
+        elif key == "error_rate":
+            worse = current > previous + tolerance * max(previous, 0.01)
+        else:
+            worse = current > previous * (1 + tolerance)
+        if worse:
+            regressions.append(f"{name}: {previous} -> {current}")
+    return regressions
@@ -0,0 +1,323 @@
+"""
+Moduł budżetu tokenów dla promptów.
+
+Szacuje liczbę tokenów promptu bez wywoływania modelu i dopasowuje prompt
+do okna kontekstu modelu, zanim zapytanie trafi do Ollama: odrzuca go,
+przycina (początek lub środek) albo streszcza nadmiarową część.
+"""
+
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+import requests
+
+from .balancer import normalize_model_name
+from .models import MODEL_INFO, is_error_response
+
+# Konfiguracja logowania
+logger = logging.getLogger("ollama_server.budget")
+
+# Strategie dopasowania promptu do budżetu
+STRATEGY_REJECT = "reject"
+STRATEGY_TRUNCATE_HEAD = "truncate_head"
+STRATEGY_TRUNCATE_MIDDLE = "truncate_middle"
+STRATEGY_SUMMARIZE = "summarize"
+STRATEGIES = (STRATEGY_REJECT, STRATEGY_TRUNCATE_HEAD, STRATEGY_TRUNCATE_MIDDLE, STRATEGY_SUMMARIZE)
+
+# Domyślne num_ctx serwera Ollama, gdy Modelfile go nie ustawia
+OLLAMA_DEFAULT_NUM_CTX = 2048
+
+# Znacznik wstawiany w miejsce usuniętego fragmentu
+TRUNCATION_MARKER = "\n[...]\n"
+
+# Słowa, liczby, pojedyncze znaki interpunkcyjne i odstępy
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]|\s+")
+
+# Liczba zapamiętanych oszacowań estimate_tokens
+ESTIMATE_CACHE_SIZE = 4096
+
+# Prompt streszczający fragment, który nie mieści się w budżecie
+SUMMARY_PROMPT = "Streść zwięźle poniższy tekst, zachowując najważniejsze fakty:\n\n{text}"
+
+
+def _piece_tokens(piece: str) -> int:
+    """Szacowana liczba tokenów fragmentu (słowo ~ 1 token na 4 znaki, odstępy bez kosztu)."""
+    if piece.isspace():
+        return 0
+    return (len(piece) + 3) // 4
+
+
+# Oszacowania kluczowane skrótem i długością tekstu - pamięć podręczna nie przechowuje samych promptów
+_estimates: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+_estimates_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Szybko szacuje liczbę tokenów tekstu.
+
+    Oszacowanie jest celowo zawyżone względem tokenizerów BPE (tokeny słów
+    liczone po 4 znaki, każdy znak interpunkcyjny osobno), aby prompt
+    zmieszczony w budżecie nie został przycięty przez Ollama. Wyniki są
+    zapamiętywane, więc powtarzające się prompty (np. systemowe) nie są
+    analizowane ponownie.
+
+    Args:
+        text: Tekst do oszacowania.
+
+    Returns:
+        Szacowana liczba tokenów.
+    """
+    key = (hash(text), len(text))
+    with _estimates_lock:
+        tokens = _estimates.get(key)
+        if tokens is not None:
+            _estimates.move_to_end(key)
+            return tokens
+
+    tokens = sum(_piece_tokens(piece) for piece in _PIECE_PATTERN.findall(text))
+    with _estimates_lock:
+        _estimates[key] = tokens
+        if len(_estimates) > ESTIMATE_CACHE_SIZE:
+            _estimates.popitem(last=False)
+    return tokens
+
+
+def _split_pieces(text: str) -> Tuple[List[str], List[int]]:
+    pieces = _PIECE_PATTERN.findall(text)
+    return pieces, [_piece_tokens(piece) for piece in pieces]
+
+
+def _head_count(costs: List[int], budget: int) -> int:
+    """Zwraca liczbę początkowych fragmentów mieszczących się w budżecie."""
+    used = 0
+    for index, cost in enumerate(costs):
+        if used + cost > budget:
+            return index
+        used += cost
+    return len(costs)
+
+
+def _take_head(pieces: List[str], costs: List[int], budget: int) -> str:
+    """Zwraca najdłuższy początek tekstu mieszczący się w budżecie."""
+    return "".join(pieces[:_head_count(costs, budget)])
+
+
+def _take_tail(pieces: List[str], costs: List[int], budget: int) -> str:
+    """Zwraca najdłuższy koniec tekstu mieszczący się w budżecie."""
+    count = _head_count(costs[::-1], budget)
+    return "".join(pieces[len(pieces) - count:])
+
+
+def truncate_text(text: str, max_tokens: int, strategy: str = STRATEGY_TRUNCATE_MIDDLE) -> str:
+    """
+    Przycina tekst do podanej liczby tokenów.
+
+    Args:
+        text: Tekst do przycięcia.
+        max_tokens: Maksymalna (szacowana) liczba tokenów wyniku.
+        strategy: truncate_head (usuwa początek, zachowuje najnowszą część)
+            lub truncate_middle (zachowuje początek i koniec).
+
+    Returns:
+        Przycięty tekst (bez zmian, jeśli się mieści).
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    pieces, costs = _split_pieces(text)
+    marker_cost = estimate_tokens(TRUNCATION_MARKER)
+    budget = max(0, max_tokens - marker_cost)
+    if strategy == STRATEGY_TRUNCATE_HEAD:
+        return TRUNCATION_MARKER.lstrip() + _take_tail(pieces, costs, budget).lstrip()
+
+    head = _take_head(pieces, costs, budget // 2)
+    tail = _take_tail(pieces, costs, budget - budget // 2)
+    return head.rstrip() + TRUNCATION_MARKER + tail.lstrip()
+
+
+class PromptTooLong(ValueError):
+    """Prompt przekracza budżet tokenów modelu (strategia reject)."""
+
+    def __init__(self, message: str, tokens: Dict[str, Any]):
+        super().__init__(message)
+        self.tokens = tokens
+
+
+class PromptBudget:
+    """
+    Dopasowuje prompty do okna kontekstu modeli.
+
+    Okno kontekstu modelu jest ustalane raz (i zapamiętywane) w kolejności:
+    ustawienie context_window, num_ctx lub context_length z /api/show,
+    MODEL_INFO, domyślne num_ctx Ollama.
+    """
+
+    def __init__(
+            self,
+            client,
+            strategy: str = STRATEGY_TRUNCATE_MIDDLE,
+            context_window: int = 0,
+            summarize: Optional[Callable[[str, str], str]] = None
+    ):
+        """
+        Args:
+            client: Klient Ollama (OllamaClient lub OllamaPool).
+            strategy: Domyślna strategia (reject, truncate_head, truncate_middle, summarize).
+            context_window: Stałe okno kontekstu dla wszystkich modeli (0 - ustalane dla modelu).
+            summarize: Funkcja (model, tekst) -> streszczenie; domyślnie generowanie przez klienta.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Nieznana strategia '{strategy}'. Dostępne: {', '.join(STRATEGIES)}")
+        self.client = client
+        self.strategy = strategy
+        self.context_window_override = context_window
+        self.summarize = summarize or self._summarize_with_model
+        self._windows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def context_window(self, model_name: str) -> int:
+        """
+        Zwraca okno kontekstu modelu w tokenach.
+
+        Args:
+            model_name: Nazwa modelu.
+
+        Returns:
+            Liczba tokenów okna kontekstu.
+        """
+        if self.context_window_override:
+            return self.context_window_override
+
+        name = normalize_model_name(model_name)
+        with self._lock:
+            if name in self._windows:
+                return self._windows[name]
+
+        try:
+            details = self.client.show_model(model_name)
+        except (requests.RequestException, ValueError) as e:
+            # Bez zapamiętywania - przy kolejnym zapytaniu spróbujemy ponownie
+            logger.debug(f"Nie można pobrać szczegółów modelu {model_name}: {str(e)}")
+            return self._window_from_details(model_name, {})
+
+        window = self._window_from_details(model_name, details)
+        with self._lock:
+            self._windows[name] = window
+        return window
+
+    @staticmethod
+    def _window_from_details(model_name: str, details: Dict[str, Any]) -> int:
+
+        # num_ctx ustawione w Modelfile to rzeczywiste okno używane przez Ollama
+        for line in details.get("parameters", "").splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[0] == "num_ctx" and parts[1].isdigit():
+                return int(parts[1])
+
+        # Bez num_ctx Ollama używa domyślnego okna, nawet jeśli model obsługuje dłuższe
+        trained = None
+        for key, value in details.get("model_info", {}).items():
+            if key.endswith(".context_length"):
+                trained = int(value)
+                break
+        if trained is None:
+            trained = MODEL_INFO.get(model_name.split(":")[0], {}).get("context")
+        return min(trained, OLLAMA_DEFAULT_NUM_CTX) if trained else OLLAMA_DEFAULT_NUM_CTX
+
+    def _summarize_with_model(self, model_name: str, text: str) -> str:
+        summary = self.client.generate(model_name, SUMMARY_PROMPT.format(text=text), temperature=0.2)
+        if is_error_response(summary):
+            raise requests.RequestException(summary)
+        return summary
+
+    def _summarize(self, model_name: str, text: str, budget: int, window: int) -> str:
+        """
+        Streszcza środkową część tekstu tak, aby całość zmieściła się w budżecie.
+
+        Początek i koniec promptu (zwykle instrukcja i pytanie) pozostają bez zmian,
+        a środek jest streszczany fragmentami mieszczącymi się w oknie modelu.
+        """
+        pieces, costs = _split_pieces(text)
+        keep = budget // 4
+        head = _take_head(pieces, costs, keep)
+        tail = _take_tail(pieces, costs, keep)
+        middle = text[len(head):len(text) - len(tail)]
+
+        # Fragmenty streszczane osobno muszą zmieścić się w oknie razem z instrukcją i odpowiedzią
+        chunk_budget = max(1, window // 2 - estimate_tokens(SUMMARY_PROMPT))
+        middle_pieces, middle_costs = _split_pieces(middle)
+        summaries = []
+        while middle_pieces:
+            count = max(1, _head_count(middle_costs, chunk_budget))
+            summaries.append(self.summarize(model_name, "".join(middle_pieces[:count])).strip())
+            del middle_pieces[:count], middle_costs[:count]
+
+        result = head.rstrip() + "\n\n" + "\n".join(summaries) + "\n\n" + tail.lstrip()
+        # Streszczenie może nadal być za długie - wtedy przycinamy środek
+        return truncate_text(result, budget, STRATEGY_TRUNCATE_MIDDLE)
+
+    def apply(
+            self,
+            model_name: str,
+            prompt: str,
+            max_tokens: int,
+            strategy: Optional[str] = None,
+            num_ctx: Optional[int] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Dopasowuje prompt do okna kontekstu modelu.
+
+        Budżet promptu to okno kontekstu pomniejszone o max_tokens zarezerwowane
+        na odpowiedź (co najwyżej połowa okna).
+
+        Args:
+            model_name: Nazwa modelu.
+            prompt: Prompt.
+            max_tokens: Maksymalna liczba tokenów odpowiedzi.
+            strategy: Strategia dla tego zapytania (domyślnie: strategia budżetu).
+            num_ctx: Okno kontekstu zapytania (options.num_ctx) - Ollama używa go zamiast okna modelu.
+
+        Returns:
+            Krotka (prompt do wysłania, liczniki tokenów).
+
+        Raises:
+            PromptTooLong: Prompt przekracza budżet, a strategia to reject.
+            ValueError: Nieznana strategia.
+            requests.RequestException: Błąd streszczania (strategia summarize).
+        """
+        strategy = strategy or self.strategy
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Nieznana strategia '{strategy}'. Dostępne: {', '.join(STRATEGIES)}")
+
+        window = num_ctx or self.context_window(model_name)
+        budget = window - min(max_tokens, window // 2)
+        original = estimate_tokens(prompt)
+        tokens = {
+            "prompt": original,
+            "prompt_original": original,
+            "budget": budget,
+            "context_window": window,
+            "max_tokens": max_tokens,
+            "truncated": False,
+            "strategy": strategy,
+        }
+        if original <= budget:
+            return prompt, tokens
+
+        if strategy == STRATEGY_REJECT:
+            raise PromptTooLong(
+                f"Prompt ma około {original} tokenów, a budżet modelu {model_name} to {budget}", tokens
+            )
+
+        logger.info(f"Prompt ({original} tokenów) przekracza budżet {budget} modelu {model_name}: {strategy}")
+        if strategy == STRATEGY_SUMMARIZE:
+            prompt = self._summarize(model_name, prompt, budget, window)
+        else:
+            prompt = truncate_text(prompt, budget, strategy)
+
+        tokens.update(prompt=estimate_tokens(prompt), truncated=True)
+        return prompt, tokens
@@ -6,10 +6,22 @@ Umożliwia uruchamianie i konfigurację serwera z wiersza poleceń.
 
 import os
 import sys
+import json
+import time
 import click
-from .config import load_config, update_env_var, DEFAULT_CONFIG
-from .models import OllamaClient, MODEL_INFO
+import requests
+from .config import load_config, update_env_var, find_or_create_env, write_env_values, DEFAULT_CONFIG
+from .models import MODEL_INFO
+from .balancer import create_client
+from .batch import BatchCheckpoint, parse_jsonl, run_batch
+from .bench import TARGETS, TARGET_OLLAMA, OllamaTarget, ServerTarget, run_bench, compare_to_baseline
+from .fake_ollama import FakeOllama, DISTRIBUTIONS
+from .options import GenerationOptions
 from .server import run_server
+from .utils import (
+    get_hardware_info, format_bytes, recommend_model, recommend_num_thread, recommend_num_ctx,
+    kv_bytes_per_token, trained_context, calibrate_concurrency, choose_concurrency, save_autotune_run
+)
 import logging
 
 # Konfiguracja logowania
@@ -51,7 +63,7 @@ def info(config):
     click.echo(f"  Debug: {cfg['DEBUG']}")
 
     # Sprawdź dostępność Ollama
-    client = OllamaClient(cfg["OLLAMA_URL"])
+    client = create_client(cfg["OLLAMA_URL"])
     if client.check_availability():
         click.echo("\nStatus Ollama: ✅ Działa")
 
@@ -86,7 +98,7 @@ def models(config):
     cfg = load_config(config)
 
     # Sprawdź dostępność Ollama
-    client = OllamaClient(cfg["OLLAMA_URL"])
+    client = create_client(cfg["OLLAMA_URL"])
     if client.check_availability():
         # Pobierz listę modeli
         models = client.list_models()
@@ -129,7 +141,7 @@ def setup_model(model, config):
     click.echo(f"  Opis: {model_info['description']}")
 
     # Sprawdź dostępność Ollama
-    client = OllamaClient(cfg["OLLAMA_URL"])
+    client = create_client(cfg["OLLAMA_URL"])
     if not client.check_availability():
         click.echo("\nStatus Ollama: ❌ Niedostępny")
         click.echo("Uruchom Ollama komendą: ollama serve")
@@ -152,6 +164,14 @@ def setup_model(model, config):
     update_env_var("MODEL_NAME", model, config)
     click.echo(f"\n✅ Skonfigurowano {model} jako domyślny model")
 
+    # Rozgrzej model, aby pierwsze zapytanie nie czekało na jego załadowanie
+    click.echo(f"Ładowanie modelu {model} do pamięci...")
+    try:
+        seconds = create_client(cfg["OLLAMA_URL"], keep_alive=cfg["KEEP_ALIVE"] or None).load_model(model)
+        click.echo(f"✅ Model załadowany w {seconds:.1f} s")
+    except requests.RequestException as e:
+        click.echo(f"⚠️ Nie udało się załadować modelu: {str(e)}")
+
 
 @cli.command()
 @click.option("--model", default=DEFAULT_CONFIG["MODEL_NAME"], help="Nazwa modelu")
@@ -194,7 +214,7 @@ def ask(prompt, model, temp, tokens, config):
     tokens = int(tokens) if tokens is not None else cfg["MAX_TOKENS"]
 
     # Sprawdź dostępność Ollama
-    client = OllamaClient(cfg["OLLAMA_URL"])
+    client = create_client(cfg["OLLAMA_URL"])
     if not client.check_availability():
         click.echo("Status Ollama: ❌ Niedostępny")
         click.echo("Uruchom Ollama komendą: ollama serve")
@@ -228,6 +248,297 @@ def ask(prompt, model, temp, tokens, config):
     click.echo(f"Odpowiedź:\n\n{response}")
 
 
+@cli.command()
+@click.argument("input_file", type=click.File("r", encoding="utf-8"))
+@click.option("--output", "-o", required=True, help="Plik wynikowy JSONL (służy też jako punkt kontrolny)")
+@click.option("--parallel", default=None, type=int, help="Liczba równoczesnych zapytań (domyślnie: MAX_CONCURRENCY)")
+@click.option("--model", default=None, help="Nazwa modelu (domyślnie: z konfiguracji)")
+@click.option("--temp", default=None, type=float, help="Temperatura generowania")
+@click.option("--tokens", default=None, type=int, help="Maksymalna liczba tokenów")
+@click.option("--config", default=None, help="Ścieżka do pliku konfiguracyjnego")
+def batch(input_file, output, parallel, model, temp, tokens, config):
+    """
+    Przetwarza wsadowo prompty z pliku JSONL.
+
+    INPUT_FILE - plik JSONL (lub "-" dla stdin); każda linia to tekst JSON
+    lub obiekt z polem "prompt". Wyniki są dopisywane do pliku --output
+    w kolejności ukończenia; ponowne uruchomienie pomija ukończone pozycje.
+    """
+    cfg = load_config(config)
+
+    model = model or cfg["MODEL_NAME"]
+    temp = temp if temp is not None else cfg["TEMPERATURE"]
+    tokens = tokens if tokens is not None else cfg["MAX_TOKENS"]
+    parallel = parallel or cfg["MAX_CONCURRENCY"]
+
+    items = parse_jsonl(input_file)
+    client = create_client(cfg["OLLAMA_URL"])
+    if not client.check_availability():
+        click.echo("Status Ollama: ❌ Niedostępny")
+        click.echo("Uruchom Ollama komendą: ollama serve")
+        return
+
+    click.echo(f"Przetwarzanie {len(items)} promptów modelem {model} (równolegle: {parallel})", err=True)
+    report_every = max(1, len(items) // 20)
+
+    options = GenerationOptions(
+        temperature=temp,
+        max_tokens=tokens,
+        num_ctx=cfg["CONTEXT_WINDOW"] or None,
+        num_thread=cfg.get("NUM_THREAD") or None
+    )
+    results = run_batch(client, items, model, options, parallel, BatchCheckpoint(output))
+    for count, result in enumerate(results, 1):
+        if "summary" in result:
+            summary = result["summary"]
+            click.echo(
+                f"\n✅ Przetworzono {summary['processed']} promptów (pominięto ukończone wcześniej: "
+                f"{summary['skipped']}, błędy: {summary['errors']}) w {summary['seconds']} s - "
+                f"{summary['prompts_per_second']} promptów/s, {summary['tokens_per_second']} tokenów/s",
+                err=True
+            )
+            click.echo(json.dumps(summary))
+        elif count % report_every == 0 or "error" in result:
+            status = "❌" if "error" in result else "✅"
+            click.echo(f"  {status} {count}/{len(items)}: #{result['index']} ({result['seconds']} s)", err=True)
+
+
+@cli.command()
+@click.option("--model", default=None, help="Model do strojenia (domyślnie: największy mieszczący się w pamięci)")
+@click.option("--max-concurrency", default=4, type=int, help="Największa badana liczba równoczesnych generacji")
+@click.option("--tokens", default=64, type=int, help="Liczba tokenów generowanych w zapytaniu kalibracyjnym")
+@click.option("--rounds", default=2, type=int, help="Liczba zapytań na slot współbieżności")
+@click.option("--output", default="autotune.jsonl", help="Plik historii pomiarów (JSONL)")
+@click.option("--dry-run", is_flag=True, help="Tylko wyświetl zalecenia, bez zapisu konfiguracji")
+@click.option("--config", default=None, help="Ścieżka do pliku konfiguracyjnego")
+def autotune(model, max_concurrency, tokens, rounds, output, dry_run, config):
+    """
+    Dobiera model, współbieżność, num_thread i num_ctx do sprzętu.
+
+    Sprawdza rdzenie CPU, dostępną pamięć i rozmiary modeli zgłaszane przez
+    Ollama, mierzy przepustowość (tokeny/s) przy współbieżności
+    1..--max-concurrency i zapisuje zalecane MODEL_NAME, MAX_CONCURRENCY,
+    NUM_THREAD i CONTEXT_WINDOW (num_ctx) w pliku .env. Krzywa pomiarów
+    jest dopisywana do pliku --output.
+    """
+    env_file = find_or_create_env(config)
+    cfg = load_config(env_file)
+
+    hardware = get_hardware_info()
+    click.echo("Sprzęt:")
+    click.echo(f"  CPU: {hardware['cpu_logical']} wątków logicznych, "
+               f"{hardware['cpu_physical'] or '?'} rdzeni fizycznych")
+    memory_total = format_bytes(hardware["memory_total"]) if hardware["memory_total"] else "?"
+    memory_available = format_bytes(hardware["memory_available"]) if hardware["memory_available"] else "?"
+    click.echo(f"  Pamięć: {memory_available} dostępne z {memory_total}")
+
+    client = create_client(cfg["OLLAMA_URL"], keep_alive=cfg["KEEP_ALIVE"] or None)
+    if not client.check_availability():
+        click.echo("\nStatus Ollama: ❌ Niedostępny")
+        click.echo("Uruchom Ollama komendą: ollama serve")
+        return
+
+    installed = client.list_models()
+    model = model or recommend_model(installed, hardware)
+    selected = next((m for m in installed if m.get("name") == model or m.get("name", "").split(":")[0] == model), None)
+    if selected is None:
+        click.echo(f"\nModel {model}: ❌ Niedostępny")
+        click.echo(f"Możesz pobrać model komendą: ollama-server setup-model {model}")
+        return
+    model = selected["name"]
+    model_size = selected.get("size") or 0
+
+    try:
+        details = client.show_model(model)
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f"Nie można pobrać szczegółów modelu {model}: {str(e)}")
+        details = {}
+    kv_per_token = kv_bytes_per_token(details, model_size)
+    context_limit = trained_context(details, model)
+    num_thread = recommend_num_thread(hardware)
+    # Kalibracja z oknem mieszczącym się w pamięci przy największej badanej współbieżności
+    calibration_ctx = recommend_num_ctx(model_size, kv_per_token, context_limit, hardware, max_concurrency)
+
+    click.echo(f"\nModel: {model} ({format_bytes(model_size)}, kontekst do {context_limit or '?'} tokenów)")
+    click.echo(f"Kalibracja: num_thread={num_thread}, num_ctx={calibration_ctx}, {tokens} tokenów na zapytanie")
+    options = GenerationOptions(temperature=0.0, max_tokens=tokens, seed=0, num_ctx=calibration_ctx,
+                                num_thread=num_thread)
+
+    def progress(point):
+        click.echo(f"  współbieżność {point['concurrency']}: {point['tokens_per_second']} tokenów/s łącznie, "
+                   f"{point['tokens_per_second_per_request']} tokenów/s na zapytanie, "
+                   f"średni czas {point['latency_seconds']} s, błędy: {point['errors']}")
+
+    try:
+        curve = calibrate_concurrency(client, model, max_concurrency, options, rounds=rounds, progress=progress)
+    except requests.RequestException as e:
+        click.echo(f"❌ Nie udało się załadować modelu {model}: {str(e)}")
+        return
+
+    concurrency = choose_concurrency(curve)
+    num_ctx = recommend_num_ctx(model_size, kv_per_token, context_limit, hardware, concurrency)
+    recommendation = {
+        "MODEL_NAME": model,
+        "MAX_CONCURRENCY": concurrency,
+        "NUM_THREAD": num_thread,
+        "CONTEXT_WINDOW": num_ctx,
+    }
+
+    previous = save_autotune_run(output, {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model": model,
+        "hardware": hardware,
+        "options": options.to_dict(),
+        "curve": curve,
+        "recommendation": recommendation,
+    })
+
+    click.echo("\nZalecana konfiguracja:")
+    for key, value in recommendation.items():
+        click.echo(f"  {key}: {value}")
+    best = max(point["tokens_per_second"] for point in curve)
+    click.echo(f"Najwyższa przepustowość: {best} tokenów/s (krzywa zapisana w {output})")
+    if previous:
+        previous_best = max((point["tokens_per_second"] for point in previous.get("curve", [])), default=0)
+        click.echo(f"Poprzedni pomiar ({previous.get('timestamp')}): {previous_best} tokenów/s, "
+                   f"zalecenia: {previous.get('recommendation')}")
+    if concurrency == max_concurrency:
+        click.echo("Przepustowość rosła do końca zakresu - warto powtórzyć z większym --max-concurrency "
+                   "(i OLLAMA_NUM_PARALLEL po stronie Ollama)")
+
+    if dry_run:
+        click.echo("\nTryb --dry-run: konfiguracja nie została zmieniona")
+        return
+    write_env_values(env_file, recommendation)
+    click.echo(f"\n✅ Zapisano konfigurację w {env_file}")
+
+
+@cli.command()
+@click.option("--target", type=click.Choice(TARGETS), default=TARGET_OLLAMA,
+              help="Cel pomiaru: Ollama bezpośrednio lub ten serwer (/api/ask)")
+@click.option("--url", default=None, help="Adres celu (domyślnie: OLLAMA_URL lub http://localhost:SERVER_PORT)")
+@click.option("--prompts", "prompts_file", type=click.File("r", encoding="utf-8"), default=None,
+              help="Plik JSONL z promptami (jak dla batch); domyślnie --prompt")
+@click.option("--prompt", default="Wyjaśnij krótko, czym jest rekurencja.", help="Prompt, gdy nie podano --prompts")
+@click.option("--requests", "requests_count", default=20, type=int, help="Liczba mierzonych zapytań")
+@click.option("--concurrency", default=1, type=int, help="Liczba równoczesnych zapytań")
+@click.option("--rate", default=None, type=float, help="Stała częstotliwość zapytań na sekundę (zamiast --concurrency)")
+@click.option("--warmup", default=1, type=int, help="Liczba zapytań rozgrzewających (nie są mierzone)")
+@click.option("--model", default=None, help="Nazwa modelu dla --target ollama (domyślnie: z konfiguracji)")
+@click.option("--temp", default=None, type=float, help="Temperatura generowania")
+@click.option("--tokens", default=128, type=int, help="Maksymalna liczba tokenów odpowiedzi")
+@click.option("--json", "as_json", is_flag=True, help="Wypisz tylko wynik JSON (np. dla CI)")
+@click.option("--output", "-o", default=None, help="Zapisz wynik JSON do pliku")
+@click.option("--baseline", type=click.File("r", encoding="utf-8"), default=None,
+              help="Wynik bazowy JSON; pogorszenie ponad --max-regression kończy się kodem 1")
+@click.option("--max-regression", default=0.1, type=float, help="Dopuszczalne względne pogorszenie względem --baseline")
+@click.option("--config", default=None, help="Ścieżka do pliku konfiguracyjnego")
+def bench(target, url, prompts_file, prompt, requests_count, concurrency, rate, warmup, model, temp, tokens,
+          as_json, output, baseline, max_regression, config):
+    """
+    Mierzy czas odpowiedzi i przepustowość Ollama lub serwera.
+
+    Podaje percentyle p50/p95/p99 czasu odpowiedzi i czasu do pierwszego
+    tokenu (tylko --target ollama), tokeny/s, odsetek błędów i narzut ponad
+    czas generowania zgłoszony przez Ollama.
+    """
+    cfg = load_config(config)
+    options = GenerationOptions(temperature=temp if temp is not None else cfg["TEMPERATURE"], max_tokens=tokens)
+    if target == TARGET_OLLAMA:
+        bench_target = OllamaTarget(url or cfg["OLLAMA_URL"], model or cfg["MODEL_NAME"], options)
+    else:
+        bench_target = ServerTarget(url or f"http://localhost:{cfg['SERVER_PORT']}", options)
+    prompts = [item["prompt"] for item in parse_jsonl(prompts_file)] if prompts_file else [prompt]
+
+    def log(message):
+        if not as_json:
+            click.echo(message, err=True)
+
+    log(f"Pomiar {bench_target.url} ({target}): {requests_count} zapytań, "
+        + (f"{rate} zapytań/s" if rate else f"współbieżność {concurrency}"))
+    for _ in range(warmup):
+        try:
+            bench_target.request(prompts[0])
+        except (requests.RequestException, ValueError) as e:
+            log(f"⚠️ Zapytanie rozgrzewające nie powiodło się: {str(e)}")
+
+    report_every = max(1, requests_count // 10)
+    done = []
+
+    def progress(result):
+        done.append(result)
+        if len(done) % report_every == 0:
+            log(f"  {len(done)}/{requests_count}")
+
+    summary = run_bench(bench_target, prompts, requests_count, concurrency, rate, progress)
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    if as_json:
+        click.echo(json.dumps(summary, ensure_ascii=False))
+    else:
+        def row(name, stats):
+            if not stats:
+                return f"  {name:<22} -"
+            return (f"  {name:<22} p50 {stats['p50']:.3f} s  p95 {stats['p95']:.3f} s  "
+                    f"p99 {stats['p99']:.3f} s  max {stats['max']:.3f} s")
+
+        click.echo(f"\nZapytania: {summary['completed']}/{summary['requests']} "
+                   f"(błędy: {summary['errors']}, {summary['error_rate'] * 100:.1f}%) w {summary['duration_seconds']} s")
+        if summary["errors_by_type"]:
+            click.echo(f"  Rodzaje błędów: {summary['errors_by_type']}")
+        click.echo(row("Czas odpowiedzi", summary["latency_seconds"]))
+        click.echo(row("Pierwszy token", summary["ttft_seconds"]))
+        click.echo(row("Narzut ponad Ollama", summary["overhead_seconds"]))
+        click.echo(f"  Przepustowość: {summary['requests_per_second']} zapytań/s, "
+                   f"{summary['tokens_per_second']} tokenów/s")
+
+    if baseline:
+        regressions = compare_to_baseline(summary, json.load(baseline), max_regression)
+        for regression in regressions:
+            click.echo(f"❌ Regresja {regression}", err=True)
+        if regressions:
+            sys.exit(1)
+
+
+@cli.command("fake-ollama")
+@click.option("--host", default="127.0.0.1", help="Adres, na którym nasłuchuje atrapa")
+@click.option("--port", default=11434, type=int, help="Port atrapy")
+@click.option("--model", "models", multiple=True, help="Dostępny model (można powtarzać; domyślnie zestaw przykładowy)")
+@click.option("--token-rate", default=50.0, type=float, help="Tokeny na sekundę na zapytanie (0 - bez opóźnienia)")
+@click.option("--latency", default=0.05, type=float, help="Średni czas przetwarzania promptu (s)")
+@click.option("--jitter", default=0.0, type=float, help="Rozrzut czasu dla rozkładu uniform (s)")
+@click.option("--distribution", type=click.Choice(DISTRIBUTIONS), default="fixed", help="Rozkład czasu przetwarzania promptu")
+@click.option("--response-tokens", default=32, type=int, help="Długość odpowiedzi w tokenach (ogranicza ją num_predict)")
+@click.option("--error-rate", default=0.0, type=float, help="Odsetek zapytań kończących się błędem (0.0-1.0)")
+@click.option("--error-status", default=500, type=int, help="Kod HTTP wstrzykiwanych błędów")
+@click.option("--load-delay", default=0.0, type=float, help="Czas ładowania modelu przy pierwszym użyciu (s)")
+@click.option("--max-parallel", default=0, type=int, help="Najwięcej równoczesnych generacji (0 - bez limitu)")
+@click.option("--seed", default=0, type=int, help="Ziarno losowości (opóźnienia i błędy)")
+def fake_ollama(host, port, models, token_rate, latency, jitter, distribution, response_tokens, error_rate,
+                error_status, load_delay, max_parallel, seed):
+    """
+    Uruchamia atrapę Ollama do testów obciążeniowych.
+
+    Odpowiada na /api/tags, /api/generate, /api/pull i /api/embed bez
+    prawdziwych modeli, z konfigurowalną prędkością generowania, opóźnieniami
+    i wstrzykiwanymi błędami.
+    """
+    overrides = {"models": {name if ":" in name else f"{name}:latest": 1_000_000_000 for name in models}} if models else {}
+    fake = FakeOllama(
+        host=host, port=port, token_rate=token_rate, latency=latency, latency_jitter=jitter,
+        latency_distribution=distribution, response_tokens=response_tokens, error_rate=error_rate,
+        error_status=error_status, load_delay=load_delay, max_parallel=max_parallel, seed=seed, **overrides
+    )
+    click.echo(f"Atrapa Ollama: http://{host}:{port} (Ctrl+C kończy)")
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        click.echo("\nZatrzymano atrapę")
+    click.echo(json.dumps(fake.stats(), ensure_ascii=False))
+
+
 def main():
     """Główna funkcja CLI."""
     try:
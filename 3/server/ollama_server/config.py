@@ -6,9 +6,14 @@ dostarczenie domyślnych ustawień.
 """
 
 import os
+import uuid
+import atexit
 import logging
+import threading
 from pathlib import Path
-from dotenv import load_dotenv, find_dotenv, set_key
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional
+from dotenv import load_dotenv, find_dotenv, set_key, dotenv_values
 
 # Konfiguracja logowania
 logging.basicConfig(
@@ -21,10 +26,29 @@ logger = logging.getLogger("ollama_server.config")
 DEFAULT_CONFIG = {
     "MODEL_NAME": "tinyllama:latest",
     "OLLAMA_URL": "http://localhost:11434",
+    "OLLAMA_SUPERVISE": False,
+    "OLLAMA_HEALTH_INTERVAL": 5.0,
     "SERVER_PORT": 5001,
     "TEMPERATURE": 0.7,
     "MAX_TOKENS": 1000,
     "DEBUG": False,
+    "MAX_CONCURRENCY": 2,
+    "MAX_QUEUE": 32,
+    "MAX_BATCH_QUEUE": 32,
+    "QUEUE_TIMEOUT": 30.0,
+    "BATCH_QUEUE_TIMEOUT": 300.0,
+    "BATCH_DIR": ".batches",
+    "KEEP_ALIVE": "30m",
+    "PRELOAD_MODELS": "",
+    "CHAT_MAX_SESSIONS": 1000,
+    "CHAT_SESSION_TTL": 1800.0,
+    "CONTEXT_WINDOW": 0,
+    "NUM_THREAD": 0,
+    "PROMPT_STRATEGY": "truncate_middle",
+    "EMBED_MODEL": "nomic-embed-text",
+    "EMBED_BATCH_SIZE": 32,
+    "EMBED_CACHE_DIR": ".embeddings",
+    "EMBED_CACHE_SIZE": 100000,
 }
 
 
@@ -60,10 +84,37 @@ def create_default_env(env_file):
         f.write("# Konfiguracja serwera\n")
         f.write(f"OLLAMA_URL=\"{DEFAULT_CONFIG['OLLAMA_URL']}\"\n")
         f.write(f"SERVER_PORT={DEFAULT_CONFIG['SERVER_PORT']}\n\n")
+        f.write("# Nadzór Ollama (OLLAMA_SUPERVISE=true - uruchamianie i ponowne uruchamianie `ollama serve`;\n")
+        f.write("# stan sprawdzany co OLLAMA_HEALTH_INTERVAL sekund)\n")
+        f.write(f"OLLAMA_SUPERVISE={str(DEFAULT_CONFIG['OLLAMA_SUPERVISE']).lower()}\n")
+        f.write(f"OLLAMA_HEALTH_INTERVAL={DEFAULT_CONFIG['OLLAMA_HEALTH_INTERVAL']}\n\n")
         f.write("# Parametry generowania\n")
         f.write(f"TEMPERATURE={DEFAULT_CONFIG['TEMPERATURE']}\n")
         f.write(f"MAX_TOKENS={DEFAULT_CONFIG['MAX_TOKENS']}\n")
-        f.write(f"DEBUG={str(DEFAULT_CONFIG['DEBUG']).lower()}\n")
+        f.write(f"DEBUG={str(DEFAULT_CONFIG['DEBUG']).lower()}\n\n")
+        f.write("# Kolejka zapytań (na model)\n")
+        f.write(f"MAX_CONCURRENCY={DEFAULT_CONFIG['MAX_CONCURRENCY']}\n")
+        f.write(f"MAX_QUEUE={DEFAULT_CONFIG['MAX_QUEUE']}\n")
+        f.write(f"MAX_BATCH_QUEUE={DEFAULT_CONFIG['MAX_BATCH_QUEUE']}\n")
+        f.write(f"QUEUE_TIMEOUT={DEFAULT_CONFIG['QUEUE_TIMEOUT']}\n")
+        f.write(f"BATCH_QUEUE_TIMEOUT={DEFAULT_CONFIG['BATCH_QUEUE_TIMEOUT']}\n\n")
+        f.write("# Utrzymanie modeli w pamięci (puste PRELOAD_MODELS - tylko MODEL_NAME)\n")
+        f.write(f"KEEP_ALIVE=\"{DEFAULT_CONFIG['KEEP_ALIVE']}\"\n")
+        f.write(f"PRELOAD_MODELS=\"{DEFAULT_CONFIG['PRELOAD_MODELS']}\"\n\n")
+        f.write("# Sesje rozmów /api/chat (liczba sesji i czas wygaśnięcia w sekundach)\n")
+        f.write(f"CHAT_MAX_SESSIONS={DEFAULT_CONFIG['CHAT_MAX_SESSIONS']}\n")
+        f.write(f"CHAT_SESSION_TTL={DEFAULT_CONFIG['CHAT_SESSION_TTL']}\n\n")
+        f.write("# Budżet tokenów promptu (CONTEXT_WINDOW=0 - okno ustalane dla modelu;\n")
+        f.write("# PROMPT_STRATEGY: reject, truncate_head, truncate_middle, summarize)\n")
+        f.write(f"CONTEXT_WINDOW={DEFAULT_CONFIG['CONTEXT_WINDOW']}\n")
+        f.write(f"PROMPT_STRATEGY=\"{DEFAULT_CONFIG['PROMPT_STRATEGY']}\"\n\n")
+        f.write("# Wątki CPU na generowanie (NUM_THREAD=0 - ustala Ollama; wartości dobiera ollama-server autotune)\n")
+        f.write(f"NUM_THREAD={DEFAULT_CONFIG['NUM_THREAD']}\n\n")
+        f.write("# Embeddingi (EMBED_CACHE_SIZE=0 - bez pamięci podręcznej na dysku)\n")
+        f.write(f"EMBED_MODEL=\"{DEFAULT_CONFIG['EMBED_MODEL']}\"\n")
+        f.write(f"EMBED_BATCH_SIZE={DEFAULT_CONFIG['EMBED_BATCH_SIZE']}\n")
+        f.write(f"EMBED_CACHE_DIR=\"{DEFAULT_CONFIG['EMBED_CACHE_DIR']}\"\n")
+        f.write(f"EMBED_CACHE_SIZE={DEFAULT_CONFIG['EMBED_CACHE_SIZE']}\n")
 
 
 def update_env_var(key, value, env_file=None):
@@ -82,19 +133,347 @@ def load_config(env_path=None):
     env_file = find_or_create_env(env_path)
     logger.info(f"Ładowanie konfiguracji z: {env_file}")
     load_dotenv(env_file, override=True)
+    return parse_config(os.environ)
+
+
+def parse_config(values: Mapping[str, str]) -> Dict[str, Any]:
+    """
+    Zamienia wartości tekstowe (zmienne środowiskowe lub plik .env) na konfigurację.
+
+    Args:
+        values: Wartości tekstowe; brakujące klucze przyjmują wartości domyślne.
+
+    Returns:
+        Słownik konfiguracji z wartościami odpowiednich typów.
+    """
+    def get(key, default):
+        value = values.get(key)
+        return default if value is None else value
 
     config = {
-        "MODEL_NAME": os.getenv("MODEL_NAME", DEFAULT_CONFIG["MODEL_NAME"]),
-        "OLLAMA_URL": os.getenv("OLLAMA_URL", DEFAULT_CONFIG["OLLAMA_URL"]),
-        "SERVER_PORT": int(os.getenv("SERVER_PORT", DEFAULT_CONFIG["SERVER_PORT"])),
-        "TEMPERATURE": float(os.getenv("TEMPERATURE", DEFAULT_CONFIG["TEMPERATURE"])),
-        "MAX_TOKENS": int(os.getenv("MAX_TOKENS", DEFAULT_CONFIG["MAX_TOKENS"])),
-        "DEBUG": os.getenv("DEBUG", str(DEFAULT_CONFIG["DEBUG"])).lower() in ("true", "1", "t"),
+        "MODEL_NAME": get("MODEL_NAME", DEFAULT_CONFIG["MODEL_NAME"]),
+        "OLLAMA_URL": get("OLLAMA_URL", DEFAULT_CONFIG["OLLAMA_URL"]),
+        "OLLAMA_SUPERVISE": get("OLLAMA_SUPERVISE", str(DEFAULT_CONFIG["OLLAMA_SUPERVISE"])).lower() in ("true", "1", "t"),
+        "OLLAMA_HEALTH_INTERVAL": float(get("OLLAMA_HEALTH_INTERVAL", DEFAULT_CONFIG["OLLAMA_HEALTH_INTERVAL"])),
+        "SERVER_PORT": int(get("SERVER_PORT", DEFAULT_CONFIG["SERVER_PORT"])),
+        "TEMPERATURE": float(get("TEMPERATURE", DEFAULT_CONFIG["TEMPERATURE"])),
+        "MAX_TOKENS": int(get("MAX_TOKENS", DEFAULT_CONFIG["MAX_TOKENS"])),
+        "DEBUG": get("DEBUG", str(DEFAULT_CONFIG["DEBUG"])).lower() in ("true", "1", "t"),
+        "MAX_CONCURRENCY": int(get("MAX_CONCURRENCY", DEFAULT_CONFIG["MAX_CONCURRENCY"])),
+        "MAX_QUEUE": int(get("MAX_QUEUE", DEFAULT_CONFIG["MAX_QUEUE"])),
+        "MAX_BATCH_QUEUE": int(get("MAX_BATCH_QUEUE", DEFAULT_CONFIG["MAX_BATCH_QUEUE"])),
+        "QUEUE_TIMEOUT": float(get("QUEUE_TIMEOUT", DEFAULT_CONFIG["QUEUE_TIMEOUT"])),
+        "BATCH_QUEUE_TIMEOUT": float(get("BATCH_QUEUE_TIMEOUT", DEFAULT_CONFIG["BATCH_QUEUE_TIMEOUT"])),
+        "BATCH_DIR": get("BATCH_DIR", DEFAULT_CONFIG["BATCH_DIR"]),
+        "KEEP_ALIVE": get("KEEP_ALIVE", DEFAULT_CONFIG["KEEP_ALIVE"]),
+        "PRELOAD_MODELS": get("PRELOAD_MODELS", DEFAULT_CONFIG["PRELOAD_MODELS"]),
+        "CHAT_MAX_SESSIONS": int(get("CHAT_MAX_SESSIONS", DEFAULT_CONFIG["CHAT_MAX_SESSIONS"])),
+        "CHAT_SESSION_TTL": float(get("CHAT_SESSION_TTL", DEFAULT_CONFIG["CHAT_SESSION_TTL"])),
+        "CONTEXT_WINDOW": int(get("CONTEXT_WINDOW", DEFAULT_CONFIG["CONTEXT_WINDOW"])),
+        "PROMPT_STRATEGY": get("PROMPT_STRATEGY", DEFAULT_CONFIG["PROMPT_STRATEGY"]),
+        "NUM_THREAD": int(get("NUM_THREAD", DEFAULT_CONFIG["NUM_THREAD"])),
+        "EMBED_MODEL": get("EMBED_MODEL", DEFAULT_CONFIG["EMBED_MODEL"]),
+        "EMBED_BATCH_SIZE": int(get("EMBED_BATCH_SIZE", DEFAULT_CONFIG["EMBED_BATCH_SIZE"])),
+        "EMBED_CACHE_DIR": get("EMBED_CACHE_DIR", DEFAULT_CONFIG["EMBED_CACHE_DIR"]),
+        "EMBED_CACHE_SIZE": int(get("EMBED_CACHE_SIZE", DEFAULT_CONFIG["EMBED_CACHE_SIZE"])),
     }
 
     return config
 
 
+# Klucze czytane przy każdym zapytaniu - ich zmiana w .env działa bez ponownego uruchomienia
+RELOADABLE_KEYS = frozenset({
+    "MODEL_NAME", "TEMPERATURE", "MAX_TOKENS", "CONTEXT_WINDOW", "NUM_THREAD", "PROMPT_STRATEGY", "EMBED_MODEL",
+    "BATCH_DIR",
+})
+
+
+def format_env_value(value: Any) -> str:
+    """Zwraca wartość w zapisie pliku .env (teksty w cudzysłowie, wartości logiczne małymi literami)."""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, str):
+        return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return str(value)
+
+
+def write_env_values(env_file: str, values: Mapping[str, Any]) -> None:
+    """
+    Zapisuje wartości w pliku .env jednym atomowym zastąpieniem pliku.
+
+    Istniejące linie KLUCZ=... są podmieniane, brakujące klucze dopisywane
+    na końcu; komentarze i pozostałe linie zostają bez zmian.
+
+    Args:
+        env_file: Ścieżka do pliku .env.
+        values: Klucze i wartości do zapisania.
+    """
+    lines = []
+    if os.path.exists(env_file):
+        with open(env_file, "r") as f:
+            lines = f.read().splitlines()
+
+    remaining = dict(values)
+    for i, line in enumerate(lines):
+        key = line.split("=", 1)[0].strip()
+        if key.startswith("export "):
+            key = key[len("export "):].strip()
+        if "=" in line and key in remaining:
+            lines[i] = f"{key}={format_env_value(remaining.pop(key))}"
+    lines.extend(f"{key}={format_env_value(value)}" for key, value in remaining.items())
+
+    directory = os.path.dirname(os.path.abspath(env_file))
+    # Plik tymczasowy z uprawnieniami zwykłego pliku (umask), a nie 0600 jak z tempfile.mkstemp
+    tmp_path = os.path.join(directory, f".env.{uuid.uuid4().hex[:12]}.tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        # Podmieniony plik zachowuje swoje uprawnienia
+        if os.path.exists(env_file):
+            os.chmod(tmp_path, os.stat(env_file).st_mode & 0o777)
+        os.replace(tmp_path, env_file)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Obserwowane pliki .env: ścieżka -> magazyn, którego wątek obserwuje plik (jeden wątek na plik)
+_watched_files: Dict[str, "ConfigStore"] = {}
+_watched_lock = threading.Lock()
+
+
+def _env_file_keys(env_file: Optional[str]) -> set:
+    """Zwraca klucze zapisane w pliku .env (pusty zbiór, jeśli pliku nie ma)."""
+    if not env_file or not os.path.exists(env_file):
+        return set()
+    return set(dotenv_values(env_file))
+
+
+class ConfigStore:
+    """
+    Konfiguracja w pamięci z atomową podmianą migawki.
+
+    Odczyt to pobranie referencji do niezmiennej migawki (bez blokady),
+    zmiana tworzy nową migawkę. Zmiany wprowadzone w trakcie działania są
+    zapisywane w pliku .env w tle, po krótkiej zwłoce (kilka zmian - jeden
+    zapis), a zmiany pliku .env wprowadzone z zewnątrz są wczytywane przez
+    wątek obserwujący plik, poza ścieżką obsługi zapytań.
+    """
+
+    def __init__(
+            self,
+            config: Mapping[str, Any],
+            env_file: Optional[str] = None,
+            debounce: float = 1.0,
+            poll_interval: float = 2.0,
+            on_change: Optional[Callable[[Mapping[str, Any], Iterable[str]], None]] = None
+    ):
+        """
+        Args:
+            config: Początkowa konfiguracja (np. z load_config()).
+            env_file: Plik .env do obserwowania i zapisu (None - tylko w pamięci).
+            debounce: Zwłoka (s) zapisu zmian w pliku.
+            poll_interval: Odstęp (s) sprawdzania zmian pliku.
+            on_change: Funkcja (migawka, zmienione klucze) wywoływana po każdej zmianie.
+        """
+        self.env_file = env_file
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.on_change = on_change
+        self._snapshot = MappingProxyType(dict(config))
+        self._pending: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._file_state = self._stat()
+        # Klucze ustawione w pliku przy ostatnim odczycie lub zapisie
+        self._file_keys = _env_file_keys(env_file)
+        self.reloads = 0
+        self.writes = 0
+
+    def snapshot(self) -> Mapping[str, Any]:
+        """Zwraca bieżącą, niezmienną migawkę konfiguracji."""
+        return self._snapshot
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Zwraca wartość z bieżącej migawki."""
+        return self._snapshot.get(key, default)
+
+    def _swap(self, values: Mapping[str, Any]) -> list:
+        """Tworzy nową migawkę z podanymi wartościami (z założoną blokadą); zwraca zmienione klucze."""
+        changed = [key for key, value in values.items() if self._snapshot.get(key) != value]
+        if changed:
+            self._snapshot = MappingProxyType({**self._snapshot, **values})
+        return changed
+
+    def _notify(self, snapshot: Mapping[str, Any], changed: list) -> None:
+        if changed and self.on_change:
+            try:
+                self.on_change(snapshot, changed)
+            except Exception as e:
+                logger.error(f"Błąd obsługi zmiany konfiguracji: {str(e)}")
+
+    def update(self, **values: Any) -> list:
+        """
+        Zmienia wartości w pamięci i planuje ich zapis w pliku .env.
+
+        Args:
+            **values: Klucze i nowe wartości.
+
+        Returns:
+            Lista zmienionych kluczy.
+        """
+        with self._lock:
+            changed = self._swap(values)
+            snapshot = self._snapshot
+            if changed and self.env_file:
+                self._pending.update({key: values[key] for key in changed})
+                # Kolejne zmiany w czasie zwłoki przesuwają zapis - jeden zapis dla serii zmian
+                if self._timer is not None:
+                    self._timer.cancel()
+                self._timer = threading.Timer(self.debounce, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        self._notify(snapshot, changed)
+        return changed
+
+    def flush(self) -> None:
+        """Zapisuje oczekujące zmiany w pliku .env (od razu)."""
+        with self._write_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending or not self.env_file:
+                return
+            try:
+                write_env_values(self.env_file, pending)
+                self.writes += 1
+                logger.info(f"Zapisano w {self.env_file}: {', '.join(sorted(pending))}")
+            except OSError as e:
+                logger.error(f"Nie można zapisać pliku {self.env_file}: {str(e)}")
+                with self._lock:
+                    # Nowsze zmiany mają pierwszeństwo przed tymi, których nie udało się zapisać
+                    self._pending = {**pending, **self._pending}
+                return
+            # Własny zapis nie jest traktowany jako zmiana z zewnątrz
+            with self._lock:
+                self._file_state = self._stat()
+                self._file_keys |= set(pending)
+
+    def _stat(self):
+        if not self.env_file:
+            return None
+        try:
+            stat = os.stat(self.env_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> list:
+        """
+        Wczytuje plik .env ponownie i podmienia migawkę.
+
+        Porównywana jest tylko zawartość pliku: klucz usunięty z pliku wraca do
+        wartości domyślnej, a klucze spoza pliku (np. ze zmiennych środowiskowych)
+        pozostają bez zmian. Zmiany oczekujące na zapis mają pierwszeństwo przed
+        wartościami z pliku.
+
+        Returns:
+            Lista zmienionych kluczy.
+        """
+        if not self.env_file:
+            return []
+        state = self._stat()
+        try:
+            file_values = {key: value for key, value in dotenv_values(self.env_file).items() if value is not None}
+            values = parse_config(file_values)
+        except (OSError, ValueError) as e:
+            logger.error(f"Nieprawidłowy plik {self.env_file}, konfiguracja bez zmian: {str(e)}")
+            return []
+
+        with self._lock:
+            self._file_state = state
+            keys = set(file_values) | self._file_keys
+            self._file_keys = set(file_values)
+            values = {key: value for key, value in values.items() if key in keys and key not in self._pending}
+            changed = self._swap(values)
+            snapshot = self._snapshot
+            self.reloads += 1
+
+        if changed:
+            logger.info(f"Wczytano zmiany z {self.env_file}: {', '.join(sorted(changed))}")
+            restart = sorted(set(changed) - RELOADABLE_KEYS)
+            if restart:
+                logger.warning(f"Zmiana {', '.join(restart)} wymaga ponownego uruchomienia serwera")
+        self._notify(snapshot, changed)
+        return changed
+
+    def check(self) -> bool:
+        """Wczytuje plik .env, jeśli zmienił się od ostatniego odczytu lub zapisu."""
+        state = self._stat()
+        with self._lock:
+            modified = state is not None and state != self._file_state
+        if modified:
+            self.reload()
+        return modified
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def start(self) -> None:
+        """
+        Uruchamia wątek obserwujący plik .env.
+
+        Plik obserwuje jeden wątek w procesie: magazyn uruchomiony później dla tego
+        samego pliku (np. kolejne create_app) przejmuje obserwację od poprzedniego.
+        """
+        if not self.env_file or self._watcher is not None:
+            return
+        path = os.path.realpath(self.env_file)
+        with _watched_lock:
+            previous = _watched_files.get(path)
+            _watched_files[path] = self
+        if previous is not None and previous is not self:
+            logger.info(f"Przejęcie obserwacji pliku {self.env_file}")
+            previous.stop()
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+        # Zmiany oczekujące na zapis nie giną przy zamknięciu serwera
+        atexit.register(self.flush)
+
+    def stop(self) -> None:
+        """Zatrzymuje obserwację pliku i zapisuje oczekujące zmiany."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(self.poll_interval + 1)
+            self._watcher = None
+            atexit.unregister(self.flush)
+            with _watched_lock:
+                path = os.path.realpath(self.env_file)
+                if _watched_files.get(path) is self:
+                    del _watched_files[path]
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """Zwraca plik konfiguracji, liczbę wczytań i zapisów oraz oczekujące zmiany."""
+        with self._lock:
+            return {
+                "env_file": self.env_file,
+                "reloads": self.reloads,
+                "writes": self.writes,
+                "pending": sorted(self._pending),
+            }
+
+
 if __name__ == "__main__":
     # Jeśli uruchomiony bezpośrednio, wyświetl bieżącą konfigurację
     config = load_config()
@@ -0,0 +1,216 @@
+"""
+Moduł embeddingów Ollama.
+
+Teksty są deduplikowane, wyszukiwane w pamięci podręcznej na dysku
+i dopiero brakujące wektory są liczone przez Ollama, w paczkach po
+kilkadziesiąt tekstów. Wektory są zapisywane jako float32 (4 bajty na
+wymiar) w osobnych plikach, a po przekroczeniu limitu usuwane są
+najdawniej używane.
+"""
+
+import os
+import hashlib
+import logging
+import tempfile
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+# Konfiguracja logowania
+logger = logging.getLogger("ollama_server.embeddings")
+
+# Rozszerzenie plików z wektorami
+VECTOR_SUFFIX = ".f32"
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Zwraca klucz wektora w pamięci podręcznej (skrót SHA-256 modelu i tekstu)."""
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Pamięć podręczna wektorów na dysku z usuwaniem najdawniej używanych (LRU).
+
+    Każdy wektor to plik <katalog>/<2 znaki klucza>/<klucz>.f32 z surowymi
+    wartościami float32. Kolejność LRU jest odtwarzana przy starcie na
+    podstawie czasu modyfikacji plików, który jest aktualizowany przy odczycie.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 100000):
+        """
+        Args:
+            directory: Katalog pamięci podręcznej.
+            max_entries: Maksymalna liczba przechowywanych wektorów.
+        """
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+        self._entries: Dict[str, int] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._load_index()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + VECTOR_SUFFIX)
+
+    def _load_index(self) -> None:
+        """Odczytuje istniejące wektory z dysku (od najdawniej używanego)."""
+        found = []
+        if os.path.isdir(self.directory):
+            for root, _, files in os.walk(self.directory):
+                for name in files:
+                    if name.endswith(VECTOR_SUFFIX):
+                        stat = os.stat(os.path.join(root, name))
+                        found.append((stat.st_mtime, name[:-len(VECTOR_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+        self._evict()
+        if found:
+            logger.info(f"Pamięć podręczna embeddingów: {len(self._entries)} wektorów w {self.directory}")
+
+    def _evict(self) -> None:
+        """Usuwa najdawniej używane wektory ponad limit (z założoną blokadą)."""
+        while len(self._entries) > self.max_entries:
+            key, _ = self._entries.popitem(last=False)
+            self.evicted += 1
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[array]:
+        """
+        Zwraca wektor z pamięci podręcznej.
+
+        Args:
+            key: Klucz z cache_key().
+
+        Returns:
+            Wektor float32 lub None, jeśli go nie ma.
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        vector = array("f")
+        try:
+            with open(path, "rb") as f:
+                vector.frombytes(f.read())
+            # Czas modyfikacji zachowuje kolejność LRU po ponownym uruchomieniu
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self._entries.pop(key, None)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return vector
+
+    def put(self, key: str, vector: array) -> None:
+        """
+        Zapisuje wektor (atomowo - przez plik tymczasowy).
+
+        Args:
+            key: Klucz z cache_key().
+            vector: Wektor float32.
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                vector.tofile(f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Nie można zapisać wektora w pamięci podręcznej: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            self._entries[key] = len(vector) * vector.itemsize
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        """Zwraca liczbę wektorów, zajmowane bajty i skuteczność pamięci podręcznej."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": sum(self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evicted": self.evicted,
+            }
+
+
+class Embedder:
+    """Liczy embeddingi z deduplikacją, pamięcią podręczną i podziałem na paczki."""
+
+    def __init__(self, client, cache: Optional[EmbeddingCache] = None, batch_size: int = 32):
+        """
+        Args:
+            client: Klient Ollama (OllamaClient lub OllamaPool).
+            cache: Pamięć podręczna wektorów (None - bez pamięci podręcznej).
+            batch_size: Maksymalna liczba tekstów w jednym zapytaniu do Ollama.
+        """
+        self.client = client
+        self.cache = cache
+        self.batch_size = max(1, batch_size)
+
+    def embed(self, model_name: str, texts: List[str]) -> Tuple[List[List[float]], Dict[str, int]]:
+        """
+        Zwraca embeddingi tekstów.
+
+        Zgłasza requests.RequestException w przypadku błędu Ollama.
+
+        Args:
+            model_name: Nazwa modelu embeddingów.
+            texts: Teksty (mogą się powtarzać).
+
+        Returns:
+            Krotka (wektory w kolejności tekstów, liczniki: unique, cached, computed, batches).
+        """
+        # Każdy różny tekst jest liczony co najwyżej raz
+        unique = list(OrderedDict.fromkeys(texts))
+        vectors: Dict[str, array] = {}
+        missing = []
+        for text in unique:
+            vector = self.cache.get(cache_key(model_name, text)) if self.cache else None
+            if vector is None:
+                missing.append(text)
+            else:
+                vectors[text] = vector
+
+        batches = 0
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            results = self.client.embed(model_name, batch)
+            if len(results) != len(batch):
+                raise ValueError(f"Ollama zwróciła {len(results)} wektorów dla {len(batch)} tekstów")
+            batches += 1
+            for text, values in zip(batch, results):
+                vector = array("f", values)
+                vectors[text] = vector
+                if self.cache:
+                    self.cache.put(cache_key(model_name, text), vector)
+
+        stats = {
+            "unique": len(unique),
+            "cached": len(unique) - len(missing),
+            "computed": len(missing),
+            "batches": batches,
+        }
+        # Wektory są zwracane z precyzją float32 niezależnie od źródła
+        return [vectors[text].tolist() for text in texts], stats
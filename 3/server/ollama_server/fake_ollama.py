@@ -0,0 +1,516 @@
+"""
+Atrapa serwera Ollama do testów obciążeniowych i pomiarów wydajności.
+
+Odpowiada na /api/tags, /api/generate (strumieniowo i nie), /api/pull,
+/api/embed (oraz /api/embeddings, /api/show, /api/ps, /api/version)
+zgodnie ze schematem Ollama, bez prawdziwych modeli. Czas przetwarzania
+promptu (rozkład stały, jednostajny lub wykładniczy), prędkość generowania
+tokenów, opóźnienie ładowania modelu, liczba równoczesnych generacji
+i odsetek błędów są konfigurowalne, a treść odpowiedzi i losowość
+(ziarno `seed`) - deterministyczne.
+
+Użycie:
+    with FakeOllama(token_rate=100, latency=0.05) as fake:
+        client = OllamaClient(fake.url)
+
+    ollama-server fake-ollama --port 11434 --token-rate 30 --error-rate 0.01
+"""
+
+import json
+import time
+import socket
+import random
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field, fields
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+
+# Konfiguracja logowania
+logger = logging.getLogger("ollama_server.fake_ollama")
+
+# Modele dostępne w atrapie (nazwa -> rozmiar w bajtach)
+DEFAULT_MODELS = {
+    "tinyllama:latest": 637_700_000,
+    "phi3:latest": 2_200_000_000,
+    "nomic-embed-text:latest": 274_000_000,
+}
+
+# Rozkłady czasu przetwarzania promptu
+DISTRIBUTIONS = ("fixed", "uniform", "exponential")
+
+# Słowa, z których składane są odpowiedzi (jeden token = jedno słowo ze spacją)
+WORDS = ("Ollama", "odpowiada", "na", "pytanie", "krótko", "i", "rzeczowo", "bez", "zbędnych", "słów.")
+
+# Rozmiar pobieranego modelu, gdy nie jest znany
+PULL_MODEL_SIZE = 1_000_000_000
+PULL_STEPS = 10
+
+
+@dataclass
+class FakeOllamaSettings:
+    """Ustawienia atrapy (można je zmieniać w trakcie działania)."""
+
+    models: Dict[str, int] = field(default_factory=lambda: dict(DEFAULT_MODELS))
+    token_rate: float = 50.0
+    latency: float = 0.05
+    latency_jitter: float = 0.0
+    latency_distribution: str = "fixed"
+    response_tokens: int = 32
+    error_rate: float = 0.0
+    error_status: int = 500
+    load_delay: float = 0.0
+    max_parallel: int = 0
+    pull_delay: float = 0.0
+    embed_dimensions: int = 8
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.latency_distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Nieznany rozkład '{self.latency_distribution}'. Dostępne: {', '.join(DISTRIBUTIONS)}")
+        if not 0.0 <= self.error_rate <= 1.0:
+            raise ValueError("error_rate musi być z zakresu 0.0-1.0")
+
+
+def _token(i: int) -> str:
+    return f"{WORDS[i % len(WORDS)]} "
+
+
+def response_text(tokens: int) -> str:
+    """Zwraca odpowiedź atrapy o podanej liczbie tokenów (do porównań w testach)."""
+    return "".join(_token(i) for i in range(tokens))
+
+
+def embedding(text: str, dimensions: int) -> list:
+    """Zwraca deterministyczny wektor embeddingu tekstu (wartości z zakresu -1..1)."""
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return [round(digest[i % len(digest)] / 127.5 - 1.0, 6) for i in range(dimensions)]
+
+
+def _normalize(name: str) -> str:
+    return name if ":" in name else f"{name}:latest"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Obsługa zapytań HTTP atrapy (stan w self.server.fake)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    # Odpowiedzi
+
+    def _send_json(self, payload: Any, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_stream(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_line(self, payload: Dict[str, Any]) -> None:
+        data = (json.dumps(payload) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def _end_stream(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _read_json(self) -> Optional[Dict[str, Any]]:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, 400)
+            return None
+        if not isinstance(data, dict):
+            self._send_json({"error": "expected JSON object"}, 400)
+            return None
+        return data
+
+    # Trasy
+
+    def do_HEAD(self):
+        self.server.fake.count("HEAD /")
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        fake = self.server.fake
+        fake.count(f"GET {self.path}")
+        if self.path == "/":
+            body = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path == "/api/tags":
+            self._send_json({"models": fake.list_models()})
+        elif self.path == "/api/ps":
+            self._send_json({"models": fake.loaded_models()})
+        elif self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        fake = self.server.fake
+        fake.count(f"POST {self.path}")
+        routes = {
+            "/api/generate": self._generate,
+            "/api/pull": self._pull,
+            "/api/embed": self._embed,
+            "/api/embeddings": self._embeddings,
+            "/api/show": self._show,
+        }
+        route = routes.get(self.path)
+        if route is None:
+            self._send_json({"error": "not found"}, 404)
+            return
+        data = self._read_json()
+        if data is not None:
+            route(data)
+
+    def _check_model(self, data: Dict[str, Any]) -> Optional[str]:
+        """Zwraca nazwę modelu lub wysyła błąd (brak modelu, wstrzyknięty błąd)."""
+        fake = self.server.fake
+        name = data.get("model") or data.get("name") or ""
+        if _normalize(name) not in fake.settings.models:
+            self._send_json({"error": f"model '{name}' not found, try pulling it first"}, 404)
+            return None
+        if fake.inject_error():
+            self._send_json({"error": "fake ollama: injected error"}, fake.settings.error_status)
+            return None
+        return _normalize(name)
+
+    def _generate(self, data: Dict[str, Any]) -> None:
+        fake = self.server.fake
+        model = self._check_model(data)
+        if model is None:
+            return
+
+        settings = fake.settings
+        options = data.get("options") or {}
+        limit = options.get("num_predict")
+        tokens = min(settings.response_tokens, limit) if isinstance(limit, int) and limit > 0 \
+            else settings.response_tokens
+        prompt = data.get("prompt") or ""
+        stream = data.get("stream", True)
+
+        started = time.perf_counter()
+        with fake.generation_slot():
+            load_seconds = fake.load(model)
+            prompt_seconds = fake.prompt_latency()
+            time.sleep(prompt_seconds)
+            token_seconds = 1.0 / settings.token_rate if settings.token_rate > 0 else 0.0
+
+            if stream:
+                self._start_stream()
+                for i in range(tokens):
+                    time.sleep(token_seconds)
+                    self._write_line({"model": model, "created_at": fake.now(),
+                                      "response": _token(i), "done": False})
+            else:
+                time.sleep(token_seconds * tokens)
+        fake.add_tokens(tokens)
+
+        total = time.perf_counter() - started
+        summary = {
+            "model": model,
+            "created_at": fake.now(),
+            "response": "" if stream else response_text(tokens),
+            "done": True,
+            "done_reason": "length" if tokens == limit else "stop",
+            "context": list(range(min(tokens, 16))),
+            "total_duration": int(total * 1e9),
+            "load_duration": int(load_seconds * 1e9),
+            "prompt_eval_count": len(prompt.split()),
+            "prompt_eval_duration": int(prompt_seconds * 1e9),
+            "eval_count": tokens,
+            "eval_duration": int(token_seconds * tokens * 1e9),
+        }
+        if stream:
+            self._write_line(summary)
+            self._end_stream()
+        else:
+            self._send_json(summary)
+
+    def _pull(self, data: Dict[str, Any]) -> None:
+        fake = self.server.fake
+        name = _normalize(data.get("model") or data.get("name") or "")
+        if fake.inject_error():
+            self._send_json({"error": "fake ollama: injected error"}, fake.settings.error_status)
+            return
+        size = fake.settings.models.get(name, PULL_MODEL_SIZE)
+        stream = data.get("stream", True)
+        digest = "sha256:" + hashlib.sha256(name.encode("utf-8")).hexdigest()
+
+        if stream:
+            self._start_stream()
+            self._write_line({"status": "pulling manifest"})
+        for step in range(1, PULL_STEPS + 1):
+            time.sleep(fake.settings.pull_delay / PULL_STEPS)
+            if stream:
+                self._write_line({"status": f"pulling {digest[7:19]}", "digest": digest,
+                                  "total": size, "completed": size * step // PULL_STEPS})
+        fake.add_model(name, size)
+        if stream:
+            for status in ("verifying sha256 digest", "writing manifest", "success"):
+                self._write_line({"status": status})
+            self._end_stream()
+        else:
+            self._send_json({"status": "success"})
+
+    def _embed(self, data: Dict[str, Any]) -> None:
+        fake = self.server.fake
+        model = self._check_model(data)
+        if model is None:
+            return
+        texts = data.get("input")
+        texts = [texts] if isinstance(texts, str) else list(texts or [])
+        load_seconds = fake.load(model)
+        dimensions = fake.settings.embed_dimensions
+        self._send_json({
+            "model": model,
+            "embeddings": [embedding(text, dimensions) for text in texts],
+            "load_duration": int(load_seconds * 1e9),
+        })
+
+    def _embeddings(self, data: Dict[str, Any]) -> None:
+        fake = self.server.fake
+        model = self._check_model(data)
+        if model is None:
+            return
+        fake.load(model)
+        self._send_json({"embedding": embedding(data.get("prompt") or "", fake.settings.embed_dimensions)})
+
+    def _show(self, data: Dict[str, Any]) -> None:
+        fake = self.server.fake
+        name = _normalize(data.get("model") or data.get("name") or "")
+        if name not in fake.settings.models:
+            self._send_json({"error": f"model '{name}' not found"}, 404)
+            return
+        self._send_json({
+            "parameters": "",
+            "details": {"format": "gguf", "family": "llama"},
+            "model_info": {
+                "general.architecture": "llama",
+                "llama.block_count": 22,
+                "llama.attention.head_count": 32,
+                "llama.attention.head_count_kv": 4,
+                "llama.embedding_length": 2048,
+                "llama.context_length": 2048,
+            },
+        })
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Domyślna kolejka gniazda (5) przepełnia się przy równoczesnych połączeniach,
+    # a odrzucony SYN jest ponawiany dopiero po sekundzie
+    request_queue_size = 128
+
+    def get_request(self):
+        connection, address = super().get_request()
+        # Bez algorytmu Nagle'a - krótkie fragmenty strumienia nie czekają na potwierdzenia
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return connection, address
+
+
+class FakeOllama:
+    """Atrapa serwera Ollama działająca w wątku w tle."""
+
+    def __init__(self, settings: Optional[FakeOllamaSettings] = None, host: str = "127.0.0.1", port: int = 0,
+                 **overrides):
+        """
+        Args:
+            settings: Ustawienia atrapy (domyślnie FakeOllamaSettings()).
+            host: Adres nasłuchiwania.
+            port: Port (0 - dowolny wolny).
+            **overrides: Pojedyncze ustawienia zastępujące `settings` (np. token_rate=100).
+        """
+        values = {f.name: getattr(settings, f.name) for f in fields(FakeOllamaSettings)} if settings else {}
+        values.update(overrides)
+        self.settings = FakeOllamaSettings(**values)
+        self.host = host
+        self.port = port
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+        self._random = random.Random(self.settings.seed)
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._loaded: Dict[str, float] = {}
+        self._parallel = threading.BoundedSemaphore(self.settings.max_parallel) if self.settings.max_parallel else None
+        self._stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {"requests": {}, "errors_injected": 0, "loads": 0, "tokens": 0, "active": 0, "max_active": 0}
+
+    @property
+    def url(self) -> str:
+        """Adres atrapy (po uruchomieniu)."""
+        return f"http://{self.host}:{self.port}"
+
+    def _bind(self) -> None:
+        self._server = _Server((self.host, self.port), _Handler)
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+
+    def start(self) -> "FakeOllama":
+        """Uruchamia atrapę w wątku w tle."""
+        self._bind()
+        # Krótki interwał - stop() nie czeka domyślnych 0.5 s
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        name="fake-ollama", daemon=True)
+        self._thread.start()
+        logger.info(f"Atrapa Ollama działa pod adresem {self.url}")
+        return self
+
+    def serve_forever(self) -> None:
+        """Uruchamia atrapę w bieżącym wątku (do zatrzymania przez Ctrl+C)."""
+        self._bind()
+        logger.info(f"Atrapa Ollama działa pod adresem {self.url}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        """Zatrzymuje atrapę."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    # Stan używany przez obsługę zapytań
+
+    @staticmethod
+    def now() -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def count(self, route: str) -> None:
+        with self._lock:
+            self._stats["requests"][route] = self._stats["requests"].get(route, 0) + 1
+
+    def inject_error(self) -> bool:
+        """Losuje (deterministycznie) wstrzyknięcie błędu."""
+        with self._lock:
+            failed = self.settings.error_rate > 0 and self._random.random() < self.settings.error_rate
+            if failed:
+                self._stats["errors_injected"] += 1
+        return failed
+
+    def prompt_latency(self) -> float:
+        """Losuje czas przetwarzania promptu według ustawionego rozkładu."""
+        settings = self.settings
+        with self._lock:
+            if settings.latency_distribution == "uniform":
+                value = self._random.uniform(settings.latency - settings.latency_jitter,
+                                             settings.latency + settings.latency_jitter)
+            elif settings.latency_distribution == "exponential" and settings.latency > 0:
+                value = self._random.expovariate(1.0 / settings.latency)
+            else:
+                value = settings.latency
+        return max(0.0, value)
+
+    def load(self, model: str) -> float:
+        """Ładuje model przy pierwszym użyciu (opóźnienie load_delay); zwraca czas ładowania."""
+        with self._lock:
+            if model in self._loaded:
+                return 0.0
+            model_lock = self._load_locks.setdefault(model, threading.Lock())
+        with model_lock:
+            with self._lock:
+                if model in self._loaded:
+                    return 0.0
+            time.sleep(self.settings.load_delay)
+            with self._lock:
+                self._loaded[model] = time.time()
+                self._stats["loads"] += 1
+        return self.settings.load_delay
+
+    def unload(self, model: Optional[str] = None) -> None:
+        """Usuwa model (lub wszystkie) z pamięci - kolejne użycie znów czeka load_delay."""
+        with self._lock:
+            if model is None:
+                self._loaded.clear()
+            else:
+                self._loaded.pop(_normalize(model), None)
+
+    def generation_slot(self):
+        """Kontekst jednej generacji (kolejka przy max_parallel, licznik aktywnych)."""
+        fake = self
+
+        class _Slot:
+            def __enter__(self):
+                if fake._parallel is not None:
+                    fake._parallel.acquire()
+                with fake._lock:
+                    fake._stats["active"] += 1
+                    fake._stats["max_active"] = max(fake._stats["max_active"], fake._stats["active"])
+
+            def __exit__(self, *exc_info):
+                with fake._lock:
+                    fake._stats["active"] -= 1
+                if fake._parallel is not None:
+                    fake._parallel.release()
+
+        return _Slot()
+
+    def add_tokens(self, tokens: int) -> None:
+        with self._lock:
+            self._stats["tokens"] += tokens
+
+    def add_model(self, name: str, size: int) -> None:
+        with self._lock:
+            self.settings.models[name] = size
+
+    def list_models(self) -> list:
+        return [{"name": name, "model": name, "size": size, "modified_at": "2024-01-01T00:00:00Z",
+                 "digest": hashlib.sha256(name.encode("utf-8")).hexdigest()}
+                for name, size in sorted(self.settings.models.items())]
+
+    def loaded_models(self) -> list:
+        with self._lock:
+            loaded = list(self._loaded)
+        return [{"name": name, "model": name, "size": self.settings.models.get(name, 0)} for name in loaded]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Zwraca statystyki atrapy.
+
+        Returns:
+            dict: requests (liczba zapytań według trasy), errors_injected, loads,
+            tokens, active i max_active (najwięcej równoczesnych generacji).
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["requests"] = dict(self._stats["requests"])
+        return stats
+
+    def reset_stats(self) -> None:
+        """Zeruje statystyki (stan załadowanych modeli pozostaje)."""
+        with self._lock:
+            active = self._stats["active"]
+            self._stats = self._empty_stats()
+            self._stats["active"] = active
@@ -0,0 +1,191 @@
+"""
+Moduł zarządzania cyklem życia modeli Ollama.
+
+Odpowiada za wstępne ładowanie modeli przy starcie serwera, rozgrzewanie
+modelu po przełączeniu lub pobraniu oraz śledzenie, które modele są
+załadowane do pamięci i ile trwało ich ładowanie.
+"""
+
+import time
+import logging
+import threading
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import requests
+
+from .balancer import normalize_model_name
+
+# Konfiguracja logowania
+logger = logging.getLogger("ollama_server.lifecycle")
+
+# Stany modelu
+STATE_UNLOADED = "unloaded"
+STATE_LOADING = "loading"
+STATE_LOADED = "loaded"
+STATE_ERROR = "error"
+
+
+def parse_model_list(value: str) -> List[str]:
+    """Zamienia listę modeli oddzielonych przecinkami na listę nazw."""
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class ModelManager:
+    """
+    Śledzi stan załadowania modeli i ładuje je w tle.
+
+    Ładowanie tego samego modelu nie jest uruchamiane ponownie, dopóki
+    poprzednie się nie zakończy. Zapamiętuje też, czy model jest pobrany
+    do Ollama, aby zapytania nie odpytywały /api/tags za każdym razem.
+    """
+
+    def __init__(self, client, availability_ttl: float = 5.0):
+        """
+        Args:
+            client: Klient Ollama (OllamaClient lub OllamaPool).
+            availability_ttl: Czas (s), przez który zapamiętana dostępność modelu jest aktualna.
+        """
+        self.client = client
+        self.availability_ttl = availability_ttl
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._availability: Dict[str, Tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, model_name: str) -> Dict[str, Any]:
+        name = normalize_model_name(model_name)
+        state = self._states.get(name)
+        if state is None:
+            state = self._states[name] = {
+                "state": STATE_UNLOADED, "load_seconds": None, "loaded_at": None, "error": None
+            }
+        return state
+
+    def load(self, model_name: str) -> Dict[str, Any]:
+        """
+        Ładuje model synchronicznie i zapisuje czas ładowania.
+
+        Args:
+            model_name: Nazwa modelu.
+
+        Returns:
+            Stan modelu po próbie załadowania.
+        """
+        with self._lock:
+            self._state(model_name).update(state=STATE_LOADING, error=None)
+
+        try:
+            seconds = self.client.load_model(model_name)
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Nie udało się załadować modelu {model_name}: {str(e)}")
+            with self._lock:
+                self._state(model_name).update(state=STATE_ERROR, error=str(e))
+                return dict(self._state(model_name))
+
+        logger.info(f"Model {model_name} załadowany w {seconds:.2f} s")
+        with self._lock:
+            self._state(model_name).update(state=STATE_LOADED, load_seconds=round(seconds, 3), loaded_at=time.time())
+            return dict(self._state(model_name))
+
+    def warm_up(self, model_name: str) -> bool:
+        """
+        Ładuje model w tle.
+
+        Args:
+            model_name: Nazwa modelu.
+
+        Returns:
+            bool: True jeśli rozpoczęto ładowanie, False jeśli model jest już ładowany.
+        """
+        with self._lock:
+            state = self._state(model_name)
+            if state["state"] == STATE_LOADING:
+                return False
+            state.update(state=STATE_LOADING, error=None)
+
+        threading.Thread(target=self.load, args=(model_name,), name=f"warm-up-{model_name}", daemon=True).start()
+        return True
+
+    def is_available(self, model_name: str) -> bool:
+        """
+        Sprawdza, czy model jest pobrany do Ollama.
+
+        Wynik jest zapamiętywany na availability_ttl sekund (odstęp sprawdzeń
+        nadzorcy Ollama); invalidate_availability() wymusza ponowne sprawdzenie.
+
+        Args:
+            model_name: Nazwa modelu (z tagiem lub bez).
+
+        Returns:
+            bool: True jeśli model jest dostępny.
+        """
+        base_name = model_name.split(":")[0]
+        with self._lock:
+            cached = self._availability.get(base_name)
+        if cached is not None and time.monotonic() - cached[1] < self.availability_ttl:
+            return cached[0]
+
+        available = self.client.check_model_availability(base_name)
+        with self._lock:
+            self._availability[base_name] = (available, time.monotonic())
+        return available
+
+    def invalidate_availability(self, model_name: Optional[str] = None) -> None:
+        """Usuwa zapamiętaną dostępność modelu (lub wszystkich modeli), np. po pobraniu albo błędzie 404."""
+        with self._lock:
+            if model_name is None:
+                self._availability.clear()
+            else:
+                self._availability.pop(model_name.split(":")[0], None)
+
+    def pulled(self, model_name: str) -> bool:
+        """
+        Obsługuje zakończone pobieranie modelu: odświeża jego dostępność i ładuje go w tle.
+
+        Returns:
+            bool: True jeśli rozpoczęto ładowanie.
+        """
+        self.invalidate_availability(model_name)
+        return self.warm_up(model_name)
+
+    def preload(self, model_names: Iterable[str]) -> None:
+        """Ładuje w tle wszystkie podane modele."""
+        for model_name in model_names:
+            logger.info(f"Wstępne ładowanie modelu: {model_name}")
+            self.warm_up(model_name)
+
+    def refresh(self) -> bool:
+        """
+        Aktualizuje stan modeli na podstawie /api/ps (modele zwolnione po keep_alive).
+
+        Returns:
+            bool: True jeśli udało się pobrać listę załadowanych modeli.
+        """
+        try:
+            loaded = {normalize_model_name(name) for name in self.client.loaded_models()}
+        except (requests.RequestException, ValueError) as e:
+            logger.debug(f"Nie można pobrać listy załadowanych modeli: {str(e)}")
+            return False
+
+        with self._lock:
+            for name, state in self._states.items():
+                if state["state"] == STATE_LOADED and name not in loaded:
+                    state["state"] = STATE_UNLOADED
+            for name in loaded:
+                state = self._state(name)
+                if state["state"] != STATE_LOADING:
+                    state["state"] = STATE_LOADED
+        return True
+
+    def status(self, model_name: str) -> Dict[str, Any]:
+        """
+        Zwraca stan modelu.
+
+        Args:
+            model_name: Nazwa modelu.
+
+        Returns:
+            Słownik z kluczami state (unloaded, loading, loaded, error),
+            load_seconds (ostatni zmierzony czas ładowania) i loaded_at.
+        """
+        with self._lock:
+            return dict(self._state(model_name))
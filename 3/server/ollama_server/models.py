@@ -6,50 +6,70 @@ oraz obsługę generowania odpowiedzi.
 """
 
 import json
+import time
 import logging
 import requests
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, List, Optional, Union, Any, Iterator, Callable
+
+from .options import GenerationOptions
 
 # Konfiguracja logowania
 logger = logging.getLogger("ollama_server.models")
 
 # Informacje o dostępnych modelach
 MODEL_INFO = {
-    "llama3": {"size": "8B", "description": "Ogólnego przeznaczenia, dobry do większości zadań"},
-    "phi3": {"size": "3.8B", "description": "Szybki, dobry do prostszych zadań, zoptymalizowany pod kątem kodu"},
-    "mistral": {"size": "7B", "description": "Ogólnego przeznaczenia, efektywny energetycznie"},
-    "gemma": {"size": "7B", "description": "Dobry do zadań języka naturalnego i kreatywnego pisania"},
-    "tinyllama": {"size": "1.1B", "description": "Bardzo szybki, idealny dla słabszych urządzeń"},
-    "qwen": {"size": "7B", "description": "Dobry w analizie tekstu, wsparcie dla języków azjatyckich"},
-    "llava": {"size": "7B", "description": "Multimodalny z obsługą obrazów"},
-    "codellama": {"size": "7B", "description": "Wyspecjalizowany model do kodowania"},
-    "vicuna": {"size": "7B", "description": "Wytrenowany na konwersacjach, dobry do dialogów"},
-    "falcon": {"size": "7B", "description": "Szybki i efektywny, dobry stosunek wydajności do rozmiaru"},
-    "orca-mini": {"size": "3B", "description": "Dobry do podstawowych zadań NLP"},
-    "wizardcoder": {"size": "13B", "description": "Stworzony do zadań związanych z kodem"},
-    "llama2": {"size": "7B", "description": "Sprawdzony w różnych zastosowaniach"},
-    "stablelm": {"size": "3B", "description": "Dobry do generowania tekstu i dialogów"},
-    "dolphin": {"size": "7B", "description": "Koncentruje się na naturalności dialogów"},
-    "neural-chat": {"size": "7B", "description": "Zoptymalizowany pod kątem urządzeń Intel"},
-    "starling": {"size": "7B", "description": "Mniejszy ale skuteczny"},
-    "openhermes": {"size": "7B", "description": "Dobra dokładność, postępowanie zgodnie z instrukcjami"},
-    "yi": {"size": "6B", "description": "Zaawansowany model wielojęzyczny"},
+    "llama3": {"size": "8B", "description": "Ogólnego przeznaczenia, dobry do większości zadań", "context": 8192},
+    "phi3": {"size": "3.8B", "description": "Szybki, dobry do prostszych zadań, zoptymalizowany pod kątem kodu", "context": 4096},
+    "mistral": {"size": "7B", "description": "Ogólnego przeznaczenia, efektywny energetycznie", "context": 32768},
+    "gemma": {"size": "7B", "description": "Dobry do zadań języka naturalnego i kreatywnego pisania", "context": 8192},
+    "tinyllama": {"size": "1.1B", "description": "Bardzo szybki, idealny dla słabszych urządzeń", "context": 2048},
+    "qwen": {"size": "7B", "description": "Dobry w analizie tekstu, wsparcie dla języków azjatyckich", "context": 32768},
+    "llava": {"size": "7B", "description": "Multimodalny z obsługą obrazów", "context": 4096},
+    "codellama": {"size": "7B", "description": "Wyspecjalizowany model do kodowania", "context": 16384},
+    "vicuna": {"size": "7B", "description": "Wytrenowany na konwersacjach, dobry do dialogów", "context": 2048},
+    "falcon": {"size": "7B", "description": "Szybki i efektywny, dobry stosunek wydajności do rozmiaru", "context": 2048},
+    "orca-mini": {"size": "3B", "description": "Dobry do podstawowych zadań NLP", "context": 2048},
+    "wizardcoder": {"size": "13B", "description": "Stworzony do zadań związanych z kodem", "context": 16384},
+    "llama2": {"size": "7B", "description": "Sprawdzony w różnych zastosowaniach", "context": 4096},
+    "stablelm": {"size": "3B", "description": "Dobry do generowania tekstu i dialogów", "context": 4096},
+    "dolphin": {"size": "7B", "description": "Koncentruje się na naturalności dialogów", "context": 16384},
+    "neural-chat": {"size": "7B", "description": "Zoptymalizowany pod kątem urządzeń Intel", "context": 8192},
+    "starling": {"size": "7B", "description": "Mniejszy ale skuteczny", "context": 8192},
+    "openhermes": {"size": "7B", "description": "Dobra dokładność, postępowanie zgodnie z instrukcjami", "context": 8192},
+    "yi": {"size": "6B", "description": "Zaawansowany model wielojęzyczny", "context": 4096},
 }
 
 
 class OllamaClient:
     """Klient do komunikacji z API Ollama."""
 
-    def __init__(self, base_url: str = "http://localhost:11434"):
+    def __init__(self, base_url: str = "http://localhost:11434", keep_alive: Optional[str] = None):
         """
         Inicjalizacja klienta Ollama.
 
         Args:
             base_url: Bazowy URL serwera Ollama.
+            keep_alive: Czas utrzymania modelu w pamięci po zapytaniu (np. "30m", "-1");
+                None - domyślne ustawienie serwera Ollama.
         """
         self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
         logger.info(f"Inicjalizacja klienta Ollama dla: {self.base_url}")
 
+    def _request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Wysyła zapytanie HTTP do serwera Ollama.
+
+        Args:
+            method: Metoda HTTP (head, get, post).
+            path: Ścieżka względem bazowego URL.
+            **kwargs: Dodatkowe argumenty przekazywane do requests.
+
+        Returns:
+            Odpowiedź serwera.
+        """
+        return getattr(requests, method)(f"{self.base_url}{path}", **kwargs)
+
     def check_availability(self) -> bool:
         """
         Sprawdza czy serwer Ollama jest dostępny.
@@ -58,7 +78,7 @@ class OllamaClient:
             bool: True jeśli serwer jest dostępny, False w przeciwnym razie.
         """
         try:
-            response = requests.head(f"{self.base_url}", timeout=2)
+            response = self._request("head", "", timeout=2)
             return response.status_code == 200
         except requests.RequestException as e:
             logger.error(f"Błąd podczas sprawdzania dostępności Ollama: {str(e)}")
@@ -72,15 +92,9 @@ class OllamaClient:
             Lista słowników zawierających informacje o modelach.
         """
         try:
-            response = requests.get(f"{self.base_url}/api/tags")
+            response = self._request("get", "/api/tags")
             if response.status_code == 200:
-                models = response.json().get("models", [])
-                # Wzbogać o informacje z MODEL_INFO
-                for model in models:
-                    name = model.get("name", "").split(":")[0]
-                    if name in MODEL_INFO:
-                        model["info"] = MODEL_INFO[name]
-                return models
+                return add_model_info(response.json().get("models", []))
             else:
                 logger.error(f"Błąd podczas pobierania listy modeli: {response.status_code}")
                 return []
@@ -104,6 +118,123 @@ class OllamaClient:
                 return True
         return False
 
+    def loaded_models(self) -> List[str]:
+        """
+        Pobiera listę modeli aktualnie załadowanych do pamięci (/api/ps).
+
+        W przeciwieństwie do pozostałych metod zgłasza requests.RequestException
+        w przypadku błędu, aby wywołujący mógł odróżnić brak modeli od awarii.
+
+        Returns:
+            Lista nazw załadowanych modeli.
+        """
+        response = self._request("get", "/api/ps", timeout=2)
+        response.raise_for_status()
+        return [model.get("name", "") for model in response.json().get("models", [])]
+
+    def show_model(self, model_name: str) -> Dict[str, Any]:
+        """
+        Pobiera szczegóły modelu (/api/show): parametry, architekturę, długość kontekstu.
+
+        Zgłasza requests.RequestException w przypadku błędu HTTP.
+
+        Args:
+            model_name: Nazwa modelu.
+
+        Returns:
+            Odpowiedź /api/show (m.in. "parameters" i "model_info").
+        """
+        response = self._request("post", "/api/show", json={"name": model_name}, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
+    def embed(self, model_name: str, texts: List[str]) -> List[List[float]]:
+        """
+        Liczy embeddingi wielu tekstów jednym zapytaniem (/api/embed).
+
+        Starsze wersje Ollama bez /api/embed są obsługiwane przez /api/embeddings
+        (jedno zapytanie na tekst). Zgłasza requests.RequestException w przypadku błędu.
+
+        Args:
+            model_name: Nazwa modelu embeddingów.
+            texts: Lista tekstów.
+
+        Returns:
+            Lista wektorów w kolejności tekstów.
+        """
+        payload = {"model": model_name, "input": texts}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        response = self._request("post", "/api/embed", json=payload)
+        if response.status_code == 404 and "json" not in response.headers.get("Content-Type", ""):
+            # Brak endpointu /api/embed (Ollama < 0.3); brak modelu to 404 z błędem w JSON
+            vectors = []
+            for text in texts:
+                response = self._request("post", "/api/embeddings", json={"model": model_name, "prompt": text})
+                response.raise_for_status()
+                vectors.append(response.json()["embedding"])
+            return vectors
+
+        response.raise_for_status()
+        return response.json()["embeddings"]
+
+    def load_model(self, model_name: str, keep_alive: Optional[str] = None) -> float:
+        """
+        Ładuje model do pamięci serwera Ollama (zapytanie z pustym promptem).
+
+        Zgłasza requests.RequestException w przypadku błędu.
+
+        Args:
+            model_name: Nazwa modelu do załadowania.
+            keep_alive: Czas utrzymania modelu w pamięci (domyślnie: ustawienie klienta).
+
+        Returns:
+            Czas ładowania modelu w sekundach.
+        """
+        payload = {"model": model_name, "prompt": "", "stream": False}
+        keep_alive = keep_alive if keep_alive is not None else self.keep_alive
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+
+        logger.info(f"Ładowanie modelu: {model_name}")
+        start = time.monotonic()
+        response = self._request("post", "/api/generate", json=payload)
+        response.raise_for_status()
+        # load_duration (ns) to czas samego ładowania; dla już załadowanego modelu jest bliski zeru
+        load_duration = response.json().get("load_duration")
+        return load_duration / 1e9 if load_duration is not None else time.monotonic() - start
+
+    def pull_model_stream(
+            self,
+            model_name: str,
+            read_timeout: Optional[float] = None,
+            opened: Optional[Callable[[requests.Response], Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Pobiera model, zwracając kolejne komunikaty postępu z /api/pull.
+
+        Zgłasza requests.RequestException w przypadku błędu HTTP. Zamknięcie
+        generatora przed końcem przerywa połączenie, a tym samym pobieranie.
+
+        Args:
+            model_name: Nazwa modelu do pobrania.
+            read_timeout: Maksymalny czas (s) oczekiwania na kolejne dane (domyślnie bez limitu).
+            opened: Funkcja wywoływana z odpowiedzią HTTP przed odczytem (np. aby móc ją przerwać).
+
+        Yields:
+            Słowniki postępu (status, digest, total, completed) lub {"error": ...}.
+        """
+        timeout = (10, read_timeout) if read_timeout else None
+        response = self._request("post", "/api/pull", json={"name": model_name}, stream=True, timeout=timeout)
+        if opened:
+            opened(response)
+        with response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
     def pull_model(self, model_name: str) -> bool:
         """
         Pobiera model z repozytorium Ollama.
@@ -116,31 +247,72 @@ class OllamaClient:
         """
         try:
             logger.info(f"Pobieranie modelu: {model_name}")
-            response = requests.post(
-                f"{self.base_url}/api/pull",
-                json={"name": model_name},
-                stream=True
-            )
-
-            if response.status_code == 200:
-                for line in response.iter_lines():
-                    if line:
-                        data = json.loads(line)
-                        logger.info(f"Postęp pobierania: {data.get('status', '')}")
-                return True
-            else:
-                logger.error(f"Błąd podczas pobierania modelu: {response.status_code}")
-                return False
+            for data in self.pull_model_stream(model_name):
+                if "error" in data:
+                    logger.error(f"Błąd podczas pobierania modelu: {data['error']}")
+                    return False
+                logger.info(f"Postęp pobierania: {data.get('status', '')}")
+            return True
         except requests.RequestException as e:
             logger.error(f"Wyjątek podczas pobierania modelu: {str(e)}")
             return False
 
+    def pull_targets(self) -> List["OllamaClient"]:
+        """
+        Zwraca klientów serwerów, na które należy pobrać model.
+
+        Returns:
+            Lista klientów (dla pojedynczego serwera - tylko ten klient).
+        """
+        return [self]
+
+    def generate_result(
+            self,
+            model_name: str,
+            prompt: str,
+            options: Optional[GenerationOptions] = None,
+            context: Optional[List[int]] = None
+    ) -> Dict[str, Any]:
+        """
+        Generuje odpowiedź i zwraca pełny wynik /api/generate.
+
+        Zgłasza requests.RequestException w przypadku błędu HTTP.
+
+        Args:
+            model_name: Nazwa modelu do użycia.
+            prompt: Prompt/zapytanie.
+            options: Parametry generowania (domyślnie: GenerationOptions()).
+            context: Tokeny kontekstu zwrócone przez poprzednie wywołanie (kontynuacja rozmowy).
+
+        Returns:
+            Odpowiedź Ollama (response, context, eval_count, eval_duration,
+            prompt_eval_count, prompt_eval_duration, load_duration, ...).
+        """
+        options = options or GenerationOptions()
+        logger.info(f"Generowanie odpowiedzi z modelem: {model_name}")
+        payload = {
+            "model": model_name,
+            "prompt": prompt,
+            "options": options.to_ollama(),
+            "stream": False
+        }
+        if context:
+            payload["context"] = list(context)
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+
+        response = self._request("post", "/api/generate", json=payload)
+        if response.status_code != 200:
+            raise requests.HTTPError(f"Błąd podczas generowania odpowiedzi: {response.status_code}", response=response)
+        return response.json()
+
     def generate(
             self,
             model_name: str,
             prompt: str,
             temperature: float = 0.7,
-            max_tokens: int = 1000
+            max_tokens: int = 1000,
+            options: Optional[GenerationOptions] = None
     ) -> str:
         """
         Generuje odpowiedź na podstawie promptu.
@@ -150,38 +322,54 @@ class OllamaClient:
             prompt: Prompt/zapytanie.
             temperature: Temperatura generowania (0.0-1.0).
             max_tokens: Maksymalna liczba tokenów do wygenerowania.
+            options: Pełne parametry generowania (zastępują temperature i max_tokens).
 
         Returns:
-            str: Wygenerowana odpowiedź.
+            str: Wygenerowana odpowiedź lub komunikat błędu zaczynający się od "Błąd:".
         """
+        options = options or GenerationOptions(temperature=temperature, max_tokens=max_tokens)
         try:
-            logger.info(f"Generowanie odpowiedzi z modelem: {model_name}")
-            payload = {
-                "model": model_name,
-                "prompt": prompt,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-                "stream": False
-            }
-
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json=payload
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "")
-            else:
-                error_msg = f"Błąd podczas generowania odpowiedzi: {response.status_code}"
-                logger.error(error_msg)
-                return f"Błąd: {error_msg}"
-        except requests.RequestException as e:
+            return self.generate_result(model_name, prompt, options).get("response", "")
+        except requests.HTTPError as e:
+            error_msg = f"Błąd podczas generowania odpowiedzi: {e.response.status_code}"
+            logger.error(error_msg)
+            return f"Błąd: {error_msg}"
+        except (requests.RequestException, ValueError) as e:
             error_msg = f"Wyjątek podczas generowania odpowiedzi: {str(e)}"
             logger.error(error_msg)
             return f"Błąd: {error_msg}"
 
 
+def is_error_response(response: str) -> bool:
+    """
+    Sprawdza, czy tekst zwrócony przez OllamaClient.generate jest komunikatem błędu.
+
+    Args:
+        response: Tekst zwrócony przez generate.
+
+    Returns:
+        bool: True dla komunikatów błędu ("Błąd: ...").
+    """
+    return response.startswith("Błąd:")
+
+
+def add_model_info(models: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Wzbogaca listę modeli o informacje z MODEL_INFO.
+
+    Args:
+        models: Lista modeli zwrócona przez /api/tags.
+
+    Returns:
+        Ta sama lista z kluczem "info" dla znanych modeli.
+    """
+    for model in models:
+        name = model.get("name", "").split(":")[0]
+        if name in MODEL_INFO:
+            model["info"] = MODEL_INFO[name]
+    return models
+
+
 def get_model_info(model_name: str) -> Dict[str, str]:
     """
     Pobiera informacje o modelu.
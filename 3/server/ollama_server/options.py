@@ -0,0 +1,108 @@
+"""
+Moduł parametrów generowania Ollama.
+
+Ollama ignoruje parametry generowania podane na najwyższym poziomie
+zapytania - muszą się znaleźć w obiekcie `options` (a limit długości
+odpowiedzi nazywa się tam `num_predict`). GenerationOptions zbiera
+parametry w jednym miejscu i zamienia je na schemat Ollama, a
+generation_stats wyciąga z odpowiedzi statystyki czasu generowania.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Dict, List, Any, Optional
+
+# Nazwy parametrów różniące się od nazw w schemacie Ollama
+OLLAMA_OPTION_NAMES = {"max_tokens": "num_predict"}
+
+
+@dataclass
+class GenerationOptions:
+    """Parametry generowania odpowiedzi."""
+
+    temperature: float = 0.7
+    max_tokens: int = 1000
+    top_p: Optional[float] = None
+    top_k: Optional[int] = None
+    repeat_penalty: Optional[float] = None
+    seed: Optional[int] = None
+    num_ctx: Optional[int] = None
+    num_thread: Optional[int] = None
+    stop: Optional[List[str]] = None
+
+    def __post_init__(self):
+        # Wartości z JSON/formularzy mogą być tekstem - sprowadzamy je do właściwych typów
+        self.temperature = float(self.temperature)
+        self.max_tokens = int(self.max_tokens)
+        for name, cast in (("top_p", float), ("top_k", int), ("repeat_penalty", float),
+                           ("seed", int), ("num_ctx", int), ("num_thread", int)):
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, cast(value))
+        if isinstance(self.stop, str):
+            self.stop = [self.stop]
+
+        if not 0.0 <= self.temperature <= 2.0:
+            raise ValueError("temperature musi być z zakresu 0.0-2.0")
+        if self.max_tokens < 1:
+            raise ValueError("max_tokens musi być większe od 0")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], defaults: Optional["GenerationOptions"] = None) -> "GenerationOptions":
+        """
+        Tworzy parametry z danych zapytania.
+
+        Args:
+            data: Dane zapytania; parametry na najwyższym poziomie lub w kluczu "options".
+            defaults: Parametry domyślne (np. z konfiguracji serwera).
+
+        Returns:
+            GenerationOptions.
+
+        Raises:
+            ValueError: Nieprawidłowa wartość parametru.
+        """
+        values = defaults.to_dict() if defaults else {}
+        names = {f.name for f in fields(cls)}
+        for source in (data, data.get("options") or {}):
+            values.update({key: value for key, value in source.items() if key in names and value is not None})
+        try:
+            return cls(**values)
+        except TypeError as e:
+            raise ValueError(str(e))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Zwraca ustawione parametry (pod nazwami używanymi w API serwera)."""
+        return {f.name: getattr(self, f.name) for f in fields(self) if getattr(self, f.name) is not None}
+
+    def to_ollama(self) -> Dict[str, Any]:
+        """Zwraca parametry w schemacie `options` Ollama (max_tokens -> num_predict)."""
+        return {OLLAMA_OPTION_NAMES.get(key, key): value for key, value in self.to_dict().items()}
+
+
+def generation_stats(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Wyciąga statystyki czasu generowania z odpowiedzi /api/generate.
+
+    Args:
+        result: Odpowiedź Ollama (czasy w nanosekundach).
+
+    Returns:
+        Słownik z liczbą tokenów (eval_count, prompt_eval_count), czasami w sekundach
+        (load_seconds, prompt_eval_seconds, eval_seconds, total_seconds) i prędkością
+        generowania tokens_per_second. Brakujące pola mają wartość None.
+    """
+    def seconds(key):
+        value = result.get(key)
+        return round(value / 1e9, 4) if value is not None else None
+
+    eval_count = result.get("eval_count")
+    eval_duration = result.get("eval_duration")
+    return {
+        "prompt_eval_count": result.get("prompt_eval_count"),
+        "eval_count": eval_count,
+        "load_seconds": seconds("load_duration"),
+        "prompt_eval_seconds": seconds("prompt_eval_duration"),
+        "eval_seconds": seconds("eval_duration"),
+        "total_seconds": seconds("total_duration"),
+        "tokens_per_second": round(eval_count / eval_duration * 1e9, 2) if eval_count and eval_duration else None,
+    }
@@ -0,0 +1,290 @@
+"""
+Moduł pobierania modeli Ollama w tle.
+
+Każde pobieranie jest zadaniem z identyfikatorem, którego postęp (bajty
+pobrane/całkowite dla każdej warstwy, prędkość i szacowany czas do końca)
+można odczytać w dowolnym momencie. Równoczesne żądania pobrania tego
+samego modelu trafiają do jednego zadania, a zadanie można anulować
+(również zawieszone - anulowanie zrywa połączenie z Ollama).
+"""
+
+import time
+import uuid
+import socket
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+import requests
+
+from .balancer import normalize_model_name
+
+# Konfiguracja logowania
+logger = logging.getLogger("ollama_server.pulls")
+
+# Stany zadania
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+# Liczba przechowywanych zakończonych zadań
+MAX_FINISHED_JOBS = 100
+
+# Maksymalny czas (s) bez danych z /api/pull, po którym pobieranie uznaje się za zawieszone
+# (Ollama milczy m.in. podczas weryfikacji sumy kontrolnej dużych warstw)
+PULL_READ_TIMEOUT = 300.0
+
+
+def _response_socket(response: requests.Response) -> Optional[socket.socket]:
+    """
+    Zwraca gniazdo połączenia odpowiedzi strumieniowej.
+
+    urllib3 nie udostępnia gniazda publicznie - odczytywane są atrybuty prywatne
+    (_connection.sock), dlatego przy ich braku zwracane jest None.
+    """
+    connection = getattr(getattr(response, "raw", None), "_connection", None)
+    sock = getattr(connection, "sock", None)
+    return sock if isinstance(sock, socket.socket) else None
+
+
+def _abort_response(response: requests.Response) -> bool:
+    """
+    Przerywa odczyt odpowiedzi strumieniowej trwający w innym wątku.
+
+    Odpowiedź zamyka (response.close()) wątek pobierania po zakończeniu odczytu;
+    wywołane z innego wątku czekałoby na ten odczyt, a zawieszony odczyt kończy
+    dopiero read timeout strumienia. Jeśli gniazdo połączenia jest dostępne,
+    shutdown() przerywa odczyt natychmiast.
+
+    Returns:
+        True, jeśli odczyt został przerwany; False - zakończy go read timeout.
+    """
+    sock = _response_socket(response)
+    if sock is None:
+        return False
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        return False
+    return True
+
+
+class PullJob:
+    """Zadanie pobierania jednego modelu."""
+
+    def __init__(self, model_name: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.model = model_name
+        self.status = STATUS_RUNNING
+        self.message = ""
+        self.error = None
+        self.layers: Dict[str, Dict[str, int]] = OrderedDict()
+        self.started_at = time.time()
+        self.finished_at = None
+        self.rate = 0.0
+        self.callbacks: List[Callable[[str], Any]] = []
+        self.cancel_event = threading.Event()
+        self.response: Optional[requests.Response] = None
+        self._last_sample: Optional[Tuple[float, int]] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status != STATUS_RUNNING
+
+    def totals(self) -> Tuple[int, int]:
+        completed = sum(layer["completed"] for layer in self.layers.values())
+        total = sum(layer["total"] for layer in self.layers.values())
+        return completed, total
+
+    def update(self, key: str, data: Dict[str, Any]) -> None:
+        """Aktualizuje postęp na podstawie komunikatu z /api/pull."""
+        self.message = data.get("status", self.message)
+        if data.get("digest") and data.get("total"):
+            layer = self.layers.setdefault(key, {"completed": 0, "total": 0})
+            layer["total"] = data["total"]
+            layer["completed"] = data.get("completed", layer["completed"])
+
+        # Prędkość pobierania jako średnia wykładnicza z próbek co najmniej co 0,5 s
+        now = time.monotonic()
+        completed, _ = self.totals()
+        if self._last_sample is None:
+            self._last_sample = (now, completed)
+        elif now - self._last_sample[0] >= 0.5:
+            sample_time, sample_bytes = self._last_sample
+            rate = max(0, completed - sample_bytes) / (now - sample_time)
+            self.rate = rate if not self.rate else 0.7 * self.rate + 0.3 * rate
+            self._last_sample = (now, completed)
+
+    def attach(self, response: requests.Response) -> None:
+        """Zapamiętuje odpowiedź /api/pull, aby anulowanie mogło zerwać połączenie."""
+        self.response = response
+        if self.cancel_event.is_set():
+            _abort_response(response)
+
+    def to_dict(self) -> Dict[str, Any]:
+        completed, total = self.totals()
+        eta = None
+        if not self.finished and self.rate > 0 and total:
+            eta = round((total - completed) / self.rate, 1)
+        return {
+            "id": self.id,
+            "model": self.model,
+            "status": self.status,
+            "message": self.message,
+            "error": self.error,
+            "completed": completed,
+            "total": total,
+            "progress": round(completed / total, 4) if total else None,
+            "bytes_per_second": round(self.rate),
+            "eta_seconds": eta,
+            "layers": [{"digest": key, **layer} for key, layer in self.layers.items()],
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class PullManager:
+    """
+    Uruchamia i śledzi zadania pobierania modeli.
+
+    Po udanym pobraniu wywoływane są funkcje zwrotne zadania (np. rozgrzanie
+    modelu lub przełączenie na niego).
+    """
+
+    def __init__(
+        self,
+        client,
+        on_complete: Optional[Callable[[str], Any]] = None,
+        read_timeout: float = PULL_READ_TIMEOUT
+    ):
+        """
+        Args:
+            client: Klient Ollama (OllamaClient lub OllamaPool).
+            on_complete: Funkcja wywoływana z nazwą modelu po każdym udanym pobraniu.
+            read_timeout: Maksymalny czas (s) oczekiwania na kolejny komunikat postępu.
+        """
+        self.client = client
+        self.on_complete = on_complete
+        self.read_timeout = read_timeout
+        self._jobs: Dict[str, PullJob] = OrderedDict()
+        self._active: Dict[str, PullJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, model_name: str, on_complete: Optional[Callable[[str], Any]] = None) -> Tuple[PullJob, bool]:
+        """
+        Rozpoczyna pobieranie modelu lub dołącza do trwającego pobierania.
+
+        Args:
+            model_name: Nazwa modelu.
+            on_complete: Dodatkowa funkcja wywoływana po udanym pobraniu.
+
+        Returns:
+            Krotka (zadanie, czy utworzono nowe zadanie).
+        """
+        name = normalize_model_name(model_name)
+        with self._lock:
+            job = self._active.get(name)
+            created = job is None
+            if created:
+                job = PullJob(model_name)
+                self._jobs[job.id] = job
+                self._active[name] = job
+                self._prune()
+            if on_complete:
+                job.callbacks.append(on_complete)
+
+        if created:
+            logger.info(f"Zadanie {job.id}: pobieranie modelu {model_name}")
+            threading.Thread(target=self._run, args=(job,), name=f"pull-{job.id}", daemon=True).start()
+        return job, created
+
+    def _run(self, job: PullJob) -> None:
+        targets = self.client.pull_targets()
+        try:
+            if not targets:
+                raise requests.ConnectionError("Brak dostępnych serwerów Ollama")
+            for target in targets:
+                self._pull(job, target, prefix=f"{target.base_url} " if len(targets) > 1 else "")
+                if job.finished:
+                    return
+        except (requests.RequestException, ValueError) as e:
+            self._finish(job, STATUS_FAILED, str(e))
+            return
+
+        self._finish(job, STATUS_COMPLETED)
+        for callback in ([self.on_complete] if self.on_complete else []) + job.callbacks:
+            try:
+                callback(job.model)
+            except Exception as e:
+                logger.error(f"Zadanie {job.id}: błąd funkcji zwrotnej: {str(e)}")
+
+    def _pull(self, job: PullJob, target, prefix: str) -> None:
+        stream = target.pull_model_stream(job.model, read_timeout=self.read_timeout, opened=job.attach)
+        try:
+            for data in stream:
+                if job.cancel_event.is_set():
+                    self._finish(job, STATUS_CANCELLED)
+                    return
+                if "error" in data:
+                    self._finish(job, STATUS_FAILED, data["error"])
+                    return
+                with self._lock:
+                    job.update(prefix + data.get("digest", ""), data)
+        except Exception:
+            # Połączenie zerwane przez cancel() kończy odczyt wyjątkiem - to nie jest błąd pobierania
+            if not job.cancel_event.is_set():
+                raise
+        finally:
+            # Zamknięcie strumienia zrywa połączenie, co przerywa pobieranie po stronie Ollama
+            stream.close()
+        if job.cancel_event.is_set():
+            self._finish(job, STATUS_CANCELLED)
+
+    def _finish(self, job: PullJob, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            job.status = status
+            job.error = error
+            job.finished_at = time.time()
+            name = normalize_model_name(job.model)
+            if self._active.get(name) is job:
+                del self._active[name]
+        logger.info(f"Zadanie {job.id}: {status}" + (f" ({error})" if error else ""))
+
+    def _prune(self) -> None:
+        """Usuwa najstarsze zakończone zadania (z założoną blokadą)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Zwraca stan zadania lub None, jeśli zadanie nie istnieje."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Anuluje zadanie, zrywając połączenie z Ollama (również gdy pobieranie nie przesyła postępu).
+
+        Returns:
+            Stan zadania lub None, jeśli zadanie nie istnieje.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if not job.finished:
+                job.cancel_event.set()
+                job.message = "anulowanie"
+            response = job.response if not job.finished else None
+            state = job.to_dict()
+        if response is not None and not _abort_response(response):
+            logger.info(f"Zadanie {job_id}: anulowanie po zakończeniu bieżącego odczytu (read timeout)")
+        return state
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Zwraca stan wszystkich przechowywanych zadań (od najnowszego)."""
+        with self._lock:
+            return [job.to_dict() for job in reversed(self._jobs.values())]
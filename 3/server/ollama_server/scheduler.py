@@ -0,0 +1,293 @@
+"""
+Moduł kolejkowania zapytań do modeli Ollama.
+
+Ogranicza liczbę równoczesnych generacji dla każdego modelu, obsługuje
+klasy priorytetu (interactive przed batch) i odrzuca zapytania, które nie
+zmieszczą się w kolejce lub nie doczekają się obsługi w wyznaczonym czasie.
+"""
+
+import math
+import time
+import heapq
+import logging
+import itertools
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+# Konfiguracja logowania
+logger = logging.getLogger("ollama_server.scheduler")
+
+# Klasy priorytetu (mniejsza wartość - wyższy priorytet)
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+# Liczba ostatnich pomiarów czasu oczekiwania używanych do percentyli
+WAIT_WINDOW = 500
+
+
+class SchedulerRejected(Exception):
+    """Zapytanie odrzucone przez kolejkę (pełna kolejka lub przekroczony czas oczekiwania)."""
+
+    def __init__(self, message: str, status: int, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """Zapytanie oczekujące w kolejce na wolne miejsce."""
+
+    __slots__ = ("event", "granted", "cancelled")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class _ModelQueue:
+    """Kolejka i statystyki jednego modelu."""
+
+    def __init__(self):
+        self.active = 0
+        self.heap = []
+        self.queued = {name: 0 for name in PRIORITIES}
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+        self.waits = deque(maxlen=WAIT_WINDOW)
+        self.service_ewma = 0.0
+
+
+class Scheduler:
+    """
+    Centralny harmonogram generacji.
+
+    Każdy model ma osobny limit równoczesnych zapytań. Zapytania ponad limit czekają
+    w kolejce priorytetowej (FIFO w obrębie klasy). Każda klasa ma własny limit
+    miejsc w kolejce, więc zadania wsadowe nie zajmują miejsc zapytań interactive.
+    Gdy kolejka klasy jest pełna, zapytanie jest od razu odrzucane (429) albo
+    (wait_for_room) czeka na wolne miejsce w kolejce; gdy czas oczekiwania
+    przekroczy limit klasy, zapytanie jest odrzucane (503). W obu przypadkach
+    podawany jest szacowany czas Retry-After.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int = 2,
+            max_queue: int = 32,
+            queue_timeout: float = 30.0,
+            batch_queue_timeout: float = 300.0,
+            max_batch_queue: Optional[int] = None
+    ):
+        """
+        Inicjalizacja harmonogramu.
+
+        Args:
+            max_concurrency: Maksymalna liczba równoczesnych generacji na model.
+            max_queue: Maksymalna liczba oczekujących zapytań interactive na model.
+            queue_timeout: Maksymalny czas oczekiwania (s) zapytań interactive.
+            batch_queue_timeout: Maksymalny czas oczekiwania (s) zapytań batch.
+            max_batch_queue: Maksymalna liczba oczekujących zapytań batch na model
+                (domyślnie jak max_queue).
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.max_batch_queue = max_queue if max_batch_queue is None else max_batch_queue
+        self.queue_limits = {"interactive": self.max_queue, "batch": self.max_batch_queue}
+        self.timeouts = {"interactive": queue_timeout, "batch": batch_queue_timeout}
+        self._queues: Dict[str, _ModelQueue] = {}
+        self._lock = threading.Lock()
+        # Powiadamiane, gdy zwalnia się miejsce w kolejce (dla wait_for_room)
+        self._room = threading.Condition(self._lock)
+        self._sequence = itertools.count()
+
+    def _queue(self, model_name: str) -> _ModelQueue:
+        queue = self._queues.get(model_name)
+        if queue is None:
+            queue = self._queues[model_name] = _ModelQueue()
+        return queue
+
+    def _retry_after(self, queue: _ModelQueue) -> int:
+        """Szacuje czas (s) do zwolnienia miejsca w kolejce (z założoną blokadą)."""
+        waiting = sum(queue.queued.values()) + 1
+        estimate = queue.service_ewma * waiting / self.max_concurrency
+        return max(1, math.ceil(estimate))
+
+    def _grant_next(self, queue: _ModelQueue) -> None:
+        """Przydziela zwolnione miejsca kolejnym oczekującym (z założoną blokadą)."""
+        while queue.heap and queue.active < self.max_concurrency:
+            _, _, priority, waiter = heapq.heappop(queue.heap)
+            if waiter.cancelled:
+                continue
+            queue.queued[priority] -= 1
+            queue.active += 1
+            waiter.granted = True
+            waiter.event.set()
+            self._room.notify_all()
+
+    def _can_admit_now(self, queue: _ModelQueue) -> bool:
+        return queue.active < self.max_concurrency and not any(queue.queued.values())
+
+    def _admit_now(self, queue: _ModelQueue, waited: float) -> bool:
+        """Przyjmuje zapytanie bez kolejki, jeśli jest wolne miejsce (z założoną blokadą)."""
+        if not self._can_admit_now(queue):
+            return False
+        queue.active += 1
+        queue.admitted += 1
+        queue.waits.append(waited)
+        return True
+
+    def _reject_timeout(self, model_name: str, queue: _ModelQueue, waited: float):
+        """Zgłasza odrzucenie po przekroczeniu czasu oczekiwania (z założoną blokadą)."""
+        queue.rejected["timeout"] += 1
+        retry_after = self._retry_after(queue)
+        logger.warning(f"Zapytanie do modelu {model_name} czekało {waited:.1f} s w kolejce, odrzucone")
+        raise SchedulerRejected(
+            f"Model {model_name} jest przeciążony, spróbuj ponownie za {retry_after} s", 503, retry_after
+        )
+
+    def acquire(
+            self,
+            model_name: str,
+            priority: str = "interactive",
+            timeout: Optional[float] = None,
+            wait_for_room: bool = False
+    ) -> float:
+        """
+        Czeka na wolne miejsce dla modelu.
+
+        Args:
+            model_name: Nazwa modelu.
+            priority: Klasa priorytetu (interactive lub batch).
+            timeout: Maksymalny czas oczekiwania (domyślnie: limit klasy).
+            wait_for_room: Czekaj na miejsce w pełnej kolejce zamiast odrzucać zapytanie (429).
+
+        Returns:
+            Czas oczekiwania w kolejce (s).
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Nieznana klasa priorytetu '{priority}'. Dostępne: {', '.join(PRIORITIES)}.")
+        if timeout is None:
+            timeout = self.timeouts[priority]
+
+        start = time.monotonic()
+        with self._lock:
+            queue = self._queue(model_name)
+            if self._admit_now(queue, 0.0):
+                return 0.0
+
+            limit = self.queue_limits[priority]
+            if queue.queued[priority] >= limit and wait_for_room:
+                def admissible():
+                    return queue.queued[priority] < limit or self._can_admit_now(queue)
+
+                if not self._room.wait_for(admissible, timeout=max(0.0, start + timeout - time.monotonic())):
+                    self._reject_timeout(model_name, queue, time.monotonic() - start)
+                waited = time.monotonic() - start
+                if self._admit_now(queue, waited):
+                    return waited
+
+            if queue.queued[priority] >= limit:
+                queue.rejected["queue_full"] += 1
+                retry_after = self._retry_after(queue)
+                logger.warning(f"Kolejka modelu {model_name} jest pełna, zapytanie odrzucone")
+                raise SchedulerRejected(
+                    f"Kolejka modelu {model_name} jest pełna, spróbuj ponownie za {retry_after} s", 429, retry_after
+                )
+
+            waiter = _Waiter()
+            heapq.heappush(queue.heap, (PRIORITIES[priority], next(self._sequence), priority, waiter))
+            queue.queued[priority] += 1
+            self._grant_next(queue)
+
+        waiter.event.wait(max(0.0, start + timeout - time.monotonic()))
+        waited = time.monotonic() - start
+
+        with self._lock:
+            if not waiter.granted:
+                waiter.cancelled = True
+                queue.queued[priority] -= 1
+                self._room.notify_all()
+                self._reject_timeout(model_name, queue, waited)
+            queue.admitted += 1
+            queue.waits.append(waited)
+        return waited
+
+    def release(self, model_name: str, service_time: float = None) -> None:
+        """
+        Zwalnia miejsce modelu i przekazuje je kolejnemu oczekującemu.
+
+        Args:
+            model_name: Nazwa modelu.
+            service_time: Czas obsługi zapytania (s), używany do szacowania Retry-After.
+        """
+        with self._lock:
+            queue = self._queue(model_name)
+            queue.active -= 1
+            if service_time is not None:
+                queue.service_ewma = (
+                    service_time if not queue.service_ewma else 0.8 * queue.service_ewma + 0.2 * service_time
+                )
+            self._grant_next(queue)
+            # Wolne miejsce generacji przy pustej kolejce też wpuszcza czekających na miejsce w kolejce
+            self._room.notify_all()
+
+    @contextmanager
+    def slot(
+            self,
+            model_name: str,
+            priority: str = "interactive",
+            timeout: Optional[float] = None,
+            wait_for_room: bool = False
+    ):
+        """
+        Menedżer kontekstu zajmujący miejsce modelu na czas generacji.
+
+        Args:
+            model_name: Nazwa modelu.
+            priority: Klasa priorytetu (interactive lub batch).
+            timeout: Maksymalny czas oczekiwania (domyślnie: limit klasy).
+            wait_for_room: Czekaj na miejsce w pełnej kolejce zamiast odrzucać zapytanie (429).
+
+        Yields:
+            Czas oczekiwania w kolejce (s).
+        """
+        waited = self.acquire(model_name, priority, timeout, wait_for_room)
+        start = time.monotonic()
+        try:
+            yield waited
+        finally:
+            self.release(model_name, time.monotonic() - start)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Zwraca metryki kolejek.
+
+        Returns:
+            Słownik z limitami oraz, dla każdego modelu, liczbą aktywnych i oczekujących
+            zapytań, liczbą przyjętych i odrzuconych oraz czasami oczekiwania.
+        """
+        with self._lock:
+            models = {}
+            for model_name, queue in self._queues.items():
+                waits = sorted(queue.waits)
+                models[model_name] = {
+                    "active": queue.active,
+                    "queued": dict(queue.queued),
+                    "admitted": queue.admitted,
+                    "rejected": dict(queue.rejected),
+                    "wait_ms": {
+                        "avg": round(sum(waits) / len(waits) * 1000, 1) if waits else None,
+                        "p95": round(waits[min(len(waits) - 1, int(0.95 * len(waits)))] * 1000, 1) if waits else None,
+                        "max": round(waits[-1] * 1000, 1) if waits else None,
+                    },
+                    "service_ms": round(queue.service_ewma * 1000, 1),
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "max_batch_queue": self.max_batch_queue,
+                "queue_timeout": dict(self.timeouts),
+                "models": models,
+            }
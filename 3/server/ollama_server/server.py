@@ -6,9 +6,17 @@ Zawiera aplikację Flask, która obsługuje zapytania API i udostępnia interfej
 
 import logging
 import os
+from urllib.parse import urlparse
 from flask import Flask, render_template, jsonify, request, redirect, url_for
-from .config import load_config
-from .models import OllamaClient
+from .config import load_config, find_or_create_env, ConfigStore
+from .balancer import create_client, parse_backends
+from .scheduler import Scheduler
+from .lifecycle import ModelManager, parse_model_list
+from .pulls import PullManager
+from .sessions import SessionStore
+from .budget import PromptBudget
+from .embeddings import Embedder, EmbeddingCache
+from .utils import OllamaSupervisor
 from .api import api_bp
 
 # Konfiguracja logowania
@@ -28,21 +36,70 @@ def create_app(config_path=None):
     app = Flask(__name__, static_folder="web/static", template_folder="web/templates")
 
     # Ładowanie konfiguracji
-    config = load_config(config_path)
+    env_file = find_or_create_env(config_path)
+    config = load_config(env_file)
     app.config.update(config)
 
     # Rejestracja blueprintów
     app.register_blueprint(api_bp)
 
-    # Inicjalizacja klienta Ollama
-    client = OllamaClient(app.config["OLLAMA_URL"])
+    # Inicjalizacja klienta Ollama (pula, jeśli OLLAMA_URL zawiera kilka adresów)
+    client = create_client(app.config["OLLAMA_URL"], keep_alive=app.config["KEEP_ALIVE"] or None)
+    app.extensions["ollama_client"] = client
+    app.extensions["ollama_supervisor"] = create_supervisor(app.config, client)
+    # Dostępność modeli jest odświeżana w tym samym odstępie co stan Ollama
+    app.extensions["ollama_models"] = ModelManager(client, availability_ttl=app.config["OLLAMA_HEALTH_INTERVAL"])
+    # Pobrane modele są od razu ładowane do pamięci
+    app.extensions["ollama_pulls"] = PullManager(client, on_complete=app.extensions["ollama_models"].pulled)
+
+    # Dopasowanie promptów do okna kontekstu modelu
+    app.extensions["ollama_budget"] = PromptBudget(
+        client,
+        strategy=app.config["PROMPT_STRATEGY"],
+        context_window=app.config["CONTEXT_WINDOW"]
+    )
+
+    # Embeddingi z pamięcią podręczną wektorów na dysku
+    embed_cache = None
+    if app.config["EMBED_CACHE_SIZE"] > 0:
+        embed_cache = EmbeddingCache(app.config["EMBED_CACHE_DIR"], max_entries=app.config["EMBED_CACHE_SIZE"])
+    app.extensions["ollama_embedder"] = Embedder(client, embed_cache, batch_size=app.config["EMBED_BATCH_SIZE"])
+
+    # Sesje rozmów /api/chat
+    app.extensions["ollama_sessions"] = SessionStore(
+        max_sessions=app.config["CHAT_MAX_SESSIONS"],
+        ttl=app.config["CHAT_SESSION_TTL"]
+    )
+
+    # Konfiguracja w pamięci: zmiany w trakcie działania bez przepisywania .env w zapytaniu,
+    # zmiany pliku .env wczytywane w tle
+    def apply_config(snapshot, changed):
+        app.config.update({key: snapshot[key] for key in changed})
+        budget = app.extensions["ollama_budget"]
+        if "PROMPT_STRATEGY" in changed:
+            budget.strategy = snapshot["PROMPT_STRATEGY"]
+        if "CONTEXT_WINDOW" in changed:
+            budget.context_window_override = snapshot["CONTEXT_WINDOW"]
+
+    config_store = ConfigStore(config, env_file, on_change=apply_config)
+    config_store.start()
+    app.extensions["ollama_config"] = config_store
+
+    # Wspólna kolejka generacji dla wszystkich wątków serwera
+    app.extensions["ollama_scheduler"] = Scheduler(
+        max_concurrency=app.config["MAX_CONCURRENCY"],
+        max_queue=app.config["MAX_QUEUE"],
+        queue_timeout=app.config["QUEUE_TIMEOUT"],
+        batch_queue_timeout=app.config["BATCH_QUEUE_TIMEOUT"],
+        max_batch_queue=app.config["MAX_BATCH_QUEUE"]
+    )
 
     # Podstawowe trasy
     @app.route("/")
     def index():
         """Główna strona z interfejsem webowym."""
         # Sprawdź dostępność serwera Ollama
-        ollama_available = client.check_availability()
+        ollama_available = app.extensions["ollama_supervisor"].available()
 
         # Pobierz informacje o aktualnym modelu
         model_name = app.config["MODEL_NAME"]
@@ -117,9 +174,11 @@ def create_app(config_path=None):
             "ollama": "unknown"
         }
 
-        # Sprawdź dostępność Ollama
-        ollama_available = client.check_availability()
+        # Sprawdź dostępność Ollama (przy działającym nadzorze - bez łączenia się z Ollama)
+        supervisor = app.extensions["ollama_supervisor"]
+        ollama_available = supervisor.available()
         status["ollama"] = "ok" if ollama_available else "unreachable"
+        status["supervisor"] = supervisor.stats()
 
         # Sprawdź dostępność modelu
         if ollama_available:
@@ -169,6 +228,39 @@ def create_app(config_path=None):
     return app
 
 
+def create_supervisor(config, client):
+    """
+    Tworzy nadzorcę Ollama dla konfiguracji.
+
+    Proces `ollama serve` jest uruchamiany tylko przy OLLAMA_SUPERVISE=true
+    i jednym, lokalnym adresie OLLAMA_URL; w pozostałych przypadkach nadzorca
+    tylko sprawdza stan serwera.
+
+    Args:
+        config: Konfiguracja aplikacji.
+        client: Klient Ollama (OllamaClient lub OllamaPool).
+
+    Returns:
+        OllamaSupervisor (jeszcze nieuruchomiony).
+    """
+    command = env = None
+    if config["OLLAMA_SUPERVISE"]:
+        backends = parse_backends(config["OLLAMA_URL"])
+        address = urlparse(backends[0]) if len(backends) == 1 else None
+        if address is not None and address.hostname in ("localhost", "127.0.0.1", "::1", "0.0.0.0"):
+            command = ["ollama", "serve"]
+            env = {"OLLAMA_HOST": f"{address.hostname}:{address.port or 11434}"}
+        else:
+            logger.warning("OLLAMA_SUPERVISE wymaga jednego lokalnego adresu OLLAMA_URL - tylko sprawdzanie stanu")
+    # Wywołanie przez lambdę - sprawdzenie zawsze trafia do aktualnej metody klienta
+    return OllamaSupervisor(
+        lambda: client.check_availability(),
+        command,
+        env=env,
+        probe_interval=config["OLLAMA_HEALTH_INTERVAL"]
+    )
+
+
 def run_server(host="0.0.0.0", port=None, debug=False, config_path=None):
     """
     Uruchamia serwer Flask.
@@ -198,11 +290,18 @@ def run_server(host="0.0.0.0", port=None, debug=False, config_path=None):
     print(f"  - Port serwera: {port}")
     print(f"  - Temperatura: {app.config['TEMPERATURE']}")
     print(f"  - Max tokenów: {app.config['MAX_TOKENS']}")
+    print(f"  - Równoczesne generacje na model: {app.config['MAX_CONCURRENCY']} (kolejka: {app.config['MAX_QUEUE']})")
+
+    # Nadzór Ollama: sprawdzanie stanu w tle (z OLLAMA_SUPERVISE także uruchomienie procesu)
+    client = app.extensions["ollama_client"]
+    supervisor = app.extensions["ollama_supervisor"].start()
+    if supervisor.healthy:
+        print(f"✅ Ollama działa poprawnie" + (f" (PID {supervisor.pid})" if supervisor.pid else ""))
 
-    # Sprawdź dostępność Ollama
-    client = OllamaClient(ollama_url)
-    if client.check_availability():
-        print(f"✅ Ollama działa poprawnie")
+        # Wstępne ładowanie modeli w tle, aby pierwsze zapytania nie czekały na załadowanie
+        preload = parse_model_list(app.config["PRELOAD_MODELS"]) or [model_name]
+        print(f"⏳ Ładowanie modeli w tle: {', '.join(preload)} (keep_alive: {app.config['KEEP_ALIVE']})")
+        app.extensions["ollama_models"].preload(preload)
 
         # Sprawdź dostępność modelu
         if client.check_model_availability(model_name.split(":")[0]):
@@ -219,7 +318,10 @@ def run_server(host="0.0.0.0", port=None, debug=False, config_path=None):
     print(f"📝 Interfejs web: http://localhost:{port}")
 
     # Uruchom serwer
-    app.run(host=host, port=port, debug=debug)
+    try:
+        app.run(host=host, port=port, debug=debug)
+    finally:
+        supervisor.stop()
 
 
 if __name__ == "__main__":
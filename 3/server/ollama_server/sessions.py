@@ -0,0 +1,173 @@
+"""
+Moduł sesji rozmów dla endpointu /api/chat.
+
+Sesja przechowuje tokeny kontekstu zwrócone przez Ollama (pole `context`)
+i przekazuje je przy kolejnej wiadomości, dzięki czemu klient nie musi
+wysyłać całej rozmowy, a model nie przetwarza jej od nowa. Liczba sesji
+jest ograniczona (najdawniej używane są usuwane), a nieużywane sesje
+wygasają po określonym czasie.
+"""
+
+import time
+import uuid
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+# Konfiguracja logowania
+logger = logging.getLogger("ollama_server.sessions")
+
+# Liczba wiadomości historii przechowywanych w sesji
+MAX_HISTORY = 50
+
+
+class ChatSession:
+    """Stan jednej rozmowy."""
+
+    def __init__(self, model_name: str):
+        self.id = uuid.uuid4().hex
+        self.model = model_name
+        # Tokeny kontekstu jako tablica int32 (4 bajty na token zamiast obiektów int)
+        self.context = array("i")
+        self.history: List[Dict[str, str]] = []
+        self.turns = 0
+        self.prompt_eval_seconds = 0.0
+        self.saved_seconds = 0.0
+        self.created_at = time.time()
+        self.last_used = time.monotonic()
+        # Wiadomości jednej sesji są przetwarzane po kolei
+        self.lock = threading.Lock()
+
+    def reset_context(self, model_name: str) -> None:
+        """Czyści kontekst (np. po zmianie modelu - tokeny nie są przenośne między modelami)."""
+        self.model = model_name
+        self.context = array("i")
+
+    def record(self, message: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Zapisuje wynik wiadomości i zwraca statystyki ponownego użycia kontekstu.
+
+        Args:
+            message: Wiadomość użytkownika.
+            result: Odpowiedź /api/generate (response, context, prompt_eval_count, ...).
+
+        Returns:
+            Słownik ze statystykami wiadomości.
+        """
+        reused_tokens = len(self.context)
+        prompt_tokens = result.get("prompt_eval_count") or 0
+        prompt_seconds = (result.get("prompt_eval_duration") or 0) / 1e9
+
+        # Czas zaoszczędzony szacujemy jako czas przetworzenia tokenów kontekstu
+        # z prędkością zmierzoną dla nowych tokenów tej wiadomości
+        saved = reused_tokens * prompt_seconds / prompt_tokens if prompt_tokens else 0.0
+
+        self.context = array("i", result.get("context") or [])
+        self.history.append({"role": "user", "content": message})
+        self.history.append({"role": "assistant", "content": result.get("response", "")})
+        del self.history[:-MAX_HISTORY]
+        self.turns += 1
+        self.prompt_eval_seconds += prompt_seconds
+        self.saved_seconds += saved
+
+        return {
+            "reused_context_tokens": reused_tokens,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_seconds": round(prompt_seconds, 4),
+            "saved_prompt_eval_seconds": round(saved, 4),
+            "context_tokens": len(self.context),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "model": self.model,
+            "turns": self.turns,
+            "context_tokens": len(self.context),
+            "prompt_eval_seconds": round(self.prompt_eval_seconds, 4),
+            "saved_prompt_eval_seconds": round(self.saved_seconds, 4),
+            "created_at": self.created_at,
+            "history": list(self.history),
+        }
+
+
+class SessionStore:
+    """
+    Ograniczony magazyn sesji (LRU + TTL).
+
+    Sesje nieużywane dłużej niż ttl sekund wygasają, a po przekroczeniu
+    max_sessions usuwana jest najdawniej używana sesja.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800):
+        """
+        Args:
+            max_sessions: Maksymalna liczba przechowywanych sesji.
+            ttl: Czas (w sekundach) od ostatniego użycia, po którym sesja wygasa.
+        """
+        self.max_sessions = max(1, max_sessions)
+        self.ttl = ttl
+        self._sessions: Dict[str, ChatSession] = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._expired = 0
+
+    def _purge_expired(self, now: float) -> None:
+        """Usuwa wygasłe sesje (z założoną blokadą)."""
+        # Sesje są uporządkowane od najdawniej używanej, więc wystarczy sprawdzać początek
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.ttl:
+                break
+            del self._sessions[session.id]
+            self._expired += 1
+
+    def create(self, model_name: str) -> ChatSession:
+        """Tworzy nową sesję dla podanego modelu."""
+        session = ChatSession(model_name)
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                evicted_id, _ = self._sessions.popitem(last=False)
+                self._evicted += 1
+                logger.info(f"Usunięto najdawniej używaną sesję {evicted_id}")
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        """
+        Zwraca sesję i oznacza ją jako używaną.
+
+        Returns:
+            Sesja lub None, jeśli nie istnieje lub wygasła.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._purge_expired(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        """Usuwa sesję; zwraca False, jeśli sesja nie istnieje."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Zwraca liczbę sesji, usunięć i łączny zaoszczędzony czas przetwarzania promptów."""
+        with self._lock:
+            self._purge_expired(time.monotonic())
+            sessions = list(self._sessions.values())
+            return {
+                "sessions": len(sessions),
+                "max_sessions": self.max_sessions,
+                "ttl": self.ttl,
+                "evicted": self._evicted,
+                "expired": self._expired,
+                "context_tokens": sum(len(session.context) for session in sessions),
+                "saved_prompt_eval_seconds": round(sum(session.saved_seconds for session in sessions), 4),
+            }
@@ -3,10 +3,17 @@ Moduł zawierający funkcje pomocnicze dla Ollama Server.
 """
 
 import os
+import json
+import time
 import platform
 import subprocess
 import logging
-from typing import Optional, Dict, Any, List, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from .models import MODEL_INFO
+from .options import GenerationOptions
 
 # Konfiguracja logowania
 logger = logging.getLogger("ollama_server.utils")
@@ -108,22 +115,83 @@ def format_bytes(size_bytes: int) -> str:
     return f"{size_bytes:.2f} {size_names[i]}"
 
 
-def find_ollama_process() -> Optional[int]:
-    """
-    Znajduje PID procesu Ollama.
+# Ostatnio znaleziony PID procesu Ollama (sprawdzany przed przeglądaniem wszystkich procesów)
+_ollama_pid: Optional[int] = None
 
-    Returns:
-        Optional[int]: PID procesu lub None jeśli nie znaleziono.
-    """
+
+def _process_name(pid: int) -> Optional[str]:
+    """Zwraca nazwę procesu o podanym PID lub None, jeśli proces nie istnieje."""
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).name()
+        except psutil.Error:
+            return None
+    # Bez psutil: /proc (Linux)
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _is_ollama_pid(pid: int) -> bool:
+    name = _process_name(pid)
+    return bool(name) and "ollama" in name.lower()
+
+
+def _scan_ollama_process() -> Optional[int]:
+    """Przegląda wszystkie procesy w poszukiwaniu Ollama."""
     try:
         import psutil
         for proc in psutil.process_iter(['pid', 'name']):
-            if 'ollama' in proc.info['name'].lower():
+            if 'ollama' in (proc.info['name'] or '').lower():
                 return proc.info['pid']
         return None
     except ImportError:
-        logger.warning("Nie można znaleźć procesu Ollama: wymagany pakiet psutil")
+        pass
+    if os.path.isdir("/proc"):
+        for entry in os.listdir("/proc"):
+            if entry.isdigit() and _is_ollama_pid(int(entry)):
+                return int(entry)
         return None
+    logger.warning("Nie można znaleźć procesu Ollama: wymagany pakiet psutil")
+    return None
+
+
+def find_ollama_process() -> Optional[int]:
+    """
+    Znajduje PID procesu Ollama.
+
+    Najpierw sprawdzany jest ostatnio znaleziony PID (jeden proces), a
+    wszystkie procesy są przeglądane dopiero, gdy ten proces już nie działa.
+
+    Returns:
+        Optional[int]: PID procesu lub None jeśli nie znaleziono.
+    """
+    global _ollama_pid
+    if _ollama_pid is not None and _is_ollama_pid(_ollama_pid):
+        return _ollama_pid
+    _ollama_pid = _scan_ollama_process()
+    return _ollama_pid
+
+
+def _spawn_ollama(command: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    """Uruchamia proces Ollama w tle (wyjście odrzucane - nieczytany potok blokowałby proces)."""
+    global _ollama_pid
+    kwargs = {"stdout": subprocess.DEVNULL, "stderr": subprocess.DEVNULL}
+    if env:
+        kwargs["env"] = dict(os.environ, **env)
+    if platform.system() == "Windows":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    process = subprocess.Popen(command, **kwargs)
+    _ollama_pid = process.pid
+    return process
 
 
 def start_ollama_process() -> Tuple[bool, Optional[int]]:
@@ -134,24 +202,9 @@ def start_ollama_process() -> Tuple[bool, Optional[int]]:
         Tuple[bool, Optional[int]]: (sukces, pid procesu lub None)
     """
     try:
-        # Uruchom Ollama w tle
-        if platform.system() == "Windows":
-            process = subprocess.Popen(
-                ["ollama", "serve"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                creationflags=subprocess.CREATE_NEW_PROCESS_GROUP
-            )
-        else:
-            process = subprocess.Popen(
-                ["ollama", "serve"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                start_new_session=True
-            )
+        process = _spawn_ollama(["ollama", "serve"])
 
         # Daj czas na uruchomienie
-        import time
         time.sleep(2)
 
         # Sprawdź czy proces działa
@@ -230,6 +283,252 @@ def is_ollama_running() -> bool:
         return False
 
 
+class OllamaSupervisor:
+    """
+    Nadzór serwera Ollama: stan zdrowia, a opcjonalnie także proces.
+
+    Wątek w tle co `probe_interval` sekund sprawdza serwer lekkim zapytaniem,
+    a zapytania do API odczytują zapamiętany wynik (available()) zamiast
+    łączyć się z Ollama za każdym razem. Z poleceniem `command` nadzorca
+    uruchamia Ollama, jeśli nie działa, i uruchamia ją ponownie po awarii
+    lub po `max_failures` kolejnych nieudanych sprawdzeniach - z rosnącą
+    zwłoką (backoff) między kolejnymi próbami.
+    """
+
+    def __init__(
+            self,
+            probe: Callable[[], bool],
+            command: Optional[List[str]] = None,
+            env: Optional[Dict[str, str]] = None,
+            probe_interval: float = 5.0,
+            max_failures: int = 3,
+            backoff_initial: float = 1.0,
+            backoff_max: float = 60.0,
+            startup_timeout: float = 30.0
+    ):
+        """
+        Args:
+            probe: Funkcja sprawdzająca dostępność Ollama (np. klient.check_availability).
+            command: Polecenie uruchamiające Ollama (None - tylko sprawdzanie stanu).
+            env: Dodatkowe zmienne środowiskowe procesu (np. OLLAMA_HOST).
+            probe_interval: Odstęp (s) między sprawdzeniami.
+            max_failures: Liczba kolejnych nieudanych sprawdzeń, po której proces jest uruchamiany ponownie.
+            backoff_initial: Zwłoka (s) przed pierwszym ponownym uruchomieniem.
+            backoff_max: Największa zwłoka (s); tyle też musi trwać poprawne działanie, aby zwłoka wróciła do początkowej.
+            startup_timeout: Czas (s) oczekiwania na gotowość po uruchomieniu.
+        """
+        self.probe = probe
+        self.command = list(command) if command else None
+        self.env = env
+        self.probe_interval = probe_interval
+        self.max_failures = max_failures
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.startup_timeout = startup_timeout
+
+        self.pid: Optional[int] = None
+        self.healthy = False
+        self.failures = 0
+        self.restarts = 0
+        self.last_exit_code: Optional[int] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._started_at: Optional[float] = None
+        self._healthy_since: Optional[float] = None
+        self._last_probe: Optional[float] = None
+        self._backoff = backoff_initial
+        self._next_restart: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def managed(self) -> bool:
+        """Czy nadzorca uruchamia proces Ollama."""
+        return self.command is not None
+
+    @property
+    def running(self) -> bool:
+        """Czy działa wątek sprawdzający stan."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def check(self) -> bool:
+        """Sprawdza dostępność Ollama i zapamiętuje wynik."""
+        try:
+            healthy = bool(self.probe())
+        except Exception as e:
+            logger.debug(f"Błąd sprawdzania Ollama: {str(e)}")
+            healthy = False
+        now = time.monotonic()
+        with self._lock:
+            self._last_probe = now
+            if healthy:
+                if not self.healthy:
+                    self._healthy_since = now
+                self.failures = 0
+            else:
+                self.failures += 1
+            if healthy != self.healthy:
+                logger.info("Ollama dostępna" if healthy else "Ollama niedostępna")
+            self.healthy = healthy
+        return healthy
+
+    def available(self) -> bool:
+        """
+        Zwraca dostępność Ollama.
+
+        Przy działającym wątku nadzoru - ostatni zapamiętany wynik (bez
+        połączenia z Ollama); w przeciwnym razie sprawdza dostępność od razu.
+        """
+        if self.running:
+            return self.healthy
+        return self.check()
+
+    def _spawn(self) -> None:
+        logger.info(f"Uruchamianie Ollama: {' '.join(self.command)}")
+        with self._lock:
+            self._process = _spawn_ollama(self.command, self.env)
+            self.pid = self._process.pid
+            self._started_at = time.monotonic()
+            self.failures = 0
+
+    def _terminate(self, process: subprocess.Popen) -> None:
+        process.terminate()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def _schedule_restart(self, now: float) -> None:
+        self._next_restart = now + self._backoff
+        logger.warning(f"Ponowne uruchomienie Ollama za {self._backoff:.0f} s")
+        self._backoff = min(self.backoff_max, self._backoff * 2)
+
+    def wait_ready(self, timeout: float) -> bool:
+        """
+        Czeka, aż Ollama zacznie odpowiadać.
+
+        Returns:
+            bool: True, jeśli Ollama jest dostępna przed upływem czasu.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.check():
+                return True
+            process = self._process
+            if (process is not None and process.poll() is not None) or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.25)
+
+    def start(self) -> "OllamaSupervisor":
+        """
+        Uruchamia nadzór: przejmuje działającą Ollama lub (z poleceniem) uruchamia nową.
+
+        Returns:
+            OllamaSupervisor: self.
+        """
+        if self.running:
+            return self
+        self._stop.clear()
+        if self.check():
+            self.pid = find_ollama_process()
+            self._started_at = time.monotonic()
+        elif self.managed:
+            try:
+                self._spawn()
+                if not self.wait_ready(self.startup_timeout):
+                    logger.warning(f"Ollama nie odpowiada po {self.startup_timeout:.0f} s od uruchomienia")
+            except OSError as e:
+                logger.error(f"Nie można uruchomić Ollama: {str(e)}")
+                self._schedule_restart(time.monotonic())
+        self._thread = threading.Thread(target=self._monitor, name="ollama-supervisor", daemon=True)
+        self._thread.start()
+        return self
+
+    def _monitor(self) -> None:
+        while True:
+            wait = self.probe_interval
+            if self._next_restart is not None:
+                wait = max(0.0, min(wait, self._next_restart - time.monotonic()))
+            if self._stop.wait(wait):
+                return
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Błąd nadzoru Ollama: {str(e)}")
+
+    def tick(self) -> None:
+        """Jeden krok nadzoru: wykrycie awarii, sprawdzenie stanu i ewentualne ponowne uruchomienie."""
+        now = time.monotonic()
+        process = self._process
+        if process is not None and process.poll() is not None:
+            logger.warning(f"Proces Ollama (PID {process.pid}) zakończył się z kodem {process.returncode}")
+            with self._lock:
+                self.last_exit_code = process.returncode
+                self._process = None
+                self.healthy = False
+            self._schedule_restart(now)
+        elif self.check():
+            # Stabilne działanie przywraca początkową zwłokę
+            if self._healthy_since is not None and now - self._healthy_since >= self.backoff_max:
+                self._backoff = self.backoff_initial
+            return
+        elif self.managed and self._next_restart is None and self.failures >= self.max_failures:
+            logger.warning(f"Ollama nie odpowiada ({self.failures} kolejnych sprawdzeń)")
+            if process is not None:
+                self._terminate(process)
+                with self._lock:
+                    self.last_exit_code = process.returncode
+                    self._process = None
+            self._schedule_restart(now)
+
+        if self._next_restart is not None and now >= self._next_restart:
+            self._next_restart = None
+            self.restarts += 1
+            try:
+                self._spawn()
+            except OSError as e:
+                logger.error(f"Nie można uruchomić Ollama: {str(e)}")
+                self._schedule_restart(now)
+
+    def stop(self) -> None:
+        """Zatrzymuje nadzór i proces Ollama uruchomiony przez nadzorcę."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        process = self._process
+        if process is not None and process.poll() is None:
+            logger.info(f"Zatrzymywanie Ollama (PID {process.pid})")
+            self._terminate(process)
+        self._process = None
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Zwraca stan nadzoru.
+
+        Returns:
+            dict: managed, monitoring, pid, healthy, uptime_seconds (czas działania procesu),
+            restarts, last_exit_code, consecutive_failures, last_probe_seconds_ago
+            i next_restart_seconds.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "managed": self.managed,
+                "monitoring": self.running,
+                "pid": self.pid,
+                "healthy": self.healthy,
+                "uptime_seconds": round(now - self._started_at, 1) if self._started_at is not None else None,
+                "restarts": self.restarts,
+                "last_exit_code": self.last_exit_code,
+                "consecutive_failures": self.failures,
+                "last_probe_seconds_ago": round(now - self._last_probe, 1) if self._last_probe is not None else None,
+                "next_restart_seconds": round(max(0.0, self._next_restart - now), 1)
+                if self._next_restart is not None else None,
+            }
+
+
 def check_port_availability(port: int) -> bool:
     """
     Sprawdza czy port jest dostępny.
@@ -264,6 +563,319 @@ def find_available_port(start_port: int = 5000, max_port: int = 6000) -> Optiona
     return None
 
 
+# Autostrojenie: zapas pamięci na środowisko Ollama ponad rozmiar pliku modelu
+MODEL_MEMORY_OVERHEAD = 1.2
+# Część dostępnej pamięci, którą może zająć model z pamięcią kontekstu
+MEMORY_BUDGET_FRACTION = 0.8
+# Okna kontekstu rozważane przy doborze num_ctx
+CONTEXT_SIZES = (2048, 4096, 8192, 16384, 32768)
+# Minimalny przyrost przepustowości (względny), dla którego warto zwiększać współbieżność
+MIN_CONCURRENCY_GAIN = 0.1
+# Prompt kalibracyjny - krótki, aby mierzyć głównie generowanie tokenów
+CALIBRATION_PROMPT = "Opisz w kilku zdaniach, do czego służy serwer HTTP."
+
+
+def _memory_info() -> Tuple[Optional[int], Optional[int]]:
+    """Zwraca (pamięć całkowita, pamięć dostępna) w bajtach lub None, jeśli nie można ich ustalić."""
+    try:
+        import psutil
+        memory = psutil.virtual_memory()
+        return memory.total, memory.available
+    except ImportError:
+        pass
+
+    # Bez psutil: /proc/meminfo (Linux) lub sysconf
+    try:
+        values = {}
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, value = line.split(":", 1)
+                values[key] = int(value.split()[0]) * 1024
+        return values.get("MemTotal"), values.get("MemAvailable", values.get("MemFree"))
+    except (OSError, ValueError):
+        pass
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        return total, None
+    except (AttributeError, ValueError, OSError):
+        return None, None
+
+
+def get_hardware_info() -> Dict[str, Any]:
+    """
+    Pobiera parametry sprzętu istotne dla doboru modelu i współbieżności.
+
+    Returns:
+        dict: cpu_logical, cpu_physical (None, jeśli nieznane), memory_total
+        i memory_available (bajty lub None).
+    """
+    cpu_logical = os.cpu_count() or 1
+    cpu_physical = None
+    try:
+        import psutil
+        cpu_physical = psutil.cpu_count(logical=False)
+    except ImportError:
+        pass
+    memory_total, memory_available = _memory_info()
+    return {
+        "cpu_logical": cpu_logical,
+        "cpu_physical": cpu_physical,
+        "memory_total": memory_total,
+        "memory_available": memory_available if memory_available is not None else memory_total,
+    }
+
+
+def recommend_num_thread(hardware: Dict[str, Any]) -> int:
+    """
+    Zwraca liczbę wątków generowania (num_thread).
+
+    Generowanie na CPU jest ograniczone przepustowością pamięci - wątki ponad
+    liczbę rdzeni fizycznych (hyper-threading) zwykle spowalniają generowanie.
+
+    Args:
+        hardware: Wynik get_hardware_info().
+
+    Returns:
+        int: Liczba wątków.
+    """
+    if hardware.get("cpu_physical"):
+        return hardware["cpu_physical"]
+    # Bez psutil zakładamy 2 wątki logiczne na rdzeń
+    logical = hardware["cpu_logical"]
+    return logical // 2 if logical > 2 else logical
+
+
+def model_memory(model: Dict[str, Any]) -> int:
+    """Szacowana pamięć (bajty) potrzebna na załadowanie modelu bez pamięci kontekstu."""
+    return int(model.get("size", 0) * MODEL_MEMORY_OVERHEAD)
+
+
+def recommend_model(models: List[Dict[str, Any]], hardware: Dict[str, Any]) -> str:
+    """
+    Wybiera największy zainstalowany model mieszczący się w dostępnej pamięci.
+
+    Args:
+        models: Modele z OllamaClient.list_models() (rozmiar w bajtach w polu "size").
+        hardware: Wynik get_hardware_info().
+
+    Returns:
+        str: Nazwa modelu; bez zainstalowanych modeli - suggest_model_by_system().
+    """
+    sized = [model for model in models if isinstance(model.get("size"), int) and model.get("name")]
+    if not sized:
+        return suggest_model_by_system()
+    available = hardware.get("memory_available")
+    if not available:
+        return min(sized, key=lambda model: model["size"])["name"]
+
+    budget = available * MEMORY_BUDGET_FRACTION
+    fitting = [model for model in sized if model_memory(model) <= budget]
+    if not fitting:
+        # Nic się nie mieści - najmniejszy model ma największą szansę działać
+        return min(sized, key=lambda model: model["size"])["name"]
+    return max(fitting, key=lambda model: model["size"])["name"]
+
+
+def kv_bytes_per_token(details: Dict[str, Any], model_size: int) -> int:
+    """
+    Szacuje pamięć kontekstu (cache KV) na jeden token.
+
+    Korzysta z architektury podanej przez /api/show (liczba warstw, głowic KV,
+    wymiar), a bez niej - z przybliżenia na podstawie rozmiaru modelu.
+
+    Args:
+        details: Odpowiedź /api/show (klucz "model_info").
+        model_size: Rozmiar pliku modelu w bajtach.
+
+    Returns:
+        int: Bajty na token (klucze i wartości w fp16).
+    """
+    info = details.get("model_info", {})
+
+    def field(suffix):
+        for key, value in info.items():
+            if key.endswith(suffix) and isinstance(value, int):
+                return value
+        return None
+
+    layers = field(".block_count")
+    heads = field(".attention.head_count")
+    kv_heads = field(".attention.head_count_kv") or heads
+    embedding = field(".embedding_length")
+    if layers and heads and kv_heads and embedding:
+        return 2 * layers * kv_heads * (embedding // heads) * 2
+    # Ok. 250 KB/token dla modelu 7B w kwantyzacji 4-bitowej
+    return max(1, model_size // 16000)
+
+
+def trained_context(details: Dict[str, Any], model_name: str) -> Optional[int]:
+    """Zwraca długość kontekstu, na której trenowano model (/api/show lub MODEL_INFO)."""
+    for key, value in details.get("model_info", {}).items():
+        if key.endswith(".context_length"):
+            return int(value)
+    return MODEL_INFO.get(model_name.split(":")[0], {}).get("context")
+
+
+def recommend_num_ctx(model_size: int, kv_per_token: int, context_limit: Optional[int],
+                      hardware: Dict[str, Any], parallel: int = 1) -> int:
+    """
+    Zwraca największe okno kontekstu mieszczące się w pamięci.
+
+    Ollama rezerwuje pamięć kontekstu osobno dla każdego równoczesnego
+    zapytania, więc okno jest liczone dla `parallel` zapytań.
+
+    Args:
+        model_size: Rozmiar pliku modelu w bajtach.
+        kv_per_token: Pamięć kontekstu na token (kv_bytes_per_token()).
+        context_limit: Maksymalny kontekst modelu (None - bez ograniczenia).
+        hardware: Wynik get_hardware_info().
+        parallel: Liczba równoczesnych zapytań.
+
+    Returns:
+        int: Okno kontekstu (co najmniej najmniejsze z CONTEXT_SIZES).
+    """
+    sizes = [size for size in CONTEXT_SIZES if context_limit is None or size <= context_limit] or [CONTEXT_SIZES[0]]
+    available = hardware.get("memory_available")
+    if not available:
+        return sizes[0]
+    free = available * MEMORY_BUDGET_FRACTION - model_size * MODEL_MEMORY_OVERHEAD
+    fitting = [size for size in sizes if size * kv_per_token * max(1, parallel) <= free]
+    return fitting[-1] if fitting else sizes[0]
+
+
+def calibrate_concurrency(
+        client,
+        model_name: str,
+        max_concurrency: int,
+        options: Optional[GenerationOptions] = None,
+        prompt: str = CALIBRATION_PROMPT,
+        rounds: int = 1,
+        warmup: bool = True,
+        progress=None
+) -> List[Dict[str, Any]]:
+    """
+    Mierzy przepustowość generowania przy współbieżności 1..max_concurrency.
+
+    Dla każdego poziomu wysyłanych jest `concurrency * rounds` zapytań
+    (najwyżej `concurrency` naraz); przepustowość to suma wygenerowanych
+    tokenów podzielona przez czas całego poziomu.
+
+    Args:
+        client: Klient Ollama (OllamaClient lub OllamaPool).
+        model_name: Nazwa modelu (powinien być już załadowany).
+        max_concurrency: Największa badana liczba równoczesnych zapytań.
+        options: Parametry generowania (m.in. num_thread, num_ctx, max_tokens).
+        prompt: Prompt kalibracyjny.
+        rounds: Liczba zapytań na jeden slot współbieżności.
+        warmup: Czy przed pomiarem wysłać zapytanie ładujące model z podanymi
+            parametrami (zmiana num_ctx/num_thread wymusza ponowne załadowanie).
+        progress: Funkcja wywoływana z wynikiem każdego poziomu.
+
+    Returns:
+        list: Dla każdego poziomu: concurrency, requests, errors, tokens,
+        seconds, tokens_per_second (łącznie), tokens_per_second_per_request
+        i latency_seconds (średnio).
+    """
+    options = options or GenerationOptions(max_tokens=64)
+    if warmup:
+        warmup_options = GenerationOptions.from_dict({"max_tokens": 1}, options)
+        client.generate_result(model_name, prompt, warmup_options)
+
+    curve = []
+    for concurrency in range(1, max_concurrency + 1):
+        def run(_):
+            started = time.perf_counter()
+            result = client.generate_result(model_name, prompt, options)
+            return result.get("eval_count") or 0, time.perf_counter() - started
+
+        requests_count = concurrency * rounds
+        tokens = 0
+        latencies = []
+        errors = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(run, i) for i in range(requests_count)]
+            for future in futures:
+                try:
+                    count, latency = future.result()
+                except Exception as e:
+                    errors += 1
+                    logger.warning(f"Błąd zapytania kalibracyjnego: {str(e)}")
+                    continue
+                tokens += count
+                latencies.append(latency)
+        seconds = time.perf_counter() - started
+
+        point = {
+            "concurrency": concurrency,
+            "requests": requests_count,
+            "errors": errors,
+            "tokens": tokens,
+            "seconds": round(seconds, 3),
+            "tokens_per_second": round(tokens / seconds, 2) if seconds > 0 else 0.0,
+            "tokens_per_second_per_request": round(tokens / sum(latencies), 2) if latencies else 0.0,
+            "latency_seconds": round(sum(latencies) / len(latencies), 3) if latencies else None,
+        }
+        curve.append(point)
+        if progress:
+            progress(point)
+        if errors == requests_count:
+            # Serwer nie obsługuje już takiego obciążenia - dalsze poziomy nic nie wniosą
+            break
+    return curve
+
+
+def choose_concurrency(curve: List[Dict[str, Any]], min_gain: float = MIN_CONCURRENCY_GAIN) -> int:
+    """
+    Wybiera współbieżność z krzywej kalibracji.
+
+    Zwiększanie współbieżności ma sens, dopóki łączna przepustowość rośnie
+    o co najmniej `min_gain` względem najlepszego mniejszego poziomu; dalej
+    rośnie już tylko czas odpowiedzi. Poziomy z błędami są pomijane.
+
+    Args:
+        curve: Wynik calibrate_concurrency().
+        min_gain: Minimalny względny przyrost przepustowości.
+
+    Returns:
+        int: Zalecana liczba równoczesnych generacji (co najmniej 1).
+    """
+    best_concurrency, best_rate = 1, 0.0
+    for point in curve:
+        if point["errors"]:
+            break
+        rate = point["tokens_per_second"]
+        if best_rate == 0.0 or rate >= best_rate * (1 + min_gain):
+            best_concurrency, best_rate = point["concurrency"], rate
+    return best_concurrency
+
+
+def save_autotune_run(path: str, run: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Dopisuje wynik autostrojenia do pliku JSONL (historia do porównań).
+
+    Args:
+        path: Ścieżka pliku historii.
+        run: Wynik (m.in. "model", "curve", "recommendation").
+
+    Returns:
+        Poprzedni zapisany wynik dla tego samego modelu lub None.
+    """
+    previous = None
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and entry.get("model") == run.get("model"):
+                    previous = entry
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run, ensure_ascii=False) + "\n")
+    return previous
+
+
 if __name__ == "__main__":
     # Jeśli uruchomiony bezpośrednio, wyświetl informacje o systemie
     print("Informacje o systemie:")
@@ -54,13 +54,19 @@ def test_list_models(mock_list_models, mock_check_availability, client):
 
 @patch.object(OllamaClient, 'check_availability')
 @patch.object(OllamaClient, 'check_model_availability')
-@patch.object(OllamaClient, 'generate')
+@patch.object(OllamaClient, 'generate_result')
 def test_ask_endpoint(mock_generate, mock_check_model, mock_check_availability, client):
     """Test endpointu /api/ask."""
     # Przygotowanie mocków
     mock_check_availability.return_value = True
     mock_check_model.return_value = True
-    mock_generate.return_value = "To jest testowa odpowiedź."
+    mock_generate.return_value = {
+        "response": "To jest testowa odpowiedź.",
+        "eval_count": 50,
+        "eval_duration": 2_000_000_000,
+        "prompt_eval_duration": 100_000_000,
+        "load_duration": 5_000_000
+    }
 
     # Wywołanie endpointu
     response = client.post('/api/ask', json={
@@ -75,13 +81,17 @@ def test_ask_endpoint(mock_generate, mock_check_model, mock_check_availability,
     assert "response" in data
     assert data["response"] == "To jest testowa odpowiedź."
 
-    # Sprawdzenie wywołania metody generate z poprawnymi parametrami
-    mock_generate.assert_called_once_with(
-        model_name="test-model:latest",
-        prompt="Testowe zapytanie",
-        temperature=0.7,
-        max_tokens=1000
-    )
+    assert data["timing"]["eval_count"] == 50
+    assert data["timing"]["tokens_per_second"] == 25.0
+    assert data["timing"]["load_seconds"] == 0.005
+
+    # Sprawdzenie wywołania metody generate_result z poprawnymi parametrami
+    mock_generate.assert_called_once()
+    kwargs = mock_generate.call_args[1]
+    assert kwargs["model_name"] == "test-model:latest"
+    assert kwargs["prompt"] == "Testowe zapytanie"
+    assert kwargs["options"].temperature == 0.7
+    assert kwargs["options"].max_tokens == 1000
 
 
 @patch.object(OllamaClient, 'check_availability')
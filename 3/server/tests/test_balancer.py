@@ -0,0 +1,188 @@
+"""
+Testy dla modułu balancer.
+"""
+
+import json
+import socket
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ollama_server.models import OllamaClient
+from ollama_server.balancer import OllamaPool, create_client, parse_backends
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """Minimalny serwer Ollama odpowiadający na /api/tags, /api/ps i /api/generate."""
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": name} for name in self.server.models]})
+        elif self.path == "/api/ps":
+            self._send_json({"models": [{"name": name} for name in self.server.loaded]})
+        else:
+            self._send_json({})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.calls.append(payload)
+        if self.server.fail:
+            self._send_json({"error": "awaria"}, status=500)
+        else:
+            self._send_json({"response": f"odpowiedź z {self.server.name}", "done": True})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_ollama():
+    """Fabryka fałszywych serwerów Ollama uruchamianych na wolnych portach."""
+    servers = []
+
+    def start(name, models=("tinyllama:latest",), loaded=(), fail=False):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOllamaHandler)
+        server.name = name
+        server.models = list(models)
+        server.loaded = list(loaded)
+        server.fail = fail
+        server.calls = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_port}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def closed_port_url():
+    """Adres, pod którym nic nie nasłuchuje."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_parse_backends():
+    """Test parsowania listy adresów z OLLAMA_URL."""
+    assert parse_backends("http://a:11434/, http://b:11434,http://a:11434") == [
+        "http://a:11434", "http://b:11434"
+    ]
+
+
+def test_create_client_single_and_multiple():
+    """Test wyboru klienta w zależności od liczby serwerów."""
+    single = create_client("http://localhost:11434")
+    pool = create_client("http://a:11434,http://b:11434", ps_interval=0)
+
+    assert type(single) is OllamaClient
+    assert isinstance(pool, OllamaPool)
+    assert [backend.url for backend in pool.backends] == ["http://a:11434", "http://b:11434"]
+
+
+def test_least_outstanding_routing(fake_ollama):
+    """Test wyboru serwera z najmniejszą liczbą trwających zapytań."""
+    server_a, url_a = fake_ollama("a")
+    server_b, url_b = fake_ollama("b")
+    pool = OllamaPool([url_a, url_b], ps_interval=0)
+    pool.backends[0].outstanding = 3
+
+    result = pool.generate("tinyllama", "Testowe zapytanie")
+
+    assert result == "odpowiedź z b"
+    assert len(server_a.calls) == 0
+    assert pool.backends[0].outstanding == 3
+    assert pool.backends[1].outstanding == 0
+
+
+def test_loaded_model_affinity(fake_ollama):
+    """Test preferowania serwera z załadowanym modelem (/api/ps)."""
+    server_a, url_a = fake_ollama("a", models=["tinyllama:latest", "llama3:latest"])
+    server_b, url_b = fake_ollama("b", models=["tinyllama:latest", "llama3:latest"], loaded=["llama3:latest"])
+    pool = OllamaPool([url_a, url_b], ps_interval=0)
+    pool.refresh_backends()
+
+    assert pool.generate("llama3", "Pytanie") == "odpowiedź z b"
+    assert pool.generate("llama3:latest", "Pytanie") == "odpowiedź z b"
+    assert len(server_a.calls) == 0
+    assert pool.stats()[1]["loaded_models"] == ["llama3:latest"]
+
+
+def test_failover_and_ejection(fake_ollama):
+    """Test ponowienia zapytania na innym serwerze i wyłączenia niedziałającego."""
+    _, url_ok = fake_ollama("ok")
+    dead_url = closed_port_url()
+    pool = OllamaPool([dead_url, url_ok], ps_interval=0, eject_base=10)
+
+    assert pool.generate("tinyllama", "Pytanie") == "odpowiedź z ok"
+
+    dead, healthy = pool.stats()
+    assert dead["healthy"] is False
+    assert dead["errors"] == 1
+    assert dead["ejected_for"] > 5
+    assert healthy["healthy"] is True
+    assert healthy["requests"] == 1
+    assert healthy["latency_ms"]["p50"] is not None
+
+    # Wyłączony serwer nie jest już wybierany
+    assert pool.generate("tinyllama", "Pytanie") == "odpowiedź z ok"
+    assert pool.stats()[0]["requests"] == 1
+
+
+def test_server_error_failover(fake_ollama):
+    """Test traktowania odpowiedzi 5xx jako awarii serwera."""
+    failing, url_failing = fake_ollama("awaria", fail=True)
+    _, url_ok = fake_ollama("ok")
+    pool = OllamaPool([url_failing, url_ok], ps_interval=0)
+
+    assert pool.generate("tinyllama", "Pytanie") == "odpowiedź z ok"
+    assert len(failing.calls) == 1
+    assert pool.stats()[0]["consecutive_failures"] == 1
+
+
+def test_exponential_backoff():
+    """Test wykładniczego wydłużania czasu wyłączenia serwera."""
+    pool = OllamaPool(["http://a:11434", "http://b:11434"], ps_interval=0, eject_base=1, eject_max=4)
+    backend = pool.backends[0]
+    delays = []
+    for _ in range(4):
+        pool._mark_failure(backend)
+        delays.append(round(pool.stats()[0]["ejected_for"]))
+
+    assert delays == [1, 2, 4, 4]
+
+
+def test_recovery_after_health_check(fake_ollama):
+    """Test przywrócenia serwera po udanym sprawdzeniu zdrowia."""
+    _, url = fake_ollama("a")
+    pool = OllamaPool([url, "http://b:11434"], ps_interval=0, eject_base=30)
+    pool._mark_failure(pool.backends[0])
+    assert pool.stats()[0]["healthy"] is False
+
+    pool.refresh_backends()
+
+    assert pool.stats()[0]["healthy"] is True
+    assert pool.stats()[0]["consecutive_failures"] == 0
+
+
+def test_list_models_merges_backends(fake_ollama):
+    """Test łączenia list modeli z wielu serwerów."""
+    _, url_a = fake_ollama("a", models=["tinyllama:latest"])
+    _, url_b = fake_ollama("b", models=["tinyllama:latest", "llama3:latest"])
+    pool = OllamaPool([url_a, url_b], ps_interval=0)
+
+    models = {model["name"]: model for model in pool.list_models()}
+
+    assert models["tinyllama:latest"]["backends"] == [url_a, url_b]
+    assert models["llama3:latest"]["backends"] == [url_b]
+    assert "info" in models["llama3:latest"]
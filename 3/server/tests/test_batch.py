@@ -0,0 +1,128 @@
+"""
+Testy dla modułu batch.
+"""
+
+import json
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+
+from ollama_server.server import create_app
+from ollama_server.models import OllamaClient
+from ollama_server.batch import BatchCheckpoint, parse_jsonl, run_batch
+from ollama_server.options import GenerationOptions
+
+
+def fake_generate_result(model_name, prompt, options):
+    """Odpowiedź /api/generate atrapy: tekst wielkimi literami, jeden token na znak."""
+    if prompt == "zły":
+        raise requests.ConnectionError("awaria")
+    return {"response": prompt.upper(), "eval_count": len(prompt), "eval_duration": 10 ** 9}
+
+
+def test_parse_jsonl():
+    """Test wczytywania promptów z linii JSONL."""
+    items = parse_jsonl(['"Pierwsze"', '', '{"prompt": "Drugie", "id": "b", "temperature": 0.1}'])
+
+    assert items == [{"prompt": "Pierwsze"}, {"prompt": "Drugie", "id": "b", "temperature": 0.1}]
+
+
+def test_parse_jsonl_invalid_line():
+    """Test błędu dla nieprawidłowej linii."""
+    with pytest.raises(ValueError) as error:
+        parse_jsonl(['"ok"', '{"tekst": "bez promptu"}'])
+
+    assert "2" in str(error.value)
+
+
+def test_run_batch_results_and_summary():
+    """Test przetwarzania zadań i podsumowania przepustowości."""
+    client = MagicMock()
+    client.generate_result.side_effect = fake_generate_result
+    items = [{"prompt": "a"}, {"prompt": "zły"}, {"prompt": "cc", "id": 7, "max_tokens": 5}]
+
+    results = list(run_batch(client, items, "model", GenerationOptions(max_tokens=100), parallelism=2))
+
+    summary = results.pop()["summary"]
+    by_index = {result["index"]: result for result in results}
+    assert by_index[0]["response"] == "A"
+    assert by_index[1]["error"].startswith("Błąd:")
+    assert "awaria" in by_index[1]["error"]
+    assert by_index[2]["id"] == 7
+    assert by_index[2]["response"] == "CC"
+    assert by_index[2]["timing"]["eval_count"] == 2
+    assert by_index[2]["timing"]["tokens_per_second"] == 2.0
+    # Parametry pozycji nadpisują domyślne
+    options = {call.args[1]: call.args[2] for call in client.generate_result.call_args_list}
+    assert options["a"].max_tokens == 100
+    assert options["cc"].max_tokens == 5
+    assert summary["total"] == 3
+    assert summary["processed"] == 3
+    assert summary["errors"] == 1
+    assert summary["tokens"] == 3
+    assert summary["prompts_per_second"] > 0
+
+
+def test_run_batch_resume_from_checkpoint(tmp_path):
+    """Test wznawiania zadania - pomijane są tylko pozycje zakończone sukcesem."""
+    path = tmp_path / "wyniki.jsonl"
+    path.write_text(
+        json.dumps({"index": 0, "response": "A"}) + "\n" +
+        json.dumps({"index": 1, "error": "Błąd: awaria"}) + "\n" +
+        '{"index": 2, "resp'
+    )
+    client = MagicMock()
+    client.generate_result.return_value = {"response": "ok"}
+    items = [{"prompt": "a"}, {"prompt": "b"}, {"prompt": "c"}]
+
+    results = list(run_batch(client, items, "model", GenerationOptions(), checkpoint=BatchCheckpoint(str(path))))
+
+    assert sorted(result["index"] for result in results[:-1]) == [1, 2]
+    assert results[-1]["summary"]["skipped"] == 1
+    assert BatchCheckpoint(str(path)).completed() == {0, 1, 2}
+
+
+@patch.object(OllamaClient, 'generate_result')
+def test_batch_endpoint(mock_generate, tmp_path):
+    """Test endpointu /api/batch ze strumieniem JSONL i punktem kontrolnym."""
+    mock_generate.side_effect = lambda model_name, prompt, options: {"response": f"odp: {prompt}", "eval_count": 2}
+    app = create_app()
+    app.config['TESTING'] = True
+    app.config['BATCH_DIR'] = str(tmp_path)
+    client = app.test_client()
+
+    response = client.post('/api/batch', json={
+        "prompts": ["jeden", {"prompt": "dwa", "id": "x"}],
+        "parallelism": 2,
+        "batch_id": "nocne"
+    })
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert sorted(line["response"] for line in lines[:-1]) == ["odp: dwa", "odp: jeden"]
+    assert all(line["timing"]["eval_count"] == 2 for line in lines[:-1])
+    assert lines[-1]["summary"]["processed"] == 2
+    assert (tmp_path / "nocne.jsonl").exists()
+
+    # Ponowne wysłanie tego samego zadania nie generuje odpowiedzi od nowa
+    response = client.post('/api/batch', json={"prompts": ["jeden", "dwa"], "batch_id": "nocne"})
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert lines == [{"summary": lines[0]["summary"]}]
+    assert lines[0]["summary"]["skipped"] == 2
+    assert mock_generate.call_count == 2
+
+
+def test_batch_endpoint_jsonl_body_and_validation():
+    """Test treści JSONL i walidacji endpointu /api/batch."""
+    app = create_app()
+    app.config['TESTING'] = True
+    client = app.test_client()
+
+    with patch.object(OllamaClient, 'generate_result', return_value={"response": "ok"}):
+        response = client.post('/api/batch?parallelism=1', data='"a"\n"b"\n', content_type="application/x-ndjson")
+    lines = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert lines[-1]["summary"]["processed"] == 2
+
+    assert client.post('/api/batch', json={"prompt": "a"}).status_code == 400
+    assert client.post('/api/batch', json={"prompts": ["a"], "batch_id": "../x"}).status_code == 400
@@ -0,0 +1,96 @@
+"""
+Testy dla modułu bench.
+"""
+
+import requests
+import pytest
+from unittest.mock import Mock
+
+from ollama_server.bench import percentile, summarize, run_bench, compare_to_baseline, error_type
+
+
+class FakeTarget:
+    """Cel pomiaru zwracający stałe wyniki; co fail_every-te zapytanie kończy się błędem 503."""
+
+    name = "fake"
+    url = "http://fake"
+    model_name = "phi3"
+
+    def __init__(self, fail_every=0):
+        self.prompts = []
+        self.fail_every = fail_every
+
+    def request(self, prompt):
+        self.prompts.append(prompt)
+        if self.fail_every and len(self.prompts) % self.fail_every == 0:
+            raise requests.HTTPError(response=Mock(status_code=503))
+        return {"ttft": 0.01, "tokens": 10, "backend_seconds": 0.0}
+
+
+def test_percentile():
+    """Test percentyli metodą najbliższego rangą."""
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_summarize():
+    """Test podsumowania wyników z błędami."""
+    results = [
+        {"latency": 1.0, "ttft": 0.1, "tokens": 10, "overhead": 0.2},
+        {"latency": 2.0, "ttft": 0.2, "tokens": 20, "overhead": 0.3},
+        {"error": "http_429", "latency": 0.01},
+        {"error": "timeout", "latency": 30.0},
+    ]
+
+    summary = summarize(results, duration=2.0)
+
+    assert summary["requests"] == 4
+    assert summary["completed"] == 2
+    assert summary["error_rate"] == 0.5
+    assert summary["errors_by_type"] == {"http_429": 1, "timeout": 1}
+    assert summary["tokens_per_second"] == 15.0
+    assert summary["latency_seconds"]["p50"] == 1.0
+    assert summary["latency_seconds"]["max"] == 2.0
+    assert summary["ttft_seconds"]["p99"] == 0.2
+    assert summary["overhead_seconds"]["mean"] == 0.25
+
+
+@pytest.mark.parametrize("options", [{"concurrency": 3}, {"rate": 200.0}])
+def test_run_bench_replays_prompts(options):
+    """Test odtwarzania promptów cyklicznie w obu trybach."""
+    target = FakeTarget(fail_every=3)
+
+    summary = run_bench(target, ["a", "b"], requests_count=6, **options)
+
+    assert sorted(target.prompts) == ["a", "a", "a", "b", "b", "b"]
+    assert summary["requests"] == 6
+    assert summary["errors_by_type"] == {"http_503": 2}
+    assert summary["tokens"] == 40
+    assert summary["mode"] == ("rate" if "rate" in options else "concurrency")
+    assert summary["ttft_seconds"]["p50"] == 0.01
+
+
+def test_compare_to_baseline():
+    """Test wykrywania regresji względem wyniku bazowego."""
+    baseline = {"latency_seconds": {"p95": 1.0}, "ttft_seconds": None, "tokens_per_second": 100.0, "error_rate": 0.0}
+
+    assert compare_to_baseline(dict(baseline, latency_seconds={"p95": 1.05}), baseline) == []
+    regressions = compare_to_baseline(
+        {"latency_seconds": {"p95": 1.5}, "ttft_seconds": None, "tokens_per_second": 80.0, "error_rate": 0.05},
+        baseline
+    )
+    assert regressions == ["latency_seconds.p95: 1.0 -> 1.5", "tokens_per_second: 100.0 -> 80.0",
+                           "error_rate: 0.0 -> 0.05"]
+
+
+def test_error_type():
+    """Test nazw rodzajów błędów."""
+    assert error_type(requests.HTTPError(response=Mock(status_code=429))) == "http_429"
+    assert error_type(requests.Timeout()) == "timeout"
+    assert error_type(requests.ConnectionError()) == "connection"
+    assert error_type(ValueError("x")) == "ValueError"
@@ -0,0 +1,186 @@
+"""
+Testy wydajności serwerów korzystających z Ollama, z atrapą fake_ollama.
+
+Każdy serwer (pakiet ollama_server, 3/server.py, 2/server2.py, 2/server3.py)
+jest uruchamiany w wątku i obciążany zapytaniami /ask; atrapa zapewnia
+powtarzalny czas generowania, więc wyniki można porównywać między zmianami.
+Domyślnie pomijane (znacznik benchmark):
+
+    pytest -m benchmark
+    BENCH_OUTPUT=bench.json pytest -m benchmark   # wyniki JSON (np. dla CI)
+"""
+
+import os
+import sys
+import json
+import threading
+import importlib.util
+from pathlib import Path
+
+import pytest
+import requests
+from werkzeug.serving import make_server
+
+from ollama_server.bench import run_bench
+from ollama_server.fake_ollama import FakeOllama, response_text
+from ollama_server.server import create_app
+
+pytestmark = pytest.mark.benchmark
+
+PROJECT_DIR = Path(__file__).resolve().parents[3]
+SHARED_DIR = PROJECT_DIR / "3"
+
+# Skrypty serwerów: nazwa -> plik (moduły współdzielone w katalogu 3/)
+SCRIPT_SERVERS = {
+    "server": SHARED_DIR / "server.py",
+    "server2": PROJECT_DIR / "2" / "server2.py",
+    "server3": PROJECT_DIR / "2" / "server3.py",
+}
+SERVERS = ("ollama_server",) + tuple(SCRIPT_SERVERS)
+
+# Atrapa: 20 ms na prompt + 10 tokenów po 5 ms = ok. 70 ms na zapytanie
+TOKEN_RATE = 200.0
+LATENCY = 0.02
+RESPONSE_TOKENS = 10
+GENERATION_SECONDS = LATENCY + RESPONSE_TOKENS / TOKEN_RATE
+
+REQUESTS = 24
+CONCURRENCY = 8
+
+
+class AskTarget:
+    """Cel pomiaru bench.run_bench: POST /ask serwera z zapamiętaniem treści odpowiedzi."""
+
+    name = "ask"
+    model_name = None
+
+    def __init__(self, url, path):
+        self.url = url
+        self.path = path
+        self.session = requests.Session()
+        self.responses = set()
+
+    def request(self, prompt):
+        response = self.session.post(f"{self.url}{self.path}", json={"prompt": prompt, "max_tokens": RESPONSE_TOKENS},
+                                     timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        self.responses.add(data["response"].strip())
+        timing = data.get("timing") or {}
+        return {
+            "ttft": None,
+            # Serwery bez statystyk timing: w atrapie jeden token to jedno słowo
+            "tokens": timing.get("eval_count") or len(data["response"].split()),
+            "backend_seconds": timing.get("total_seconds"),
+        }
+
+
+def load_script(name, path):
+    """Importuje skrypt serwera pod unikalną nazwą modułu."""
+    spec = importlib.util.spec_from_file_location(f"bench_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def fake():
+    """Atrapa Ollama wspólna dla wszystkich pomiarów."""
+    with FakeOllama(token_rate=TOKEN_RATE, latency=LATENCY, response_tokens=RESPONSE_TOKENS) as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def results():
+    """Wyniki pomiarów; zapisywane do pliku BENCH_OUTPUT, jeśli ustawiono."""
+    collected = {}
+    yield collected
+    output = os.environ.get("BENCH_OUTPUT")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(collected, f, ensure_ascii=False, indent=2)
+
+
+@pytest.fixture(scope="module", params=SERVERS)
+def server(request, fake, tmp_path_factory):
+    """Uruchamia serwer połączony z atrapą; zwraca (nazwa, cel pomiaru)."""
+    name = request.param
+    workdir = tmp_path_factory.mktemp(name)
+    cwd = os.getcwd()
+    # Skrypty czytają i tworzą .env w bieżącym katalogu
+    os.chdir(workdir)
+    try:
+        if name == "ollama_server":
+            env_file = workdir / ".env"
+            env_file.write_text(f'OLLAMA_URL="{fake.url}"\nMODEL_NAME="tinyllama:latest"\n'
+                                f"MAX_CONCURRENCY={CONCURRENCY}\n", encoding="utf-8")
+            app = create_app(str(env_file))
+            path = "/api/ask"
+        else:
+            sys.path.insert(0, str(SHARED_DIR))
+            module = load_script(name, SCRIPT_SERVERS[name])
+            module.OLLAMA_URL = fake.url
+            app = module.app
+            path = "/ask"
+    finally:
+        os.chdir(cwd)
+
+    http_server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield name, AskTarget(f"http://127.0.0.1:{http_server.server_port}", path)
+    finally:
+        http_server.shutdown()
+        if name == "ollama_server":
+            app.extensions["ollama_config"].stop()
+        elif str(SHARED_DIR) in sys.path:
+            sys.path.remove(str(SHARED_DIR))
+
+
+def test_latency_and_throughput(server, fake, results):
+    """Test czasu odpowiedzi i skalowania przepustowości z liczbą równoczesnych zapytań."""
+    name, target = server
+    fake.unload()
+    target.request("rozgrzewka")
+
+    single = run_bench(target, ["Ile to 2+2?", "Co to jest Ollama?"], REQUESTS // 4, concurrency=1)
+    parallel = run_bench(target, ["Ile to 2+2?", "Co to jest Ollama?"], REQUESTS, concurrency=CONCURRENCY)
+    results[name] = {"concurrency_1": single, f"concurrency_{CONCURRENCY}": parallel}
+
+    for summary in (single, parallel):
+        assert summary["errors"] == 0
+        assert summary["latency_seconds"]["p50"] >= GENERATION_SECONDS
+    assert target.responses == {response_text(RESPONSE_TOKENS).strip()}
+    assert parallel["tokens"] == REQUESTS * RESPONSE_TOKENS
+    # Atrapa nie ogranicza równoległości - szeregowanie zapytań w serwerze zatrzymałoby wzrost przepustowości
+    assert parallel["requests_per_second"] >= 2 * single["requests_per_second"]
+
+
+def test_error_injection(server, fake):
+    """Test przekazywania błędów Ollama jako błędów HTTP i powrotu do działania po awarii."""
+    name, target = server
+    fake.settings.error_rate = 0.5
+    try:
+        summary = run_bench(target, ["test"], 12, concurrency=4)
+    finally:
+        fake.settings.error_rate = 0.0
+
+    assert 0 < summary["errors"] < summary["requests"]
+    assert all(error.startswith("http_5") for error in summary["errors_by_type"])
+    assert run_bench(target, ["test"], 4, concurrency=2)["errors"] == 0
+
+
+def test_model_load_delay(server, fake):
+    """Test opóźnienia pierwszego zapytania o czas ładowania modelu."""
+    name, target = server
+    fake.unload()
+    fake.settings.load_delay = 0.3
+    try:
+        cold = run_bench(target, ["test"], 1)
+        warm = run_bench(target, ["test"], 1)
+    finally:
+        fake.settings.load_delay = 0.0
+
+    assert cold["latency_seconds"]["max"] >= 0.3 + GENERATION_SECONDS
+    assert warm["latency_seconds"]["max"] < 0.3
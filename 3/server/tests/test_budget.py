@@ -0,0 +1,157 @@
+"""
+Testy dla modułu budget.
+"""
+
+import json
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+
+from ollama_server import budget as budget_module
+from ollama_server.server import create_app
+from ollama_server.models import OllamaClient
+from ollama_server.budget import (
+    PromptBudget, PromptTooLong, estimate_tokens, truncate_text, TRUNCATION_MARKER
+)
+
+
+def make_budget(window=100, **kwargs):
+    """Tworzy budżet ze stałym oknem kontekstu."""
+    return PromptBudget(MagicMock(), context_window=window, **kwargs)
+
+
+def test_estimate_tokens():
+    """Test szacowania liczby tokenów."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Ala ma kota.") == 4
+    assert estimate_tokens("konstantynopolitańczykowianeczka") == 8
+    assert estimate_tokens("a  \n\n b") == 2
+
+
+def test_truncate_text_strategies():
+    """Test przycinania początku i środka tekstu."""
+    text = " ".join(f"w{i}" for i in range(100))
+
+    middle = truncate_text(text, 20, "truncate_middle")
+    assert estimate_tokens(middle) <= 20
+    assert middle.startswith("w0 ") and middle.endswith(" w99")
+    assert "[...]" in middle
+
+    head = truncate_text(text, 20, "truncate_head")
+    assert estimate_tokens(head) <= 20
+    assert head.endswith(" w99")
+    assert "w0 " not in head
+
+    assert truncate_text("krótki tekst", 20) == "krótki tekst"
+
+
+def test_apply_within_budget():
+    """Test promptu mieszczącego się w budżecie."""
+    prompt, tokens = make_budget().apply("llama3", "Ala ma kota.", max_tokens=30)
+
+    assert prompt == "Ala ma kota."
+    assert tokens["prompt"] == 4
+    assert tokens["budget"] == 70
+    assert tokens["truncated"] is False
+
+
+def test_apply_reject():
+    """Test odrzucenia zbyt długiego promptu."""
+    with pytest.raises(PromptTooLong) as excinfo:
+        make_budget(strategy="reject").apply("llama3", "słowo " * 200, max_tokens=30)
+
+    assert excinfo.value.tokens["prompt_original"] == 400
+    assert excinfo.value.tokens["budget"] == 70
+
+
+def test_apply_reserves_at_most_half_window_for_output():
+    """Test, że max_tokens nie zajmuje więcej niż połowy okna."""
+    _, tokens = make_budget().apply("llama3", "x", max_tokens=1000)
+    assert tokens["budget"] == 50
+
+
+def test_apply_request_num_ctx():
+    """Test okna kontekstu podanego w zapytaniu (options.num_ctx) zamiast okna modelu."""
+    _, tokens = make_budget(window=100).apply("llama3", "x", max_tokens=30, num_ctx=1000)
+    assert tokens["context_window"] == 1000
+    assert tokens["budget"] == 970
+
+
+def test_estimate_tokens_cache_does_not_keep_text():
+    """Test, że pamięć podręczna oszacowań nie przechowuje tekstów promptów."""
+    text = "słowo " * 10000
+    assert estimate_tokens(text) == estimate_tokens(text) == 20000
+    assert not any(isinstance(part, str) for key in budget_module._estimates for part in key)
+
+
+def test_apply_summarize():
+    """Test streszczania środkowej części promptu."""
+    summarize = MagicMock(return_value="STRESZCZENIE")
+    budget = make_budget(window=200, summarize=summarize)
+    prompt = "Instrukcja. " + "dane " * 300 + "Pytanie?"
+
+    result, tokens = budget.apply("llama3", prompt, max_tokens=50, strategy="summarize")
+
+    assert tokens["truncated"] is True
+    assert tokens["prompt"] <= tokens["budget"]
+    assert result.startswith("Instrukcja.")
+    assert result.endswith("Pytanie?")
+    assert "STRESZCZENIE" in result
+    assert summarize.call_count >= 1
+
+
+def test_context_window_discovery():
+    """Test ustalania okna kontekstu z /api/show i MODEL_INFO."""
+    client = MagicMock()
+    client.show_model.return_value = {"parameters": "stop \"<|eot_id|>\"\nnum_ctx 8192"}
+    assert PromptBudget(client).context_window("llama3") == 8192
+
+    # Bez num_ctx Ollama używa domyślnego okna
+    client = MagicMock()
+    client.show_model.return_value = {"model_info": {"llama.context_length": 131072}}
+    assert PromptBudget(client).context_window("llama3") == 2048
+
+    # Serwer niedostępny - MODEL_INFO, bez zapamiętywania wyniku
+    client = MagicMock()
+    client.show_model.side_effect = requests.ConnectionError("brak połączenia")
+    budget = PromptBudget(client)
+    assert budget.context_window("tinyllama") == 2048
+    budget.context_window("tinyllama")
+    assert client.show_model.call_count == 2
+
+
+@pytest.fixture
+def client():
+    """Fixture dla klienta testowego Flask."""
+    app = create_app()
+    app.config['TESTING'] = True
+    app.extensions["ollama_budget"].context_window_override = 100
+    with app.test_client() as client:
+        yield client
+
+
+@patch.object(OllamaClient, 'check_availability', return_value=True)
+@patch.object(OllamaClient, 'check_model_availability', return_value=True)
+@patch.object(OllamaClient, 'generate_result', return_value={"response": "Odpowiedź"})
+def test_ask_truncates_prompt(mock_generate, mock_model_available, mock_available, client):
+    """Test przycięcia promptu przed wysłaniem do Ollama."""
+    response = client.post('/api/ask', json={"prompt": "słowo " * 200, "max_tokens": 30})
+    data = json.loads(response.data)
+
+    assert response.status_code == 200
+    assert data["tokens"]["truncated"] is True
+    assert data["tokens"]["prompt"] <= 70
+    assert TRUNCATION_MARKER in mock_generate.call_args[1]["prompt"]
+
+
+@patch.object(OllamaClient, 'check_availability', return_value=True)
+@patch.object(OllamaClient, 'check_model_availability', return_value=True)
+@patch.object(OllamaClient, 'generate_result', return_value={"response": "Odpowiedź"})
+def test_ask_rejects_prompt(mock_generate, mock_model_available, mock_available, client):
+    """Test odrzucenia zbyt długiego promptu (413) i nieznanej strategii (400)."""
+    response = client.post('/api/ask', json={"prompt": "słowo " * 200, "strategy": "reject"})
+    assert response.status_code == 413
+    assert json.loads(response.data)["tokens"]["prompt_original"] == 400
+    mock_generate.assert_not_called()
+
+    assert client.post('/api/ask', json={"prompt": "x", "strategy": "nieznana"}).status_code == 400
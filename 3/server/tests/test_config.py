@@ -3,15 +3,18 @@ Testy dla modułu konfiguracji.
 """
 
 import os
+import time
 import pytest
 import tempfile
-from unittest.mock import patch
+from unittest.mock import patch, MagicMock
 
 from ollama_server.config import (
     load_config,
     update_env_var,
     find_or_create_env,
     create_default_env,
+    write_env_values,
+    ConfigStore,
     DEFAULT_CONFIG
 )
 
@@ -139,4 +142,107 @@ def test_create_default_env():
         assert f'MODEL_NAME="{DEFAULT_CONFIG["MODEL_NAME"]}"' in content
         assert f'SERVER_PORT={DEFAULT_CONFIG["SERVER_PORT"]}' in content
         assert f'TEMPERATURE={DEFAULT_CONFIG["TEMPERATURE"]}' in content
-        assert f'MAX_TOKENS={DEFAULT_CONFIG["MAX_TOKENS"]}' in content
\ No newline at end of file
+        assert f'MAX_TOKENS={DEFAULT_CONFIG["MAX_TOKENS"]}' in content
+
+
+def test_write_env_values(temp_env_file):
+    """Test podmiany i dopisania wartości z zachowaniem pozostałych linii."""
+    write_env_values(temp_env_file, {"MODEL_NAME": "phi3", "EMBED_MODEL": "nomic-embed-text"})
+
+    with open(temp_env_file, 'r') as f:
+        lines = f.read().splitlines()
+
+    assert lines[0] == "# Test file"
+    assert 'MODEL_NAME="phi3"' in lines
+    assert "SERVER_PORT=5000" in lines
+    assert lines[-1] == 'EMBED_MODEL="nomic-embed-text"'
+
+
+def test_write_env_values_keeps_mode(temp_env_file, tmp_path):
+    """Test zachowania uprawnień pliku .env i uprawnień nowego pliku zgodnych z umask."""
+    os.chmod(temp_env_file, 0o640)
+    new_file = str(tmp_path / ".env")
+    umask = os.umask(0o022)
+    try:
+        write_env_values(temp_env_file, {"MODEL_NAME": "phi3"})
+        write_env_values(new_file, {"MODEL_NAME": "phi3"})
+    finally:
+        os.umask(umask)
+
+    assert os.stat(temp_env_file).st_mode & 0o777 == 0o640
+    assert os.stat(new_file).st_mode & 0o777 == 0o644
+    assert os.listdir(tmp_path) == [".env"]
+
+
+def test_config_store_update_is_debounced(temp_env_file):
+    """Test zmiany w pamięci i jednego zapisu pliku dla serii zmian."""
+    on_change = MagicMock()
+    store = ConfigStore(load_config(temp_env_file), temp_env_file, debounce=0.05, on_change=on_change)
+    before = store.snapshot()
+
+    with patch('ollama_server.config.write_env_values', wraps=write_env_values) as mock_write:
+        assert store.update(MODEL_NAME="a") == ["MODEL_NAME"]
+        store.update(MODEL_NAME="b", TEMPERATURE=0.9)
+        assert store.update(MODEL_NAME="b") == []
+
+        # Migawka jest podmieniana, a nie zmieniana w miejscu
+        assert before["MODEL_NAME"] == "test-model:latest"
+        assert store.get("MODEL_NAME") == "b"
+        assert on_change.call_count == 2
+
+        time.sleep(0.3)
+        mock_write.assert_called_once_with(temp_env_file, {"MODEL_NAME": "b", "TEMPERATURE": 0.9})
+
+    assert load_config(temp_env_file)["MODEL_NAME"] == "b"
+    # Własny zapis nie jest wczytywany ponownie jako zmiana z zewnątrz
+    assert store.check() is False
+
+
+def test_config_store_reloads_external_changes(temp_env_file):
+    """Test wczytania zmian pliku .env, z pierwszeństwem zmian oczekujących na zapis."""
+    store = ConfigStore(load_config(temp_env_file), temp_env_file, debounce=60)
+    store.update(MODEL_NAME="w-pamieci")
+
+    with open(temp_env_file, 'a') as f:
+        f.write("MAX_TOKENS=64\n")
+    os.utime(temp_env_file, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+
+    assert store.check() is True
+    assert store.get("MAX_TOKENS") == 64
+    assert store.get("MODEL_NAME") == "w-pamieci"
+
+    store.stop()
+    assert load_config(temp_env_file)["MODEL_NAME"] == "w-pamieci"
+
+
+def test_config_store_reload_uses_file_only(temp_env_file):
+    """Test wczytania pliku bez zmiennych środowiskowych - klucz usunięty z pliku wraca do domyślnej."""
+    store = ConfigStore(load_config(temp_env_file), temp_env_file)
+    assert store.get("MAX_TOKENS") == 500
+
+    with open(temp_env_file, 'w') as f:
+        f.write("MODEL_NAME=test-model:latest\n")
+    with patch.dict(os.environ, {"MAX_TOKENS": "500", "MAX_QUEUE": "7"}):
+        changed = store.reload()
+
+    assert "MAX_TOKENS" in changed
+    assert store.get("MAX_TOKENS") == DEFAULT_CONFIG["MAX_TOKENS"]
+    # Klucze spoza pliku nie są zmieniane przy ponownym wczytaniu
+    assert "MAX_QUEUE" not in changed
+
+
+def test_config_store_one_watcher_per_file(temp_env_file):
+    """Test przejęcia obserwacji pliku przez nowy magazyn i wyrejestrowania przy zatrzymaniu."""
+    first = ConfigStore(load_config(temp_env_file), temp_env_file, poll_interval=0.05)
+    second = ConfigStore(load_config(temp_env_file), temp_env_file, poll_interval=0.05)
+
+    with patch('ollama_server.config.atexit') as mock_atexit:
+        first.start()
+        second.start()
+        assert first._watcher is None
+        assert second._watcher.is_alive()
+        assert mock_atexit.unregister.call_args_list == [((first.flush,),)]
+
+        second.stop()
+        assert second._watcher is None
+        assert mock_atexit.unregister.call_count == 2
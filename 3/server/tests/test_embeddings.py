@@ -0,0 +1,128 @@
+"""
+Testy dla modułu embeddings i endpointu /api/embed.
+"""
+
+import os
+import json
+import pytest
+import requests
+from array import array
+from unittest.mock import patch, MagicMock
+
+from ollama_server.server import create_app
+from ollama_server.models import OllamaClient
+from ollama_server.embeddings import Embedder, EmbeddingCache, cache_key
+
+
+def fake_embed(model_name, texts):
+    """Wektor zależny od długości tekstu."""
+    return [[float(len(text)), 0.5] for text in texts]
+
+
+def test_cache_roundtrip_and_persistence(tmp_path):
+    """Test zapisu wektora jako float32 i odczytu po ponownym utworzeniu."""
+    cache = EmbeddingCache(str(tmp_path))
+    key = cache_key("nomic-embed-text", "Ala ma kota")
+    cache.put(key, array("f", [0.1, 0.2, 0.3]))
+
+    assert os.path.getsize(os.path.join(str(tmp_path), key[:2], key + ".f32")) == 12
+
+    reopened = EmbeddingCache(str(tmp_path))
+    assert reopened.get(key).tolist() == pytest.approx([0.1, 0.2, 0.3])
+    assert reopened.stats()["entries"] == 1
+    assert reopened.get(cache_key("inny-model", "Ala ma kota")) is None
+
+
+def test_cache_lru_eviction(tmp_path):
+    """Test usuwania najdawniej używanego wektora."""
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    keys = [cache_key("m", text) for text in ("a", "b", "c")]
+    cache.put(keys[0], array("f", [1.0]))
+    cache.put(keys[1], array("f", [2.0]))
+    assert cache.get(keys[0]) is not None
+
+    cache.put(keys[2], array("f", [3.0]))
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.stats()["evicted"] == 1
+    assert not os.path.exists(os.path.join(str(tmp_path), keys[1][:2], keys[1] + ".f32"))
+
+
+def test_embedder_dedup_cache_and_batches(tmp_path):
+    """Test deduplikacji, pamięci podręcznej i podziału na paczki."""
+    client = MagicMock()
+    client.embed.side_effect = fake_embed
+    embedder = Embedder(client, EmbeddingCache(str(tmp_path)), batch_size=2)
+
+    vectors, stats = embedder.embed("m", ["a", "bb", "a", "ccc", "dddd"])
+
+    assert vectors == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5], [3.0, 0.5], [4.0, 0.5]]
+    assert stats == {"unique": 4, "cached": 0, "computed": 4, "batches": 2}
+    assert [call[0][1] for call in client.embed.call_args_list] == [["a", "bb"], ["ccc", "dddd"]]
+
+    vectors, stats = embedder.embed("m", ["bb", "eeeee"])
+    assert vectors == [[2.0, 0.5], [5.0, 0.5]]
+    assert stats == {"unique": 2, "cached": 1, "computed": 1, "batches": 1}
+
+
+def test_embedder_rejects_mismatched_response():
+    """Test błędu, gdy Ollama zwróci inną liczbę wektorów."""
+    client = MagicMock()
+    client.embed.return_value = [[1.0]]
+
+    with pytest.raises(ValueError):
+        Embedder(client).embed("m", ["a", "b"])
+
+
+@patch('requests.post')
+def test_client_embed_fallback(mock_post):
+    """Test użycia /api/embeddings, gdy serwer nie ma /api/embed."""
+    not_found = MagicMock(status_code=404, headers={"Content-Type": "text/plain"})
+    single = MagicMock(status_code=200)
+    single.json.return_value = {"embedding": [0.25]}
+    mock_post.side_effect = [not_found, single, single]
+
+    vectors = OllamaClient("http://localhost:11434").embed("m", ["a", "b"])
+
+    assert vectors == [[0.25], [0.25]]
+    assert mock_post.call_args_list[0][0][0] == "http://localhost:11434/api/embed"
+    assert mock_post.call_args_list[1][1]["json"] == {"model": "m", "prompt": "a"}
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Fixture dla klienta testowego Flask z pamięcią podręczną w katalogu tymczasowym."""
+    app = create_app()
+    app.config['TESTING'] = True
+    app.extensions["ollama_embedder"].cache = EmbeddingCache(str(tmp_path))
+    with app.test_client() as client:
+        yield client
+
+
+@patch.object(OllamaClient, 'embed')
+def test_embed_endpoint(mock_embed, client):
+    """Test endpointu /api/embed."""
+    mock_embed.side_effect = fake_embed
+
+    data = json.loads(client.post('/api/embed', json={"input": ["a", "bb", "a"], "model": "m"}).data)
+    assert data["embeddings"] == [[1.0, 0.5], [2.0, 0.5], [1.0, 0.5]]
+    assert data["dimensions"] == 2
+    assert data["computed"] == 2
+
+    data = json.loads(client.post('/api/embed', json={"input": "a", "model": "m"}).data)
+    assert data["cached"] == 1
+    assert mock_embed.call_count == 1
+
+    metrics = json.loads(client.get('/api/metrics').data)
+    assert metrics["embeddings"]["hits"] == 1
+
+
+@patch.object(OllamaClient, 'embed')
+def test_embed_endpoint_errors(mock_embed, client):
+    """Test błędów endpointu /api/embed."""
+    assert client.post('/api/embed', json={}).status_code == 400
+    assert client.post('/api/embed', json={"input": [1, 2]}).status_code == 400
+
+    mock_embed.side_effect = requests.ConnectionError("brak połączenia")
+    assert client.post('/api/embed', json={"input": "a"}).status_code == 502
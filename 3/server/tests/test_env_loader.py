@@ -0,0 +1,41 @@
+"""
+Testy modułu 3/env_loader.py serwerów Flask.
+"""
+
+import os
+import importlib.util
+from pathlib import Path
+
+MODULE_PATH = Path(__file__).resolve().parents[2] / "env_loader.py"
+spec = importlib.util.spec_from_file_location("env_loader", MODULE_PATH)
+env_loader = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(env_loader)
+
+
+def test_update_env_value(tmp_path):
+    """Test podmiany i dopisania wartości w pliku .env."""
+    env_file = tmp_path / ".env"
+    env_file.write_text("# Konfiguracja\nMODEL_NAME=\"llama3\"\nPORT=5000\n")
+
+    assert env_loader.update_env_value(str(env_file), "MODEL_NAME", "phi3")
+    assert env_loader.update_env_value(str(env_file), "TEMPERATURE", 0.5)
+
+    assert env_file.read_text() == "# Konfiguracja\nMODEL_NAME=\"phi3\"\nPORT=5000\nTEMPERATURE=0.5\n"
+    assert os.listdir(tmp_path) == [".env"]
+
+
+def test_update_env_value_keeps_mode(tmp_path):
+    """Test zachowania uprawnień pliku .env po atomowym zapisie."""
+    env_file = tmp_path / ".env"
+    env_file.write_text("PORT=5000\n")
+    os.chmod(env_file, 0o644)
+
+    env_loader.update_env_value(str(env_file), "PORT", 5001)
+
+    assert os.stat(env_file).st_mode & 0o777 == 0o644
+
+
+def test_update_env_value_missing_file(tmp_path):
+    """Test, że brakujący plik .env nie jest tworzony."""
+    assert not env_loader.update_env_value(str(tmp_path / ".env"), "PORT", 5001)
+    assert os.listdir(tmp_path) == []
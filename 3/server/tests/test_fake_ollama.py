@@ -0,0 +1,141 @@
+"""
+Testy dla atrapy Ollama (fake_ollama) z prawdziwym klientem OllamaClient.
+"""
+
+import time
+import pytest
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from ollama_server.fake_ollama import FakeOllama, FakeOllamaSettings, response_text, embedding
+from ollama_server.models import OllamaClient
+from ollama_server.options import GenerationOptions
+from ollama_server.bench import OllamaTarget
+
+
+@pytest.fixture
+def fake():
+    """Atrapa bez opóźnień generowania."""
+    with FakeOllama(token_rate=0, latency=0, response_tokens=8) as server:
+        yield server
+
+
+def test_tags_and_availability(fake):
+    """Test listy modeli i sprawdzania dostępności."""
+    client = OllamaClient(fake.url)
+
+    assert client.check_availability() is True
+    names = [model["name"] for model in client.list_models()]
+    assert "tinyllama:latest" in names
+    assert client.check_model_availability("phi3") is True
+
+
+def test_generate_non_streaming(fake):
+    """Test generowania bez strumieniowania - deterministyczna treść i statystyki."""
+    client = OllamaClient(fake.url)
+
+    result = client.generate_result("tinyllama", "Ile to 2+2?", GenerationOptions(max_tokens=5))
+
+    assert result["response"] == response_text(5)
+    assert result["eval_count"] == 5
+    assert result["done_reason"] == "length"
+    assert result["prompt_eval_count"] == 3
+    assert client.generate("tinyllama", "Ile to 2+2?") == response_text(8)
+
+
+def test_generate_streaming(fake):
+    """Test generowania strumieniowego - jeden fragment na token i podsumowanie."""
+    response = requests.post(f"{fake.url}/api/generate", json={"model": "phi3", "prompt": "Cześć"}, stream=True)
+    chunks = [line for line in response.iter_lines() if line]
+
+    assert len(chunks) == 9
+    target = OllamaTarget(fake.url, "phi3", GenerationOptions(max_tokens=3))
+    result = target.request("Cześć")
+    assert result["tokens"] == 3
+    assert result["ttft"] is not None
+
+
+def test_unknown_model(fake):
+    """Test błędu 404 dla modelu, którego nie pobrano."""
+    client = OllamaClient(fake.url)
+
+    with pytest.raises(requests.HTTPError):
+        client.generate_result("llama3", "test")
+
+
+def test_pull_adds_model(fake):
+    """Test pobierania modelu - komunikaty postępu i dopisanie do listy."""
+    client = OllamaClient(fake.url)
+
+    statuses = [message["status"] for message in client.pull_model_stream("llama3")]
+
+    assert statuses[0] == "pulling manifest"
+    assert statuses[-1] == "success"
+    assert any(name == "llama3:latest" for name in [model["name"] for model in client.list_models()])
+    assert client.generate_result("llama3", "test")["response"] == response_text(8)
+
+
+def test_embed(fake):
+    """Test deterministycznych embeddingów (/api/embed)."""
+    client = OllamaClient(fake.url)
+
+    vectors = client.embed("nomic-embed-text", ["a", "b", "a"])
+
+    assert vectors[0] == vectors[2] == embedding("a", 8)
+    assert vectors[0] != vectors[1]
+    assert client.show_model("tinyllama")["model_info"]["llama.context_length"] == 2048
+
+
+def test_error_injection():
+    """Test wstrzykiwania błędów - powtarzalne przy tym samym ziarnie."""
+    def failures(seed):
+        with FakeOllama(token_rate=0, latency=0, error_rate=0.5, error_status=503, seed=seed) as server:
+            client = OllamaClient(server.url)
+            outcome = []
+            for _ in range(20):
+                try:
+                    client.generate_result("phi3", "test")
+                    outcome.append(False)
+                except requests.HTTPError as e:
+                    assert e.response.status_code == 503
+                    outcome.append(True)
+            assert server.stats()["errors_injected"] == sum(outcome)
+            return outcome
+
+    first = failures(seed=1)
+    assert 0 < sum(first) < 20
+    assert failures(seed=1) == first
+
+
+def test_load_delay_and_token_rate():
+    """Test opóźnienia ładowania modelu przy pierwszym użyciu i prędkości generowania."""
+    with FakeOllama(token_rate=200, latency=0, load_delay=0.2, response_tokens=10) as server:
+        client = OllamaClient(server.url)
+
+        assert client.load_model("phi3") == pytest.approx(0.2)
+        assert client.load_model("phi3") == 0.0
+
+        started = time.perf_counter()
+        result = client.generate_result("phi3", "test")
+        assert time.perf_counter() - started >= 0.05
+        assert result["eval_duration"] == pytest.approx(0.05e9, rel=0.01)
+        assert server.stats()["loads"] == 1
+        assert [model["name"] for model in requests.get(f"{server.url}/api/ps").json()["models"]] == ["phi3:latest"]
+
+
+def test_max_parallel_queues_generations():
+    """Test limitu równoczesnych generacji (jak OLLAMA_NUM_PARALLEL)."""
+    with FakeOllama(token_rate=0, latency=0.05, max_parallel=2) as server:
+        client = OllamaClient(server.url)
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            list(executor.map(lambda _: client.generate_result("phi3", "test"), range(6)))
+
+        assert server.stats()["max_active"] == 2
+
+
+def test_settings_validation():
+    """Test odrzucania błędnych ustawień."""
+    with pytest.raises(ValueError):
+        FakeOllamaSettings(latency_distribution="normal")
+    with pytest.raises(ValueError):
+        FakeOllamaSettings(error_rate=1.5)
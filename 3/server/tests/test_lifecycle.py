@@ -0,0 +1,155 @@
+"""
+Testy dla modułu lifecycle.
+"""
+
+import json
+import threading
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+
+from ollama_server.server import create_app
+from ollama_server.models import OllamaClient
+from ollama_server.lifecycle import ModelManager, parse_model_list
+
+
+def test_parse_model_list():
+    """Test parsowania listy modeli z konfiguracji."""
+    assert parse_model_list(" llama3, phi3:mini ,,") == ["llama3", "phi3:mini"]
+    assert parse_model_list("") == []
+
+
+@patch('requests.post')
+def test_load_model_payload(mock_post):
+    """Test zapytania ładującego model z keep_alive."""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"response": "", "done": True, "load_duration": 2_500_000_000}
+    mock_post.return_value = mock_response
+    client = OllamaClient("http://localhost:11434", keep_alive="30m")
+
+    seconds = client.load_model("llama3")
+
+    assert seconds == 2.5
+    args, kwargs = mock_post.call_args
+    assert args[0] == "http://localhost:11434/api/generate"
+    assert kwargs["json"] == {"model": "llama3", "prompt": "", "stream": False, "keep_alive": "30m"}
+
+
+@patch('requests.post')
+def test_generate_passes_keep_alive(mock_post):
+    """Test przekazywania keep_alive przy generowaniu."""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"response": "ok"}
+    mock_post.return_value = mock_response
+
+    OllamaClient("http://localhost:11434", keep_alive="-1").generate("llama3", "Pytanie")
+    assert mock_post.call_args[1]["json"]["keep_alive"] == "-1"
+
+    OllamaClient("http://localhost:11434").generate("llama3", "Pytanie")
+    assert "keep_alive" not in mock_post.call_args[1]["json"]
+
+
+def test_manager_load_records_latency():
+    """Test zapisu stanu i czasu ładowania modelu."""
+    client = MagicMock()
+    client.load_model.return_value = 3.21
+    manager = ModelManager(client)
+
+    assert manager.status("llama3")["state"] == "unloaded"
+    manager.load("llama3")
+
+    status = manager.status("llama3:latest")
+    assert status["state"] == "loaded"
+    assert status["load_seconds"] == 3.21
+    assert status["loaded_at"] is not None
+
+
+def test_manager_caches_model_availability():
+    """Test zapamiętywania dostępności modelu i wymuszania ponownego sprawdzenia."""
+    client = MagicMock()
+    client.check_model_availability.side_effect = [True, False]
+    manager = ModelManager(client, availability_ttl=60)
+
+    assert manager.is_available("llama3:latest") is True
+    assert manager.is_available("llama3") is True
+    assert client.check_model_availability.call_count == 1
+    client.check_model_availability.assert_called_with("llama3")
+
+    manager.invalidate_availability("llama3:latest")
+    assert manager.is_available("llama3") is False
+    assert client.check_model_availability.call_count == 2
+
+
+def test_manager_pulled_refreshes_availability():
+    """Test odświeżenia dostępności i ładowania modelu po zakończonym pobieraniu."""
+    client = MagicMock()
+    client.check_model_availability.side_effect = [False, True]
+    client.load_model.return_value = 0.1
+    manager = ModelManager(client, availability_ttl=60)
+
+    assert manager.is_available("llama3") is False
+    assert manager.pulled("llama3") is True
+    assert manager.is_available("llama3") is True
+
+
+def test_manager_load_error():
+    """Test stanu modelu po nieudanym ładowaniu."""
+    client = MagicMock()
+    client.load_model.side_effect = requests.ConnectionError("brak połączenia")
+    manager = ModelManager(client)
+
+    status = manager.load("llama3")
+
+    assert status["state"] == "error"
+    assert "brak połączenia" in status["error"]
+
+
+def test_warm_up_deduplicates():
+    """Test, że trwające ładowanie nie jest uruchamiane ponownie."""
+    release = threading.Event()
+    client = MagicMock()
+    client.load_model.side_effect = lambda model_name: release.wait(2) and 1.0
+    manager = ModelManager(client)
+
+    assert manager.warm_up("llama3") is True
+    assert manager.warm_up("llama3") is False
+    assert manager.status("llama3")["state"] == "loading"
+
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name.startswith("warm-up-"):
+            thread.join(timeout=2)
+    assert manager.status("llama3")["state"] == "loaded"
+    assert client.load_model.call_count == 1
+
+
+def test_refresh_tracks_unloaded_models():
+    """Test aktualizacji stanu na podstawie /api/ps."""
+    client = MagicMock()
+    client.load_model.return_value = 1.0
+    manager = ModelManager(client)
+    manager.load("llama3")
+
+    client.loaded_models.return_value = ["phi3:latest"]
+    assert manager.refresh() is True
+
+    assert manager.status("llama3")["state"] == "unloaded"
+    assert manager.status("llama3")["load_seconds"] == 1.0
+    assert manager.status("phi3")["state"] == "loaded"
+
+
+@patch.object(OllamaClient, 'list_models')
+@patch.object(OllamaClient, 'loaded_models')
+def test_models_endpoint_load_state(mock_loaded_models, mock_list_models):
+    """Test stanu załadowania modeli w /api/models."""
+    mock_list_models.return_value = [{"name": "llama3:latest"}, {"name": "phi3:latest"}]
+    mock_loaded_models.return_value = ["llama3:latest"]
+    app = create_app()
+    app.config['TESTING'] = True
+
+    data = json.loads(app.test_client().get('/api/models').data)
+
+    states = {model["name"]: model["load_state"] for model in data["models"]}
+    assert states == {"llama3:latest": "loaded", "phi3:latest": "unloaded"}
@@ -139,8 +139,10 @@ class TestOllamaClient:
         assert args[0] == "http://localhost:11434/api/generate"
         assert kwargs["json"]["model"] == "test-model"
         assert kwargs["json"]["prompt"] == "Testowe zapytanie"
-        assert kwargs["json"]["temperature"] == 0.7
-        assert kwargs["json"]["max_tokens"] == 1000
+        # Parametry generowania muszą trafić do "options" (max_tokens jako num_predict)
+        assert kwargs["json"]["options"] == {"temperature": 0.7, "num_predict": 1000}
+        assert "temperature" not in kwargs["json"]
+        assert "max_tokens" not in kwargs["json"]
 
     @patch('requests.post')
     def test_generate_failure(self, mock_post, client):
@@ -0,0 +1,92 @@
+"""
+Testy dekodera NDJSON odpowiedzi Ollama (moduł 3/ollama_ndjson.py serwerów Flask).
+"""
+
+import json
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+MODULE_PATH = Path(__file__).resolve().parents[2] / "ollama_ndjson.py"
+spec = importlib.util.spec_from_file_location("ollama_ndjson", MODULE_PATH)
+ollama_ndjson = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ollama_ndjson)
+
+NDJSONDecoder = ollama_ndjson.NDJSONDecoder
+NDJSONError = ollama_ndjson.NDJSONError
+collect_generate = ollama_ndjson.collect_generate
+generation_stats = ollama_ndjson.generation_stats
+
+
+def decode(chunks):
+    return list(NDJSONDecoder().decode(chunks))
+
+
+def split_every(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def stream(*objects):
+    return b"".join(json.dumps(obj, ensure_ascii=False).encode("utf-8") + b"\n" for obj in objects)
+
+
+def test_lines_split_across_chunks():
+    """Test linii rozdzielonych między porcje (również po jednym bajcie)."""
+    objects = [{"response": "Ala "}, {"response": "ma kota"}, {"response": "", "done": True, "eval_count": 2}]
+    data = stream(*objects)
+
+    for size in (1, 2, 7, len(data)):
+        assert decode(split_every(data, size)) == objects
+
+
+def test_multibyte_utf8_split_at_chunk_boundary():
+    """Test znaku UTF-8 rozdzielonego granicą porcji."""
+    data = stream({"response": "zażółć gęślą jaźń"}, {"response": "€", "done": True})
+    cut = data.index("ż".encode("utf-8")) + 1
+
+    assert decode([data[:cut], data[cut:]]) == [{"response": "zażółć gęślą jaźń"}, {"response": "€", "done": True}]
+    assert decode(split_every(data, 1))[0]["response"] == "zażółć gęślą jaźń"
+
+
+def test_error_object():
+    """Test komunikatu "error" z Ollama zgłaszanego jako wyjątek."""
+    objects = decode([stream({"response": "a"}, {"error": "model not found"})])
+
+    with pytest.raises(NDJSONError) as error:
+        collect_generate(objects)
+    assert "model not found" in str(error.value)
+
+
+def test_invalid_line_number():
+    """Test numeru błędnej linii, również gdy linie przychodzą w kilku porcjach."""
+    data = stream({"response": "a"}, {"response": "b"}) + b"\n" + b'{"response": ' + b"\n" + stream({"done": True})
+
+    for size in (1, 5, len(data)):
+        with pytest.raises(NDJSONError) as error:
+            decode(split_every(data, size))
+        assert error.value.line_number == 4
+        assert str(error.value).startswith("Linia 4:")
+
+
+def test_missing_trailing_newline():
+    """Test ostatniej linii bez znaku nowej linii i pojedynczego obiektu (stream=False)."""
+    data = stream({"response": "a"}) + b'{"response": "b", "done": true, "eval_count": 2}'
+
+    text, summary = collect_generate(decode(split_every(data, 3)))
+
+    assert text == "ab"
+    assert summary == {"done": True, "eval_count": 2}
+    assert decode([b'{"response": "x"}']) == [{"response": "x"}]
+    assert decode([b"", b"  \n", b"\r\n"]) == []
+
+
+def test_generation_stats():
+    """Test statystyk czasu generowania z obiektu "done"."""
+    stats = generation_stats({"done": True, "eval_count": 100, "eval_duration": 4_000_000_000,
+                              "load_duration": 1_500_000_000})
+
+    assert stats["eval_count"] == 100
+    assert stats["tokens_per_second"] == 25.0
+    assert stats["load_seconds"] == 1.5
+    assert stats["prompt_eval_seconds"] is None
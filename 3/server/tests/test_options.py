@@ -0,0 +1,59 @@
+"""
+Testy dla modułu options.
+"""
+
+import pytest
+
+from ollama_server.options import GenerationOptions, generation_stats
+
+
+def test_to_ollama_maps_names():
+    """Test zamiany parametrów na schemat options Ollama."""
+    options = GenerationOptions(temperature=0.2, max_tokens=64, top_k=40, stop="###")
+
+    assert options.to_ollama() == {"temperature": 0.2, "num_predict": 64, "top_k": 40, "stop": ["###"]}
+
+
+def test_from_dict_with_defaults():
+    """Test łączenia parametrów zapytania z ustawieniami domyślnymi."""
+    defaults = GenerationOptions(temperature=0.7, max_tokens=1000, num_ctx=4096)
+
+    options = GenerationOptions.from_dict(
+        {"prompt": "x", "max_tokens": "128", "options": {"seed": 42, "top_p": None}}, defaults
+    )
+
+    assert options.temperature == 0.7
+    assert options.max_tokens == 128
+    assert options.seed == 42
+    assert options.num_ctx == 4096
+    assert options.top_p is None
+
+
+@pytest.mark.parametrize("data", [{"temperature": "gorąco"}, {"temperature": 5}, {"max_tokens": 0}])
+def test_from_dict_invalid(data):
+    """Test odrzucania nieprawidłowych parametrów."""
+    with pytest.raises(ValueError):
+        GenerationOptions.from_dict(data)
+
+
+def test_generation_stats():
+    """Test statystyk czasu generowania."""
+    stats = generation_stats({
+        "eval_count": 100,
+        "eval_duration": 4_000_000_000,
+        "prompt_eval_count": 20,
+        "prompt_eval_duration": 250_000_000,
+        "load_duration": 1_500_000_000,
+        "total_duration": 6_000_000_000,
+    })
+
+    assert stats == {
+        "prompt_eval_count": 20,
+        "eval_count": 100,
+        "load_seconds": 1.5,
+        "prompt_eval_seconds": 0.25,
+        "eval_seconds": 4.0,
+        "total_seconds": 6.0,
+        "tokens_per_second": 25.0,
+    }
+    assert generation_stats({})["tokens_per_second"] is None
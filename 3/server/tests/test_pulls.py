@@ -0,0 +1,270 @@
+"""
+Testy dla modułu pulls.
+"""
+
+import json
+import time
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+
+from ollama_server.server import create_app
+from ollama_server.models import OllamaClient
+from ollama_server.fake_ollama import FakeOllama
+from ollama_server.pulls import PullManager, STATUS_RUNNING, STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED
+
+
+def make_client(stream_factory):
+    """Tworzy klienta, którego jedyny serwer zwraca komunikaty z stream_factory."""
+    target = MagicMock()
+    target.base_url = "http://localhost:11434"
+    target.pull_model_stream.side_effect = lambda model_name, **kwargs: stream_factory()
+    client = MagicMock()
+    client.pull_targets.return_value = [target]
+    return client, target
+
+
+def wait_for(manager, job_id, timeout=2):
+    """Czeka na zakończenie zadania i zwraca jego stan."""
+    for thread in threading.enumerate():
+        if thread.name == f"pull-{job_id}":
+            thread.join(timeout=timeout)
+    return manager.get(job_id)
+
+
+def test_pull_progress_and_layers():
+    """Test postępu pobierania z podziałem na warstwy."""
+    def stream():
+        yield {"status": "pulling manifest"}
+        yield {"status": "pulling aaa", "digest": "sha256:aaa", "total": 100, "completed": 40}
+        yield {"status": "pulling bbb", "digest": "sha256:bbb", "total": 50, "completed": 50}
+        yield {"status": "pulling aaa", "digest": "sha256:aaa", "total": 100, "completed": 100}
+        yield {"status": "success"}
+
+    client, _ = make_client(stream)
+    completed = []
+    manager = PullManager(client, on_complete=completed.append)
+
+    job, created = manager.start("llama3")
+    state = wait_for(manager, job.id)
+
+    assert created is True
+    assert state["status"] == STATUS_COMPLETED
+    assert state["message"] == "success"
+    assert (state["completed"], state["total"], state["progress"]) == (150, 150, 1.0)
+    assert [layer["digest"] for layer in state["layers"]] == ["sha256:aaa", "sha256:bbb"]
+    assert state["eta_seconds"] is None
+    assert completed == ["llama3"]
+
+
+def test_pull_deduplicates_running_job():
+    """Test, że równoczesne pobieranie tego samego modelu trafia do jednego zadania."""
+    release = threading.Event()
+
+    def stream():
+        release.wait(2)
+        yield {"status": "success"}
+
+    client, target = make_client(stream)
+    manager = PullManager(client)
+    callback = MagicMock()
+
+    job, created = manager.start("llama3")
+    same_job, same_created = manager.start("llama3:latest", on_complete=callback)
+
+    assert created is True
+    assert same_created is False
+    assert same_job is job
+
+    release.set()
+    assert wait_for(manager, job.id)["status"] == STATUS_COMPLETED
+    assert target.pull_model_stream.call_count == 1
+    callback.assert_called_once_with("llama3")
+
+    # Po zakończeniu kolejne żądanie tworzy nowe zadanie
+    _, created = manager.start("llama3")
+    assert created is True
+
+
+def test_pull_cancel():
+    """Test anulowania trwającego pobierania."""
+    started = threading.Event()
+    release = threading.Event()
+    closed = threading.Event()
+
+    def stream():
+        try:
+            yield {"status": "pulling aaa", "digest": "sha256:aaa", "total": 100, "completed": 10}
+            started.set()
+            release.wait(2)
+            yield {"status": "pulling aaa", "digest": "sha256:aaa", "total": 100, "completed": 20}
+            yield {"status": "success"}
+        finally:
+            closed.set()
+
+    client, _ = make_client(stream)
+    callback = MagicMock()
+    manager = PullManager(client, on_complete=callback)
+
+    job, _ = manager.start("llama3")
+    assert started.wait(2)
+    assert manager.cancel(job.id)["message"] == "anulowanie"
+    release.set()
+
+    state = wait_for(manager, job.id)
+    assert state["status"] == STATUS_CANCELLED
+    assert closed.is_set()
+    callback.assert_not_called()
+    assert manager.cancel("brak") is None
+
+
+def test_pull_cancel_stalled():
+    """Test anulowania pobierania, które przestało przesyłać postęp (zerwanie połączenia)."""
+    with FakeOllama(token_rate=0, latency=0, pull_delay=600) as fake:
+        client = OllamaClient(fake.url)
+        manager = PullManager(client)
+        job, _ = manager.start("llama3")
+        for _ in range(100):
+            if manager.get(job.id)["message"] == "pulling manifest":
+                break
+            time.sleep(0.02)
+
+        started = time.monotonic()
+        manager.cancel(job.id)
+        state = wait_for(manager, job.id)
+
+    assert state["status"] == STATUS_CANCELLED
+    assert time.monotonic() - started < 2
+
+
+def test_pull_cancel_without_socket():
+    """Test anulowania, gdy gniazdo połączenia jest niedostępne - odczyt kończy read timeout."""
+    with FakeOllama(token_rate=0, latency=0, pull_delay=600) as fake, \
+            patch("ollama_server.pulls._response_socket", return_value=None):
+        manager = PullManager(OllamaClient(fake.url), read_timeout=0.5)
+        job, _ = manager.start("llama3")
+        for _ in range(100):
+            if manager.get(job.id)["message"] == "pulling manifest":
+                break
+            time.sleep(0.02)
+
+        started = time.monotonic()
+        state = manager.cancel(job.id)
+        assert state["status"] == STATUS_RUNNING
+        assert time.monotonic() - started < 0.2
+        state = wait_for(manager, job.id)
+
+    assert state["status"] == STATUS_CANCELLED
+    assert state["error"] is None
+
+
+def test_response_socket_missing_attributes():
+    """Test, że brak prywatnych atrybutów urllib3 nie powoduje błędu anulowania."""
+    from ollama_server.pulls import _abort_response
+
+    assert _abort_response(MagicMock(raw=object())) is False
+    assert _abort_response(MagicMock(raw=MagicMock(_connection=None))) is False
+
+
+def test_pull_read_timeout():
+    """Test przerwania zawieszonego pobierania po przekroczeniu czasu odczytu."""
+    with FakeOllama(token_rate=0, latency=0, pull_delay=600) as fake:
+        manager = PullManager(OllamaClient(fake.url), read_timeout=0.2)
+        job, _ = manager.start("llama3")
+        state = wait_for(manager, job.id)
+
+    assert state["status"] == STATUS_FAILED
+    assert state["error"]
+
+
+def test_pull_error_chunk():
+    """Test błędu zgłoszonego przez Ollama w strumieniu postępu."""
+    def stream():
+        yield {"status": "pulling manifest"}
+        yield {"error": "pull model manifest: file does not exist"}
+
+    client, _ = make_client(stream)
+    callback = MagicMock()
+    manager = PullManager(client, on_complete=callback)
+
+    job, _ = manager.start("nieistniejacy")
+    state = wait_for(manager, job.id)
+
+    assert state["status"] == STATUS_FAILED
+    assert "does not exist" in state["error"]
+    callback.assert_not_called()
+
+
+def test_pull_without_backends():
+    """Test błędu, gdy żaden serwer Ollama nie jest dostępny."""
+    client = MagicMock()
+    client.pull_targets.return_value = []
+    manager = PullManager(client)
+
+    job, _ = manager.start("llama3")
+    state = wait_for(manager, job.id)
+
+    assert state["status"] == STATUS_FAILED
+    assert state["error"]
+
+
+@pytest.fixture
+def client():
+    """Fixture dla klienta testowego Flask."""
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@patch.object(OllamaClient, 'pull_model_stream')
+def test_pull_endpoints(mock_pull_stream, client):
+    """Test endpointów pobierania modeli."""
+    mock_pull_stream.side_effect = lambda model_name, **kwargs: (data for data in [{"status": "success"}])
+
+    response = client.post('/api/pull', json={"model_name": "llama3"})
+    assert response.status_code == 202
+    job_id = json.loads(response.data)["pull"]["id"]
+
+    manager = client.application.extensions["ollama_pulls"]
+    wait_for(manager, job_id)
+
+    data = json.loads(client.get(f'/api/pull/{job_id}').data)
+    assert data["pull"]["status"] == STATUS_COMPLETED
+    assert [job["id"] for job in json.loads(client.get('/api/pulls').data)["pulls"]] == [job_id]
+
+    assert client.get('/api/pull/brak').status_code == 404
+    assert client.delete('/api/pull/brak').status_code == 404
+    assert client.post('/api/pull', json={}).status_code == 400
+
+
+@patch.object(OllamaClient, 'check_model_availability')
+@patch.object(OllamaClient, 'pull_model_stream')
+@patch('ollama_server.config.write_env_values')
+def test_switch_model_pulls_in_background(mock_write_env, mock_pull_stream, mock_check, client):
+    """Test przełączenia modelu po zakończeniu pobierania w tle."""
+    mock_check.return_value = False
+    release = threading.Event()
+
+    def stream(model_name, **kwargs):
+        release.wait(2)
+        yield {"status": "success"}
+
+    mock_pull_stream.side_effect = stream
+
+    with patch.object(OllamaClient, 'load_model', return_value=1.0):
+        response = client.post('/api/switch_model', json={"model_name": "phi3", "pull_if_missing": True})
+        data = json.loads(response.data)
+        assert response.status_code == 202
+        assert data["pending"] is True
+        assert client.application.config["MODEL_NAME"] != "phi3"
+
+        release.set()
+        wait_for(client.application.extensions["ollama_pulls"], data["pull"]["id"])
+
+    assert client.application.config["MODEL_NAME"] == "phi3"
+
+    # Zapis w pliku .env odbywa się w tle (po zwłoce) - tu wymuszony od razu
+    store = client.application.extensions["ollama_config"]
+    store.flush()
+    mock_write_env.assert_called_once_with(store.env_file, {"MODEL_NAME": "phi3"})
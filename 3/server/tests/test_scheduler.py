@@ -0,0 +1,162 @@
+"""
+Testy dla modułu scheduler.
+"""
+
+import json
+import time
+import threading
+import pytest
+from unittest.mock import patch
+
+from ollama_server.server import create_app
+from ollama_server.models import OllamaClient
+from ollama_server.scheduler import Scheduler, SchedulerRejected
+
+
+def test_immediate_admission():
+    """Test przyjęcia zapytania bez czekania, gdy są wolne miejsca."""
+    scheduler = Scheduler(max_concurrency=2)
+
+    with scheduler.slot("model") as waited:
+        assert waited == 0.0
+        assert scheduler.metrics()["models"]["model"]["active"] == 1
+
+    metrics = scheduler.metrics()["models"]["model"]
+    assert metrics["active"] == 0
+    assert metrics["admitted"] == 1
+
+
+def test_models_have_separate_limits():
+    """Test osobnych limitów dla różnych modeli."""
+    scheduler = Scheduler(max_concurrency=1, queue_timeout=0.1)
+
+    scheduler.acquire("model-a")
+    # Inny model nie czeka na zwolnienie miejsca przez model-a
+    assert scheduler.acquire("model-b") == 0.0
+
+
+def test_interactive_before_batch():
+    """Test obsługi zapytań interactive przed wcześniej zakolejkowanymi batch."""
+    scheduler = Scheduler(max_concurrency=1)
+    scheduler.acquire("model")
+    order = []
+
+    def worker(name, priority):
+        with scheduler.slot("model", priority):
+            order.append(name)
+
+    threads = [threading.Thread(target=worker, args=("batch", "batch"))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=worker, args=("interactive", "interactive")))
+    threads[1].start()
+    time.sleep(0.05)
+
+    assert scheduler.metrics()["models"]["model"]["queued"] == {"interactive": 1, "batch": 1}
+    scheduler.release("model")
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert order == ["interactive", "batch"]
+
+
+def test_queue_full_rejection():
+    """Test odrzucenia zapytania przy pełnej kolejce (429)."""
+    scheduler = Scheduler(max_concurrency=1, max_queue=0)
+    scheduler.acquire("model")
+
+    with pytest.raises(SchedulerRejected) as error:
+        scheduler.acquire("model")
+
+    assert error.value.status == 429
+    assert error.value.retry_after >= 1
+    assert scheduler.metrics()["models"]["model"]["rejected"]["queue_full"] == 1
+
+
+def test_batch_queue_does_not_block_interactive():
+    """Test osobnych limitów kolejki - pełna kolejka batch nie odrzuca zapytań interactive."""
+    scheduler = Scheduler(max_concurrency=1, max_queue=1, max_batch_queue=1)
+    scheduler.acquire("model")
+    threads = [threading.Thread(target=scheduler.acquire, args=("model", "batch"))]
+    threads[0].start()
+    time.sleep(0.05)
+
+    with pytest.raises(SchedulerRejected) as error:
+        scheduler.acquire("model", "batch")
+    assert error.value.status == 429
+
+    threads.append(threading.Thread(target=scheduler.acquire, args=("model", "interactive")))
+    threads[1].start()
+    time.sleep(0.05)
+    assert scheduler.metrics()["models"]["model"]["queued"] == {"interactive": 1, "batch": 1}
+
+    for _ in range(3):
+        scheduler.release("model")
+    for thread in threads:
+        thread.join(timeout=2)
+
+
+def test_batch_waits_for_room():
+    """Test oczekiwania na miejsce w pełnej kolejce zamiast odrzucenia (wait_for_room)."""
+    scheduler = Scheduler(max_concurrency=1, max_batch_queue=0)
+    scheduler.acquire("model")
+    waited = []
+
+    def worker():
+        with scheduler.slot("model", "batch", wait_for_room=True) as seconds:
+            waited.append(seconds)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    time.sleep(0.1)
+    scheduler.release("model")
+    thread.join(timeout=2)
+
+    assert waited and waited[0] >= 0.1
+    assert scheduler.metrics()["models"]["model"]["rejected"]["queue_full"] == 0
+
+    scheduler.acquire("model")
+    with pytest.raises(SchedulerRejected) as error:
+        scheduler.acquire("model", "batch", timeout=0.05, wait_for_room=True)
+    assert error.value.status == 503
+
+
+def test_queue_timeout_rejection():
+    """Test odrzucenia zapytania po przekroczeniu czasu oczekiwania (503)."""
+    scheduler = Scheduler(max_concurrency=1, queue_timeout=0.05)
+    scheduler.acquire("model")
+
+    with pytest.raises(SchedulerRejected) as error:
+        scheduler.acquire("model")
+
+    assert error.value.status == 503
+    metrics = scheduler.metrics()["models"]["model"]
+    assert metrics["rejected"]["timeout"] == 1
+    assert metrics["queued"]["interactive"] == 0
+
+    # Porzucone miejsce w kolejce nie blokuje kolejnych zapytań
+    scheduler.release("model")
+    assert scheduler.acquire("model") == 0.0
+
+
+@patch.object(OllamaClient, 'check_availability')
+@patch.object(OllamaClient, 'check_model_availability')
+@patch.object(OllamaClient, 'generate')
+def test_ask_endpoint_rejected(mock_generate, mock_check_model, mock_check_availability):
+    """Test odpowiedzi 429 z nagłówkiem Retry-After z endpointu /api/ask."""
+    mock_check_availability.return_value = True
+    mock_check_model.return_value = True
+    app = create_app()
+    app.config['TESTING'] = True
+    app.extensions["ollama_scheduler"] = Scheduler(max_concurrency=1, max_queue=0)
+    app.extensions["ollama_scheduler"].acquire(app.config["MODEL_NAME"])
+
+    response = app.test_client().post('/api/ask', json={"prompt": "Testowe zapytanie"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert "error" in json.loads(response.data)
+    mock_generate.assert_not_called()
+
+    metrics = json.loads(app.test_client().get('/api/metrics').data)
+    assert metrics["scheduler"]["models"][app.config["MODEL_NAME"]]["rejected"]["queue_full"] == 1
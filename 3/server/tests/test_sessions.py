@@ -0,0 +1,139 @@
+"""
+Testy dla modułu sessions i endpointu /api/chat.
+"""
+
+import json
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+
+from ollama_server.server import create_app
+from ollama_server.models import OllamaClient
+from ollama_server.sessions import SessionStore, ChatSession
+
+
+def test_session_record_saved_time():
+    """Test szacowania czasu zaoszczędzonego dzięki ponownemu użyciu kontekstu."""
+    session = ChatSession("llama3")
+
+    first = session.record("Cześć", {
+        "response": "Witaj", "context": [1, 2, 3, 4], "prompt_eval_count": 4, "prompt_eval_duration": 400_000_000
+    })
+    assert first["reused_context_tokens"] == 0
+    assert first["saved_prompt_eval_seconds"] == 0
+
+    second = session.record("Co słychać?", {
+        "response": "Dobrze", "context": [1, 2, 3, 4, 5, 6], "prompt_eval_count": 2, "prompt_eval_duration": 200_000_000
+    })
+    # 4 tokeny kontekstu po 0,1 s każdy
+    assert second["reused_context_tokens"] == 4
+    assert second["saved_prompt_eval_seconds"] == pytest.approx(0.4)
+    assert list(session.context) == [1, 2, 3, 4, 5, 6]
+    assert [message["role"] for message in session.to_dict()["history"]] == ["user", "assistant"] * 2
+
+
+def test_store_evicts_least_recently_used():
+    """Test usuwania najdawniej używanej sesji po przekroczeniu limitu."""
+    store = SessionStore(max_sessions=2)
+    first = store.create("llama3")
+    second = store.create("llama3")
+
+    assert store.get(first.id) is first
+    store.create("llama3")
+
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first
+    assert store.metrics()["evicted"] == 1
+
+
+@patch('ollama_server.sessions.time.monotonic')
+def test_store_expires_sessions(mock_monotonic):
+    """Test wygasania nieużywanych sesji."""
+    mock_monotonic.return_value = 100.0
+    store = SessionStore(ttl=60)
+    session = store.create("llama3")
+
+    mock_monotonic.return_value = 150.0
+    assert store.get(session.id) is session
+
+    mock_monotonic.return_value = 211.0
+    assert store.get(session.id) is None
+    assert store.metrics()["expired"] == 1
+
+
+@patch('requests.post')
+def test_generate_result_context_payload(mock_post):
+    """Test przekazywania tokenów kontekstu do Ollama."""
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"response": "ok", "context": [1, 2]}
+    mock_post.return_value = mock_response
+
+    result = OllamaClient("http://localhost:11434").generate_result("llama3", "Pytanie", context=[7, 8])
+
+    assert result["context"] == [1, 2]
+    assert mock_post.call_args[1]["json"]["context"] == [7, 8]
+
+
+@pytest.fixture
+def client():
+    """Fixture dla klienta testowego Flask."""
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.test_client() as client:
+        yield client
+
+
+@patch.object(OllamaClient, 'generate_result')
+def test_chat_reuses_context(mock_generate, client):
+    """Test, że kolejna wiadomość sesji przekazuje kontekst z poprzedniej odpowiedzi."""
+    mock_generate.side_effect = [
+        {"response": "Witaj", "context": [1, 2, 3], "prompt_eval_count": 3, "prompt_eval_duration": 300_000_000},
+        {"response": "Dobrze", "context": [1, 2, 3, 4, 5], "prompt_eval_count": 2, "prompt_eval_duration": 200_000_000},
+    ]
+
+    first = json.loads(client.post('/api/chat', json={"message": "Cześć"}).data)
+    session_id = first["session_id"]
+    second = json.loads(client.post('/api/chat', json={"message": "Co słychać?", "session_id": session_id}).data)
+
+    assert second["response"] == "Dobrze"
+    assert list(mock_generate.call_args_list[0][1]["context"]) == []
+    assert list(mock_generate.call_args_list[1][1]["context"]) == [1, 2, 3]
+    assert second["stats"]["saved_prompt_eval_seconds"] == pytest.approx(0.3)
+
+    session = json.loads(client.get(f'/api/chat/{session_id}').data)
+    assert session["turns"] == 2
+    assert session["context_tokens"] == 5
+
+    metrics = json.loads(client.get('/api/metrics').data)
+    assert metrics["sessions"]["sessions"] == 1
+
+
+@patch.object(OllamaClient, 'generate_result')
+def test_chat_resets_context_after_model_switch(mock_generate, client):
+    """Test czyszczenia kontekstu po zmianie modelu."""
+    mock_generate.return_value = {"response": "ok", "context": [1, 2]}
+    session_id = json.loads(client.post('/api/chat', json={"message": "Cześć"}).data)["session_id"]
+
+    client.application.config["MODEL_NAME"] = "inny-model"
+    data = json.loads(client.post('/api/chat', json={"message": "Dalej", "session_id": session_id}).data)
+
+    assert data["context_reset"] is True
+    assert list(mock_generate.call_args[1]["context"]) == []
+
+
+@patch.object(OllamaClient, 'generate_result')
+def test_chat_errors(mock_generate, client):
+    """Test błędów endpointu /api/chat."""
+    assert client.post('/api/chat', json={}).status_code == 400
+    assert client.post('/api/chat', json={"message": "x", "session_id": "brak"}).status_code == 404
+    assert client.get('/api/chat/brak').status_code == 404
+    assert client.delete('/api/chat/brak').status_code == 404
+
+    mock_generate.side_effect = requests.ConnectionError("brak połączenia")
+    response = client.post('/api/chat', json={"message": "Cześć"})
+    assert response.status_code == 502
+
+    session_id = json.loads(response.data)["session_id"]
+    assert client.delete(f'/api/chat/{session_id}').status_code == 200
+    assert client.get(f'/api/chat/{session_id}').status_code == 404
@@ -0,0 +1,164 @@
+"""
+Testy dla modułu utils (autostrojenie i nadzór Ollama).
+"""
+
+import sys
+import time
+from unittest.mock import Mock
+
+from ollama_server import utils
+from ollama_server.utils import (
+    recommend_model, recommend_num_thread, recommend_num_ctx, kv_bytes_per_token,
+    calibrate_concurrency, choose_concurrency, save_autotune_run, find_ollama_process, OllamaSupervisor
+)
+
+# Proces zastępujący `ollama serve` w testach nadzoru
+SLEEP_COMMAND = [sys.executable, "-c", "import time; time.sleep(60)"]
+
+GB = 1024 ** 3
+HARDWARE = {"cpu_logical": 8, "cpu_physical": 4, "memory_total": 16 * GB, "memory_available": 10 * GB}
+
+
+def test_recommend_model_largest_fitting():
+    """Test wyboru największego modelu mieszczącego się w pamięci."""
+    models = [
+        {"name": "tinyllama:latest", "size": 1 * GB},
+        {"name": "llama3:latest", "size": 5 * GB},
+        {"name": "mixtral:latest", "size": 26 * GB},
+    ]
+
+    assert recommend_model(models, HARDWARE) == "llama3:latest"
+    assert recommend_model(models, dict(HARDWARE, memory_available=2 * GB)) == "tinyllama:latest"
+    assert recommend_model(models[2:], HARDWARE) == "mixtral:latest"
+
+
+def test_recommend_num_thread():
+    """Test doboru wątków: rdzenie fizyczne, a bez psutil połowa wątków logicznych."""
+    assert recommend_num_thread(HARDWARE) == 4
+    assert recommend_num_thread({"cpu_logical": 8, "cpu_physical": None}) == 4
+    assert recommend_num_thread({"cpu_logical": 1, "cpu_physical": None}) == 1
+
+
+def test_kv_bytes_per_token_from_model_info():
+    """Test szacowania pamięci kontekstu z architektury modelu."""
+    details = {"model_info": {
+        "llama.block_count": 32,
+        "llama.attention.head_count": 32,
+        "llama.attention.head_count_kv": 8,
+        "llama.embedding_length": 4096,
+    }}
+
+    assert kv_bytes_per_token(details, 5 * GB) == 2 * 32 * 8 * 128 * 2
+    assert kv_bytes_per_token({}, 16000 * 1000) == 1000
+
+
+def test_recommend_num_ctx_limits():
+    """Test doboru okna kontekstu z uwzględnieniem pamięci, limitu modelu i współbieżności."""
+    kv = 128 * 1024
+
+    assert recommend_num_ctx(5 * GB, kv, 8192, HARDWARE) == 8192
+    assert recommend_num_ctx(5 * GB, kv, None, HARDWARE) == 16384
+    assert recommend_num_ctx(5 * GB, kv, None, HARDWARE, parallel=4) == 4096
+    assert recommend_num_ctx(5 * GB, kv, None, dict(HARDWARE, memory_available=None)) == 2048
+
+
+def test_calibrate_concurrency():
+    """Test pomiaru krzywej przepustowości."""
+    client = Mock()
+    client.generate_result.return_value = {"eval_count": 10}
+    points = []
+
+    curve = calibrate_concurrency(client, "phi3", 3, rounds=2, progress=points.append)
+
+    assert [point["concurrency"] for point in curve] == [1, 2, 3]
+    assert [point["tokens"] for point in curve] == [20, 40, 60]
+    assert points == curve
+    # Zapytanie rozgrzewające + 2 + 4 + 6
+    assert client.generate_result.call_count == 13
+    assert client.generate_result.call_args_list[0][0][2].max_tokens == 1
+
+
+def test_choose_concurrency_stops_at_plateau():
+    """Test wyboru współbieżności, powyżej której przepustowość już nie rośnie."""
+    def point(concurrency, rate, errors=0):
+        return {"concurrency": concurrency, "tokens_per_second": rate, "errors": errors}
+
+    assert choose_concurrency([point(1, 10.0), point(2, 18.0), point(3, 19.0), point(4, 19.5)]) == 2
+    assert choose_concurrency([point(1, 10.0), point(2, 18.0), point(3, 30.0, errors=1)]) == 2
+    assert choose_concurrency([]) == 1
+
+
+def test_save_autotune_run(tmp_path):
+    """Test historii pomiarów - zwracany jest poprzedni wynik dla modelu."""
+    path = str(tmp_path / "autotune.jsonl")
+
+    assert save_autotune_run(path, {"model": "phi3", "curve": [1]}) is None
+    assert save_autotune_run(path, {"model": "llama3", "curve": [2]}) is None
+    assert save_autotune_run(path, {"model": "phi3", "curve": [3]}) == {"model": "phi3", "curve": [1]}
+
+
+def test_find_ollama_process_uses_cached_pid(monkeypatch):
+    """Test sprawdzania zapamiętanego PID przed przeglądaniem wszystkich procesów."""
+    scan = Mock(return_value=4321)
+    monkeypatch.setattr(utils, "_scan_ollama_process", scan)
+    monkeypatch.setattr(utils, "_process_name", lambda pid: "ollama" if pid == 4321 else None)
+    monkeypatch.setattr(utils, "_ollama_pid", None)
+
+    assert find_ollama_process() == 4321
+    assert find_ollama_process() == 4321
+    assert scan.call_count == 1
+
+
+def test_supervisor_available_without_monitor():
+    """Test sprawdzania stanu przy każdym wywołaniu, gdy wątek nadzoru nie działa."""
+    supervisor = OllamaSupervisor(Mock(side_effect=[True, False]))
+
+    assert supervisor.available() is True
+    assert supervisor.available() is False
+    assert supervisor.stats()["consecutive_failures"] == 1
+    assert supervisor.stats()["managed"] is False
+
+
+def test_supervisor_restarts_crashed_process_with_backoff():
+    """Test ponownego uruchomienia procesu po awarii z rosnącą zwłoką."""
+    supervisor = OllamaSupervisor(lambda: False, SLEEP_COMMAND, probe_interval=60, backoff_initial=0.05,
+                                  startup_timeout=0.1)
+    try:
+        supervisor.start()
+        first_pid = supervisor.pid
+        supervisor._process.kill()
+        supervisor._process.wait()
+
+        supervisor.tick()
+        stats = supervisor.stats()
+        assert stats["last_exit_code"] is not None
+        assert stats["next_restart_seconds"] is not None
+        assert stats["restarts"] == 0
+
+        time.sleep(0.06)
+        supervisor.tick()
+        assert supervisor.restarts == 1
+        assert supervisor.pid != first_pid
+        assert supervisor._process.poll() is None
+        assert supervisor._backoff == 0.1
+    finally:
+        supervisor.stop()
+    assert supervisor._process is None
+
+
+def test_supervisor_restarts_unresponsive_process():
+    """Test zatrzymania procesu, który nie odpowiada przez max_failures sprawdzeń."""
+    supervisor = OllamaSupervisor(lambda: False, SLEEP_COMMAND, probe_interval=60, max_failures=2,
+                                  backoff_initial=60, startup_timeout=0)
+    try:
+        supervisor.start()
+        process = supervisor._process
+        supervisor.failures = 0
+
+        supervisor.tick()
+        assert process.poll() is None
+        supervisor.tick()
+        assert process.poll() is not None
+        assert supervisor.stats()["next_restart_seconds"] > 0
+    finally:
+        supervisor.stop()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Produkcyjne uruchomienie serwera Flask dla Ollama (server.py).
+
+Serwer deweloperski Flaska (app.run) obsługuje zapytania w jednym procesie,
+a każde /ask blokuje go na czas generowania odpowiedzi. Ten skrypt uruchamia
+tę samą aplikację:
+- przez gunicorn (jeśli jest zainstalowany): WORKERS procesów po THREADS wątków,
+  płynne przeładowanie sygnałem HUP (kill -HUP <pid>),
+- albo przez wbudowany serwer wielowątkowy (pula THREADS wątków w jednym
+  procesie), np. na Windows lub bez gunicorn; HUP kończy trwające zapytania
+  i uruchamia proces od nowa.
+
+Konfiguracja pochodzi z tego samego pliku .env co server.py:
+WORKERS, THREADS, REQUEST_TIMEOUT, GRACEFUL_TIMEOUT, SERVER_PORT (oraz
+OLLAMA_TIMEOUT używany przez samą aplikację).
+
+Użycie:
+    python wsgi.py                       # ustawienia z .env
+    python wsgi.py --workers 4 --threads 16
+    python wsgi.py --builtin             # wymuszenie serwera wbudowanego
+"""
+
+import os
+import sys
+import signal
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+# Import aplikacji ładuje konfigurację z .env (load_env_config)
+from server import app, config
+
+
+class PooledWSGIServer:
+    """
+    Wbudowany serwer wielowątkowy z ograniczoną pulą wątków.
+
+    Gdy wszystkie wątki są zajęte, serwer przestaje przyjmować połączenia
+    (czekają w kolejce gniazda), zamiast tworzyć nowy wątek na każde zapytanie.
+    """
+
+    def __init__(self, host, port, wsgi_app, threads=8, request_timeout=120):
+        from werkzeug.serving import BaseWSGIServer
+
+        self.request_timeout = request_timeout
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+        self._slots = threading.BoundedSemaphore(threads)
+        self._active = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+        pooled = self
+
+        class _Server(BaseWSGIServer):
+            def process_request(self, request, client_address):
+                pooled._slots.acquire()
+                with pooled._lock:
+                    pooled._active += 1
+                pooled._executor.submit(pooled._handle, self, request, client_address)
+
+        self.server = _Server(host, port, wsgi_app)
+
+    def _handle(self, server, request, client_address):
+        try:
+            # Limit czasu operacji na gnieździe chroni wątki przed wolnymi klientami
+            request.settimeout(self.request_timeout)
+            server.finish_request(request, client_address)
+        except Exception:
+            server.handle_error(request, client_address)
+        finally:
+            server.shutdown_request(request)
+            self._slots.release()
+            with self._lock:
+                self._active -= 1
+                self._idle.notify_all()
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self, graceful_timeout=30):
+        """Przestaje przyjmować połączenia i czeka na zakończenie trwających zapytań."""
+        self.server.shutdown()
+        with self._lock:
+            self._idle.wait_for(lambda: self._active == 0, timeout=graceful_timeout)
+            remaining = self._active
+        self._executor.shutdown(wait=False)
+        self.server.server_close()
+        return remaining
+
+
+def run_builtin(host, port, threads, request_timeout, graceful_timeout):
+    """Uruchamia aplikację na wbudowanym serwerze wielowątkowym."""
+    server = PooledWSGIServer(host, port, app, threads=threads, request_timeout=request_timeout)
+    reload_requested = threading.Event()
+
+    def stop(signum, frame):
+        if signum == getattr(signal, "SIGHUP", None):
+            reload_requested.set()
+        # shutdown() czeka na pętlę serve_forever, więc musi działać w innym wątku
+        threading.Thread(target=server.server.shutdown, daemon=True).start()
+
+    for name in ("SIGTERM", "SIGINT", "SIGHUP"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), stop)
+
+    print(f"🔌 Serwer wbudowany: http://{host}:{port} (wątki: {threads}, pid: {os.getpid()})")
+    server.serve_forever()
+
+    print("⏳ Kończenie trwających zapytań...")
+    remaining = server.shutdown(graceful_timeout)
+    if remaining:
+        print(f"⚠️ Przerwano {remaining} zapytań po {graceful_timeout} s")
+
+    if reload_requested.is_set():
+        print("🔄 Przeładowanie serwera...")
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+
+def run_gunicorn(host, port, workers, threads, request_timeout, graceful_timeout):
+    """Uruchamia aplikację przez gunicorn (procesy robocze z pulą wątków)."""
+    from gunicorn.app.base import BaseApplication
+
+    class OllamaApplication(BaseApplication):
+        def load_config(self):
+            settings = {
+                "bind": f"{host}:{port}",
+                "workers": workers,
+                "threads": threads,
+                # Przy threads > 1 gunicorn używa procesów gthread
+                "worker_class": "gthread" if threads > 1 else "sync",
+                "timeout": request_timeout,
+                "graceful_timeout": graceful_timeout,
+                "keepalive": 5,
+                # Okresowa wymiana procesów ogranicza skutki wycieków pamięci
+                "max_requests": 1000,
+                "max_requests_jitter": 100,
+            }
+            for key, value in settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    print(f"🔌 gunicorn: http://{host}:{port} (procesy: {workers}, wątki: {threads})")
+    OllamaApplication().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Produkcyjne uruchomienie serwera Ollama")
+    parser.add_argument("--host", default="0.0.0.0", help="Adres nasłuchiwania")
+    parser.add_argument("--port", type=int, default=config["SERVER_PORT"], help="Port serwera")
+    parser.add_argument("--workers", type=int, default=config["WORKERS"], help="Liczba procesów (gunicorn)")
+    parser.add_argument("--threads", type=int, default=config["THREADS"], help="Liczba wątków na proces")
+    parser.add_argument("--timeout", type=int, default=config["REQUEST_TIMEOUT"], help="Limit czasu zapytania (s)")
+    parser.add_argument("--graceful-timeout", type=int, default=config["GRACEFUL_TIMEOUT"],
+                        help="Czas na dokończenie zapytań przy zamykaniu/przeładowaniu (s)")
+    parser.add_argument("--builtin", action="store_true", help="Użyj wbudowanego serwera zamiast gunicorn")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    threads = max(1, args.threads)
+
+    if not args.builtin:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            print("ℹ️ gunicorn nie jest zainstalowany (pip install gunicorn) - używam serwera wbudowanego")
+            args.builtin = True
+
+    if args.builtin:
+        if workers > 1:
+            print(f"ℹ️ Serwer wbudowany działa w jednym procesie - WORKERS={workers} pominięte")
+        run_builtin(args.host, args.port, threads, args.timeout, args.graceful_timeout)
+    else:
+        run_gunicorn(args.host, args.port, workers, threads, args.timeout, args.graceful_timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,21 +17,37 @@ def run_docker_server(host: str = "0.0.0.0", port: int = 8000):
 
 def run_email_server(host: str = "0.0.0.0", port: int = 8001):
     """Run the Email MCP server."""
-    from mcp.servers.email import create_email_mcp_server
+    from mcp.gateway import email_server_from_env
     
-    # Get SMTP configuration from environment variables
-    smtp_server = os.getenv("SMTP_SERVER")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_username = os.getenv("SMTP_USERNAME")
-    smtp_password = os.getenv("SMTP_PASSWORD")
+    server = email_server_from_env()
+    print(f"Starting Email MCP Server on http://{host}:{port}")
+    server.run(host=host, port=port)
+
+def run_filesystem_server(host: str = "0.0.0.0", port: int = 8006):
+    """Run the Filesystem MCP server."""
+    from mcp.gateway import filesystem_server_from_env
     
-    if not all([smtp_server, smtp_username, smtp_password]):
-        raise ValueError("SMTP_SERVER, SMTP_USERNAME, and SMTP_PASSWORD must be set in .env")
+    server = filesystem_server_from_env()
+    print(f"Starting Filesystem MCP Server on http://{host}:{port} (root: {os.getenv('FILESYSTEM_BASE_PATH', '/data')})")
+    server.run(host=host, port=port)
+
+def run_ollama_server(host: str = "0.0.0.0", port: int = 8008):
+    """Run the Ollama MCP server."""
+    from mcp.gateway import ollama_server_from_env
     
-    print(f"Starting Email MCP Server on http://{host}:{port}")
-    server = create_email_mcp_server(smtp_server, smtp_port, smtp_username, smtp_password)
+    server = ollama_server_from_env()
+    print(f"Starting Ollama MCP Server on http://{host}:{port} (Ollama: {os.getenv('OLLAMA_URL', 'http://localhost:11434')})")
     server.run(host=host, port=port)
 
+def run_gateway(host: str = "0.0.0.0", port: int = 8000, servers: str = ""):
+    """Run all MCP servers in one process under /<server>/ routes."""
+    from mcp.gateway import MCPGateway
+    
+    names = [name.strip() for name in servers.split(",") if name.strip()]
+    gateway = MCPGateway(names or None)
+    print(f"Starting MCP Gateway on http://{host}:{port} (servers: {', '.join(gateway.servers)}, loaded on first use)")
+    gateway.run(host=host, port=port)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="MCP Server")
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
@@ -46,12 +62,35 @@ if __name__ == "__main__":
     email_parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     email_parser.add_argument("--port", type=int, default=8001, help="Port to listen on")
     
+    # Filesystem server command
+    filesystem_parser = subparsers.add_parser("filesystem", help="Run Filesystem MCP server")
+    filesystem_parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
+    filesystem_parser.add_argument("--port", type=int, default=int(os.getenv("FILESYSTEM_PORT", "8006")), help="Port to listen on")
+    
+    # Ollama server command
+    ollama_parser = subparsers.add_parser("ollama", help="Run Ollama MCP server")
+    ollama_parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
+    ollama_parser.add_argument("--port", type=int, default=int(os.getenv("OLLAMA_MCP_PORT", "8008")), help="Port to listen on")
+    
+    # Gateway command
+    gateway_parser = subparsers.add_parser("gateway", help="Run all MCP servers in one process")
+    gateway_parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
+    gateway_parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")), help="Port to listen on")
+    gateway_parser.add_argument("--servers", default=os.getenv("MCP_GATEWAY_SERVERS", ""),
+                                help="Comma-separated servers to host (default: all)")
+    
     args = parser.parse_args()
     
     if args.command == "docker":
         run_docker_server(args.host, args.port)
     elif args.command == "email":
         run_email_server(args.host, args.port)
+    elif args.command == "filesystem":
+        run_filesystem_server(args.host, args.port)
+    elif args.command == "ollama":
+        run_ollama_server(args.host, args.port)
+    elif args.command == "gateway":
+        run_gateway(args.host, args.port, args.servers)
     else:
         print(f"Unknown command: {args.command}")
-        print("Available commands: docker, email")
+        print("Available commands: docker, email, filesystem, ollama, gateway")
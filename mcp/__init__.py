@@ -3,6 +3,7 @@ from typing import Any, Callable, Dict, List, Optional, TypeVar, Union
 from functools import wraps
 from fastapi import FastAPI, HTTPException, Request, Depends
 from pydantic import BaseModel
+import json
 import logging
 from loguru import logger
 
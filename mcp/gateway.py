@@ -0,0 +1,303 @@
+"""Single-process gateway hosting all MCP servers under namespaced routes."""
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from loguru import logger
+
+from mcp import MCPServer
+
+# A backend that failed to load is retried on the first request after this many seconds
+RETRY_INTERVAL = 30.0
+
+# Limits of the HTTP connection pool shared by all hosted servers
+SHARED_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+SHARED_POOL_TIMEOUT = 120.0
+
+
+def email_server_from_env() -> MCPServer:
+    """Create the Email MCP server from SMTP_* environment variables."""
+    from mcp.servers.email import create_email_mcp_server
+
+    smtp_server = os.getenv("SMTP_SERVER")
+    smtp_port = int(os.getenv("SMTP_PORT", "587"))
+    smtp_username = os.getenv("SMTP_USERNAME")
+    smtp_password = os.getenv("SMTP_PASSWORD")
+    if not all([smtp_server, smtp_username, smtp_password]):
+        raise ValueError("SMTP_SERVER, SMTP_USERNAME, and SMTP_PASSWORD must be set in .env")
+    return create_email_mcp_server(smtp_server, smtp_port, smtp_username, smtp_password)
+
+
+def filesystem_server_from_env() -> MCPServer:
+    """Create the Filesystem MCP server from FILESYSTEM_* environment variables."""
+    from mcp.servers.filesystem import create_filesystem_mcp_server
+
+    base_path = os.getenv("FILESYSTEM_BASE_PATH", "/data")
+    read_only = os.getenv("FILESYSTEM_READ_ONLY", "False").lower() in ("1", "true", "yes")
+    max_workers = int(os.getenv("FILESYSTEM_WORKERS", "0")) or None
+    return create_filesystem_mcp_server(base_path, read_only, max_workers)
+
+
+def ollama_server_from_env(client: Optional[httpx.AsyncClient] = None) -> MCPServer:
+    """Create the Ollama MCP server from OLLAMA_URL and OLLAMA_MODEL environment variables."""
+    from mcp.servers.ollama import create_ollama_mcp_server
+
+    base_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
+    model = os.getenv("OLLAMA_MODEL", "tinyllama:latest")
+    return create_ollama_mcp_server(base_url, model, client)
+
+
+def _docker_app(gateway: "MCPGateway"):
+    from mcp.servers.docker import create_docker_mcp_server
+    return create_docker_mcp_server().app
+
+
+def _email_app(gateway: "MCPGateway"):
+    return email_server_from_env().app
+
+
+def _puppeteer_app(gateway: "MCPGateway"):
+    from mcp.servers.puppeteer import app
+    return app
+
+
+def _filesystem_app(gateway: "MCPGateway"):
+    return filesystem_server_from_env().app
+
+
+def _ollama_app(gateway: "MCPGateway"):
+    return ollama_server_from_env(gateway.http).app
+
+
+# Hosted servers: mount name (also the MCP resource prefix) -> factory building the ASGI app
+SERVER_FACTORIES: Dict[str, Callable[["MCPGateway"], Any]] = {
+    "docker": _docker_app,
+    "email": _email_app,
+    "puppeteer": _puppeteer_app,
+    "filesystem": _filesystem_app,
+    "ollama": _ollama_app,
+}
+
+
+class LazyServer:
+    """ASGI app that imports and builds a hosted server on its first request."""
+
+    def __init__(self, name: str, factory: Callable[["MCPGateway"], Any], gateway: "MCPGateway"):
+        self.name = name
+        self.factory = factory
+        self.gateway = gateway
+        self.app = None
+        self.error: Optional[str] = None
+        self.failed_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        # Updated only from the event loop, so no locking is needed
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.duration_sum = 0.0
+
+    @property
+    def state(self) -> str:
+        if self.app is not None:
+            return "ready"
+        return "failed" if self.error else "not_loaded"
+
+    async def load(self):
+        """Build the server once; returns None while it is failing."""
+        if self.app is not None:
+            return self.app
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self.app is not None:
+                return self.app
+            if self.error and time.monotonic() - self.failed_at < RETRY_INTERVAL:
+                return None
+            started = time.monotonic()
+            try:
+                # Imports of heavy dependencies (e.g. the docker SDK) and client setup run off the event loop
+                app = await asyncio.get_running_loop().run_in_executor(None, self.factory, self.gateway)
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {str(e)}"
+                self.failed_at = time.monotonic()
+                logger.error(f"Failed to load {self.name} server: {self.error}")
+                return None
+            self.app = app
+            self.error = None
+            self.load_seconds = time.monotonic() - started
+            logger.info(f"Loaded {self.name} server in {self.load_seconds:.3f}s")
+        return self.app
+
+    def _outside_namespace(self, scope) -> Optional[str]:
+        """Return the MCP resource if the request targets another server's resource."""
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if path.startswith(root_path):
+            path = path[len(root_path):]
+        if not path.startswith("/mcp/"):
+            return None
+        resource_path = path[len("/mcp/"):]
+        # The resource registry is process-wide, so each mount only dispatches its own prefix
+        if resource_path == self.name or resource_path.startswith(f"{self.name}."):
+            return None
+        return resource_path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return
+
+        app = await self.load()
+        if app is None:
+            if scope["type"] == "http":
+                self.requests += 1
+                self.errors += 1
+            response = JSONResponse({"detail": f"{self.name} server unavailable: {self.error}"}, status_code=503)
+            await response(scope, receive, send)
+            return
+
+        resource_path = self._outside_namespace(scope)
+        if resource_path is not None:
+            response = JSONResponse({"detail": f"Resource '{resource_path}' not found"}, status_code=404)
+            await response(scope, receive, send)
+            return
+
+        if scope["type"] != "http":
+            await app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await app(scope, receive, send_with_status)
+        finally:
+            self.in_flight -= 1
+            self.requests += 1
+            self.duration_sum += time.perf_counter() - started
+            if status >= 500:
+                self.errors += 1
+
+
+class MCPGateway:
+    """Hosts several MCP servers in one ASGI process under /<name>/ route prefixes."""
+
+    def __init__(
+        self,
+        servers: Optional[Iterable[str]] = None,
+        factories: Optional[Dict[str, Callable[["MCPGateway"], Any]]] = None
+    ):
+        factories = factories or SERVER_FACTORIES
+        names = list(servers) if servers else list(factories)
+        unknown = [name for name in names if name not in factories]
+        if unknown:
+            raise ValueError(f"Unknown MCP servers: {', '.join(unknown)}. Available: {', '.join(factories)}")
+
+        self._http: Optional[httpx.AsyncClient] = None
+        self.started = time.time()
+        self.servers = {name: LazyServer(name, factories[name], self) for name in names}
+        self.app = FastAPI(title="MCP Gateway", version="1.0.0", lifespan=self._lifespan)
+        self._setup_routes()
+        for name, server in self.servers.items():
+            self.app.mount(f"/{name}", server)
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """HTTP connection pool shared by all hosted servers."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=SHARED_POOL_TIMEOUT, limits=SHARED_POOL_LIMITS)
+        return self._http
+
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI):
+        yield
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def health(self) -> Dict[str, Any]:
+        """Gateway status with the state of every hosted server (without loading any)."""
+        servers = {}
+        for name, server in self.servers.items():
+            servers[name] = {"state": server.state}
+            if server.load_seconds is not None:
+                servers[name]["load_seconds"] = round(server.load_seconds, 3)
+            if server.error:
+                servers[name]["error"] = server.error
+        failed = any(server.state == "failed" for server in self.servers.values())
+        return {
+            "status": "degraded" if failed else "ok",
+            "service": "MCP Gateway",
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "servers": servers,
+        }
+
+    def metrics(self) -> str:
+        """Per-server request metrics in the Prometheus text format."""
+        series = [
+            ("mcp_gateway_server_loaded", "gauge", "Whether the server has been loaded.",
+             lambda server: 1 if server.app is not None else 0),
+            ("mcp_gateway_server_load_seconds", "gauge", "Time taken to import and build the server.",
+             lambda server: round(server.load_seconds or 0, 6)),
+            ("mcp_gateway_requests_total", "counter", "Requests handled by the server.",
+             lambda server: server.requests),
+            ("mcp_gateway_request_errors_total", "counter", "Requests answered with a 5xx status.",
+             lambda server: server.errors),
+            ("mcp_gateway_request_duration_seconds_sum", "counter", "Total time spent handling requests.",
+             lambda server: round(server.duration_sum, 6)),
+            ("mcp_gateway_requests_in_flight", "gauge", "Requests currently being handled.",
+             lambda server: server.in_flight),
+        ]
+        lines: List[str] = []
+        for metric, kind, description, value in series:
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, server in self.servers.items():
+                lines.append(f'{metric}{{server="{name}"}} {value(server)}')
+
+        try:
+            import resource
+            # ru_maxrss is in kilobytes on Linux
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            max_rss = None
+        if max_rss is not None:
+            lines.append("# HELP mcp_gateway_max_rss_bytes Peak resident memory of the gateway process.")
+            lines.append("# TYPE mcp_gateway_max_rss_bytes gauge")
+            lines.append(f"mcp_gateway_max_rss_bytes {max_rss}")
+        return "\n".join(lines) + "\n"
+
+    def _setup_routes(self):
+        @self.app.get("/health")
+        async def health_check() -> Dict[str, Any]:
+            return self.health()
+
+        @self.app.get("/metrics", response_class=PlainTextResponse)
+        async def metrics() -> str:
+            return self.metrics()
+
+    def run(self, host: str = "0.0.0.0", port: int = 8000):
+        """Run the gateway."""
+        import uvicorn
+        uvicorn.run(self.app, host=host, port=port)
+
+
+def create_app() -> FastAPI:
+    """Create the gateway app for the servers listed in MCP_GATEWAY_SERVERS (default: all).
+
+    Usable as an ASGI factory: uvicorn mcp.gateway:create_app --factory
+    """
+    servers = [name.strip() for name in os.getenv("MCP_GATEWAY_SERVERS", "").split(",") if name.strip()]
+    return MCPGateway(servers or None).app
@@ -0,0 +1,341 @@
+"""Filesystem MCP Server implementation."""
+from typing import Dict, Any, List, Optional
+import os
+import stat
+import base64
+import asyncio
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse
+
+from mcp import MCPError, MCPResponse, MCPServer, ResourceRegistry
+
+# Reads larger than this are not inlined in MCP responses; use GET /files/{path} instead
+INLINE_READ_LIMIT = 1024 * 1024
+
+# Queue marker telling the upload writer to discard the temp file instead of committing it
+_UPLOAD_ABORTED = object()
+
+
+class FilesystemMCP:
+    """Filesystem MCP server implementation sandboxed to a base directory."""
+
+    def __init__(self, base_path: str, read_only: bool = False, max_workers: Optional[int] = None):
+        self.base_path = os.path.realpath(base_path)
+        self.read_only = read_only
+        if not os.path.isdir(self.base_path):
+            raise MCPError(f"Filesystem base path does not exist: {self.base_path}")
+
+        # Dedicated pool so slow disk I/O never blocks the event loop or other servers' executors
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-fs")
+        self.actions = {
+            "listDirectory": self.list_directory,
+            "readFile": self.read_file,
+            "writeFile": self.write_file,
+            "deleteFile": self.delete_file,
+            "createDirectory": self.create_directory,
+            "getFileInfo": self.get_file_info,
+        }
+
+    async def _run(self, func, *args, **kwargs):
+        """Run blocking file I/O in the server's thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def resolve(self, path: str) -> str:
+        """Resolve a client path inside the sandbox, following symlinks."""
+        if "\x00" in path:
+            raise MCPError("Invalid path")
+        full_path = os.path.realpath(os.path.join(self.base_path, path.lstrip("/\\")))
+        if os.path.commonpath([self.base_path, full_path]) != self.base_path:
+            raise MCPError(f"Path is outside the filesystem root: {path}")
+        return full_path
+
+    def _check_writable(self):
+        if self.read_only:
+            raise MCPError("Filesystem server is read-only")
+
+    def _resolve_file_target(self, path: str) -> str:
+        """Resolve a path that a file will be written to; the root and directories are rejected."""
+        full_path = self.resolve(path)
+        if full_path == self.base_path or os.path.isdir(full_path):
+            raise MCPError(f"Path is a directory: {path}")
+        return full_path
+
+    def _resolve_entry(self, path: str) -> str:
+        """Resolve a path without following its last component, so a symlink names the link itself."""
+        relative = os.path.normpath(path.lstrip("/\\") or ".")
+        name = os.path.basename(relative)
+        if name in ("", ".", ".."):
+            raise MCPError(f"Path is a directory: {path}")
+        parent = self.resolve(os.path.dirname(relative))
+        return os.path.join(parent, name)
+
+    def _relative(self, full_path: str) -> str:
+        return os.path.relpath(full_path, self.base_path).replace(os.sep, "/")
+
+    @staticmethod
+    def _entry_info(entry: os.DirEntry) -> Dict[str, Any]:
+        info = entry.stat(follow_symlinks=False)
+        is_directory = entry.is_dir(follow_symlinks=False)
+        return {
+            "name": entry.name,
+            "isDirectory": is_directory,
+            "size": 0 if is_directory else info.st_size,
+            "modified": info.st_mtime,
+        }
+
+    def _list_directory(self, full_path: str) -> List[Dict[str, Any]]:
+        with os.scandir(full_path) as iterator:
+            return sorted((self._entry_info(entry) for entry in iterator), key=lambda item: item["name"])
+
+    async def list_directory(self, path: str = ".") -> Dict[str, Any]:
+        """List directory entries."""
+        full_path = self.resolve(path)
+        if not os.path.isdir(full_path):
+            raise MCPError(f"Not a directory: {path}")
+        entries = await self._run(self._list_directory, full_path)
+        return {"path": self._relative(full_path), "entries": entries}
+
+    @staticmethod
+    def _read_range(full_path: str, offset: int, length: int) -> bytes:
+        with open(full_path, "rb") as file:
+            file.seek(offset)
+            return file.read(length)
+
+    async def read_file(
+        self,
+        path: str,
+        encoding: str = "utf-8",
+        offset: int = 0,
+        length: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Read a file (or a byte range of it); use encoding='base64' for binary data."""
+        full_path = self.resolve(path)
+        if not os.path.isfile(full_path):
+            raise MCPError(f"File not found: {path}")
+
+        size = os.path.getsize(full_path)
+        offset = max(0, min(offset, size))
+        length = size - offset if length is None else max(0, min(length, size - offset))
+        if length > INLINE_READ_LIMIT:
+            raise MCPError(
+                f"File range of {length} bytes exceeds the inline limit of {INLINE_READ_LIMIT} bytes; "
+                f"use offset/length or GET /files/{self._relative(full_path)}"
+            )
+
+        data = await self._run(self._read_range, full_path, offset, length)
+        if encoding == "base64":
+            content = base64.b64encode(data).decode("ascii")
+        else:
+            content = data.decode(encoding, errors="replace")
+        return {"path": self._relative(full_path), "content": content, "encoding": encoding,
+                "offset": offset, "size": size}
+
+    @staticmethod
+    def _create_temp(directory: str):
+        """Create a temp file with the default mode (0o666 less the umask, applied by the OS)."""
+        while True:
+            tmp_path = os.path.join(directory, f".upload-{secrets.token_hex(8)}")
+            try:
+                return os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp_path
+            except FileExistsError:
+                continue
+
+    @staticmethod
+    def _write_atomic(full_path: str, chunks, append: bool = False) -> int:
+        """Write chunks to a temp file next to the target and rename it into place."""
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if append:
+            with open(full_path, "ab") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                return file.tell()
+
+        fd, tmp_path = FilesystemMCP._create_temp(directory)
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                written = file.tell()
+                file.flush()
+                os.fsync(file.fileno())
+            # The replaced file keeps its permissions
+            try:
+                os.chmod(tmp_path, stat.S_IMODE(os.stat(full_path).st_mode))
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, full_path)
+            return written
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    async def write_file(
+        self,
+        path: str,
+        content: str,
+        encoding: str = "utf-8",
+        append: bool = False
+    ) -> Dict[str, Any]:
+        """Write a file atomically (or append to it); use encoding='base64' for binary data."""
+        self._check_writable()
+        full_path = self._resolve_file_target(path)
+        data = base64.b64decode(content, validate=True) if encoding == "base64" else content.encode(encoding)
+        size = await self._run(self._write_atomic, full_path, [data], append)
+        return {"path": self._relative(full_path), "size": size}
+
+    async def delete_file(self, path: str) -> Dict[str, Any]:
+        """Delete a file; a symlink is removed itself, not its target."""
+        self._check_writable()
+        full_path = self._resolve_entry(path)
+        if not os.path.islink(full_path) and not os.path.isfile(full_path):
+            raise MCPError(f"File not found: {path}")
+        await self._run(os.unlink, full_path)
+        return {"path": self._relative(full_path), "deleted": True}
+
+    async def create_directory(self, path: str) -> Dict[str, Any]:
+        """Create a directory (including parents)."""
+        self._check_writable()
+        full_path = self.resolve(path)
+        await self._run(os.makedirs, full_path, exist_ok=True)
+        return {"path": self._relative(full_path), "created": True}
+
+    async def get_file_info(self, path: str) -> Dict[str, Any]:
+        """Get file metadata."""
+        full_path = self.resolve(path)
+        try:
+            info = await self._run(os.stat, full_path)
+        except FileNotFoundError:
+            raise MCPError(f"Path not found: {path}")
+        return {
+            "path": self._relative(full_path),
+            "isDirectory": os.path.isdir(full_path),
+            "size": info.st_size,
+            "modified": info.st_mtime,
+        }
+
+    @staticmethod
+    async def _call(handler, **params) -> MCPResponse:
+        try:
+            return MCPResponse(success=True, data=await handler(**params))
+        except MCPError as e:
+            return MCPResponse(success=False, error=str(e))
+        except (OSError, ValueError, TypeError, LookupError) as e:
+            return MCPResponse(success=False, error=f"Filesystem error: {str(e)}")
+
+    async def handle(self, action: str = "", **params) -> MCPResponse:
+        """Dispatch a 'filesystem' resource call to the requested action."""
+        handler = self.actions.get(action)
+        if handler is None:
+            return MCPResponse(success=False, error=f"Unknown filesystem action: {action}")
+        return await self._call(handler, **params)
+
+    def register(self, registry: ResourceRegistry):
+        """Register the 'filesystem' resource and 'filesystem.<action>' aliases."""
+        registry.register("filesystem", self.handle)
+        for action, handler in self.actions.items():
+            registry.register(f"filesystem.{action}", partial(self._call_action, handler))
+
+    async def _call_action(self, handler, action: str = "", **params) -> MCPResponse:
+        return await self._call(handler, **params)
+
+    def _resolve_file(self, path: str) -> str:
+        try:
+            full_path = self.resolve(path)
+        except MCPError as e:
+            raise HTTPException(status_code=403, detail=str(e))
+        if not os.path.isfile(full_path):
+            raise HTTPException(status_code=404, detail=f"File not found: {path}")
+        return full_path
+
+    def _stream_to_file(self, full_path: str, queue: "asyncio.Queue", loop) -> int:
+        def chunks():
+            while True:
+                chunk = asyncio.run_coroutine_threadsafe(queue.get(), loop).result()
+                if chunk is None:
+                    return
+                if chunk is _UPLOAD_ABORTED:
+                    # Raising makes _write_atomic delete the temp file
+                    raise MCPError("Upload aborted")
+                yield chunk
+
+        return self._write_atomic(full_path, chunks())
+
+    @staticmethod
+    def _abort_upload(queue: "asyncio.Queue"):
+        # Drop pending chunks so the marker fits and reaches the writer next
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_UPLOAD_ABORTED)
+
+    @staticmethod
+    async def _put_chunk(queue: "asyncio.Queue", writer: "asyncio.Future", chunk):
+        """Queue a chunk for the writer, failing instead of blocking if the writer has stopped."""
+        put = asyncio.ensure_future(queue.put(chunk))
+        await asyncio.wait({put, writer}, return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            await writer
+            raise HTTPException(status_code=500, detail="Upload writer stopped before the body was read")
+
+    def mount(self, app):
+        """Add raw file routes: zero-copy downloads and streaming uploads."""
+
+        @app.get("/files/{path:path}")
+        async def download_file(path: str):
+            full_path = self._resolve_file(path)
+            # FileResponse handles Range requests and uses the ASGI pathsend extension
+            # (sendfile) when the server supports it, otherwise streams from a thread
+            return FileResponse(full_path, filename=os.path.basename(full_path))
+
+        @app.put("/files/{path:path}")
+        async def upload_file(path: str, request: Request) -> Dict[str, Any]:
+            if self.read_only:
+                raise HTTPException(status_code=403, detail="Filesystem server is read-only")
+            try:
+                full_path = self.resolve(path)
+            except MCPError as e:
+                raise HTTPException(status_code=403, detail=str(e))
+            if full_path == self.base_path or os.path.isdir(full_path):
+                raise HTTPException(status_code=409, detail=f"Path is a directory: {path}")
+
+            # Hand chunks to the writer thread through a bounded queue so the body
+            # is never held in memory and the event loop never blocks on disk
+            loop = asyncio.get_running_loop()
+            queue: asyncio.Queue = asyncio.Queue(maxsize=8)
+            writer = loop.run_in_executor(self.executor, self._stream_to_file, full_path, queue, loop)
+            try:
+                async for chunk in request.stream():
+                    if chunk:
+                        await self._put_chunk(queue, writer, chunk)
+                # Commit only once the whole body has been received
+                await self._put_chunk(queue, writer, None)
+                size = await writer
+            except OSError as e:
+                raise HTTPException(status_code=500, detail=f"Filesystem error: {str(e)}")
+            except BaseException:
+                # Client disconnect or cancellation: the writer discards the temp file
+                if not writer.done():
+                    self._abort_upload(queue)
+                await asyncio.gather(writer, return_exceptions=True)
+                raise
+            return {"path": self._relative(full_path), "size": size}
+
+
+def create_filesystem_mcp_server(
+    base_path: str,
+    read_only: bool = False,
+    max_workers: Optional[int] = None
+) -> MCPServer:
+    """Create and configure a Filesystem MCP server."""
+    server = MCPServer("Filesystem MCP Server", "1.0.0")
+    filesystem_mcp = FilesystemMCP(base_path, read_only, max_workers)
+    filesystem_mcp.register(ResourceRegistry())
+    filesystem_mcp.mount(server.app)
+    return server
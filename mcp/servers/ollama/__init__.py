@@ -0,0 +1,130 @@
+"""Ollama MCP Server implementation."""
+from typing import Dict, Any, List, Optional, Union
+from functools import partial
+from contextlib import asynccontextmanager
+
+import httpx
+
+from mcp import MCPError, MCPResponse, MCPServer, ResourceRegistry
+
+
+class OllamaMCP:
+    """Ollama MCP server implementation proxying to an Ollama HTTP API."""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434",
+        model: str = "tinyllama:latest",
+        client: Optional[httpx.AsyncClient] = None,
+        timeout: float = 120.0
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        # A client passed in (e.g. by the gateway) is shared with other servers and closed by its owner
+        self.client = client or httpx.AsyncClient(timeout=timeout)
+        self.owns_client = client is None
+        self.timeout = timeout
+        self.actions = {
+            "generate": self.generate,
+            "listModels": self.list_models,
+            "embed": self.embed,
+        }
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.client.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        if response.status_code != 200:
+            raise MCPError(f"Ollama returned {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    async def generate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Generate a completion (non-streaming)."""
+        options = {}
+        if temperature is not None:
+            options["temperature"] = temperature
+        if max_tokens is not None:
+            options["num_predict"] = max_tokens
+        result = await self._post("/api/generate", {
+            "model": model or self.model, "prompt": prompt, "stream": False, "options": options
+        })
+        return {
+            "response": result.get("response", ""),
+            "model": result.get("model", model or self.model),
+            "eval_count": result.get("eval_count"),
+            "total_duration": result.get("total_duration"),
+        }
+
+    async def list_models(self) -> Dict[str, Any]:
+        """List models available in Ollama."""
+        response = await self.client.get(f"{self.base_url}/api/tags", timeout=self.timeout)
+        if response.status_code != 200:
+            raise MCPError(f"Ollama returned {response.status_code}")
+        return {"models": [
+            {"name": model.get("name"), "size": model.get("size")}
+            for model in response.json().get("models", [])
+        ]}
+
+    async def embed(self, input: Union[str, List[str]], model: Optional[str] = None) -> Dict[str, Any]:
+        """Compute embeddings for one or more texts."""
+        result = await self._post("/api/embed", {"model": model or self.model, "input": input})
+        return {"embeddings": result.get("embeddings", [])}
+
+    async def close(self):
+        """Close the HTTP client if this server created it."""
+        if self.owns_client:
+            await self.client.aclose()
+
+    @staticmethod
+    async def _call(handler, **params) -> MCPResponse:
+        try:
+            return MCPResponse(success=True, data=await handler(**params))
+        except MCPError as e:
+            return MCPResponse(success=False, error=str(e))
+        except (httpx.HTTPError, ValueError, TypeError) as e:
+            return MCPResponse(success=False, error=f"Ollama error: {str(e)}")
+
+    async def handle(self, action: str = "", **params) -> MCPResponse:
+        """Dispatch an 'ollama' resource call to the requested action."""
+        handler = self.actions.get(action)
+        if handler is None:
+            return MCPResponse(success=False, error=f"Unknown ollama action: {action}")
+        return await self._call(handler, **params)
+
+    def register(self, registry: ResourceRegistry):
+        """Register the 'ollama' resource and 'ollama.<action>' aliases."""
+        registry.register("ollama", self.handle)
+        for action, handler in self.actions.items():
+            registry.register(f"ollama.{action}", partial(self._call_action, handler))
+
+    async def _call_action(self, handler, action: str = "", **params) -> MCPResponse:
+        return await self._call(handler, **params)
+
+
+def create_ollama_mcp_server(
+    base_url: str = "http://localhost:11434",
+    model: str = "tinyllama:latest",
+    client: Optional[httpx.AsyncClient] = None
+) -> MCPServer:
+    """Create and configure an Ollama MCP server."""
+    server = MCPServer("Ollama MCP Server", "1.0.0")
+    ollama_mcp = OllamaMCP(base_url, model, client)
+    ollama_mcp.register(ResourceRegistry())
+
+    # Close the server's own HTTP client on shutdown (a shared client is closed by its owner)
+    parent_lifespan = server.app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        try:
+            async with parent_lifespan(app) as state:
+                yield state
+        finally:
+            await ollama_mcp.close()
+
+    server.app.router.lifespan_context = lifespan
+    return server
@@ -0,0 +1,196 @@
+"""Test cases for the Filesystem MCP server (in-process, no running server needed)."""
+import os
+import stat
+import base64
+import asyncio
+import tempfile
+import unittest
+import httpx
+
+from mcp.servers.filesystem import create_filesystem_mcp_server
+
+
+class TestFilesystemServer(unittest.IsolatedAsyncioTestCase):
+    """Test cases for the Filesystem MCP server routes and actions."""
+
+    async def asyncSetUp(self):
+        """Create a sandbox directory and an in-process client."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "root")
+        os.mkdir(self.root)
+        self.app = create_filesystem_mcp_server(self.root).app
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        """Close the client and remove the sandbox."""
+        await self.client.aclose()
+        self.tmp.cleanup()
+
+    async def call(self, action, **params):
+        response = await self.client.post(f"/mcp/filesystem.{action}", json={"params": params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def leftovers(self):
+        return [name for name in os.listdir(self.root) if name.startswith(".upload-")]
+
+    async def test_range_download(self):
+        """Test GET /files with a Range header."""
+        with open(os.path.join(self.root, "data.bin"), "wb") as file:
+            file.write(b"0123456789")
+
+        response = await self.client.get("/files/data.bin", headers={"Range": "bytes=2-5"})
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.content, b"2345")
+        self.assertEqual(response.headers["content-range"], "bytes 2-5/10")
+
+    async def test_streaming_upload(self):
+        """Test PUT /files streaming a chunked body into place."""
+        async def body():
+            for i in range(20):
+                yield bytes([65 + i]) * 1000
+
+        response = await self.client.put("/files/sub/upload.bin", content=body())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"path": "sub/upload.bin", "size": 20000})
+        with open(os.path.join(self.root, "sub", "upload.bin"), "rb") as file:
+            self.assertEqual(file.read()[::1000], bytes(range(65, 85)))
+        self.assertEqual(self.leftovers(), [])
+
+    async def test_upload_client_disconnect(self):
+        """Test that a disconnected upload leaves neither the file nor a temp file."""
+        messages = [
+            {"type": "http.request", "body": b"partial", "more_body": True},
+            {"type": "http.disconnect"},
+        ]
+
+        async def receive():
+            return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "PUT",
+            "scheme": "http", "path": "/files/partial.bin", "raw_path": b"/files/partial.bin",
+            "root_path": "", "query_string": b"", "headers": [(b"host", b"test")],
+            "client": ("127.0.0.1", 1234), "server": ("test", 80),
+        }
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            pass
+
+        self.assertFalse(os.path.exists(os.path.join(self.root, "partial.bin")))
+        self.assertEqual(self.leftovers(), [])
+
+    async def test_upload_writer_failure(self):
+        """Test that an upload fails instead of hanging when the writer stops early."""
+        with open(os.path.join(self.root, "file.txt"), "w") as file:
+            file.write("x")
+
+        async def body():
+            for _ in range(50):
+                yield b"x" * 1000
+
+        response = await asyncio.wait_for(self.client.put("/files/file.txt/nested.bin", content=body()), 5)
+
+        self.assertEqual(response.status_code, 500)
+
+    async def test_upload_rejects_root_and_directories(self):
+        """Test that uploads to the root or a directory are refused."""
+        os.mkdir(os.path.join(self.root, "dir"))
+
+        for path in ("/files/dir", "/files/./"):
+            response = await self.client.put(path, content=b"data")
+            self.assertIn(response.status_code, (404, 405, 409))
+        self.assertEqual(os.listdir(self.tmp.name), ["root"])
+        self.assertEqual(self.leftovers(), [])
+
+    async def test_sandbox_escape(self):
+        """Test that paths outside the base directory are rejected."""
+        with open(os.path.join(self.tmp.name, "secret.txt"), "w") as file:
+            file.write("secret")
+        os.symlink(self.tmp.name, os.path.join(self.root, "link"))
+
+        for path in ("../secret.txt", "link/secret.txt", "/../secret.txt"):
+            result = await self.call("readFile", path=path)
+            self.assertFalse(result["success"])
+            self.assertIn("outside", result["error"])
+        response = await self.client.get("/files/link/secret.txt")
+        self.assertEqual(response.status_code, 403)
+
+    async def test_write_file_rejects_root_and_directories(self):
+        """Test that writeFile does not create temp files for the root or a directory."""
+        os.mkdir(os.path.join(self.root, "dir"))
+
+        for path in ("", ".", "dir"):
+            result = await self.call("writeFile", path=path, content="data")
+            self.assertFalse(result["success"])
+            self.assertIn("directory", result["error"])
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["root"])
+        self.assertEqual(os.listdir(self.root), ["dir"])
+
+    async def test_write_file_error_paths(self):
+        """Test invalid base64 content and unknown encodings."""
+        result = await self.call("writeFile", path="a.bin", content="not base64!", encoding="base64")
+        self.assertFalse(result["success"])
+
+        result = await self.call("writeFile", path="a.txt", content="text", encoding="no-such-codec")
+        self.assertFalse(result["success"])
+        self.assertIn("Filesystem error", result["error"])
+
+        result = await self.call("readFile", path="missing.txt")
+        self.assertFalse(result["success"])
+        self.assertFalse(os.path.exists(os.path.join(self.root, "a.bin")))
+
+        data = base64.b64encode(b"\x00\x01").decode("ascii")
+        result = await self.call("writeFile", path="a.bin", content=data, encoding="base64")
+        self.assertTrue(result["success"])
+        self.assertEqual(result["data"]["size"], 2)
+
+    async def test_write_keeps_file_mode(self):
+        """Test that atomic writes keep an existing mode and give new files 0o666 less the umask."""
+        path = os.path.join(self.root, "script.txt")
+        with open(path, "w") as file:
+            file.write("old")
+        os.chmod(path, 0o644)
+        umask = os.umask(0o027)
+        try:
+            result = await self.call("writeFile", path="script.txt", content="new")
+            response = await self.client.put("/files/new.bin", content=b"data")
+        finally:
+            os.umask(umask)
+
+        self.assertTrue(result["success"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o644)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(self.root, "new.bin")).st_mode), 0o640)
+
+    async def test_delete_symlink_keeps_target(self):
+        """Test that deleteFile removes a symlink itself and refuses paths outside the root."""
+        target = os.path.join(self.root, "target.txt")
+        with open(target, "w") as file:
+            file.write("keep")
+        os.symlink(target, os.path.join(self.root, "link.txt"))
+
+        result = await self.call("deleteFile", path="link.txt")
+
+        self.assertTrue(result["success"])
+        self.assertEqual(result["data"]["path"], "link.txt")
+        self.assertFalse(os.path.lexists(os.path.join(self.root, "link.txt")))
+        self.assertTrue(os.path.exists(target))
+
+        os.symlink(self.tmp.name, os.path.join(self.root, "outside"))
+        with open(os.path.join(self.tmp.name, "secret.txt"), "w") as file:
+            file.write("secret")
+        for path in ("outside/secret.txt", "../secret.txt", ".."):
+            result = await self.call("deleteFile", path=path)
+            self.assertFalse(result["success"])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "secret.txt")))
+
+
+if __name__ == "__main__":
+    unittest.main()
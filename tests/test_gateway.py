@@ -0,0 +1,131 @@
+"""Test cases for the MCP gateway (in-process, no running servers needed)."""
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi import FastAPI
+
+from mcp import gateway
+from mcp.gateway import MCPGateway
+from mcp.servers.ollama import OllamaMCP, create_ollama_mcp_server
+
+
+def echo_app():
+    """A hosted server answering every MCP resource with its name."""
+    app = FastAPI()
+
+    @app.api_route("/mcp/{resource_path:path}", methods=["GET", "POST"])
+    async def resource(resource_path: str):
+        return {"resource": resource_path}
+
+    return app
+
+
+class TestGateway(unittest.IsolatedAsyncioTestCase):
+    """Test cases for lazy loading, failures, namespaces and metrics."""
+
+    async def asyncSetUp(self):
+        """Create a gateway with test factories and an in-process client."""
+        self.builds = {"alpha": 0, "broken": 0}
+
+        def alpha(gw):
+            self.builds["alpha"] += 1
+            return echo_app()
+
+        def broken(gw):
+            self.builds["broken"] += 1
+            if self.builds["broken"] == 1:
+                raise RuntimeError("backend down")
+            return echo_app()
+
+        self.gateway = MCPGateway(factories={"alpha": alpha, "broken": broken})
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=self.gateway.app), base_url="http://test")
+
+    async def asyncTearDown(self):
+        """Close the client."""
+        await self.client.aclose()
+
+    async def test_lazy_loading(self):
+        """Test that a server is built once, on its first request."""
+        health = (await self.client.get("/health")).json()
+        self.assertEqual(health["servers"]["alpha"]["state"], "not_loaded")
+        self.assertEqual(self.builds["alpha"], 0)
+
+        responses = await asyncio.gather(*(self.client.get("/alpha/mcp/alpha.ping") for _ in range(5)))
+
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertEqual(responses[0].json(), {"resource": "alpha.ping"})
+        self.assertEqual(self.builds["alpha"], 1)
+        health = (await self.client.get("/health")).json()
+        self.assertEqual(health["servers"]["alpha"]["state"], "ready")
+        self.assertEqual(health["status"], "ok")
+
+    async def test_failure_and_retry(self):
+        """Test the 503 answer for a failed server and the retry after RETRY_INTERVAL."""
+        response = await self.client.get("/broken/mcp/broken.ping")
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("backend down", response.json()["detail"])
+
+        # Within the retry interval the factory is not called again
+        response = await self.client.get("/broken/mcp/broken.ping")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.builds["broken"], 1)
+        health = (await self.client.get("/health")).json()
+        self.assertEqual(health["status"], "degraded")
+        self.assertEqual(health["servers"]["broken"]["state"], "failed")
+
+        with patch.object(gateway, "RETRY_INTERVAL", 0):
+            response = await self.client.get("/broken/mcp/broken.ping")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.builds["broken"], 2)
+        self.assertEqual((await self.client.get("/health")).json()["status"], "ok")
+
+    async def test_namespace_filtering(self):
+        """Test that a mount only dispatches its own resource prefix."""
+        self.assertEqual((await self.client.get("/alpha/mcp/alpha")).status_code, 200)
+        self.assertEqual((await self.client.post("/alpha/mcp/alpha.x.y")).status_code, 200)
+
+        for path in ("/alpha/mcp/broken.ping", "/alpha/mcp/alphabet", "/alpha/mcp/docker.containers.list"):
+            response = await self.client.get(path)
+            self.assertEqual(response.status_code, 404)
+            self.assertIn("not found", response.json()["detail"])
+
+    async def test_metrics(self):
+        """Test the per-server Prometheus metrics."""
+        await self.client.get("/alpha/mcp/alpha.ping")
+        await self.client.get("/alpha/missing")
+        await self.client.get("/broken/mcp/broken.ping")
+
+        response = await self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        lines = response.text.splitlines()
+        self.assertIn('mcp_gateway_server_loaded{server="alpha"} 1', lines)
+        self.assertIn('mcp_gateway_server_loaded{server="broken"} 0', lines)
+        self.assertIn('mcp_gateway_requests_total{server="alpha"} 2', lines)
+        self.assertIn('mcp_gateway_request_errors_total{server="alpha"} 0', lines)
+        self.assertIn('mcp_gateway_request_errors_total{server="broken"} 1', lines)
+        self.assertIn('mcp_gateway_requests_in_flight{server="alpha"} 0', lines)
+        self.assertIn("# TYPE mcp_gateway_requests_total counter", lines)
+
+    async def test_unknown_server(self):
+        """Test that unknown server names are rejected."""
+        with self.assertRaises(ValueError):
+            MCPGateway(["nope"], factories={"alpha": lambda gw: echo_app()})
+
+
+class TestOllamaShutdown(unittest.IsolatedAsyncioTestCase):
+    """Test cases for closing the standalone Ollama server's HTTP client."""
+
+    async def test_close_on_shutdown(self):
+        """Test that app shutdown closes the Ollama HTTP client."""
+        with patch.object(OllamaMCP, "close", new_callable=AsyncMock) as close:
+            server = create_ollama_mcp_server("http://ollama.test")
+            async with server.app.router.lifespan_context(server.app):
+                close.assert_not_awaited()
+            close.assert_awaited_once()
+
+
+if __name__ == "__main__":
+    unittest.main()